@@ -18,6 +18,9 @@ pyinstaller --name="ForensicFlow" ^
             --hidden-import="customtkinter" ^
             --hidden-import="reportlab" ^
             --hidden-import="PIL" ^
+            --hidden-import="numpy" ^
+            --hidden-import="pypdf" ^
+            --hidden-import="psutil" ^
             main.py
 
 echo.
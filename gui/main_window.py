@@ -3,19 +3,43 @@ Ventana principal de ForensicFlow
 """
 
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import threading
+import queue
+from collections import deque
 from datetime import datetime
 import os
 import tkinter as tk
 
-from phases.verification import VerificationPhase
-from phases.acquisition import AcquisitionPhase
-from phases.analysis import AnalysisPhase
-from phases.reporting import ReportingPhase
+from phases.pipeline import AnalysisPipeline
+from phases.reporting import REPORT_FORMATS
 from utils.logger import Logger
+from utils.tracing import Tracer, TRACE_FILE
+from utils.job_control import JobControl, Cancelled, CHECKPOINT_FILE
+from utils.throttle import DEFAULT_BANDWIDTH_MB_S, DEFAULT_LOAD_THRESHOLD
 
 
+# Panel de log: cada LOG_POLL_MS el hilo de Tk vacía la cola de mensajes en un solo lote
+LOG_POLL_MS = 100
+
+# Líneas visibles en el panel (el log completo queda en disco)
+LOG_VIEW_LINES = 2000
+
+LOG_COLORS = {
+    "INFO": "#00ff88",
+    "SUCCESS": "#00ff88",
+    "WARNING": "#ffd700",
+    "ERROR": "#ff4444",
+    "PHASE": "#00d9ff"
+}
+
+# Filtros del panel: niveles visibles (None = todos)
+LOG_FILTERS = {
+    "Todo": None,
+    "Hitos": ("PHASE", "SUCCESS", "WARNING", "ERROR"),
+    "Errores": ("WARNING", "ERROR"),
+}
+
 class ForensicFlowApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -30,10 +54,26 @@ class ForensicFlowApp(ctk.CTk):
         self.evidence_folder = ""
         self.analysis_running = False
         self.capture_mode = None  # 'selective' o 'complete'
+        self.incremental_capture = False  # Reutilizar la adquisición previa del mismo disco
+        self.rescue_capture = False  # Lectura tolerante a sectores dañados
+        self.original_destination = None  # Carpeta (otra unidad) para la imagen original
+        self.low_impact = False  # Adquisición con recursos limitados (servidores en producción)
+        self.bandwidth_limit = None  # MB/s máximos de lectura en modo de bajo impacto
+        self.load_threshold = None  # % de CPU del equipo a partir del cual se pausa
+        self.split_size = None  # Bytes por segmento si la imagen se divide (.001, .002, ...)
+        self.report_formats = None  # Formatos del reporte (None = todos)
+        self.tracer = None  # Spans de rendimiento del análisis en curso
+        self.jobs = None  # Cancelación y procesos externos del análisis en curso
         
         # Logger
         self.logger = Logger()
         
+        # Mensajes pendientes para el panel: add_log se llama desde el hilo del análisis
+        self.log_queue = queue.SimpleQueue()
+        self.log_lines = deque(maxlen=LOG_VIEW_LINES)
+        self.log_filter = None
+        self.log_view_count = 0
+        
         # Configurar UI
         self.setup_ui()
         
@@ -216,6 +256,16 @@ class ForensicFlowApp(ctk.CTk):
         )
         panel_title.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
         
+        # Filtro por nivel
+        log_filter = ctk.CTkSegmentedButton(
+            log_frame,
+            values=list(LOG_FILTERS),
+            command=self.set_log_filter,
+            font=ctk.CTkFont(size=12)
+        )
+        log_filter.set("Todo")
+        log_filter.grid(row=0, column=1, padx=20, pady=(20, 10), sticky="e")
+        
         # Área de texto para el log
         self.log_text = ctk.CTkTextbox(
             log_frame,
@@ -224,7 +274,10 @@ class ForensicFlowApp(ctk.CTk):
             text_color="#00ff88",
             wrap="word"
         )
-        self.log_text.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="nsew")
+        self.log_text.grid(row=1, column=0, columnspan=2, padx=20, pady=(0, 20), sticky="nsew")
+        for level, color in LOG_COLORS.items():
+            self.log_text.tag_config(level, foreground=color)
+        self.after(LOG_POLL_MS, self.drain_log)
         
         # Log inicial
         self.add_log("Sistema iniciado correctamente", "INFO")
@@ -282,26 +335,60 @@ class ForensicFlowApp(ctk.CTk):
         exit_button.grid(row=0, column=2, padx=10)
         
     def add_log(self, message, level="INFO"):
-        """Agregar mensaje al log"""
+        """Agregar mensaje al log
+
+        Se puede llamar desde cualquier hilo: el mensaje se encola y el hilo de Tk lo muestra
+        en el próximo lote (drain_log).
+        """
         timestamp = datetime.now().strftime("%H:%M:%S")
+        self.log_queue.put((level, f"[{timestamp}] [{level}] {message}\n"))
         
-        # Colores según nivel
-        colors = {
-            "INFO": "#00ff88",
-            "SUCCESS": "#00ff88",
-            "WARNING": "#ffd700",
-            "ERROR": "#ff4444",
-            "PHASE": "#00d9ff"
-        }
-        
-        color = colors.get(level, "#ffffff")
-        formatted_message = f"[{timestamp}] [{level}] {message}\n"
+        # También guardar en el logger
+        self.logger.log(message, level)
         
-        self.log_text.insert("end", formatted_message)
+    def drain_log(self):
+        """Mostrar en un solo lote los mensajes encolados desde la última vuelta"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if batch:
+            self.log_lines.extend(batch)
+            visible = [line for line in batch if self.log_filter is None or line[0] in self.log_filter]
+            if len(visible) >= LOG_VIEW_LINES:
+                self.render_log()
+            elif visible:
+                # Solo se sigue el final si el usuario no se desplazó hacia arriba
+                at_end = self.log_text.yview()[1] >= 0.999
+                for level, text in visible:
+                    self.log_text.insert("end", text, level)
+                self.log_view_count += len(visible)
+                if self.log_view_count > LOG_VIEW_LINES:
+                    excess = self.log_view_count - LOG_VIEW_LINES
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
+                    self.log_view_count = LOG_VIEW_LINES
+                if at_end:
+                    self.log_text.see("end")
+        
+        self.after(LOG_POLL_MS, self.drain_log)
+        
+    def render_log(self):
+        """Redibujar el panel con las últimas líneas que pasan el filtro"""
+        visible = [line for line in self.log_lines if self.log_filter is None or line[0] in self.log_filter]
+        visible = visible[-LOG_VIEW_LINES:]
+        self.log_text.delete("1.0", "end")
+        for level, text in visible:
+            self.log_text.insert("end", text, level)
+        self.log_view_count = len(visible)
         self.log_text.see("end")
         
-        # También guardar en el logger
-        self.logger.log(message, level)
+    def set_log_filter(self, name):
+        """Mostrar solo los niveles del filtro elegido"""
+        self.log_filter = LOG_FILTERS[name]
+        self.render_log()
         
     def update_phase_status(self, phase_index, status):
         """Actualizar el estado de una fase
@@ -344,6 +431,15 @@ class ForensicFlowApp(ctk.CTk):
         
         # Guardar modo seleccionado
         self.capture_mode = dialog.selected_mode
+        self.incremental_capture = dialog.incremental_var.get()
+        self.rescue_capture = dialog.rescue_var.get()
+        self.original_destination = dialog.original_destination
+        self.low_impact = dialog.low_impact_var.get()
+        self.bandwidth_limit = dialog.bandwidth_limit
+        self.load_threshold = dialog.load_threshold
+        self.split_size = dialog.split_size
+        # Triaje: se omite el PDF, el formato más lento de generar
+        self.report_formats = [fmt for fmt in REPORT_FORMATS if fmt != "pdf"] if dialog.triage_var.get() else None
         
         # Iniciar análisis
         self.begin_analysis()
@@ -355,93 +451,68 @@ class ForensicFlowApp(ctk.CTk):
         self.stop_button.configure(state="normal")
         self.status_label.configure(text="● Análisis en curso...", text_color="#ffd700")
         
+        # El log del caso empieza aquí: las entradas de análisis anteriores de la sesión no son de este caso
+        self.logger.start_run()
         self.add_log("=" * 50, "INFO")
         self.add_log("INICIANDO ANÁLISIS FORENSE AUTOMATIZADO", "PHASE")
         mode_text = "SELECTIVO (Áreas Críticas)" if self.capture_mode == "selective" else "COMPLETO (Imagen Forense Total)"
         self.add_log(f"Modo de captura: {mode_text}", "INFO")
+        if self.capture_mode == "complete" and self.incremental_capture:
+            self.add_log("Captura incremental habilitada (solo se guardan los cambios desde la última adquisición)", "INFO")
+        if self.capture_mode == "complete" and self.rescue_capture:
+            self.add_log("Captura tolerante a sectores dañados habilitada (mapa de errores)", "INFO")
+        if self.capture_mode == "complete" and self.original_destination:
+            self.add_log(f"Imagen original en: {self.original_destination}", "INFO")
+        if self.low_impact:
+            self.add_log("Modo de bajo impacto habilitado (ancho de banda limitado y pausa con carga alta)", "INFO")
+        if self.capture_mode == "complete" and self.split_size:
+            self.add_log(f"Imagen dividida en segmentos de {self.split_size // (1024**2)} MB", "INFO")
+        if self.report_formats:
+            self.add_log(f"Triaje rápido: reporte en {', '.join(fmt.upper() for fmt in self.report_formats)} (sin PDF)", "INFO")
         self.add_log("=" * 50, "INFO")
         
+        # Spans de rendimiento de esta ejecución (fases, herramientas, hashes); la traza se guarda
+        # en la carpeta del caso que cree la fase 1
+        self.tracer = Tracer()
+        self.jobs = JobControl()
+        self.evidence_folder = ""
+        
         # Ejecutar análisis en un thread separado
         analysis_thread = threading.Thread(target=self.run_analysis, daemon=True)
         analysis_thread.start()
         
     def run_analysis(self):
-        """Ejecutar todas las fases del análisis"""
+        """Ejecutar todas las fases del análisis
+
+        Las tareas de las cuatro fases se ejecutan según sus dependencias: el análisis de la memoria
+        avanza mientras se captura el disco.
+        """
         try:
-            # Fase 1: Verificación inicial
-            self.run_phase_1()
-            
-            # Fase 2: Adquisición
-            self.run_phase_2()
-            
-            # Fase 3: Análisis automatizado
-            self.run_phase_3()
-            
-            # Fase 4: Generación de reporte
-            self.run_phase_4()
+            AnalysisPipeline(self).run(
+                on_group=lambda phase, status: self.after(0, lambda: self.update_phase_status(phase, status))
+            )
             
             # Análisis completado
             self.after(0, self.analysis_completed)
             
+        except Cancelled:
+            self.after(0, self.analysis_stopped)
+            
         except Exception as e:
             self.after(0, lambda: self.analysis_error(str(e)))
             
-    def run_phase_1(self):
-        """Ejecutar Fase 1: Verificación inicial"""
-        self.after(0, lambda: self.update_phase_status(0, "running"))
-        self.after(0, lambda: self.add_log("Iniciando Fase 1: Verificación inicial", "PHASE"))
-        
-        phase = VerificationPhase(self)
-        success = phase.execute()
-        
-        if success:
-            self.evidence_folder = phase.evidence_folder
-            self.after(0, lambda: self.update_phase_status(0, "completed"))
-        else:
-            self.after(0, lambda: self.update_phase_status(0, "error"))
-            raise Exception("Error en la fase de verificación")
-            
-    def run_phase_2(self):
-        """Ejecutar Fase 2: Adquisición"""
-        self.after(0, lambda: self.update_phase_status(1, "running"))
-        self.after(0, lambda: self.add_log("Iniciando Fase 2: Adquisición de evidencia", "PHASE"))
-        
-        phase = AcquisitionPhase(self, self.evidence_folder)
-        success = phase.execute()
-        
-        if success:
-            self.after(0, lambda: self.update_phase_status(1, "completed"))
-        else:
-            self.after(0, lambda: self.update_phase_status(1, "error"))
-            raise Exception("Error en la fase de adquisición")
+        finally:
+            self.save_trace()
             
-    def run_phase_3(self):
-        """Ejecutar Fase 3: Análisis automatizado"""
-        self.after(0, lambda: self.update_phase_status(2, "running"))
-        self.after(0, lambda: self.add_log("Iniciando Fase 3: Análisis automatizado", "PHASE"))
-        
-        phase = AnalysisPhase(self, self.evidence_folder)
-        success = phase.execute()
-        
-        if success:
-            self.after(0, lambda: self.update_phase_status(2, "completed"))
-        else:
-            self.after(0, lambda: self.update_phase_status(2, "error"))
-            raise Exception("Error en la fase de análisis")
-            
-    def run_phase_4(self):
-        """Ejecutar Fase 4: Generación de reporte"""
-        self.after(0, lambda: self.update_phase_status(3, "running"))
-        self.after(0, lambda: self.add_log("Iniciando Fase 4: Generación de reporte", "PHASE"))
-        
-        phase = ReportingPhase(self, self.evidence_folder)
-        success = phase.execute()
-        
-        if success:
-            self.after(0, lambda: self.update_phase_status(3, "completed"))
-        else:
-            self.after(0, lambda: self.update_phase_status(3, "error"))
-            raise Exception("Error en la fase de reporte")
+    def save_trace(self):
+        """Guardar la traza de rendimiento completa en la carpeta del caso"""
+        if not self.evidence_folder:
+            return
+        try:
+            trace_file = self.tracer.save(os.path.join(self.evidence_folder, "Hallazgos", TRACE_FILE))
+            self.add_log(f"Traza de rendimiento: {trace_file} (abrir en ui.perfetto.dev o chrome://tracing)", "INFO")
+        except Exception as e:
+            self.add_log(f"No se pudo guardar la traza de rendimiento: {str(e)}", "WARNING")
             
     def analysis_completed(self):
         """Análisis completado exitosamente"""
@@ -462,6 +533,17 @@ class ForensicFlowApp(ctk.CTk):
             f"El reporte PDF ha sido generado."
         )
         
+    def analysis_stopped(self):
+        """El análisis se detuvo: las tareas en curso terminaron y las herramientas fueron cerradas"""
+        self.analysis_running = False
+        self.start_button.configure(state="normal")
+        self.stop_button.configure(state="disabled")
+        self.status_label.configure(text="● Análisis detenido", text_color="#ff4444")
+        
+        self.add_log("Análisis detenido: procesos externos terminados", "WARNING")
+        if self.evidence_folder:
+            self.add_log(f"Estado de las tareas: {os.path.join(self.evidence_folder, CHECKPOINT_FILE)}", "INFO")
+        
     def analysis_error(self, error_message):
         """Error durante el análisis"""
         self.analysis_running = False
@@ -481,11 +563,12 @@ class ForensicFlowApp(ctk.CTk):
     def stop_analysis(self):
         """Detener el análisis"""
         if messagebox.askyesno("Detener Análisis", "¿Está seguro de que desea detener el análisis?"):
-            self.analysis_running = False
-            self.start_button.configure(state="normal")
+            # El botón de inicio se habilita cuando el hilo del análisis termina (analysis_stopped)
             self.stop_button.configure(state="disabled")
-            self.status_label.configure(text="● Análisis detenido", text_color="#ff4444")
-            self.add_log("Análisis detenido por el usuario", "WARNING")
+            self.status_label.configure(text="● Deteniendo análisis...", text_color="#ffd700")
+            self.add_log("Análisis detenido por el usuario: terminando herramientas y tareas en curso", "WARNING")
+            # Terminar los procesos puede tardar hasta CANCEL_GRACE segundos: fuera del hilo de Tk
+            threading.Thread(target=self.jobs.cancel, name="cancelar-analisis", daemon=True).start()
             
     def quit_app(self):
         """Salir de la aplicación"""
@@ -495,10 +578,16 @@ class ForensicFlowApp(ctk.CTk):
                 "Hay un análisis en curso. ¿Está seguro de que desea salir?"
             ):
                 return
+            # No dejar herramientas externas (dd, WinPmem, Volatility) corriendo tras salir
+            self.jobs.cancel()
                 
         self.quit()
 
 
+# Tamaño de segmento por defecto: por debajo del límite de 4 GB por archivo de FAT32
+DEFAULT_SPLIT_MB = 2048
+
+
 class CaptureSelectionDialog(ctk.CTkToplevel):
     """Diálogo modal para seleccionar el modo de captura"""
     
@@ -506,17 +595,21 @@ class CaptureSelectionDialog(ctk.CTkToplevel):
         super().__init__(parent)
         
         self.selected_mode = None
+        self.original_destination = None
+        self.bandwidth_limit = None
+        self.load_threshold = None
+        self.split_size = None
         
         # Configuración de la ventana
         self.title("Seleccionar Modo de Captura")
-        self.geometry("700x450")
+        self.geometry("700x730")
         self.resizable(False, False)
         
         # Centrar ventana
         self.update_idletasks()
         x = (self.winfo_screenwidth() // 2) - (700 // 2)
-        y = (self.winfo_screenheight() // 2) - (450 // 2)
-        self.geometry(f"700x450+{x}+{y}")
+        y = (self.winfo_screenheight() // 2) - (730 // 2)
+        self.geometry(f"700x730+{x}+{y}")
         
         # Hacer modal
         self.transient(parent)
@@ -633,6 +726,108 @@ class CaptureSelectionDialog(ctk.CTkToplevel):
         )
         complete_button.pack(pady=(10, 20), padx=20, fill="x")
         
+        # Opción de captura incremental (solo aplica a la captura completa)
+        self.incremental_var = ctk.BooleanVar(value=False)
+        incremental_check = ctk.CTkCheckBox(
+            self,
+            text="Captura incremental: guardar solo los cambios desde la última adquisición de este equipo",
+            variable=self.incremental_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        incremental_check.grid(row=3, column=0, pady=(0, 5))
+        
+        # Disco con sectores dañados: lectura por pasadas con mapa de errores
+        self.rescue_var = ctk.BooleanVar(value=False)
+        rescue_check = ctk.CTkCheckBox(
+            self,
+            text="Disco dañado: lectura tolerante a errores con mapa de sectores ilegibles",
+            variable=self.rescue_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        rescue_check.grid(row=4, column=0, pady=(0, 5))
+        
+        # Segundo destino: la imagen original en otra unidad, la copia de trabajo en el caso
+        destination_frame = ctk.CTkFrame(self, fg_color="transparent")
+        destination_frame.grid(row=5, column=0, pady=(5, 0))
+        
+        destination_button = ctk.CTkButton(
+            destination_frame,
+            text="📁 Unidad para la imagen original...",
+            command=self.select_original_destination,
+            fg_color="#1e1e2e",
+            hover_color="#2e2e3e",
+            font=ctk.CTkFont(size=12),
+            height=30
+        )
+        destination_button.grid(row=0, column=0, padx=5)
+        
+        self.destination_label = ctk.CTkLabel(
+            destination_frame,
+            text="Misma carpeta del caso",
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        self.destination_label.grid(row=0, column=1, padx=5)
+        
+        # Modo de bajo impacto para servidores en producción
+        low_impact_frame = ctk.CTkFrame(self, fg_color="transparent")
+        low_impact_frame.grid(row=6, column=0, pady=(10, 0))
+        
+        self.low_impact_var = ctk.BooleanVar(value=False)
+        low_impact_check = ctk.CTkCheckBox(
+            low_impact_frame,
+            text="Bajo impacto (servidor en producción):",
+            variable=self.low_impact_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        low_impact_check.grid(row=0, column=0, padx=5)
+        
+        self.bandwidth_entry = ctk.CTkEntry(low_impact_frame, width=50, font=ctk.CTkFont(size=12))
+        self.bandwidth_entry.insert(0, str(DEFAULT_BANDWIDTH_MB_S))
+        self.bandwidth_entry.grid(row=0, column=1, padx=(5, 2))
+        ctk.CTkLabel(low_impact_frame, text="MB/s, pausa con CPU >", font=ctk.CTkFont(size=12),
+                     text_color="#8892b0").grid(row=0, column=2, padx=2)
+        
+        self.load_entry = ctk.CTkEntry(low_impact_frame, width=40, font=ctk.CTkFont(size=12))
+        self.load_entry.insert(0, str(DEFAULT_LOAD_THRESHOLD))
+        self.load_entry.grid(row=0, column=3, padx=(2, 2))
+        ctk.CTkLabel(low_impact_frame, text="%", font=ctk.CTkFont(size=12),
+                     text_color="#8892b0").grid(row=0, column=4, padx=(2, 5))
+        
+        # Imagen dividida en segmentos para unidades FAT32/exFAT
+        split_frame = ctk.CTkFrame(self, fg_color="transparent")
+        split_frame.grid(row=7, column=0, pady=(10, 0))
+        
+        self.split_var = ctk.BooleanVar(value=False)
+        split_check = ctk.CTkCheckBox(
+            split_frame,
+            text="Dividir la imagen en segmentos de",
+            variable=self.split_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        split_check.grid(row=0, column=0, padx=5)
+        
+        self.split_entry = ctk.CTkEntry(split_frame, width=60, font=ctk.CTkFont(size=12))
+        self.split_entry.insert(0, str(DEFAULT_SPLIT_MB))
+        self.split_entry.grid(row=0, column=1, padx=2)
+        ctk.CTkLabel(split_frame, text="MB (.001, .002, ... para FAT32/exFAT)", font=ctk.CTkFont(size=12),
+                     text_color="#8892b0").grid(row=0, column=2, padx=(2, 5))
+        
+        # Triaje: reporte HTML/JSON/CSV sin esperar el PDF
+        self.triage_var = ctk.BooleanVar(value=False)
+        triage_check = ctk.CTkCheckBox(
+            self,
+            text="Triaje rápido: reporte HTML/JSON/CSV sin PDF",
+            variable=self.triage_var,
+            font=ctk.CTkFont(size=12),
+            text_color="#8892b0"
+        )
+        triage_check.grid(row=8, column=0, pady=(10, 0))
+        
         # Botón cancelar
         cancel_button = ctk.CTkButton(
             self,
@@ -644,11 +839,33 @@ class CaptureSelectionDialog(ctk.CTkToplevel):
             height=40,
             width=200
         )
-        cancel_button.grid(row=3, column=0, pady=20)
+        cancel_button.grid(row=9, column=0, pady=20)
+    
+    def select_original_destination(self):
+        """Elegir la carpeta donde se escribirá la imagen original (captura completa)"""
+        folder = filedialog.askdirectory(parent=self, title="Carpeta para la imagen original")
+        if folder:
+            self.original_destination = folder
+            self.destination_label.configure(text=folder, text_color="#00ff88")
+    
+    def read_limit(self, entry):
+        """Valor numérico positivo de un campo; vacío o inválido = sin límite"""
+        try:
+            value = float(entry.get().replace(",", "."))
+        except ValueError:
+            return None
+        return value if value > 0 else None
     
     def select_mode(self, mode):
         """Seleccionar modo y cerrar diálogo"""
         self.selected_mode = mode
+        if self.low_impact_var.get():
+            self.bandwidth_limit = self.read_limit(self.bandwidth_entry)
+            self.load_threshold = self.read_limit(self.load_entry)
+        if self.split_var.get():
+            split_mb = self.read_limit(self.split_entry)
+            # Segmentos en MB enteros
+            self.split_size = int(split_mb) * 1024 * 1024 if split_mb and split_mb >= 1 else None
         self.destroy()
     
     def cancel(self):
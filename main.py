@@ -7,6 +7,7 @@ import customtkinter as ctk
 import ctypes
 import sys
 import os
+import multiprocessing
 from gui.main_window import ForensicFlowApp
 
 
@@ -38,6 +39,9 @@ def request_admin():
 
 
 def main():
+    # Necesario para los procesos de trabajo en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
+    
     # Verificar privilegios de administrador
     if not is_admin():
         print("ForensicFlow requiere privilegios de administrador.")
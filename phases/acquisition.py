@@ -6,9 +6,18 @@ Fase 2: Adquisición de evidencia
 """
 
 import os
+import csv
 import subprocess
 import hashlib
+from datetime import datetime
 from utils.tools_manager import ToolsManager
+from utils.delta_image import DeltaImager, build_segment_manifest, save_segment_manifest, find_base_image, hash_image
+from utils.direct_io import DirectImager, verify_destinations
+from utils.evidence_reader import split_base, split_part_path, split_parts
+from utils.rescue_imager import RescueImager
+from utils.throttle import ResourceGovernor
+from utils.job_control import get_job_control
+from utils.tracing import get_tracer, traced
 
 
 class AcquisitionPhase:
@@ -17,13 +26,13 @@ class AcquisitionPhase:
         self.evidence_folder = evidence_folder
         self.tools_manager = ToolsManager(app)
         self.dump_file = None
+        self.governor = None
+        self.jobs = get_job_control(app)
         
     def execute(self):
         """Ejecutar la fase de adquisición"""
         try:
-            # Verificar que las herramientas estén disponibles
-            self.app.add_log("Verificando disponibilidad de herramientas...", "INFO")
-            self.tools_manager.check_and_install_tools()
+            self.prepare()
             
             # Ejecutar Calamity (información del sistema)
             if not self.run_calamity():
@@ -35,18 +44,7 @@ class AcquisitionPhase:
                 return False
             
             # Capturar disco según el modo seleccionado
-            capture_mode = getattr(self.app, 'capture_mode', None)
-            
-            if capture_mode == 'selective':
-                self.app.add_log("Modo seleccionado: Captura Selectiva", "INFO")
-                if not self.capture_disk_selective():
-                    self.app.add_log("Advertencia: Error en captura selectiva, continuando...", "WARNING")
-            elif capture_mode == 'complete':
-                self.app.add_log("Modo seleccionado: Captura Completa", "INFO")
-                if not self.capture_disk_complete():
-                    self.app.add_log("Advertencia: Error en captura completa, continuando...", "WARNING")
-            else:
-                self.app.add_log("Sin modo de captura de disco seleccionado", "INFO")
+            self.capture_disk()
             
             # Calcular hashes
             if not self.calculate_hashes():
@@ -59,6 +57,39 @@ class AcquisitionPhase:
             self.app.add_log(f"Error en Fase 2: {str(e)}", "ERROR")
             return False
             
+    def prepare(self):
+        """Verificar las herramientas y, en modo de bajo impacto, limitar los recursos de la adquisición"""
+        self.app.add_log("Verificando disponibilidad de herramientas...", "INFO")
+        self.tools_manager.check_and_install_tools()
+        
+        # Modo de bajo impacto: limitar ancho de banda, bajar la prioridad de las herramientas y pausar con carga alta.
+        # La prioridad de ForensicFlow no se toca: el análisis y el reporte corren en el mismo proceso
+        if getattr(self.app, 'low_impact', False):
+            self.governor = ResourceGovernor(
+                self.app,
+                bandwidth_mb_s=getattr(self.app, 'bandwidth_limit', None),
+                load_threshold=getattr(self.app, 'load_threshold', None)
+            )
+            self.app.add_log(f"Modo de bajo impacto: {self.governor.describe()}", "INFO")
+        return True
+    
+    def capture_disk(self):
+        """Capturar el disco según el modo seleccionado; los errores se informan y el análisis continúa"""
+        capture_mode = getattr(self.app, 'capture_mode', None)
+        
+        if capture_mode == 'selective':
+            self.app.add_log("Modo seleccionado: Captura Selectiva", "INFO")
+            if not self.capture_disk_selective():
+                self.app.add_log("Advertencia: Error en captura selectiva, continuando...", "WARNING")
+        elif capture_mode == 'complete':
+            self.app.add_log("Modo seleccionado: Captura Completa", "INFO")
+            if not self.capture_disk_complete():
+                self.app.add_log("Advertencia: Error en captura completa, continuando...", "WARNING")
+        else:
+            self.app.add_log("Sin modo de captura de disco seleccionado", "INFO")
+        return True
+            
+    @traced("Información del sistema (Calamity)")
     def run_calamity(self):
         """Recopilar información del sistema usando comandos nativos de Windows"""
         self.app.add_log("Recopilando información del sistema...", "INFO")
@@ -90,13 +121,14 @@ class AcquisitionPhase:
                     f.write(f"{'='*60}\n\n")
                     
                     try:
-                        result = subprocess.run(
-                            cmd,
-                            shell=True,
-                            capture_output=True,
-                            text=True,
-                            timeout=60
-                        )
+                        with get_tracer(self.app).span(description, "herramienta", cmd=cmd):
+                            result = self.jobs.run(
+                                cmd,
+                                shell=True,
+                                capture_output=True,
+                                text=True,
+                                timeout=60
+                            )
                         f.write(result.stdout)
                         
                         # Contar líneas de salida
@@ -115,6 +147,7 @@ class AcquisitionPhase:
             self.app.add_log(f"Error al recopilar información del sistema: {str(e)}", "ERROR")
             return False
             
+    @traced("Volcado de memoria (WinPmem)")
     def run_winpmem(self):
         """Ejecutar WinPmem para realizar volcado de memoria"""
         self.app.add_log("="*50, "INFO")
@@ -148,10 +181,8 @@ class AcquisitionPhase:
             
             try:
                 # Ejecutar WinPmem con parámetros para volcado RAW
-                result = subprocess.run(
+                result = self.run_tool(
                     [winpmem_path, output_file, "-o"],
-                    capture_output=True,
-                    text=True,
                     timeout=1800  # 30 minutos máximo
                 )
                 
@@ -194,6 +225,7 @@ class AcquisitionPhase:
             self.app.add_log(f"Error al crear dump simulado: {str(e)}", "ERROR")
             return False
             
+    @traced("Hashes de integridad")
     def calculate_hashes(self):
         """Calcular hashes MD5 y SHA256 de las evidencias"""
         self.app.add_log("Calculando hashes de integridad...", "INFO")
@@ -229,16 +261,29 @@ class AcquisitionPhase:
             self.app.add_log(f"Error al calcular hashes: {str(e)}", "ERROR")
             return False
             
+    def run_tool(self, cmd, timeout):
+        """Ejecutar una herramienta externa; en modo de bajo impacto con prioridad baja y pausas por carga"""
+        with get_tracer(self.app).span(os.path.basename(cmd[0]), "herramienta", cmd=" ".join(cmd)):
+            if self.governor:
+                return self.governor.run(cmd, timeout)
+            return self.jobs.run(cmd, timeout=timeout, capture_output=True, text=True)
+    
     def calculate_file_hash(self, filepath, hash_algorithm):
         """Calcular hash de un archivo"""
         try:
-            with open(filepath, 'rb') as f:
+            name = f"{hash_algorithm.name.upper()} {os.path.basename(filepath)}"
+            with get_tracer(self.app).span(name, "hash") as span, open(filepath, 'rb') as f:
                 while chunk := f.read(8192):
+                    self.jobs.check()
                     hash_algorithm.update(chunk)
+                    if self.governor:
+                        self.governor.throttle(len(chunk))
+                span.add(bytes=f.tell())
             return hash_algorithm.hexdigest()
         except Exception as e:
             return f"Error: {str(e)}"
     
+    @traced("Captura selectiva de disco")
     def capture_disk_selective(self):
         """Captura selectiva de áreas críticas del disco"""
         self.app.add_log("="*50, "INFO")
@@ -268,7 +313,7 @@ class AcquisitionPhase:
             self.app.add_log("1/4 Capturando MBR (Master Boot Record)...", "INFO")
             
             cmd_mbr = [dd_path, f"if={disk_id}", f"of={mbr_file}", "bs=512", "count=1"]
-            result = subprocess.run(cmd_mbr, capture_output=True, text=True, timeout=60)
+            result = self.run_tool(cmd_mbr, timeout=60)
             
             if os.path.exists(mbr_file):
                 self.app.add_log("✓ MBR capturado (512 bytes)", "SUCCESS")
@@ -280,7 +325,7 @@ class AcquisitionPhase:
             self.app.add_log("2/4 Capturando tabla de particiones...", "INFO")
             
             cmd_partition = [dd_path, f"if={disk_id}", f"of={partition_file}", "bs=1024", "count=64"]
-            result = subprocess.run(cmd_partition, capture_output=True, text=True, timeout=60)
+            result = self.run_tool(cmd_partition, timeout=60)
             
             if os.path.exists(partition_file):
                 self.app.add_log("✓ Tabla de particiones capturada (64 KB)", "SUCCESS")
@@ -293,7 +338,7 @@ class AcquisitionPhase:
             self.app.add_log("Esto puede tomar varios minutos...", "INFO")
             
             cmd_boot = [dd_path, f"if={disk_id}", f"of={boot_file}", "bs=1M", "count=100"]
-            result = subprocess.run(cmd_boot, capture_output=True, text=True, timeout=600)
+            result = self.run_tool(cmd_boot, timeout=600)
             
             if os.path.exists(boot_file):
                 size_mb = os.path.getsize(boot_file) / (1024**2)
@@ -329,6 +374,7 @@ class AcquisitionPhase:
             self.app.add_log(f"Error en captura selectiva: {str(e)}", "ERROR")
             return False
     
+    @traced("Captura completa de disco")
     def capture_disk_complete(self):
         """Captura forense completa del disco con verificación de integridad"""
         self.app.add_log("="*50, "INFO")
@@ -344,46 +390,64 @@ class AcquisitionPhase:
             disk_id = "\\\\.\\PhysicalDrive0"
             self.app.add_log(f"Disco objetivo: {disk_id}", "INFO")
             
-            # Verificar herramienta dd
-            dd_path = self.tools_manager.get_tool_path("dd")
-            
-            if not dd_path or not os.path.exists(dd_path):
-                self.app.add_log("ERROR: dd for Windows no encontrado", "ERROR")
-                self.app.add_log("Se requiere dd para captura completa", "ERROR")
-                return False
-            
-            # Nombres de archivos
-            original_image = os.path.join(disk_folder, "disk_original.dd")
+            # Modo incremental: reutilizar la adquisición previa del mismo equipo
+            if getattr(self.app, 'incremental_capture', False):
+                base_image = find_base_image(self.evidence_folder, disk_id)
+                if base_image:
+                    return self.capture_disk_incremental(disk_id, base_image, disk_folder)
+                self.app.add_log("No hay adquisición previa de este disco; se realizará la captura completa", "WARNING")
+            
+            # Nombres de archivos (la imagen original puede ir a otra unidad)
+            original_folder = getattr(self.app, 'original_destination', None) or disk_folder
+            os.makedirs(original_folder, exist_ok=True)
+            original_image = os.path.join(original_folder, "disk_original.dd")
             working_copy = os.path.join(disk_folder, "disk_working_copy.dd")
+            rescue_map = os.path.join(disk_folder, "disk_original.map")
+            split_size = getattr(self.app, 'split_size', None)
+            custody_lines = []
+            manifest = None
             
             # PASO 1: Capturar imagen original del disco
             self.app.add_log("PASO 1/5: Capturando imagen original del disco...", "PHASE")
             self.app.add_log("Esto capturará TODOS los datos del disco bit a bit", "INFO")
             
-            cmd_capture = [dd_path, f"if={disk_id}", f"of={original_image}", "bs=4M", "conv=noerror,sync"]
-            
-            try:
-                # Mostrar progreso (esto tomará horas en discos grandes)
-                self.app.add_log("Iniciando captura... Por favor espere", "INFO")
-                result = subprocess.run(cmd_capture, capture_output=True, text=True, timeout=36000)  # 10 horas max
-                
-                if os.path.exists(original_image):
-                    size_gb = os.path.getsize(original_image) / (1024**3)
-                    self.app.add_log(f"✓ Imagen original capturada ({size_gb:.2f} GB)", "SUCCESS")
-                else:
-                    self.app.add_log("ERROR: No se creó la imagen original", "ERROR")
+            if getattr(self.app, 'rescue_capture', False):
+                # Disco degradado: lectura tolerante a errores con mapa de sectores
+                rescue = self.image_disk_rescue(disk_id, original_image, rescue_map)
+                if not rescue:
                     return False
-                    
-            except subprocess.TimeoutExpired:
-                self.app.add_log("ERROR: Timeout en captura (>10 horas)", "ERROR")
-                return False
+                tool = "ForensicFlow (adquisición tolerante a errores, estilo ddrescue)"
+                custody_lines = self.rescue_custody_lines(rescue)
+                if split_size:
+                    self.app.add_log("La división en segmentos no se aplica a la lectura tolerante a errores", "WARNING")
+            else:
+                # Lectura directa: original y copia de trabajo en la misma pasada; dd como alternativa
+                manifest = self.image_disk_direct(disk_id, original_image, working_copy, split_size)
+                if manifest:
+                    tool = "ForensicFlow (lectura directa alineada, sin caché, doble destino)"
+                    if manifest.get("parts"):
+                        # Imagen dividida: las rutas pasan a ser las de los primeros segmentos (.001)
+                        original_image, working_copy = manifest["destinations"]
+                        custody_lines = self.split_custody_lines(manifest, [original_image, working_copy])
+                else:
+                    if split_size:
+                        self.app.add_log("dd no divide la imagen: se generará un único archivo", "WARNING")
+                    if not self.image_disk_dd(disk_id, original_image):
+                        return False
+                    tool = "dd for Windows"
             
             # PASO 2: Calcular hash de la imagen original
             self.app.add_log("PASO 2/5: Calculando hash de la imagen original...", "PHASE")
-            self.app.add_log("Esto puede tomar tiempo con imágenes grandes...", "INFO")
             
-            original_md5 = self.calculate_file_hash(original_image, hashlib.md5())
-            original_sha256 = self.calculate_file_hash(original_image, hashlib.sha256())
+            # Una sola lectura: MD5, SHA256 y hashes por segmento para futuras capturas incrementales
+            if manifest:
+                self.app.add_log("Hashes calculados durante la lectura del disco", "INFO")
+            else:
+                self.app.add_log("Esto puede tomar tiempo con imágenes grandes...", "INFO")
+                manifest = build_segment_manifest(original_image, source=disk_id, governor=self.governor,
+                                                  jobs=self.jobs)
+            original_md5 = manifest["md5"]
+            original_sha256 = manifest["sha256"]
             
             self.app.add_log(f"✓ MD5:    {original_md5}", "SUCCESS")
             self.app.add_log(f"✓ SHA256: {original_sha256}", "SUCCESS")
@@ -392,8 +456,9 @@ class AcquisitionPhase:
             self.app.add_log("PASO 3/5: Protegiendo imagen original (solo lectura)...", "PHASE")
             
             try:
-                os.chmod(original_image, 0o444)  # Solo lectura para todos
-                subprocess.run(["attrib", "+R", original_image], check=False)
+                for part in split_parts(original_image):
+                    os.chmod(part, 0o444)  # Solo lectura para todos
+                    subprocess.run(["attrib", "+R", part], check=False)
                 self.app.add_log("✓ Imagen original protegida contra escritura", "SUCCESS")
             except Exception as e:
                 self.app.add_log(f"Advertencia: No se pudo proteger imagen: {str(e)}", "WARNING")
@@ -402,25 +467,44 @@ class AcquisitionPhase:
             self.app.add_log("PASO 4/5: Creando copia de trabajo...", "PHASE")
             self.app.add_log("Esta copia será usada para el análisis", "INFO")
             
-            try:
-                import shutil
-                shutil.copy2(original_image, working_copy)
-                
-                if os.path.exists(working_copy):
-                    self.app.add_log("✓ Copia de trabajo creada", "SUCCESS")
-                else:
-                    self.app.add_log("ERROR: No se pudo crear copia de trabajo", "ERROR")
-                    return False
+            if manifest.get("dual_destination"):
+                self.app.add_log("✓ Copia de trabajo escrita durante la lectura del disco", "SUCCESS")
+            else:
+                try:
+                    import shutil
+                    shutil.copy2(original_image, working_copy)
                     
-            except Exception as e:
-                self.app.add_log(f"ERROR al crear copia: {str(e)}", "ERROR")
-                return False
+                    if os.path.exists(working_copy):
+                        self.app.add_log("✓ Copia de trabajo creada", "SUCCESS")
+                    else:
+                        self.app.add_log("ERROR: No se pudo crear copia de trabajo", "ERROR")
+                        return False
+                        
+                except Exception as e:
+                    self.app.add_log(f"ERROR al crear copia: {str(e)}", "ERROR")
+                    return False
             
             # PASO 5: Verificar integridad de la copia
             self.app.add_log("PASO 5/5: Verificando integridad de la copia...", "PHASE")
             
-            copy_md5 = self.calculate_file_hash(working_copy, hashlib.md5())
-            copy_sha256 = self.calculate_file_hash(working_copy, hashlib.sha256())
+            if manifest.get("dual_destination"):
+                # Relectura de ambos destinos en paralelo contra los hashes tomados del disco
+                self.app.add_log("Releyendo la imagen original y la copia de trabajo en paralelo...", "INFO")
+                readback = verify_destinations([original_image, working_copy], governor=self.governor,
+                                               jobs=self.jobs)
+                for path, (md5, sha256) in readback.items():
+                    verified = md5 == original_md5 and sha256 == original_sha256
+                    custody_lines.append(
+                        f"Relectura de {os.path.basename(path)}: {'coincide' if verified else 'NO coincide'} "
+                        f"con los hashes del disco"
+                    )
+                    if not verified:
+                        self.app.add_log(f"ERROR: {os.path.basename(path)} no coincide con el disco de origen", "ERROR")
+                        return False
+                copy_md5, copy_sha256 = readback[working_copy]
+            else:
+                copy_md5 = self.calculate_file_hash(working_copy, hashlib.md5())
+                copy_sha256 = self.calculate_file_hash(working_copy, hashlib.sha256())
             
             if copy_md5 == original_md5 and copy_sha256 == original_sha256:
                 self.app.add_log("✓ VERIFICACIÓN EXITOSA: La copia es idéntica al original", "SUCCESS")
@@ -428,30 +512,16 @@ class AcquisitionPhase:
                 self.app.add_log("ERROR: Los hashes NO coinciden - la copia está corrupta", "ERROR")
                 return False
             
-            # Guardar información de chain of custody
-            hashes_folder = os.path.join(self.evidence_folder, "Hallazgos", "hashes")
-            chain_file = os.path.join(hashes_folder, "chain_of_custody.txt")
+            if original_folder != disk_folder:
+                custody_lines.append(f"Ubicación de la imagen original: {original_image}")
             
-            with open(chain_file, 'w', encoding='utf-8') as f:
-                from datetime import datetime
-                f.write("CADENA DE CUSTODIA - CAPTURA FORENSE DE DISCO\\n")
-                f.write("="*60 + "\\n\\n")
-                f.write(f"Fecha y hora de captura: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\\n")
-                f.write(f"Disco origen: {disk_id}\\n")
-                f.write(f"Herramienta: dd for Windows\\n\\n")
-                
-                f.write("IMAGEN ORIGINAL (Protegida - Solo lectura):\\n")
-                f.write(f"Archivo: {os.path.basename(original_image)}\\n")
-                f.write(f"MD5:    {original_md5}\\n")
-                f.write(f"SHA256: {original_sha256}\\n\\n")
-                
-                f.write("COPIA DE TRABAJO (Para análisis):\\n")
-                f.write(f"Archivo: {os.path.basename(working_copy)}\\n")
-                f.write(f"MD5:    {copy_md5}\\n")
-                f.write(f"SHA256: {copy_sha256}\\n\\n")
-                
-                f.write("VERIFICACIÓN DE INTEGRIDAD:\\n")
-                f.write(f"Estado: {'✓ VERIFICADO - Hashes coinciden' if copy_md5 == original_md5 else '✗ ERROR - Hashes no coinciden'}\\n")
+            # Guardar información de chain of custody
+            self.write_disk_chain_of_custody(
+                disk_id, tool,
+                original_image, original_md5, original_sha256,
+                working_copy, copy_md5, copy_sha256,
+                extra_lines=custody_lines
+            )
             
             self.app.add_log("="*50, "SUCCESS")
             self.app.add_log("CAPTURA FORENSE COMPLETADA EXITOSAMENTE", "SUCCESS")
@@ -466,6 +536,246 @@ class AcquisitionPhase:
             self.app.add_log(f"Error en captura completa: {str(e)}", "ERROR")
             return False
     
+    @traced("Imagen con dd", "imagen")
+    def image_disk_dd(self, disk_id, original_image):
+        """Imagen bit a bit del disco con dd"""
+        dd_path = self.tools_manager.get_tool_path("dd")
+        
+        if not dd_path or not os.path.exists(dd_path):
+            self.app.add_log("ERROR: dd for Windows no encontrado", "ERROR")
+            self.app.add_log("Se requiere dd para captura completa", "ERROR")
+            return False
+        
+        cmd_capture = [dd_path, f"if={disk_id}", f"of={original_image}", "bs=4M", "conv=noerror,sync"]
+        
+        try:
+            # Mostrar progreso (esto tomará horas en discos grandes)
+            self.app.add_log("Iniciando captura... Por favor espere", "INFO")
+            # Sin límite de tiempo en modo de bajo impacto: las pausas por carga pueden alargarlo
+            result = self.run_tool(cmd_capture, timeout=None if self.governor else 36000)  # 10 horas max
+            
+            if os.path.exists(original_image):
+                size_gb = os.path.getsize(original_image) / (1024**3)
+                self.app.add_log(f"✓ Imagen original capturada ({size_gb:.2f} GB)", "SUCCESS")
+                return True
+            self.app.add_log("ERROR: No se creó la imagen original", "ERROR")
+            return False
+                
+        except subprocess.TimeoutExpired:
+            self.app.add_log("ERROR: Timeout en captura (>10 horas)", "ERROR")
+            return False
+    
+    @traced("Imagen con lectura directa", "imagen")
+    def image_disk_direct(self, disk_id, original_image, working_copy=None, split_size=None):
+        """Imagen del disco con lectura directa alineada; devuelve el manifiesto de segmentos o None
+        
+        Con `working_copy` la copia de trabajo se escribe en la misma lectura del disco.
+        Con `split_size` cada imagen se escribe en segmentos .001, .002, ... de ese tamaño.
+        """
+        self.app.add_log("Iniciando captura con lectura directa (sin caché del sistema)... Por favor espere", "INFO")
+        copies = [working_copy] if working_copy else []
+        if copies:
+            self.app.add_log("Escribiendo imagen original y copia de trabajo a la vez (una sola lectura del disco)", "INFO")
+        if split_size:
+            self.app.add_log(f"Imagen dividida en segmentos de {split_size // (1024**2)} MB", "INFO")
+        
+        try:
+            imager = DirectImager(self.app, governor=self.governor, split_size=split_size)
+            result = imager.image(disk_id, original_image, copies)
+        except OSError as e:
+            self.app.add_log(f"Lectura directa interrumpida ({str(e)}); se usará dd", "WARNING")
+            self.app.add_log("Si el disco tiene sectores dañados, use la opción 'Disco dañado'", "INFO")
+            for path in [original_image, *copies]:
+                for part in split_parts(split_part_path(path, 1)) if split_size else [path]:
+                    if os.path.exists(part):
+                        os.remove(part)
+            return None
+        
+        size_gb = result["size"] / (1024**3)
+        self.app.add_log(
+            f"✓ Imagen original capturada ({size_gb:.2f} GB, {result['throughput_mb_s']:.0f} MB/s, "
+            f"bloque {result['block_size'] // 1024} KB)",
+            "SUCCESS"
+        )
+        manifest = save_segment_manifest(
+            result["destinations"][0], disk_id, result["size"], result["segment_size"],
+            result["md5"], result["sha256"], result["segment_hashes"], parts=result["parts"]
+        )
+        # Marcas solo en memoria: el manifiesto en disco no cambia de formato
+        return dict(manifest, dual_destination=bool(copies), destinations=result["destinations"])
+    
+    def split_custody_lines(self, manifest, images):
+        """Guardar los hashes de cada segmento junto a cada imagen y resumirlos para la cadena de custodia"""
+        parts = manifest["parts"]
+        lines = [f"Imagen dividida en {len(parts)} segmentos de hasta {parts[0]['size'] // (1024**2)} MB"]
+        for image in images:
+            base = split_base(image)
+            csv_path = base + ".parts.csv"
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(["file", "size_bytes", "md5", "sha256"])
+                prefix = os.path.basename(base)
+                for part in parts:
+                    # Los nombres del manifiesto son los de la imagen original
+                    name = prefix + part["file"][-4:]
+                    writer.writerow([name, part["size"], part["md5"], part["sha256"]])
+            lines.append(f"Hashes por segmento de {os.path.basename(base)}: {os.path.basename(csv_path)}")
+        return lines
+    
+    @traced("Imagen tolerante a errores", "imagen")
+    def image_disk_rescue(self, disk_id, original_image, map_file):
+        """Imagen del disco con pasadas de recuperación y mapa de sectores dañados"""
+        self.app.add_log("Modo disco dañado: primera pasada rápida y reintentos sobre las zonas con errores", "INFO")
+        self.app.add_log(f"Mapa de errores: {os.path.basename(map_file)} (formato ddrescue)", "INFO")
+        
+        try:
+            summary = RescueImager(self.app, governor=self.governor).image(disk_id, original_image, map_file)
+        except OSError as e:
+            self.app.add_log(f"ERROR en la captura tolerante a errores: {str(e)}", "ERROR")
+            return None
+        
+        size_gb = summary["size"] / (1024**3)
+        self.app.add_log(f"✓ Imagen original capturada ({size_gb:.2f} GB en {summary['elapsed']:.0f} s)", "SUCCESS")
+        if summary["bad_bytes"] or summary["untried_bytes"]:
+            self.app.add_log(
+                f"Sectores ilegibles: {summary['bad_bytes']} bytes en {summary['bad_ranges']} rangos "
+                "(rellenados con ceros en la imagen)",
+                "WARNING"
+            )
+        else:
+            self.app.add_log("✓ Sin sectores ilegibles", "SUCCESS")
+        return summary
+    
+    def rescue_custody_lines(self, summary):
+        """Resumen del mapa de errores para la cadena de custodia"""
+        map_sha256 = self.calculate_file_hash(summary["map"], hashlib.sha256())
+        lines = [
+            "MAPA DE SECTORES (lectura tolerante a errores):",
+            f"Archivo de mapa: {os.path.basename(summary['map'])}",
+            f"SHA256 del mapa: {map_sha256}",
+            f"Bytes leídos correctamente: {summary['good_bytes']} de {summary['size']}",
+            f"Bytes ilegibles (rellenados con ceros): {summary['bad_bytes']}",
+        ]
+        if summary["untried_bytes"]:
+            lines.append(f"Bytes sin leer: {summary['untried_bytes']}")
+        for start, length in summary["bad_range_list"][:20]:
+            lines.append(f"  Sectores {start // 512}-{(start + length) // 512 - 1} (offset 0x{start:x}, {length} bytes)")
+        if summary["bad_ranges"] > 20:
+            lines.append(f"  ... {summary['bad_ranges'] - 20} rangos más en el archivo de mapa")
+        return lines
+    
+    @traced("Captura incremental", "imagen")
+    def capture_disk_incremental(self, disk_id, base_image, disk_folder):
+        """Captura diferencial: solo se escriben los segmentos que cambiaron desde la adquisición base
+
+        No se escribe copia de trabajo: el análisis lee la imagen delta (base + segmentos modificados)
+        como un único archivo a través de evidence_reader.
+        """
+        self.app.add_log("Modo incremental: se compara el disco con una adquisición previa", "INFO")
+        self.app.add_log(f"Imagen base: {base_image}", "INFO")
+        
+        delta_image = os.path.join(disk_folder, "disk_original.delta")
+        delta_index = delta_image + ".json"
+        
+        # PASO 1: Leer el disco completo y guardar solo los segmentos modificados
+        self.app.add_log("PASO 1/3: Leyendo el disco y comparando segmentos con la imagen base...", "PHASE")
+        try:
+            index = DeltaImager(self.app, governor=self.governor).acquire(disk_id, base_image, delta_image)
+        except OSError as e:
+            self.app.add_log(f"ERROR en la captura incremental: {str(e)}", "ERROR")
+            return False
+        
+        changed = len(index["changed_segments"])
+        total_segments = len(index["segment_hashes"])
+        delta_gb = os.path.getsize(delta_image) / (1024**3)
+        self.app.add_log(f"✓ Disco leído ({index['size'] / (1024**3):.2f} GB)", "SUCCESS")
+        self.app.add_log(f"✓ Segmentos modificados: {changed} de {total_segments} ({delta_gb:.2f} GB escritos)", "SUCCESS")
+        self.app.add_log(f"✓ MD5:    {index['md5']}", "SUCCESS")
+        self.app.add_log(f"✓ SHA256: {index['sha256']}", "SUCCESS")
+        
+        # PASO 2: Proteger la imagen delta y su índice
+        self.app.add_log("PASO 2/3: Protegiendo imagen delta (solo lectura)...", "PHASE")
+        for path in (delta_image, delta_index):
+            try:
+                os.chmod(path, 0o444)
+                subprocess.run(["attrib", "+R", path], check=False)
+            except Exception as e:
+                self.app.add_log(f"Advertencia: No se pudo proteger {os.path.basename(path)}: {str(e)}", "WARNING")
+        
+        # PASO 3: La imagen leída de la base y el delta debe coincidir con lo leído del disco
+        self.app.add_log("PASO 3/3: Verificando la imagen delta (base + delta, sin escribir copia)...", "PHASE")
+        try:
+            copy_md5, copy_sha256 = hash_image(delta_index, governor=self.governor, jobs=self.jobs)
+        except OSError as e:
+            self.app.add_log(f"ERROR al leer la imagen delta: {str(e)}", "ERROR")
+            return False
+        
+        if copy_md5 == index["md5"] and copy_sha256 == index["sha256"]:
+            self.app.add_log("✓ VERIFICACIÓN EXITOSA: La imagen delta es idéntica al disco leído", "SUCCESS")
+        else:
+            self.app.add_log("ERROR: Los hashes NO coinciden - la imagen base o el delta están dañados", "ERROR")
+            return False
+        
+        self.write_disk_chain_of_custody(
+            disk_id, "ForensicFlow (adquisición incremental)",
+            delta_index, index["md5"], index["sha256"],
+            None, copy_md5, copy_sha256,
+            extra_lines=[
+                "ADQUISICIÓN INCREMENTAL:",
+                f"Imagen base: {base_image}",
+                f"SHA256 de la imagen base: {index['base_sha256']}",
+                f"Tamaño de segmento: {index['segment_size']} bytes",
+                f"Segmentos modificados: {changed} de {total_segments}",
+                f"Archivo delta: {os.path.basename(delta_image)} ({os.path.getsize(delta_image)} bytes)",
+            ]
+        )
+        
+        self.app.add_log("="*50, "SUCCESS")
+        self.app.add_log("CAPTURA INCREMENTAL COMPLETADA EXITOSAMENTE", "SUCCESS")
+        self.app.add_log(f"Imagen delta protegida: {os.path.basename(delta_index)}", "SUCCESS")
+        self.app.add_log("El análisis lee la imagen delta directamente (sin copia de trabajo)", "SUCCESS")
+        self.app.add_log("="*50, "SUCCESS")
+        return True
+    
+    def write_disk_chain_of_custody(self, disk_id, tool, original_image, original_md5, original_sha256,
+                                    working_copy, copy_md5, copy_sha256, extra_lines=None):
+        """Documentar la cadena de custodia de la captura de disco
+
+        Sin `working_copy` (captura incremental), los hashes de la copia son los de la imagen
+        leída de la base y el delta.
+        """
+        hashes_folder = os.path.join(self.evidence_folder, "Hallazgos", "hashes")
+        chain_file = os.path.join(hashes_folder, "chain_of_custody.txt")
+        verified = copy_md5 == original_md5 and copy_sha256 == original_sha256
+        
+        with open(chain_file, 'w', encoding='utf-8') as f:
+            f.write("CADENA DE CUSTODIA - CAPTURA FORENSE DE DISCO\n")
+            f.write("="*60 + "\n\n")
+            f.write(f"Fecha y hora de captura: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Disco origen: {disk_id}\n")
+            f.write(f"Herramienta: {tool}\n\n")
+            
+            f.write("IMAGEN ORIGINAL (Protegida - Solo lectura):\n")
+            f.write(f"Archivo: {os.path.basename(original_image)}\n")
+            f.write(f"MD5:    {original_md5}\n")
+            f.write(f"SHA256: {original_sha256}\n\n")
+            
+            if working_copy:
+                f.write("COPIA DE TRABAJO (Para análisis):\n")
+                f.write(f"Archivo: {os.path.basename(working_copy)}\n")
+            else:
+                f.write("IMAGEN LEÍDA DE LA BASE Y EL DELTA (Para análisis, sin copia de trabajo):\n")
+            f.write(f"MD5:    {copy_md5}\n")
+            f.write(f"SHA256: {copy_sha256}\n\n")
+            
+            for line in extra_lines or []:
+                f.write(f"{line}\n")
+            if extra_lines:
+                f.write("\n")
+            
+            f.write("VERIFICACIÓN DE INTEGRIDAD:\n")
+            f.write(f"Estado: {'✓ VERIFICADO - Hashes coinciden' if verified else '✗ ERROR - Hashes no coinciden'}\n")
+    
     def capture_disk_info_alternative(self):
         """Capturar información del disco sin herramientas especiales"""
         self.app.add_log("Capturando información del disco con comandos nativos...", "INFO")
@@ -490,7 +800,7 @@ class AcquisitionPhase:
                     f.write(f"\\n{description}:\\n")
                     f.write("-"*60 + "\\n")
                     
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
+                    result = self.jobs.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
                     f.write(result.stdout)
                     f.write("\\n")
             
@@ -2,13 +2,40 @@
 Fase 3: Análisis automatizado
 - Llamar Volatility sobre el dump
 - Ejecutar módulos básicos (pslist, netscan, etc.)
-
+- Verificar el MD5 almacenado en imágenes EWF (E01)
+- Extraer características (URLs, correos, IPs, dominios, carteras)
+- Mapear entropía y bloques en cero de la memoria y las imágenes de disco
+- Recuperar ejecutables PE del volcado de memoria
+- Listar archivos desde la $MFT de capturas selectivas o imágenes sin TSK
+- Clasificar hashes con conjuntos de archivos conocidos (known-good / known-bad)
+- Construir la línea de tiempo multi-fuente
 """
 
 import os
+import csv
 import subprocess
 import json
+import threading
 from utils.tools_manager import ToolsManager
+from utils.feature_extractor import FeatureExtractor
+from utils.entropy_map import EntropyMapper
+from utils.pe_carver import PECarver
+from utils.tsk_scheduler import TSKScheduler
+from utils.fs_catalog import FileSystemCatalog
+from utils.mft_parser import MFTParser
+from utils.hash_sets import HashSetLibrary
+from utils import timeline
+from utils.evidence_reader import get_evidence_size, is_delta_image, list_evidence_images, split_base
+from utils.ewf_reader import EWFImage
+from utils.tracing import get_tracer, traced
+from utils.job_control import get_job_control
+
+
+# Imágenes de disco que entienden los escáneres, TSK y el analizador de la $MFT
+DISK_IMAGE_EXTENSIONS = ('.dd', '.img', '.E01', '.e01', '.bin', '.delta.json')
+
+# Módulos de Volatility que se ejecutan sobre el dump
+VOLATILITY_MODULES = ("pslist", "netscan", "dlllist", "cmdline", "filescan")
 
 
 class AnalysisPhase:
@@ -17,6 +44,11 @@ class AnalysisPhase:
         self.evidence_folder = evidence_folder
         self.tools_manager = ToolsManager(app)
         self.analysis_results = {}
+        # (dump, volatility) una vez ubicados; () si se usaron resultados simulados
+        self.volatility = None
+        self.volatility_fallback = True
+        self.volatility_lock = threading.Lock()
+        self.jobs = get_job_control(app)
         
     def execute(self):
         """Ejecutar la fase de análisis"""
@@ -25,10 +57,38 @@ class AnalysisPhase:
             if not self.run_volatility_analysis():
                 self.app.add_log("Advertencia: Problemas con análisis de Volatility", "WARNING")
             
+            # Recuperar ejecutables del volcado de memoria
+            if not self.run_pe_carving():
+                self.app.add_log("Advertencia: Problemas en la recuperación de ejecutables", "WARNING")
+            
+            # Verificar el MD5 almacenado en las imágenes EWF (E01) recibidas
+            if not self.run_ewf_verification():
+                self.app.add_log("Advertencia: Problemas al verificar imágenes EWF", "WARNING")
+            
+            # Extraer características de la memoria y las imágenes de disco
+            if not self.run_feature_extraction():
+                self.app.add_log("Advertencia: Problemas en la extracción de características", "WARNING")
+            
+            # Ubicar regiones cifradas, comprimidas o borradas
+            if not self.run_entropy_map():
+                self.app.add_log("Advertencia: Problemas al generar el mapa de entropía", "WARNING")
+            
             # Ejecutar análisis con TSK (si hay imagen de disco)
             if not self.run_tsk_analysis():
                 self.app.add_log("Advertencia: No se ejecutó análisis TSK", "WARNING")
             
+            # Listado de archivos desde la $MFT (capturas selectivas o sin TSK)
+            if not self.run_mft_analysis():
+                self.app.add_log("Advertencia: Problemas en el análisis de la $MFT", "WARNING")
+            
+            # Separar archivos conocidos del sistema y detectar known-bad
+            if not self.run_hash_classification():
+                self.app.add_log("Advertencia: Problemas en la clasificación por hashes conocidos", "WARNING")
+            
+            # Unificar eventos de disco, memoria y recolección en vivo
+            if not self.run_timeline():
+                self.app.add_log("Advertencia: Problemas al construir la línea de tiempo", "WARNING")
+            
             # Guardar resultados consolidados
             self.save_analysis_results()
             
@@ -39,74 +99,100 @@ class AnalysisPhase:
             self.app.add_log(f"Error en Fase 3: {str(e)}", "ERROR")
             return False
             
+    @traced("Volatility")
     def run_volatility_analysis(self):
         """Ejecutar análisis con Volatility"""
         self.app.add_log("Iniciando análisis con Volatility...", "INFO")
         
         try:
+            if not self.locate_volatility():
+                return self.volatility_fallback
+            
+            for module in VOLATILITY_MODULES:
+                self.run_volatility_module(module)
+            
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error en análisis de Volatility: {str(e)}", "ERROR")
+            return self.create_simulated_volatility_results()
+            
+    def locate_volatility(self):
+        """Ubicar el dump y Volatility una sola vez; sin alguno de los dos se generan resultados simulados
+
+        Devuelve (dump, volatility) o None. Los módulos pueden llamarlo a la vez desde varios hilos.
+        """
+        with self.volatility_lock:
+            if self.volatility is not None:
+                return self.volatility or None
+            
+            self.volatility = ()
             # Buscar archivo de dump
             dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
             dump_files = [f for f in os.listdir(dumps_folder) if f.endswith('.raw') or f.endswith('.dump')]
             
             if not dump_files:
                 self.app.add_log("No se encontró archivo de dump para analizar", "WARNING")
-                return self.create_simulated_volatility_results()
-            
-            dump_file = os.path.join(dumps_folder, dump_files[0])
-            volatility_output = os.path.join(self.evidence_folder, "Hallazgos", "volatility_output")
+                self.volatility_fallback = self.create_simulated_volatility_results()
+                return None
             
             # Verificar Volatility
             volatility_path = self.tools_manager.get_tool_path("volatility")
             
             if not volatility_path or not os.path.exists(volatility_path):
                 self.app.add_log("Volatility no encontrado, generando resultados simulados...", "WARNING")
-                return self.create_simulated_volatility_results()
+                self.volatility_fallback = self.create_simulated_volatility_results()
+                return None
+            
+            self.volatility = (os.path.join(dumps_folder, dump_files[0]), volatility_path)
+            return self.volatility
+            
+    def run_volatility_module(self, module):
+        """Ejecutar un módulo de Volatility sobre el dump"""
+        located = self.locate_volatility()
+        if not located:
+            return self.volatility_fallback
+        dump_file, volatility_path = located
+        
+        self.app.add_log(f"Ejecutando módulo Volatility: {module}", "INFO")
+        
+        volatility_output = os.path.join(self.evidence_folder, "Hallazgos", "volatility_output")
+        output_file = os.path.join(volatility_output, f"{module}.txt")
+        
+        try:
+            # Comando para Volatility 3
+            cmd = [
+                "python",
+                volatility_path,
+                "-f", dump_file,
+                module
+            ]
+            
+            with get_tracer(self.app).span(f"volatility {module}", "herramienta", cmd=" ".join(cmd)):
+                result = self.jobs.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=300
+                )
             
-            # Módulos a ejecutar
-            modules = ["pslist", "netscan", "dlllist", "cmdline", "filescan"]
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(result.stdout)
+                if result.stderr:
+                    f.write("\n\nERRORS:\n")
+                    f.write(result.stderr)
             
-            for module in modules:
-                self.app.add_log(f"Ejecutando módulo Volatility: {module}", "INFO")
-                
-                output_file = os.path.join(volatility_output, f"{module}.txt")
-                
-                try:
-                    # Comando para Volatility 3
-                    cmd = [
-                        "python",
-                        volatility_path,
-                        "-f", dump_file,
-                        module
-                    ]
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=300
-                    )
-                    
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(result.stdout)
-                        if result.stderr:
-                            f.write("\n\nERRORS:\n")
-                            f.write(result.stderr)
-                    
-                    self.app.add_log(f"✓ Módulo {module} completado", "SUCCESS")
-                    
-                    # Guardar resultados
-                    self.analysis_results[module] = self.parse_volatility_output(result.stdout, module)
-                    
-                except subprocess.TimeoutExpired:
-                    self.app.add_log(f"Timeout en módulo {module}", "WARNING")
-                except Exception as e:
-                    self.app.add_log(f"Error en módulo {module}: {str(e)}", "WARNING")
+            self.app.add_log(f"✓ Módulo {module} completado", "SUCCESS")
             
+            # Guardar resultados
+            self.analysis_results[module] = self.parse_volatility_output(result.stdout, module)
             return True
             
+        except subprocess.TimeoutExpired:
+            self.app.add_log(f"Timeout en módulo {module}", "WARNING")
         except Exception as e:
-            self.app.add_log(f"Error en análisis de Volatility: {str(e)}", "ERROR")
-            return self.create_simulated_volatility_results()
+            self.app.add_log(f"Error en módulo {module}: {str(e)}", "WARNING")
+        return False
             
     def create_simulated_volatility_results(self):
         """Crear resultados simulados de Volatility para demostración"""
@@ -211,6 +297,201 @@ TCP     0.0.0.0:4444        0.0.0.0:0               LISTENING       1024
         except Exception as e:
             return {"error": str(e), "raw_preview": output[:500]}
         
+    @traced("Recuperación de ejecutables")
+    def run_pe_carving(self):
+        """Recuperar ejecutables PE (MZ/PE) del volcado de memoria"""
+        self.app.add_log("="*50, "INFO")
+        self.app.add_log("RECUPERACIÓN DE EJECUTABLES DESDE MEMORIA", "PHASE")
+        self.app.add_log("="*50, "INFO")
+        
+        try:
+            dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
+            dump_files = [f for f in os.listdir(dumps_folder) if f.endswith('.raw') or f.endswith('.dump')]
+            
+            if not dump_files:
+                self.app.add_log("No se encontró volcado de memoria para recuperar ejecutables", "INFO")
+                return True
+            
+            dump_file = os.path.join(dumps_folder, dump_files[0])
+            carved_folder = os.path.join(self.evidence_folder, "Hallazgos", "carved")
+            
+            self.app.add_log(f"Buscando cabeceras MZ/PE en: {dump_files[0]}", "INFO")
+            summary = PECarver(self.app, carved_folder).carve(dump_file)
+            
+            unique_files = [entry for entry in summary["files"] if not entry["duplicate_of"]]
+            self.analysis_results["carved"] = {
+                "source": summary["source"],
+                "total_found": summary["total_found"],
+                "unique": summary["unique"],
+                "truncated_by_limit": summary["truncated_by_limit"],
+                "manifest": os.path.join(carved_folder, "manifest.json"),
+                "files": unique_files[:50]
+            }
+            
+            self.app.add_log(f"✓ Ejecutables recuperados: {summary['total_found']} ({summary['unique']} únicos)", "SUCCESS")
+            self.app.add_log("Manifiesto guardado: carved/manifest.json", "INFO")
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error en recuperación de ejecutables: {str(e)}", "ERROR")
+            return False
+            
+    @traced("Extracción de características")
+    def run_feature_extraction(self, kind=None):
+        """Extraer características de la evidencia y generar histogramas de frecuencia"""
+        self.app.add_log("="*50, "INFO")
+        self.app.add_log("EXTRACCIÓN DE CARACTERÍSTICAS (URLs, CORREOS, IPs, DOMINIOS, CARTERAS)", "PHASE")
+        self.app.add_log("="*50, "INFO")
+        
+        try:
+            sources = self.find_feature_sources(kind)
+            
+            if not sources:
+                self.app.add_log("No se encontró evidencia para extraer características", "INFO")
+                return True
+            
+            features_folder = os.path.join(self.evidence_folder, "Hallazgos", "features")
+            extractor = FeatureExtractor(self.app, features_folder)
+            results = {}
+            
+            for source in sources:
+                name = os.path.basename(source)
+                self.app.add_log(f"Extrayendo características de: {name}", "INFO")
+                with get_tracer(self.app).span(f"Características {name}", "analisis") as span:
+                    summary = extractor.scan_file(source)
+                    span.add(bytes=get_evidence_size(source))
+                results[name] = summary
+                
+                found = ", ".join(
+                    f"{scanner}: {data['unique']}"
+                    for scanner, data in summary["scanners"].items() if data["total"]
+                )
+                self.app.add_log(f"✓ {name} procesado ({found or 'sin coincidencias'})", "SUCCESS")
+            
+            self.analysis_results.setdefault("features", {}).update(results)
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error en extracción de características: {str(e)}", "ERROR")
+            return False
+            
+    @traced("Mapa de entropía")
+    def run_entropy_map(self, kind=None):
+        """Calcular la entropía por bloque y la proporción de bloques en cero de la evidencia"""
+        self.app.add_log("="*50, "INFO")
+        self.app.add_log("MAPA DE ENTROPÍA Y BLOQUES EN CERO", "PHASE")
+        self.app.add_log("="*50, "INFO")
+        
+        try:
+            sources = self.find_feature_sources(kind)
+            
+            if not sources:
+                self.app.add_log("No se encontró evidencia para el mapa de entropía", "INFO")
+                return True
+            
+            entropy_folder = os.path.join(self.evidence_folder, "Hallazgos", "entropy")
+            mapper = EntropyMapper(self.app, entropy_folder)
+            results = {}
+            
+            for source in sources:
+                name = os.path.basename(source)
+                self.app.add_log(f"Mapeando entropía de: {name}", "INFO")
+                with get_tracer(self.app).span(f"Entropía {name}", "analisis") as span:
+                    summary = mapper.map_file(source)
+                    span.add(bytes=get_evidence_size(source))
+                results[name] = summary
+                self.app.add_log(
+                    f"✓ {name}: entropía media {summary['mean_entropy']:.2f} bits/byte, "
+                    f"{summary['zero_ratio']:.1%} en cero, {summary['high_entropy_ratio']:.1%} alta entropía "
+                    f"({summary['high_entropy_regions']} regiones)",
+                    "SUCCESS"
+                )
+            
+            self.analysis_results.setdefault("entropy", {}).update(results)
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error en el mapa de entropía: {str(e)}", "ERROR")
+            return False
+            
+    @traced("Verificación EWF")
+    def run_ewf_verification(self):
+        """Recalcular el MD5 de cada imagen EWF y compararlo con el almacenado por la herramienta de adquisición"""
+        disk_folder = os.path.join(self.evidence_folder, "Hallazgos", "disk_images")
+        if not os.path.exists(disk_folder):
+            return True
+        images = list_evidence_images(disk_folder, ('.E01', '.e01'))
+        if not images:
+            return True
+        
+        self.app.add_log("="*50, "INFO")
+        self.app.add_log("VERIFICACIÓN DE IMÁGENES EWF (E01)", "PHASE")
+        self.app.add_log("="*50, "INFO")
+        
+        try:
+            results = {}
+            for name in images:
+                with get_tracer(self.app).span(f"MD5 {name}", "hash") as span, \
+                        EWFImage(os.path.join(disk_folder, name)) as image:
+                    span.add(bytes=image.size)
+                    self.app.add_log(
+                        f"Verificando {name}: {image.size / (1024**3):.2f} GB en {len(image.segments)} segmentos, "
+                        f"{image.chunk_count} chunks",
+                        "INFO"
+                    )
+                    result = image.verify(jobs=self.jobs)
+                    result["case"] = image.header
+                results[name] = result
+                
+                if result["verified"]:
+                    self.app.add_log(f"✓ {name}: MD5 verificado ({result['computed_md5']})", "SUCCESS")
+                elif result["verified"] is None:
+                    self.app.add_log(f"{name}: sin hash almacenado; MD5 calculado {result['computed_md5']}", "WARNING")
+                else:
+                    self.app.add_log(
+                        f"{name}: el MD5 NO coincide (almacenado {result['stored_md5']}, calculado {result['computed_md5']}"
+                        f", {len(result['corrupt_chunks'])} chunks corruptos)",
+                        "ERROR"
+                    )
+            
+            self.analysis_results["ewf"] = results
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error al verificar imágenes EWF: {str(e)}", "ERROR")
+            return False
+    
+    def find_feature_sources(self, kind=None):
+        """Buscar volcado de memoria e imágenes de disco para el extractor
+
+        `kind` limita la búsqueda a "memory" o "disk" (la memoria se analiza mientras se captura el disco).
+        """
+        sources = []
+        
+        dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
+        if kind != "disk" and os.path.exists(dumps_folder):
+            for f in sorted(os.listdir(dumps_folder)):
+                if f.endswith(('.raw', '.dump')):
+                    sources.append(os.path.join(dumps_folder, f))
+        
+        disk_folder = os.path.join(self.evidence_folder, "Hallazgos", "disk_images")
+        if kind != "memory" and os.path.exists(disk_folder):
+            disk_files = list_evidence_images(disk_folder, DISK_IMAGE_EXTENSIONS)
+            for f in disk_files:
+                # El análisis se hace sobre la copia de trabajo, no sobre el original
+                if self.is_superseded_original(f, disk_files):
+                    continue
+                sources.append(os.path.join(disk_folder, f))
+        
+        return sources
+    
+    def is_superseded_original(self, name, images):
+        """La imagen original (única o dividida) se omite si existe la copia de trabajo"""
+        return split_base(name) == "disk_original.dd" and any(
+            split_base(image) == "disk_working_copy.dd" for image in images
+        )
+        
+    @traced("TSK")
     def run_tsk_analysis(self):
         """Ejecutar análisis con The Sleuth Kit (TSK)"""
         self.app.add_log("="*50, "INFO")
@@ -227,9 +508,14 @@ TCP     0.0.0.0:4444        0.0.0.0:0               LISTENING       1024
                 return True
             
             # Buscar imágenes de disco completo (.dd) o archivos binarios grandes
+            # Las imágenes divididas se pasan por su primer segmento (.001): TSK abre el resto
             disk_images = []
-            for f in os.listdir(disk_folder):
-                if f.endswith(('.dd', '.img', '.E01', '.bin')) and os.path.getsize(os.path.join(disk_folder, f)) > 1024*1024:  # Más de 1 MB
+            for f in list_evidence_images(disk_folder, DISK_IMAGE_EXTENSIONS):
+                if is_delta_image(f):
+                    # TSK no lee imágenes delta: su $MFT la analiza el analizador propio
+                    self.app.add_log(f"Omitiendo {f} en TSK (imagen delta, se analiza su $MFT)", "INFO")
+                    continue
+                if get_evidence_size(os.path.join(disk_folder, f)) > 1024*1024:  # Más de 1 MB
                     disk_images.append(f)
             
             if not disk_images:
@@ -255,30 +541,30 @@ TCP     0.0.0.0:4444        0.0.0.0:0               LISTENING       1024
                 self.app.add_log(f"Imágenes disponibles en: {disk_folder}", "INFO")
                 return True
             
-            # Ejecutar comandos TSK básicos
+            # Planificar trabajos TSK: mmls primero, luego fsstat/fls/istat por partición
+            tsk_bin_dir = os.path.dirname(tsk_path)
+            jobs = []
             for image in disk_images:
-                self.app.add_log(f"Analizando imagen: {image}", "INFO")
-                image_path = os.path.join(disk_folder, image)
-                
-                # Obtener directorio de TSK
-                tsk_bin_dir = os.path.dirname(tsk_path)
-                
-                # mmls: mostrar particiones
-                self.app.add_log("Ejecutando TSK: mmls (información de particiones)", "INFO")
-                output_file = os.path.join(tsk_output, f"mmls_{image}.txt")
-                mmls_exe = os.path.join(tsk_bin_dir, "mmls.exe")
-                if self.run_tsk_command([mmls_exe, image_path], output_file):
-                    self.app.add_log("✓ Análisis de particiones completado", "SUCCESS")
-                
-                # fls: listar archivos (solo si es copia de trabajo)
-                if "working_copy" in image:
-                    self.app.add_log("Ejecutando TSK: fls en copia de trabajo (listado de archivos)", "INFO")
-                    output_file = os.path.join(tsk_output, f"fls_{image}.txt")
-                    fls_exe = os.path.join(tsk_bin_dir, "fls.exe")
-                    if self.run_tsk_command([fls_exe, "-r", image_path], output_file):
-                        self.app.add_log("✓ Listado de archivos completado", "SUCCESS")
-                else:
-                    self.app.add_log("Omitiendo fls en imagen original (solo lectura)", "INFO")
+                # fls solo sobre la copia de trabajo: la imagen original queda intacta
+                analyze_partitions = not image.endswith('.bin') and not self.is_superseded_original(image, disk_images)
+                if not analyze_partitions:
+                    self.app.add_log(f"Omitiendo análisis de particiones en {image} (solo mmls)", "INFO")
+                jobs.append((os.path.join(disk_folder, image), analyze_partitions))
+            
+            scheduler = TSKScheduler(self.app, tsk_bin_dir, tsk_output)
+            self.app.add_log(f"Ejecutando trabajos TSK en paralelo ({scheduler.max_workers} trabajadores)", "INFO")
+            tsk_results = scheduler.run(jobs)
+            
+            self.analysis_results["tsk"] = tsk_results
+            for image, result in tsk_results.items():
+                failed = [job for job in result["jobs"] if job["status"] != "ok"]
+                self.app.add_log(
+                    f"{image}: {len(result['partitions'])} particiones, {len(result['jobs'])} trabajos, {len(failed)} con incidencias",
+                    "INFO" if not failed else "WARNING"
+                )
+            
+            # Indexar los listados de fls en el catálogo consultable
+            self.build_file_catalog(tsk_output, tsk_results)
                 
             self.app.add_log("✓ Análisis TSK completado para todas las imágenes", "SUCCESS")
             return True
@@ -287,31 +573,251 @@ TCP     0.0.0.0:4444        0.0.0.0:0               LISTENING       1024
             self.app.add_log(f"Error en análisis TSK: {str(e)}", "ERROR")
             return True  # No es crítico
             
-    def run_tsk_command(self, cmd, output_file):
-        """Ejecutar un comando de TSK"""
+    @traced("Catálogo de archivos")
+    def build_file_catalog(self, tsk_output, tsk_results):
+        """Cargar los bodyfiles de fls en el catálogo indexado (catalog.db)"""
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300
+            bodyfiles = [
+                (image, job)
+                for image, result in tsk_results.items()
+                for job in result["jobs"]
+                if job["tool"] == "fls" and job["lines"]
+            ]
+            if not bodyfiles:
+                return True
+            
+            self.app.add_log("Construyendo catálogo indexado del sistema de archivos...", "INFO")
+            catalog = FileSystemCatalog(os.path.join(tsk_output, "catalog.db"))
+            try:
+                for image, job in bodyfiles:
+                    if job["status"] != "ok":
+                        self.app.add_log(f"  Listado parcial ({job['status']}): {job['output']}", "WARNING")
+                    count = catalog.ingest_bodyfile(os.path.join(tsk_output, job["output"]), image, job["offset"])
+                    self.app.add_log(f"  {job['output']}: {count} entradas", "INFO")
+                
+                catalog.build_indexes()
+                self.analysis_results["catalog"] = catalog.summary()
+            finally:
+                catalog.close()
+            
+            summary = self.analysis_results["catalog"]
+            self.app.add_log(
+                f"✓ Catálogo creado: {summary['total_entries']} entradas ({summary['deleted_entries']} eliminadas)",
+                "SUCCESS"
             )
+            self.app.add_log("Consulta: python -m utils.fs_catalog catalog.db \"*.ps1\" --deleted --days 7", "INFO")
+            return True
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
-                if result.stderr:
-                    f.write("\n\nERRORS:\n")
-                    f.write(result.stderr)
+        except Exception as e:
+            self.app.add_log(f"Error al construir catálogo de archivos: {str(e)}", "WARNING")
+            return False
+            
+    @traced("Análisis de la $MFT")
+    def run_mft_analysis(self):
+        """Decodificar la $MFT de las imágenes que TSK no listó (p. ej. boot_sector.bin)"""
+        self.app.add_log("="*50, "INFO")
+        self.app.add_log("ANÁLISIS NATIVO DE LA $MFT (NTFS)", "PHASE")
+        self.app.add_log("="*50, "INFO")
+        
+        try:
+            disk_folder = os.path.join(self.evidence_folder, "Hallazgos", "disk_images")
+            if not os.path.exists(disk_folder):
+                self.app.add_log("No se encontró carpeta de imágenes de disco", "INFO")
+                return True
+            
+            # Imágenes con un listado de fls correcto no necesitan un segundo análisis
+            listed = {
+                image for image, result in self.analysis_results.get("tsk", {}).items()
+                if any(job["tool"] == "fls" and job["status"] == "ok" for job in result["jobs"])
+            }
+            disk_files = list_evidence_images(disk_folder, DISK_IMAGE_EXTENSIONS)
+            sources = []
+            for f in disk_files:
+                if f in listed or self.is_superseded_original(f, disk_files):
+                    continue
+                if get_evidence_size(os.path.join(disk_folder, f)) > 1024*1024:  # MBR y tabla de particiones no contienen la $MFT
+                    sources.append(f)
+            
+            if not sources:
+                self.app.add_log("No hay capturas pendientes de análisis de la $MFT", "INFO")
+                return True
+            
+            mft_folder = os.path.join(self.evidence_folder, "Hallazgos", "mft")
+            parser = MFTParser(self.app, mft_folder)
+            results = {}
+            for f in sources:
+                self.app.add_log(f"Analizando $MFT en: {f}", "INFO")
+                with get_tracer(self.app).span(f"$MFT {f}", "analisis"):
+                    summary = parser.parse_image(os.path.join(disk_folder, f))
+                results[f] = summary
+                records = sum(volume["records"] for volume in summary["volumes"])
+                self.app.add_log(f"✓ {f}: {records} registros de la $MFT recuperados", "SUCCESS" if records else "INFO")
+            
+            self.analysis_results["mft"] = results
+            
+            # Los bodyfiles de la $MFT se suman al catálogo consultable
+            bodyfiles = [
+                (image, volume)
+                for image, summary in results.items()
+                for volume in summary["volumes"] if volume["records"]
+            ]
+            if bodyfiles:
+                tsk_output = os.path.join(self.evidence_folder, "Hallazgos", "tsk_output")
+                os.makedirs(tsk_output, exist_ok=True)
+                catalog = FileSystemCatalog(os.path.join(tsk_output, "catalog.db"))
+                try:
+                    for image, volume in bodyfiles:
+                        catalog.ingest_bodyfile(volume["bodyfile"], image, volume["volume_offset"] // 512)
+                    catalog.build_indexes()
+                    self.analysis_results["catalog"] = catalog.summary()
+                finally:
+                    catalog.close()
+                self.app.add_log(f"Catálogo actualizado: {self.analysis_results['catalog']['total_entries']} entradas", "INFO")
+            return True
+            
+        except Exception as e:
+            self.app.add_log(f"Error en análisis de la $MFT: {str(e)}", "ERROR")
+            return False
+            
+    @traced("Clasificación por hashes conocidos")
+    def run_hash_classification(self):
+        """Clasificar los hashes del catálogo y de los ejecutables recuperados"""
+        self.app.add_log("Clasificando hashes con conjuntos de archivos conocidos...", "INFO")
+        
+        try:
+            library_folder = os.path.join(self.tools_manager.tools_folder, "hash_sets")
+            library = HashSetLibrary(library_folder)
+            if not library.sets:
+                self.app.add_log(f"No hay conjuntos de hashes importados en: {library_folder}", "INFO")
+                self.app.add_log("Importar con: python -m utils.hash_sets import nsrl known_good NSRLFile.txt", "INFO")
+                return True
             
-            # Contar líneas de salida
-            lines = len(result.stdout.split('\n'))
-            self.app.add_log(f"  Salida: {lines} líneas procesadas", "INFO")
+            # (origen, elemento, hash) de cada artefacto con hash
+            items = []
+            manifest = os.path.join(self.evidence_folder, "Hallazgos", "carved", "manifest.json")
+            if os.path.exists(manifest):
+                with open(manifest, 'r', encoding='utf-8') as f:
+                    for entry in json.load(f)["files"]:
+                        items += [("carved", entry["file"], entry["md5"]), ("carved", entry["file"], entry["sha256"])]
+            
+            catalog_path = os.path.join(self.evidence_folder, "Hallazgos", "tsk_output", "catalog.db")
+            catalog_bad = []
+            try:
+                if os.path.exists(catalog_path):
+                    catalog = FileSystemCatalog(catalog_path)
+                    try:
+                        catalog_hashes = catalog.md5_values()
+                        matches = library.classify(catalog_hashes + [value for _, _, value in items])
+                        catalog.mark_known(matches)
+                        self.analysis_results["catalog"] = catalog.summary()
+                        catalog_bad = catalog.known_files("known_bad", limit=50)
+                        items += [("catalog", "", md5) for md5 in catalog_hashes]
+                    finally:
+                        catalog.close()
+                else:
+                    matches = library.classify(value for _, _, value in items)
+            finally:
+                library.close()
+            
+            known_folder = os.path.join(self.evidence_folder, "Hallazgos", "known_files")
+            os.makedirs(known_folder, exist_ok=True)
+            results_csv = os.path.join(known_folder, "classification.csv")
+            known_bad = []
+            counts = {"known_good": 0, "known_bad": 0}
+            with open(results_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(["source", "item", "hash", "category", "hash_set"])
+                for source, item, value in items:
+                    match = matches.get(value.lower())
+                    if not match:
+                        continue
+                    writer.writerow([source, item, value, match[0], match[1]])
+                    counts[match[0]] += 1
+                    if match[0] == "known_bad" and source != "catalog":
+                        known_bad.append({"source": source, "item": item, "hash": value, "hash_set": match[1]})
+            for entry in catalog_bad:
+                known_bad.append({
+                    "source": "catalog",
+                    "item": f"{entry['image']}:{entry['path']}",
+                    "hash": entry["md5"],
+                    "hash_set": matches[entry["md5"]][1],
+                })
+            
+            self.analysis_results["known_files"] = {
+                "hash_sets": library.summary(),
+                "checked": len(set(value for _, _, value in items)),
+                "known_good": counts["known_good"],
+                "known_bad": counts["known_bad"],
+                "known_bad_items": known_bad[:50],
+                "csv": results_csv,
+            }
+            
+            self.app.add_log(
+                f"✓ Hashes clasificados: {counts['known_good']} conocidos (known-good), {counts['known_bad']} maliciosos (known-bad)",
+                "SUCCESS"
+            )
+            for entry in known_bad[:10]:
+                self.app.add_log(f"  KNOWN-BAD [{entry['hash_set']}] {entry['source']} {entry['item']} {entry['hash']}", "WARNING")
             return True
-                    
+            
+        except Exception as e:
+            self.app.add_log(f"Error en clasificación por hashes: {str(e)}", "WARNING")
+            return False
+            
+    @traced("Línea de tiempo")
+    def run_timeline(self):
+        """Construir la súper línea de tiempo (timeline.csv y timeline.db)"""
+        self.app.add_log("Construyendo línea de tiempo multi-fuente...", "INFO")
+        
+        try:
+            findings = os.path.join(self.evidence_folder, "Hallazgos")
+            builder = timeline.TimelineBuilder(self.app, os.path.join(findings, "timeline"))
+            
+            # Bodyfiles de fls (incluye las marcas $FILE_NAME de NTFS)
+            tsk_output = os.path.join(findings, "tsk_output")
+            for image, result in self.analysis_results.get("tsk", {}).items():
+                for job in result["jobs"]:
+                    if job["tool"] == "fls" and job["lines"]:
+                        bodyfile = os.path.join(tsk_output, job["output"])
+                        builder.add_source(job["output"], timeline.bodyfile_events(bodyfile, image))
+            
+            for image, summary in self.analysis_results.get("mft", {}).items():
+                for volume in summary["volumes"]:
+                    if volume["records"]:
+                        name = os.path.basename(volume["bodyfile"])
+                        builder.add_source(name, timeline.bodyfile_events(volume["bodyfile"], image))
+            
+            volatility_output = os.path.join(findings, "volatility_output")
+            for name, parser in (("pslist.txt", timeline.pslist_events), ("netscan.txt", timeline.netscan_events)):
+                path = os.path.join(volatility_output, name)
+                if os.path.exists(path):
+                    builder.add_source(name, parser(path))
+            
+            system_info = os.path.join(findings, "dumps", "system_info.txt")
+            if os.path.exists(system_info):
+                builder.add_source("system_info.txt", timeline.system_info_events(system_info))
+            
+            logger = getattr(self.app, "logger", None)
+            if logger:
+                builder.add_source("log", timeline.log_events(logger.iter_entries()))
+            
+            summary = builder.build()
+            self.analysis_results["timeline"] = summary
+            
+            if summary["total_events"]:
+                self.app.add_log(
+                    f"✓ Línea de tiempo: {summary['total_events']} eventos ({summary['first_event']} - {summary['last_event']} UTC)",
+                    "SUCCESS"
+                )
+            else:
+                self.app.add_log("Línea de tiempo vacía: no hay eventos con marca de tiempo", "INFO")
+            return True
+            
         except Exception as e:
-            self.app.add_log(f"  Error al ejecutar comando TSK: {str(e)}", "WARNING")
+            self.app.add_log(f"Error al construir línea de tiempo: {str(e)}", "WARNING")
             return False
             
+    @traced("Guardar resultados")
     def save_analysis_results(self):
         """Guardar resultados consolidados del análisis"""
         try:
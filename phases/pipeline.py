@@ -0,0 +1,188 @@
+"""
+Plan de ejecución del análisis
+Las cuatro fases se descomponen en tareas con sus entradas y salidas. El análisis de la memoria
+(Volatility, ejecutables, características, entropía) empieza en cuanto termina el volcado, mientras
+el disco todavía se está capturando; el reporte espera a que termine todo.
+Al terminar, fallar o detenerse se guarda checkpoint.json en la carpeta del caso con el estado
+de cada tarea y los artefactos completos
+"""
+
+import os
+import json
+from datetime import datetime
+
+from phases.verification import VerificationPhase
+from phases.acquisition import AcquisitionPhase
+from phases.analysis import AnalysisPhase, VOLATILITY_MODULES
+from phases.reporting import ReportingPhase
+from utils.task_graph import TaskGraph, TaskGraphError
+from utils.job_control import CHECKPOINT_FILE, Cancelled
+
+
+PHASE_TITLES = (
+    "Fase 1: Verificación inicial",
+    "Fase 2: Adquisición de evidencia",
+    "Fase 3: Análisis automatizado",
+    "Fase 4: Generación de reporte",
+)
+
+# Lecturas simultáneas del disco de evidencia: más de dos compiten por el cabezal en discos externos
+EVIDENCE_READERS = 2
+
+
+def pipeline_limits(app):
+    """Recursos del equipo que reparten las tareas; en bajo impacto, una tarea pesada a la vez"""
+    if getattr(app, 'low_impact', False):
+        return {"cpu": 1, "evidencia": 1, "disco_origen": 1}
+    return {"cpu": os.cpu_count() or 1, "evidencia": EVIDENCE_READERS, "disco_origen": 1}
+
+
+class AnalysisPipeline:
+    """Tareas de las cuatro fases; las fases se crean al conocerse la carpeta del caso"""
+
+    def __init__(self, app):
+        self.app = app
+        self.evidence_folder = ""
+        self.acquisition = None
+        self.analysis = None
+        self.reporting = None
+        self.graph = None
+
+    def build(self):
+        graph = TaskGraph(self.app, limits=pipeline_limits(self.app))
+        scan = {"cpu": 1, "evidencia": 1}
+
+        # Fase 1
+        graph.add("Verificación inicial", self.verify, outputs=["caso"], group=0,
+                  error="Error en la fase de verificación")
+
+        # Fase 2: orden de volatilidad (sistema, memoria, disco); el disco no bloquea el análisis de la memoria
+        graph.add("Preparar adquisición", lambda: self.acquisition.prepare(),
+                  inputs=["caso"], outputs=["herramientas"], group=1, error="Error en la fase de adquisición")
+        graph.add("Información del sistema", lambda: self.acquisition.run_calamity(),
+                  inputs=["herramientas"], outputs=["system_info"], group=1)
+        graph.add("Volcado de memoria", lambda: self.acquisition.run_winpmem(),
+                  inputs=["system_info"], outputs=["dump"], group=1, error="No se pudo realizar el volcado de memoria")
+        graph.add("Captura de disco", lambda: self.acquisition.capture_disk(),
+                  inputs=["dump"], outputs=["disco"], resources={"disco_origen": 1}, group=1)
+        graph.add("Hashes de la memoria", lambda: self.acquisition.calculate_hashes(),
+                  inputs=["dump", "system_info"], outputs=["hashes"], resources={"evidencia": 1}, group=1)
+
+        # Fase 3: memoria
+        for module in VOLATILITY_MODULES:
+            graph.add(f"Volatility {module}", lambda module=module: self.analysis.run_volatility_module(module),
+                      inputs=["dump"], outputs=[f"volatility:{module}"], resources={"cpu": 1}, group=2)
+        graph.add("Recuperación de ejecutables", lambda: self.analysis.run_pe_carving(),
+                  inputs=["dump"], outputs=["carved"], resources=scan, group=2)
+        graph.add("Características de la memoria", lambda: self.analysis.run_feature_extraction("memory"),
+                  inputs=["dump"], outputs=["features:memory"], resources=scan, group=2)
+        graph.add("Entropía de la memoria", lambda: self.analysis.run_entropy_map("memory"),
+                  inputs=["dump"], outputs=["entropy:memory"], resources=scan, group=2)
+
+        # Fase 3: disco
+        graph.add("Verificación EWF", lambda: self.analysis.run_ewf_verification(),
+                  inputs=["disco"], outputs=["ewf"], resources=scan, group=2)
+        graph.add("Características del disco", lambda: self.analysis.run_feature_extraction("disk"),
+                  inputs=["disco"], outputs=["features:disk"], resources=scan, group=2)
+        graph.add("Entropía del disco", lambda: self.analysis.run_entropy_map("disk"),
+                  inputs=["disco"], outputs=["entropy:disk"], resources=scan, group=2)
+        graph.add("TSK", lambda: self.analysis.run_tsk_analysis(),
+                  inputs=["disco"], outputs=["tsk"], resources={"evidencia": 1}, group=2)
+        graph.add("Análisis de la $MFT", lambda: self.analysis.run_mft_analysis(),
+                  inputs=["tsk"], outputs=["mft"], resources=scan, group=2)
+        graph.add("Clasificación por hashes conocidos", lambda: self.analysis.run_hash_classification(),
+                  inputs=["mft", "carved"], outputs=["known_files"], group=2)
+        graph.add("Línea de tiempo", lambda: self.analysis.run_timeline(),
+                  inputs=["mft", "system_info", "volatility:pslist", "volatility:netscan"], outputs=["timeline"],
+                  resources={"cpu": 1}, group=2)
+
+        analysis_outputs = {output for task in graph.tasks if task.group == 2 for output in task.outputs}
+        graph.add("Guardar resultados del análisis", self.save_analysis,
+                  inputs=analysis_outputs, outputs=["analysis_results"], group=2)
+
+        # Fase 4: el reporte ya reparte sus secciones en procesos
+        graph.add("Reporte", lambda: self.reporting.execute(),
+                  inputs=["analysis_results", "hashes"], outputs=["reporte"], group=3,
+                  error="Error en la fase de reporte")
+        return graph
+
+    def run(self, on_group=None):
+        """Ejecutar el plan completo; lanza TaskGraphError si falla una tarea crítica y Cancelled
+        si se detiene el análisis
+        """
+        def notify(group, status):
+            if status == "running":
+                self.app.add_log(f"Iniciando {PHASE_TITLES[group]}", "PHASE")
+            if on_group:
+                on_group(group, status)
+
+        self.graph = self.build()
+        status = "error"
+        try:
+            results = self.graph.run(on_group=notify)
+            status = "completed"
+            return results
+        except Cancelled:
+            status = "cancelled"
+            raise
+        except TaskGraphError:
+            status = "failed"
+            raise
+        finally:
+            self.save_checkpoint(status)
+
+    def save_checkpoint(self, status):
+        """Guardar en la carpeta del caso qué tareas terminaron, cuáles se interrumpieron y qué
+        artefactos están completos; se escribe en un archivo temporal y se reemplaza de una vez
+        """
+        if not self.evidence_folder or self.graph is None:
+            return None
+        checkpoint = {
+            "status": status,
+            "saved": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "artifacts": sorted(self.graph.ready),
+            "interrupted": [task.name for task in self.graph.tasks if task.status == "cancelled"],
+            "tasks": [
+                {"name": task.name, "phase": PHASE_TITLES[task.group], "status": task.status}
+                for task in self.graph.tasks
+            ],
+        }
+        path = os.path.join(self.evidence_folder, CHECKPOINT_FILE)
+        try:
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            self.app.add_log(f"No se pudo guardar el checkpoint: {str(e)}", "WARNING")
+            return None
+
+        # Lo registrado hasta aquí debe estar en disco junto al checkpoint
+        logger = getattr(self.app, 'logger', None)
+        if logger:
+            logger.flush()
+        return path
+
+    def verify(self):
+        """Fase 1 y creación de las fases siguientes sobre la carpeta del caso"""
+        phase = VerificationPhase(self.app)
+        if not phase.execute():
+            return False
+
+        self.evidence_folder = phase.evidence_folder
+        self.app.evidence_folder = phase.evidence_folder
+        # Desde aquí el log se escribe en la carpeta del caso a medida que ocurre
+        logger = getattr(self.app, 'logger', None)
+        if logger:
+            logger.attach(self.evidence_folder)
+
+        self.acquisition = AcquisitionPhase(self.app, self.evidence_folder)
+        self.analysis = AnalysisPhase(self.app, self.evidence_folder)
+        self.reporting = ReportingPhase(self.app, self.evidence_folder)
+        return True
+
+    def save_analysis(self):
+        self.analysis.save_analysis_results()
+        self.app.add_log("Análisis automatizado completado", "SUCCESS")
+        return True
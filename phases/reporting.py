@@ -1,20 +1,151 @@
 """
 Fase 4: Generación de reporte
 - Consolidar resultados
-- Generar reporte preliminar en PDF
+- Generar el reporte en PDF (secciones renderizadas en paralelo), HTML, JSON y CSV desde un mismo modelo
 - Dejar evidencia lista para Autopsy
 """
 
 import os
+import sys
+import time
+import argparse
 from datetime import datetime
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreakIfNotEmpty
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from reportlab.lib import colors
+from reportlab.graphics.shapes import Drawing, Rect, String
 import json
+from utils.entropy_map import heat_strip, heat_color
+from utils import report_appendix, report_model, tracing
+from utils.report_model import REPORT_SECTIONS, ReportModel, note_path
+from utils.report_export import EXPORTERS
+from utils.report_appendix import FlowableStream, appendix_flowables, build_appendices
+from utils.pdf_merge import merge_available, merge_sections
+from utils.report_cache import SectionCache, digest_inputs, file_digest
+from utils.evidence_inventory import EvidenceInventory
+from utils.tracing import TRACE_FILE, get_tracer, traced
+
+
+APPENDIX_PREFIX = "appendix:"
+
+# Extensiones que Autopsy acepta como fuente de datos (imágenes divididas: solo el primer segmento)
+AUTOPSY_SOURCE_EXTENSIONS = (".raw", ".mem", ".dd", ".img", ".e01", ".001")
+
+# Formatos de salida; en triaje se puede omitir el PDF, que es el más lento
+REPORT_FORMATS = ("pdf", "html", "json", "csv")
+
+# Estilos de ReportLab para los bloques del modelo
+HEADING_STYLES = {0: 'CustomTitle', 1: 'CustomHeading', 2: 'Heading3'}
+PARAGRAPH_STYLES = {"normal": 'CustomNormal', "plain": 'Normal'}
+TABLE_STYLES = {
+    # Encabezado en la primera fila y filas alternadas
+    "data": [
+        ('BACKGROUND', (0, 0), (-1, 0), HexColor('#00d9ff')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f0f0f0')])
+    ],
+    # Etiquetas en la primera columna
+    "fields": [
+        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ],
+}
+
+# Entradas de cada sección para la caché: claves de analysis_results.json y rutas dentro de Hallazgos
+SECTION_INPUTS = {
+    "summary": ((), ("dumps",)),
+    "custody": (("ewf",), ("disk_images", "hashes")),
+    "memory": (("pslist", "netscan", "cmdline", "dlllist", "filescan", "carved"), ("dumps", "volatility_output")),
+    "disk": (("tsk", "mft", "catalog", "features", "known_files", "entropy"), ("tsk_output", "entropy")),
+    "timeline": (("timeline",), ()),
+    "closing": ((), ()),
+}
+
+# La portada lleva la fecha de generación: se renderiza siempre
+UNCACHED_SECTIONS = ("cover",)
+
+# Dentro de Reporte: PDF de secciones ya renderizadas
+CACHE_FOLDER = "cache_secciones"
+
+# Apéndices por carpeta de evidencia, reutilizados por cada proceso de renderizado
+_worker_appendices = {}
+
+
+def report_styles():
+    """Estilos del reporte (cada proceso de renderizado crea los suyos)"""
+    styles = getSampleStyleSheet()
+    
+    # Estilo personalizado para título
+    styles.add(ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=HexColor('#00d9ff'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    ))
+    
+    # Estilo para encabezados
+    styles.add(ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=HexColor('#00d9ff'),
+        spaceAfter=12,
+        spaceBefore=12
+    ))
+    
+    # Estilo para texto normal
+    styles.add(ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_JUSTIFY
+    ))
+    return styles
+
+
+def draw_page_number(canvas, doc):
+    """Pie con el número de página (reporte renderizado en un solo documento)"""
+    canvas.setFont("Helvetica", 8)
+    canvas.drawRightString(doc.pagesize[0] - 72, 24, f"Página {doc.page}")
+
+
+def _render_section(task):
+    """Renderizar una sección en un proceso aparte; devuelve su cantidad de páginas"""
+    evidence_folder, report_data, key, part, pdf_file = task
+    phase = ReportingPhase(None, evidence_folder)
+    phase.report_data = report_data
+    phase.appendices = _worker_model(evidence_folder, report_data).appendices
+    return phase.render_section(key, part, pdf_file)
+
+
+def _worker_model(evidence_folder, report_data):
+    """Modelo del reporte en un proceso aparte (los apéndices se arman una vez por proceso)"""
+    if evidence_folder not in _worker_appendices:
+        appendices = build_appendices(report_data["inventory"], report_data.get("analysis", {}))
+        _worker_appendices[evidence_folder] = {appendix.key: appendix for appendix in appendices}
+    return ReportModel(evidence_folder, report_data, _worker_appendices[evidence_folder])
+
+
+def _export_report(task):
+    """Exportar el reporte a un formato en un proceso aparte; devuelve la ruta de salida"""
+    evidence_folder, report_data, report_format, output = task
+    EXPORTERS[report_format](_worker_model(evidence_folder, report_data), output)
+    return output
 
 
 class ReportingPhase:
@@ -22,6 +153,7 @@ class ReportingPhase:
         self.app = app
         self.evidence_folder = evidence_folder
         self.report_data = {}
+        self.appendices = {}
         
     def execute(self):
         """Ejecutar la fase de reporte"""
@@ -30,9 +162,9 @@ class ReportingPhase:
             if not self.consolidate_results():
                 self.app.add_log("Advertencia: Problemas al consolidar resultados", "WARNING")
             
-            # Generar reporte PDF
-            if not self.generate_pdf_report():
-                self.app.add_log("Error: No se pudo generar el reporte PDF", "ERROR")
+            # Generar el reporte en los formatos pedidos
+            if not self.generate_reports():
+                self.app.add_log("Error: No se pudo generar el reporte", "ERROR")
                 return False
             
             # Preparar evidencia para Autopsy
@@ -45,35 +177,40 @@ class ReportingPhase:
             self.app.add_log(f"Error en Fase 4: {str(e)}", "ERROR")
             return False
             
+    @traced("Consolidar resultados")
     def consolidate_results(self):
         """Consolidar todos los resultados del análisis"""
         self.app.add_log("Consolidando resultados del análisis...", "INFO")
         
         try:
+            # Traza de rendimiento hasta aquí (fases 1-3), para el apéndice de rendimiento; la traza
+            # completa se vuelve a guardar al terminar el análisis
+            tracer = get_tracer(self.app)
+            if tracer.enabled:
+                tracer.save(os.path.join(self.evidence_folder, "Hallazgos", TRACE_FILE))
+            
+            # Inventario de Hallazgos: una sola pasada por el disco de evidencia para todo el reporte
+            inventory = EvidenceInventory(self.evidence_folder).scan()
+            self.report_data["inventory"] = inventory
+            manifest_file = inventory.save()
+            self.app.add_log(
+                f"✓ Inventario de evidencia: {len(inventory.entries)} archivos - {manifest_file}", "INFO"
+            )
+            
             # Cargar resultados del análisis
             analysis_file = os.path.join(self.evidence_folder, "Hallazgos", "analysis_results.json")
             
-            if os.path.exists(analysis_file):
+            if inventory.exists(analysis_file):
                 with open(analysis_file, 'r', encoding='utf-8') as f:
                     self.report_data["analysis"] = json.load(f)
             else:
                 self.report_data["analysis"] = {}
             
-            # Información de hashes
-            hashes_file = os.path.join(self.evidence_folder, "Hallazgos", "hashes", "hashes.txt")
-            if os.path.exists(hashes_file):
-                with open(hashes_file, 'r', encoding='utf-8') as f:
-                    self.report_data["hashes"] = f.read()
-            
-            # Información del sistema
-            system_info_file = os.path.join(self.evidence_folder, "Hallazgos", "dumps", "system_info.txt")
-            if os.path.exists(system_info_file):
-                with open(system_info_file, 'r', encoding='utf-8') as f:
-                    self.report_data["system_info"] = f.read()[:2000]  # Primeros 2000 caracteres
+            # Información del sistema (el texto queda en el inventario para la sección de memoria)
+            self.report_data["system_info"] = inventory.read_text("dumps/system_info.txt")[:2000]  # Primeros 2000 caracteres
             
             # Listar archivos de evidencia
-            dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
-            self.report_data["evidence_files"] = os.listdir(dumps_folder) if os.path.exists(dumps_folder) else []
+            self.report_data["evidence_files"] = inventory.listdir("dumps")
             
             self.app.add_log("✓ Resultados consolidados exitosamente", "SUCCESS")
             return True
@@ -82,444 +219,271 @@ class ReportingPhase:
             self.app.add_log(f"Error al consolidar resultados: {str(e)}", "ERROR")
             return False
             
-    def generate_pdf_report(self):
-        """Generar reporte PDF profesional"""
-        self.app.add_log("Generando reporte PDF...", "INFO")
+    @traced("Generar reportes")
+    def generate_reports(self, formats=None):
+        """Generar el reporte en cada formato pedido a partir del mismo modelo
+
+        Los formatos se eligen con `report_formats` de la aplicación (por defecto todos). HTML, JSON y CSV
+        se exportan en procesos aparte mientras se renderiza el PDF.
+        """
+        requested = formats or getattr(self.app, 'report_formats', None) or REPORT_FORMATS
+        formats = [fmt for fmt in REPORT_FORMATS if fmt in requested]
+        reports_folder = os.path.join(self.evidence_folder, "Reporte")
+        base_name = os.path.join(reports_folder, f"Forensic_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        outputs = {"pdf": base_name + ".pdf", "html": base_name + ".html", "json": base_name + ".json", "csv": base_name + "_csv"}
+        
+        if "inventory" not in self.report_data:
+            self.report_data["inventory"] = EvidenceInventory(self.evidence_folder).scan()
         
+        # Apéndices con los hallazgos completos: se leen por lotes al renderizar cada formato
+        appendices = build_appendices(self.report_data["inventory"], self.report_data.get("analysis", {}))
+        self.appendices = {appendix.key: appendix for appendix in appendices}
+        
+        exports = [fmt for fmt in formats if fmt != "pdf"]
+        tasks = [(self.evidence_folder, self.report_data, fmt, outputs[fmt]) for fmt in exports]
+        started = time.monotonic()
+        success = True
+        executor = None
+        if len(formats) > 1 and (os.cpu_count() or 1) > 1:
+            executor = ProcessPoolExecutor(max_workers=len(tasks))
         try:
-            reports_folder = os.path.join(self.evidence_folder, "Reporte")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_file = os.path.join(reports_folder, f"Forensic_Report_{timestamp}.pdf")
-            
-            # Crear documento PDF
-            doc = SimpleDocTemplate(
-                pdf_file,
-                pagesize=letter,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=18
-            )
-            
-            # Contenedor para elementos del PDF
-            elements = []
-            
-            # Estilos
-            styles = getSampleStyleSheet()
-            
-            # Estilo personalizado para título
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=HexColor('#00d9ff'),
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            # Estilo para encabezados
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=16,
-                textColor=HexColor('#00d9ff'),
-                spaceAfter=12,
-                spaceBefore=12
-            )
-            
-            # Estilo para texto normal
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontSize=10,
-                alignment=TA_JUSTIFY
-            )
-            
-            # === PORTADA ===
-            elements.append(Spacer(1, 2*inch))
-            elements.append(Paragraph("REPORTE DE ANÁLISIS FORENSE DIGITAL", title_style))
-            elements.append(Spacer(1, 0.5*inch))
-            elements.append(Paragraph(f"ForensicFlow v1.0", styles['Normal']))
-            elements.append(Spacer(1, 0.3*inch))
-            elements.append(Paragraph(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']))
-            elements.append(PageBreak())
-            
-            # === RESUMEN EJECUTIVO ===
-            elements.append(Paragraph("1. RESUMEN EJECUTIVO", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            summary_text = """
-            Este reporte presenta los resultados del análisis forense digital automatizado 
-            realizado mediante ForensicFlow. El análisis incluye la adquisición de memoria volátil, 
-            análisis de procesos, conexiones de red y artefactos del sistema.
-            """
-            elements.append(Paragraph(summary_text, normal_style))
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === INFORMACIÓN DEL CASO ===
-            elements.append(Paragraph("2. INFORMACIÓN DEL CASO", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            case_data = [
-                ["Analista:", "ForensicFlow Automated System"],
-                ["Fecha de análisis:", datetime.now().strftime('%d/%m/%Y %H:%M:%S')],
-                ["Ubicación de evidencia:", self.evidence_folder],
-                ["Herramientas utilizadas:", "WinPmem, Volatility 3, TSK"]
-            ]
-            
-            case_table = Table(case_data, colWidths=[2*inch, 4*inch])
-            case_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(case_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === EVIDENCIA RECOLECTADA ===
-            elements.append(Paragraph("3. EVIDENCIA RECOLECTADA", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            if "evidence_files" in self.report_data:
-                evidence_text = "Archivos de evidencia adquiridos:<br/><br/>"
-                for file in self.report_data["evidence_files"]:
-                    # Obtener tamaño del archivo
-                    file_path = os.path.join(self.evidence_folder, "Hallazgos", "dumps", file)
-                    if os.path.exists(file_path):
-                        size_mb = os.path.getsize(file_path) / (1024**2)
-                        evidence_text += f"• {file} ({size_mb:.2f} MB)<br/>"
-                    else:
-                        evidence_text += f"• {file}<br/>"
-                elements.append(Paragraph(evidence_text, normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === HASHES DE INTEGRIDAD ===
-            elements.append(Paragraph("4. CADENA DE CUSTODIA - HASHES", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            if "hashes" in self.report_data:
-                # Limitar longitud para el PDF
-                hashes_text = self.report_data["hashes"][:1000]
-                elements.append(Paragraph(f"<font face='Courier' size='8'>{hashes_text}</font>", normal_style))
-            
-            elements.append(PageBreak())
-            
-            # === HALLAZGOS DEL ANÁLISIS ===
-            elements.append(Paragraph("5. HALLAZGOS DEL ANÁLISIS", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            # === 5.1 CAPTURA DE MEMORIA (WinPmem) ===
-            elements.append(Paragraph("5.1 Captura de Memoria Volátil (WinPmem)", styles['Heading3']))
-            elements.append(Spacer(1, 0.1*inch))
-            
-            # Información de captura de memoria
-            dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
-            memory_dump = os.path.join(dumps_folder, "memory_dump.raw")
-            
-            if os.path.exists(memory_dump):
-                dump_size_gb = os.path.getsize(memory_dump) / (1024**3)
-                memory_info = f"""
-                <b>Herramienta:</b> WinPmem v4.0<br/>
-                <b>Archivo generado:</b> memory_dump.raw<br/>
-                <b>Tamaño del volcado:</b> {dump_size_gb:.2f} GB<br/>
-                <b>Estado:</b> Captura exitosa - Evidencia preservada<br/>
-                <b>Tipo:</b> Volcado completo de memoria RAM (formato RAW)<br/>
-                <b>Integridad:</b> Verificada mediante hashes MD5/SHA256<br/>
-                """
-                elements.append(Paragraph(memory_info, normal_style))
-            else:
-                elements.append(Paragraph("Volcado de memoria simulado utilizado para demostración", normal_style))
+            futures = {executor.submit(_export_report, task): task[2] for task in tasks} if executor else {}
+            if "pdf" in formats:
+                success = self.generate_pdf_report(outputs["pdf"])
             
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === 5.2 INFORMACIÓN DEL SISTEMA ===
-            elements.append(Paragraph("5.2 Información del Sistema Capturada", styles['Heading3']))
-            elements.append(Spacer(1, 0.1*inch))
-            
-            # Parsear información básica del system_info.txt
-            system_info_file = os.path.join(dumps_folder, "system_info.txt")
-            if os.path.exists(system_info_file):
+            # Sin procesos auxiliares, los demás formatos se exportan después del PDF
+            for item in (as_completed(futures) if executor else tasks):
+                report_format = futures[item] if executor else item[2]
                 try:
-                    with open(system_info_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        
-                        # Extraer información relevante
-                        system_summary = "<b>Comandos ejecutados:</b><br/>"
-                        system_summary += "• systeminfo - Información general del sistema<br/>"
-                        system_summary += "• wmic process - Lista de procesos en ejecución<br/>"
-                        system_summary += "• netstat -ano - Conexiones de red activas<br/>"
-                        system_summary += "• tasklist /v - Tareas del sistema detalladas<br/>"
-                        system_summary += "• ipconfig /all - Configuración de red completa<br/><br/>"
-                        
-                        # Obtener algunas líneas de systeminfo si están disponibles
-                        if "Host Name:" in content:
-                            lines = content.split('\n')
-                            important_info = []
-                            for line in lines:
-                                if any(keyword in line for keyword in ["Host Name:", "OS Name:", "OS Version:", "System Type:"]):
-                                    important_info.append(line.strip())
-                            
-                            if important_info:
-                                system_summary += "<b>Información extraída:</b><br/>"
-                                system_summary += "<font face='Courier' size='8'>"
-                                for info in important_info[:6]:
-                                    system_summary += f"{info}<br/>"
-                                system_summary += "</font>"
-                        
-                        elements.append(Paragraph(system_summary, normal_style))
-                except:
-                    elements.append(Paragraph("Información del sistema capturada correctamente", normal_style))
-            else:
-                elements.append(Paragraph("No se capturó información adicional del sistema", normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === 5.2A CAPTURA DE DISCO Y CHAIN OF CUSTODY ===
-            elements.append(Paragraph("5.2A Captura de Disco y Cadena de Custodia", styles['Heading3']))
-            elements.append(Spacer(1, 0.1*inch))
-            
-            disk_folder = os.path.join(self.evidence_folder, "Hallazgos", "disk_images")
-            chain_file = os.path.join(self.evidence_folder, "Hallazgos", "hashes", "chain_of_custody.txt")
-            
-            if os.path.exists(disk_folder):
-                disk_files = os.listdir(disk_folder)
-                
-                if disk_files:
-                    # Determinar modo de captura
-                    has_complete = any('disk_original.dd' in f or 'disk_working_copy.dd' in f for f in disk_files)
-                    has_selective = any(f in ['mbr.bin', 'partition_table.bin', 'boot_sector.bin'] for f in disk_files)
-                    
-                    if has_complete:
-                        elements.append(Paragraph("<b>Modo de Captura:</b> CAPTURA FORENSE COMPLETA", normal_style))
-                        elements.append(Spacer(1, 0.1*inch))
-                        
-                        # Leer chain of custody si existe
-                        if os.path.exists(chain_file):
-                            try:
-                                with open(chain_file, 'r', encoding='utf-8') as f:
-                                    chain_content = f.read()
-                                    elements.append(Paragraph("<font face='Courier' size='7'>" + chain_content[:1500].replace('\n', '<br/>') + "</font>", normal_style))
-                            except:
-                                elements.append(Paragraph("Cadena de custodia documentada en archivo separado", normal_style))
-                        
-                        custody_info = """
-                        <b>Procedimiento Forense Aplicado:</b><br/>
-                        1. Captura bit a bit del disco completo<br/>
-                        2. Cálculo de hash criptográfico (MD5/SHA256) de la imagen original<br/>
-                        3. Protección de la imagen original (solo lectura)<br/>
-                        4. Creación de copia de trabajo verificada<br/>
-                        5. Verificación de integridad mediante comparación de hashes<br/>
-                        6. Análisis realizado ÚNICAMENTE sobre copia de trabajo<br/>
-                        <br/>
-                        <b>Cumplimiento:</b> Este procedimiento cumple con los estándares forenses para preservar la cadena de custodia y garantizar la integridad de la evidencia original.
-                        """
-                        elements.append(Spacer(1, 0.1*inch))
-                        elements.append(Paragraph(custody_info, normal_style))
-                        
-                    elif has_selective:
-                        elements.append(Paragraph("<b>Modo de Captura:</b> CAPTURA SELECTIVA DE ÁREAS CRÍTICAS", normal_style))
-                        elements.append(Spacer(1, 0.1*inch))
-                        
-                        selective_info = """
-                        <b>Áreas Capturadas:</b><br/>
-                        • <b>MBR (Master Boot Record)</b> - 512 bytes<br/>
-                        • <b>Tabla de Particiones</b> - 64 KB<br/>
-                        • <b>Sector de Arranque y $MFT</b> - 100 MB<br/>
-                        <br/>
-                        <b>Propósito:</b> Captura rápida de áreas críticas del disco que contienen información esencial sobre la estructura del sistema de archivos, particiones y archivos principales.<br/>
-                        <br/>
-                        <b>Integridad:</b> Cada archivo capturado tiene su hash MD5/SHA256 calculado y documentado.
-                        """
-                        elements.append(Paragraph(selective_info, normal_style))
-                        
-                        # Leer hashes de disco si existen
-                        disk_hashes_file = os.path.join(self.evidence_folder, "Hallazgos", "hashes", "disk_hashes.txt")
-                        if os.path.exists(disk_hashes_file):
-                            try:
-                                elements.append(Spacer(1, 0.1*inch))
-                                elements.append(Paragraph("<b>Hashes de Integridad:</b>", normal_style))
-                                with open(disk_hashes_file, 'r', encoding='utf-8') as f:
-                                    hash_content = f.read()[:800]
-                                    elements.append(Paragraph("<font face='Courier' size='6'>" + hash_content.replace('\n', '<br/>') + "</font>", normal_style))
-                            except:
-                                pass
-                    
-                    # Listar archivos capturados
-                    elements.append(Spacer(1, 0.1*inch))
-                    elements.append(Paragraph(f"<b>Archivos de imagen de disco generados:</b> {len(disk_files)}", normal_style))
-                    files_text = ""
-                    for f in disk_files:
-                        file_path = os.path.join(disk_folder, f)
-                        if os.path.exists(file_path):
-                            size_mb = os.path.getsize(file_path) / (1024**2)
-                            if size_mb >= 1024:
-                                size_str = f"{size_mb/1024:.2f} GB"
-                            else:
-                                size_str = f"{size_mb:.2f} MB"
-                            files_text += f"• {f} ({size_str})<br/>"
-                    elements.append(Paragraph(files_text, normal_style))
-                    
-                else:
-                    elements.append(Paragraph("No se realizó captura de disco en este análisis", normal_style))
-            else:
-                elements.append(Paragraph("No se realizó captura de disco en este análisis", normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === 5.3 ANÁLISIS DE MEMORIA (Volatility) ===
-            elements.append(Paragraph("5.3 Análisis de Memoria (Volatility)", styles['Heading3']))
-            elements.append(Spacer(1, 0.1*inch))
-            
-            if "analysis" in self.report_data:
-                analysis = self.report_data["analysis"]
-                
-                # PROCESOS (pslist)
-                if "pslist" in analysis:
-                    pslist_data = analysis['pslist']
-                    total_processes = pslist_data.get('total_count', 0)
-                    processes = pslist_data.get('processes', [])
-                    
-                    elements.append(Paragraph(f"<b>Procesos en Ejecución:</b> {total_processes} procesos detectados", normal_style))
-                    elements.append(Spacer(1, 0.1*inch))
-                    
-                    if processes:
-                        # Crear tabla de procesos
-                        process_table_data = [["PID", "Nombre del Proceso"]]
-                        for proc in processes[:15]:  # Primeros 15 procesos
-                            if isinstance(proc, dict):
-                                process_table_data.append([proc.get('pid', '?'), proc.get('name', 'Unknown')])
-                            else:
-                                process_table_data.append(['?', str(proc)])
-                        
-                        process_table = Table(process_table_data, colWidths=[1*inch, 4*inch])
-                        process_table.setStyle(TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), HexColor('#00d9ff')),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('FONTSIZE', (0, 0), (-1, -1), 9),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f0f0f0')])
-                        ]))
-                        elements.append(process_table)
-                        elements.append(Spacer(1, 0.2*inch))
-                
-                # CONEXIONES DE RED (netscan)
-                if "netscan" in analysis:
-                    netscan_data = analysis['netscan']
-                    total_connections = netscan_data.get('total_count', 0)
-                    connections = netscan_data.get('connections', [])
-                    
-                    elements.append(Paragraph(f"<b>Conexiones de Red:</b> {total_connections} conexiones activas detectadas", normal_style))
-                    elements.append(Spacer(1, 0.1*inch))
-                    
-                    if connections:
-                        conn_text = ""
-                        for i, conn in enumerate(connections[:10], 1):
-                            conn_text += f"{i}. {conn}<br/>"
-                        elements.append(Paragraph(f"<font face='Courier' size='8'>{conn_text}</font>", normal_style))
-                        elements.append(Spacer(1, 0.2*inch))
-                
-                # LÍNEAS DE COMANDO (cmdline)
-                if "cmdline" in analysis:
-                    cmdline_data = analysis['cmdline']
-                    cmdlines = cmdline_data.get('cmdlines', [])
-                    
-                    if cmdlines:
-                        elements.append(Paragraph("<b>Líneas de Comando de Procesos:</b>", normal_style))
-                        elements.append(Spacer(1, 0.1*inch))
-                        
-                        cmd_text = ""
-                        for i, cmd in enumerate(cmdlines[:8], 1):
-                            cmd_text += f"{i}. {cmd}<br/>"
-                        elements.append(Paragraph(f"<font face='Courier' size='7'>{cmd_text}</font>", normal_style))
-                        elements.append(Spacer(1, 0.2*inch))
-                
-                # INFORMACIÓN ADICIONAL
-                elements.append(Paragraph("<b>Módulos Volatility Ejecutados:</b>", normal_style))
-                modules_executed = []
-                for key in analysis.keys():
-                    if key in ['pslist', 'netscan', 'dlllist', 'cmdline', 'filescan']:
-                        modules_executed.append(f"• {key}")
-                if modules_executed:
-                    elements.append(Paragraph("<br/>".join(modules_executed), normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === 5.4 ANÁLISIS DE DISCO (TSK) ===
-            elements.append(Paragraph("5.4 Análisis de Disco (The Sleuth Kit)", styles['Heading3']))
-            elements.append(Spacer(1, 0.1*inch))
+                    output = item.result() if executor else _export_report(item)
+                    self.app.add_log(
+                        f"✓ Reporte {report_format.upper()} generado: {output} ({time.monotonic() - started:.1f} s)",
+                        "SUCCESS"
+                    )
+                except Exception as e:
+                    self.app.add_log(f"Error al exportar el reporte {report_format.upper()}: {str(e)}", "ERROR")
+                    success = False
+        finally:
+            if executor:
+                executor.shutdown()
+        return success
+            
+    @traced("Reporte PDF")
+    def generate_pdf_report(self, pdf_file):
+        """Generar reporte PDF profesional
+
+        Con pypdf, cada sección (y cada parte de un apéndice largo) se renderiza como PDF propio,
+        en paralelo y solo si cambiaron sus entradas; luego se unen con índice, numeración y marcadores.
+        Sin pypdf se renderiza todo en un único documento.
+        """
+        self.app.add_log("Generando reporte PDF...", "INFO")
+        
+        try:
+            started = time.monotonic()
             
-            # Verificar si se ejecutó TSK
-            tsk_output_folder = os.path.join(self.evidence_folder, "Hallazgos", "tsk_output")
-            if os.path.exists(tsk_output_folder):
-                tsk_files = os.listdir(tsk_output_folder)
-                if tsk_files:
-                    tsk_info = f"<b>Herramienta:</b> The Sleuth Kit (TSK)<br/>"
-                    tsk_info += f"<b>Archivos generados:</b> {len(tsk_files)} archivos de análisis<br/>"
-                    tsk_info += f"<b>Comandos ejecutados:</b><br/>"
-                    tsk_info += "• mmls - Información de particiones del disco<br/>"
-                    tsk_info += "• fls - Listado recursivo de archivos<br/><br/>"
-                    tsk_info += f"<b>Archivos de salida:</b><br/>"
-                    for tsk_file in tsk_files[:5]:
-                        tsk_info += f"• {tsk_file}<br/>"
-                    elements.append(Paragraph(tsk_info, normal_style))
-                else:
-                    elements.append(Paragraph("No se encontraron imágenes de disco para analizar con TSK", normal_style))
+            if merge_available():
+                pages = self.render_sections(pdf_file)
             else:
-                elements.append(Paragraph("TSK no fue ejecutado - No se encontraron imágenes de disco (.dd, .img, .E01)", normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === RECOMENDACIONES ===
-            elements.append(Paragraph("6. RECOMENDACIONES", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
-            
-            recommendations_text = """
-            1. Realizar análisis profundo con Autopsy para examinar archivos y artefactos adicionales<br/>
-            2. Revisar manualmente las conexiones de red sospechosas identificadas<br/>
-            3. Analizar los procesos maliciosos detectados en detalle<br/>
-            4. Verificar la integridad de los archivos del sistema<br/>
-            5. Documentar todos los hallazgos adicionales durante el análisis manual<br/>
-            """
-            elements.append(Paragraph(recommendations_text, normal_style))
-            
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # === NOTA SOBRE AUTOPSY ===
-            elements.append(Paragraph("7. ANÁLISIS POSTERIOR CON AUTOPSY", heading_style))
-            elements.append(Spacer(1, 0.2*inch))
+                self.app.add_log("pypdf no está instalado: el reporte se renderiza en un solo proceso", "WARNING")
+                pages = self.render_sequential(pdf_file)
             
-            autopsy_text = """
-            La evidencia recolectada ha sido preparada y está disponible para análisis 
-            manual detallado utilizando Autopsy. Esta herramienta permitirá realizar:
-            <br/><br/>
-            • Análisis de línea de tiempo<br/>
-            • Recuperación de archivos eliminados<br/>
-            • Análisis de registros del sistema<br/>
-            • Búsqueda de palabras clave<br/>
-            • Visualización de artefactos web<br/>
-            • Y muchas otras capacidades de análisis forense<br/>
-            """
-            elements.append(Paragraph(autopsy_text, normal_style))
-            
-            # Construir PDF
-            doc.build(elements)
-            
-            self.app.add_log(f"✓ Reporte PDF generado: {pdf_file}", "SUCCESS")
+            self.app.add_log(
+                f"✓ Reporte PDF generado: {pdf_file} ({pages} páginas, {len(self.appendices)} apéndices, "
+                f"{time.monotonic() - started:.1f} s)",
+                "SUCCESS"
+            )
             return True
             
         except Exception as e:
             self.app.add_log(f"Error al generar reporte PDF: {str(e)}", "ERROR")
             return False
             
+    def new_document(self, pdf_file):
+        """Documento con el formato de página del reporte"""
+        return SimpleDocTemplate(
+            pdf_file,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=36,
+            pageCompression=1
+        )
+        
+    def report_jobs(self, split_appendices=True):
+        """Trabajos de renderizado en orden: (sección, parte, título para el índice)"""
+        jobs = [(key, None, title) for key, title, _ in REPORT_SECTIONS]
+        for appendix in self.appendices.values():
+            if not split_appendices:
+                jobs.append((APPENDIX_PREFIX + appendix.key, None, f"{appendix.label}: {appendix.title}"))
+                continue
+            for part in range(appendix.part_count()):
+                jobs.append((APPENDIX_PREFIX + appendix.key, part, None if part else f"{appendix.label}: {appendix.title}"))
+        return jobs
+        
+    def section_flowables(self, key, part, styles):
+        """Flowables de una sección o de una parte de un apéndice"""
+        if key.startswith(APPENDIX_PREFIX):
+            appendix = self.appendices[key[len(APPENDIX_PREFIX):]]
+            return appendix_flowables([appendix], styles['CustomHeading'], styles['CustomNormal'], part=part)
+        model = ReportModel(self.evidence_folder, self.report_data, self.appendices)
+        return self.block_flowables(model.section(key), styles)
+        
+    def block_flowables(self, blocks, styles):
+        """Convertir los bloques del modelo en flowables de ReportLab"""
+        elements = []
+        for block in blocks:
+            kind = block["type"]
+            if kind == "heading":
+                elements.append(Paragraph(block["text"], styles[HEADING_STYLES[block["level"]]]))
+            elif kind == "paragraph":
+                elements.append(Paragraph(block["text"], styles[PARAGRAPH_STYLES[block["style"]]]))
+            elif kind == "spacer":
+                elements.append(Spacer(1, block["height"]*inch))
+            elif kind == "table":
+                pdf_table = Table(block["rows"], colWidths=[width*inch for width in block["widths"]])
+                pdf_table.setStyle(TableStyle(
+                    TABLE_STYLES[block["style"]] + [('FONTSIZE', (0, 0), (-1, -1), block["font_size"])]
+                ))
+                elements.append(pdf_table)
+            elif kind == "entropy_strip":
+                elements.append(self.entropy_heat_strip(block["map"]))
+        return elements
+        
+    def renderer_digest(self):
+        """Digest del código que renderiza las secciones: al actualizarlo se invalida la caché"""
+        return digest_inputs(*(file_digest(path) for path in (
+            os.path.abspath(__file__), report_model.__file__, report_appendix.__file__, tracing.__file__
+        )))
+        
+    def job_digest(self, key, part, renderer):
+        """Digest de las entradas de una sección; si no cambia se reutiliza el PDF guardado"""
+        inventory = self.report_data["inventory"]
+        inputs = [renderer, key, part]
+        if key in UNCACHED_SECTIONS:
+            inputs.append(datetime.now().isoformat())
+        elif key.startswith(APPENDIX_PREFIX):
+            appendix = self.appendices[key[len(APPENDIX_PREFIX):]]
+            inputs += [appendix.letter, appendix.total, appendix.part_count(),
+                       [inventory.fingerprint(source) for source in appendix.sources]]
+        else:
+            analysis = self.report_data.get("analysis", {})
+            analysis_keys, folders = SECTION_INPUTS[key]
+            inputs += [
+                {name: analysis.get(name) for name in analysis_keys},
+                [inventory.fingerprint(folder) for folder in folders],
+                # Las secciones citan los apéndices por letra
+                [(appendix.key, appendix.letter) for appendix in self.appendices.values()],
+                file_digest(note_path(self.evidence_folder, key)),
+            ]
+        return digest_inputs(*inputs)
+        
+    def render_section(self, key, part, pdf_file):
+        """Renderizar una sección como PDF independiente; devuelve su cantidad de páginas"""
+        doc = self.new_document(pdf_file)
+        doc.build(FlowableStream([], self.section_flowables(key, part, report_styles())))
+        return doc.page
+        
+    def render_sequential(self, pdf_file):
+        """Renderizar todas las secciones en un único documento, en este proceso"""
+        styles = report_styles()
+        story = chain.from_iterable(
+            chain([PageBreakIfNotEmpty()], self.section_flowables(key, part, styles))
+            for key, part, _ in self.report_jobs(split_appendices=False)
+        )
+        doc = self.new_document(pdf_file)
+        doc.build(FlowableStream([], story), onLaterPages=draw_page_number)
+        return doc.page
+        
+    def render_sections(self, pdf_file, max_workers=None):
+        """Renderizar las secciones que cambiaron (en paralelo) y unirlas con índice y numeración"""
+        jobs = self.report_jobs()
+        cache = SectionCache(os.path.join(os.path.dirname(pdf_file), CACHE_FOLDER))
+        renderer = self.renderer_digest()
+        job_ids = [f"{key}#{part or 0}" for key, part, _ in jobs]
+        digests = [self.job_digest(key, part, renderer) for key, part, _ in jobs]
+        pages = [cache.lookup(job_id, digest) for job_id, digest in zip(job_ids, digests)]
+        pending = [index for index, count in enumerate(pages) if count is None]
+        self.app.add_log(
+            f"Secciones del reporte: {len(pending)} de {len(jobs)} a renderizar, {len(jobs) - len(pending)} sin cambios",
+            "INFO"
+        )
+        
+        tasks = [(self.evidence_folder, self.report_data, jobs[index][0], jobs[index][1], cache.path(digests[index]))
+                 for index in pending]
+        max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+        if max_workers > 1:
+            next_report = 25
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(_render_section, task): index for index, task in zip(pending, tasks)}
+                for done, future in enumerate(as_completed(futures), 1):
+                    index = futures[future]
+                    pages[index] = future.result()
+                    cache.store(job_ids[index], digests[index], pages[index])
+                    percent = done * 100 // len(tasks)
+                    if percent >= next_report and done < len(tasks):
+                        self.app.add_log(f"  Secciones renderizadas: {done} de {len(tasks)}", "INFO")
+                        next_report = (percent // 25 + 1) * 25
+        else:
+            for index, (_, _, key, part, section_file) in zip(pending, tasks):
+                pages[index] = self.render_section(key, part, section_file)
+                cache.store(job_ids[index], digests[index], pages[index])
+        cache.save(set(job_ids))
+        
+        # La portada va primero y el índice a continuación
+        toc_file = os.path.join(cache.folder, "indice.pdf")
+        entries = self.render_toc(toc_file, jobs, pages)
+        paths = [cache.path(digest) for digest in digests]
+        return merge_sections([paths[0], toc_file] + paths[1:], pdf_file, outline=entries, unnumbered=pages[0])
+            
+    def render_toc(self, toc_file, jobs, pages):
+        """Renderizar el índice con la página inicial de cada sección; devuelve (título, página)
+
+        Las páginas dependen del largo del propio índice: se repite hasta que no cambia.
+        """
+        toc_pages = 1
+        while True:
+            entries = []
+            next_page = pages[0] + toc_pages + 1
+            for (_, _, title), count in zip(jobs[1:], pages[1:]):
+                if title:
+                    entries.append((title, next_page))
+                next_page += count
+            doc = self.new_document(toc_file)
+            doc.build(self.build_toc_section(report_styles(), entries))
+            if doc.page == toc_pages:
+                return entries
+            toc_pages = doc.page
+            
+    def build_toc_section(self, styles, entries):
+        """Índice de secciones y apéndices con su página"""
+        elements = []
+        elements.append(Paragraph("ÍNDICE", styles['CustomHeading']))
+        elements.append(Spacer(1, 0.2*inch))
+        
+        toc_table = Table([[title, str(page)] for title, page in entries], colWidths=[5.7*inch, 0.8*inch])
+        toc_table.setStyle(TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
+        ]))
+        elements.append(toc_table)
+        return elements
+        
+    def entropy_heat_strip(self, map_path, width=6.5*inch, height=0.35*inch):
+        """Franja de calor con la entropía a lo largo de la evidencia"""
+        strip = heat_strip(map_path)
+        drawing = Drawing(width, height + 12)
+        cell_width = width / max(1, len(strip))
+        for index, (mean_entropy, zero_ratio) in enumerate(strip):
+            color = colors.Color(*heat_color(mean_entropy, zero_ratio))
+            drawing.add(Rect(index * cell_width, 12, cell_width + 0.2, height, fillColor=color, strokeColor=None))
+        drawing.add(String(0, 0, "0", fontSize=7))
+        drawing.add(String(width, 0, "fin", fontSize=7, textAnchor="end"))
+        return drawing
+
+    @traced("Preparar evidencia para Autopsy")
     def prepare_for_autopsy(self):
         """Preparar evidencia para análisis con Autopsy"""
         self.app.add_log("Preparando evidencia para análisis con Autopsy...", "INFO")
@@ -539,6 +503,21 @@ class ReportingPhase:
                 f.write("   - Archivos .dd o .img (imágenes de disco, si existen)\n")
                 f.write("5. Ejecutar los módulos de análisis de Autopsy\n")
                 f.write("6. Revisar los resultados en la interfaz de Autopsy\n\n")
+                
+                # Fuentes de datos según el inventario, con los hashes registrados en la adquisición
+                inventory = self.report_data.get("inventory")
+                sources = []
+                if inventory:
+                    for folder in ("dumps", "disk_images"):
+                        sources += [f"{folder}/{name}" for name in sorted(inventory.files(folder))
+                                    if name.lower().endswith(AUTOPSY_SOURCE_EXTENSIONS)]
+                if sources:
+                    f.write("Fuentes de datos disponibles (Hallazgos):\n")
+                    for source in sources:
+                        f.write(f"   - {source} ({inventory.size(source) / (1024**3):.2f} GB)\n")
+                        for algorithm, value in inventory.digests(source).items():
+                            f.write(f"     {algorithm.upper()}: {value}\n")
+                    f.write("\n")
                 f.write("Ubicación de evidencia:\n")
                 f.write(f"{self.evidence_folder}\n\n")
                 f.write("NOTA: Este es un análisis manual y requiere interpretación experta.\n")
@@ -550,3 +529,28 @@ class ReportingPhase:
         except Exception as e:
             self.app.add_log(f"Error al preparar para Autopsy: {str(e)}", "WARNING")
             return True  # No es crítico
+
+
+class ConsoleLog:
+    """Registro por consola para regenerar el reporte desde la línea de comandos"""
+
+    def add_log(self, message, level="INFO"):
+        print(f"[{level}] {message}")
+
+
+def main():
+    """Regenerar el reporte de un caso: solo se renderizan las secciones cuyas entradas cambiaron"""
+    parser = argparse.ArgumentParser(description="Regenerar el reporte de ForensicFlow")
+    parser.add_argument("evidence_folder", help="Carpeta del caso (Analysis_<fecha>)")
+    parser.add_argument("--formats", default=",".join(REPORT_FORMATS),
+                        help=f"Formatos separados por coma ({', '.join(REPORT_FORMATS)}); p. ej. html,json para triaje")
+    args = parser.parse_args()
+
+    app = ConsoleLog()
+    app.report_formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    phase = ReportingPhase(app, args.evidence_folder)
+    sys.exit(0 if phase.execute() else 1)
+
+
+if __name__ == "__main__":
+    main()
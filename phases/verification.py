@@ -95,11 +95,11 @@ class VerificationPhase:
             reporte_folder = os.path.join(self.evidence_folder, "Reporte")
             hallazgos_folder = os.path.join(self.evidence_folder, "Hallazgos")
             
-            os.makedirs(reporte_folder, exist_ok=True)
+            os.makedirs(os.path.join(reporte_folder, "notas"), exist_ok=True)
             os.makedirs(hallazgos_folder, exist_ok=True)
             
             # Crear subdirectorios dentro de Hallazgos
-            subdirs = ["dumps", "volatility_output", "tsk_output", "hashes"]
+            subdirs = ["dumps", "volatility_output", "tsk_output", "hashes", "features", "carved", "timeline", "mft", "known_files", "entropy"]
             for subdir in subdirs:
                 os.makedirs(os.path.join(hallazgos_folder, subdir), exist_ok=True)
                 
@@ -25,6 +25,18 @@ try:
 except ImportError as e:
     print(f"✗ Error con Pillow: {e}")
 
+try:
+    import numpy
+    print("✓ NumPy instalado correctamente")
+except ImportError as e:
+    print(f"✗ Error con NumPy: {e}")
+
+try:
+    import psutil
+    print("✓ psutil instalado correctamente")
+except ImportError as e:
+    print(f"✗ Error con psutil: {e}")
+
 print("="*60)
 print("\nVerificando estructura del proyecto...")
 
@@ -49,6 +61,44 @@ for file in required_files:
         print(f"✗ {file} - NO ENCONTRADO")
         all_exist = False
 
+print("="*60)
+print("\nVerificando extracción de características...")
+
+try:
+    import tempfile
+    import shutil
+    from utils.feature_extractor import FeatureExtractor
+
+    class _App:
+        def add_log(self, message, level="INFO"):
+            pass
+
+    temp_folder = tempfile.mkdtemp()
+    try:
+        # Correo que cruza el límite entre dos bloques de 64 KB: debe aparecer una sola vez, completo
+        email = b"alice.longname@example-domain.com"
+        evidence = bytearray(3 * 65536)
+        evidence[65526:65526 + len(email)] = email
+        evidence_path = os.path.join(temp_folder, "evidence.raw")
+        with open(evidence_path, 'wb') as f:
+            f.write(evidence)
+
+        extractor = FeatureExtractor(_App(), os.path.join(temp_folder, "features"), max_workers=1,
+                                     chunk_size=65536)
+        extractor.scan_file(evidence_path)
+        with open(os.path.join(temp_folder, "features", "evidence.raw", "email.txt"), encoding='utf-8') as f:
+            found = [line.rstrip("\n") for line in f if not line.startswith("#")]
+        if found == [f"65526\t{email.decode()}"]:
+            print("✓ Características que cruzan el límite entre bloques")
+        else:
+            print(f"✗ Características en el límite entre bloques: {found}")
+            all_exist = False
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+except Exception as e:
+    print(f"✗ Error al verificar la extracción de características: {e}")
+    all_exist = False
+
 print("="*60)
 
 if all_exist:
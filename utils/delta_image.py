@@ -0,0 +1,364 @@
+"""
+Adquisición diferencial de disco
+Compara el origen con los hashes por segmento de una adquisición previa del mismo equipo
+y escribe solo los segmentos modificados en un archivo delta enlazado a la imagen base
+"""
+
+import io
+import os
+import json
+import socket
+import hashlib
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.evidence_reader import is_delta_image, open_evidence
+from utils.job_control import get_job_control
+
+
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+
+DELTA_FORMAT = "forensicflow-delta"
+DELTA_VERSION = 1
+
+# Sufijos de los archivos auxiliares
+MANIFEST_SUFFIX = ".segments.json"
+INDEX_SUFFIX = ".json"
+
+# Bloque de lectura al verificar una imagen delta
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class SegmentHasher:
+    """Hash SHA256 por segmento en paralelo y MD5/SHA256 del flujo completo en orden
+
+    hashlib libera el GIL con bloques grandes, por lo que los hilos aprovechan varios núcleos;
+    los hashes completos usan un hilo cada uno para respetar el orden de los datos.
+    """
+
+    def __init__(self, max_workers=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1))
+        self.md5_worker = ThreadPoolExecutor(max_workers=1)
+        self.sha256_worker = ThreadPoolExecutor(max_workers=1)
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+        self.window = self.pool._max_workers * 2
+
+    def submit(self, data):
+        """Encolar un segmento; devuelve los futuros (sha256 del segmento, md5 completo, sha256 completo)"""
+        return (
+            self.pool.submit(lambda: hashlib.sha256(data).hexdigest()),
+            self.md5_worker.submit(self.md5.update, data),
+            self.sha256_worker.submit(self.sha256.update, data),
+        )
+
+    def finish(self):
+        """Esperar a los hilos y devolver (md5, sha256) del flujo completo"""
+        self.md5_worker.shutdown(wait=True)
+        self.sha256_worker.shutdown(wait=True)
+        self.pool.shutdown(wait=True)
+        return self.md5.hexdigest(), self.sha256.hexdigest()
+
+    def abort(self):
+        """Liberar los hilos sin esperar resultados"""
+        for executor in (self.pool, self.md5_worker, self.sha256_worker):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_segments(stream, segment_size, hasher, governor=None, jobs=None):
+    """Leer un flujo por segmentos y devolver (índice, datos, sha256) en orden
+
+    La lectura se adelanta hasta `hasher.window` segmentos a los que ya se consumieron.
+    Con `jobs` (JobControl), la lectura se interrumpe si se detiene el análisis.
+    """
+    pending = deque()
+    index = 0
+    eof = False
+    while not eof or pending:
+        if not eof:
+            if jobs:
+                jobs.check()
+            data = stream.read(segment_size)
+            if data and governor:
+                governor.throttle(len(data))
+            if data:
+                pending.append((index, data, hasher.submit(data)))
+                index += 1
+            else:
+                eof = True
+        if pending and (eof or len(pending) >= hasher.window):
+            segment, data, (digest, md5_done, sha256_done) = pending.popleft()
+            # Esperar también a los hashes completos acota la memoria si van más lentos que la lectura
+            md5_done.result()
+            sha256_done.result()
+            yield segment, data, digest.result()
+
+
+def manifest_path(image_path):
+    """Ruta del manifiesto de segmentos de una imagen RAW"""
+    return image_path + MANIFEST_SUFFIX
+
+
+def build_segment_manifest(image_path, source=None, segment_size=DEFAULT_SEGMENT_SIZE, max_workers=None,
+                           governor=None, jobs=None):
+    """Calcular en una sola lectura los hashes por segmento y los hashes completos de una imagen
+
+    El manifiesto se guarda junto a la imagen para futuras adquisiciones diferenciales.
+    """
+    hasher = SegmentHasher(max_workers)
+    hashes = []
+    size = 0
+    try:
+        with open_evidence(image_path) as f:
+            for _, data, digest in hash_segments(f, segment_size, hasher, governor, jobs):
+                hashes.append(digest)
+                size += len(data)
+    except BaseException:
+        hasher.abort()
+        raise
+    md5, sha256 = hasher.finish()
+    return save_segment_manifest(image_path, source or image_path, size, segment_size, md5, sha256, hashes)
+
+
+def save_segment_manifest(image_path, source, size, segment_size, md5, sha256, hashes, parts=None):
+    """Guardar el manifiesto de segmentos de una imagen RAW ya hasheada
+
+    `parts` lista los archivos de una imagen dividida con sus hashes.
+    """
+    manifest = {
+        "source": source,
+        "host": socket.gethostname(),
+        "acquired": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "size": size,
+        "segment_size": segment_size,
+        "md5": md5,
+        "sha256": sha256,
+        "segment_hashes": hashes,
+    }
+    if parts:
+        manifest["parts"] = parts
+    with open(manifest_path(image_path), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def load_manifest(image_path):
+    """Manifiesto de segmentos de una imagen RAW o delta; None si no existe"""
+    path = image_path if is_delta_image(image_path) else manifest_path(image_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_base_image(evidence_folder, source, host=None):
+    """Buscar la adquisición más reciente del mismo disco y equipo en carpetas de análisis anteriores"""
+    host = host or socket.gethostname()
+    root = os.path.dirname(os.path.abspath(evidence_folder))
+    current = os.path.basename(os.path.abspath(evidence_folder))
+    if not os.path.isdir(root):
+        return None
+
+    for folder in sorted(os.listdir(root), reverse=True):
+        if folder == current:
+            continue
+        disk_folder = os.path.join(root, folder, "Hallazgos", "disk_images")
+        for name in ("disk_original.delta" + INDEX_SUFFIX, "disk_original.dd", "disk_original.dd.001"):
+            candidate = os.path.join(disk_folder, name)
+            if not os.path.exists(candidate):
+                continue
+            try:
+                manifest = load_manifest(candidate)
+            except (OSError, ValueError):
+                continue
+            if manifest and manifest.get("source") == source and manifest.get("host") == host:
+                return candidate
+    return None
+
+
+class DeltaImager:
+    def __init__(self, app, max_workers=None, governor=None):
+        self.app = app
+        self.max_workers = max_workers
+        self.governor = governor
+        self.jobs = get_job_control(app)
+
+    def acquire(self, source, base_image, delta_path):
+        """Leer el origen completo y guardar solo los segmentos distintos de la imagen base
+
+        Devuelve el índice de la imagen delta (con hashes por segmento y MD5/SHA256 del origen).
+        """
+        base = load_manifest(base_image)
+        segment_size = base["segment_size"]
+        base_hashes = base["segment_hashes"]
+        index_path = delta_path + INDEX_SUFFIX
+
+        hasher = SegmentHasher(self.max_workers)
+        hashes = []
+        changed = []
+        size = 0
+        delta_offset = 0
+        report_every = max(1, (base["size"] // segment_size) // 10)
+
+        try:
+            with open(source, 'rb') as src, open(delta_path, 'wb') as delta:
+                for segment, data, digest in hash_segments(src, segment_size, hasher, self.governor, self.jobs):
+                    hashes.append(digest)
+                    size += len(data)
+                    if segment >= len(base_hashes) or base_hashes[segment] != digest:
+                        delta.write(data)
+                        changed.append([segment, delta_offset])
+                        delta_offset += len(data)
+                    if segment % report_every == report_every - 1:
+                        self.app.add_log(
+                            f"  Progreso incremental: {size / (1024**3):.2f} GB leídos, {len(changed)} segmentos modificados",
+                            "INFO"
+                        )
+        except BaseException:
+            hasher.abort()
+            raise
+        md5, sha256 = hasher.finish()
+
+        index_folder = os.path.dirname(os.path.abspath(index_path))
+        index = {
+            "format": DELTA_FORMAT,
+            "version": DELTA_VERSION,
+            "source": source,
+            "host": socket.gethostname(),
+            "acquired": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "size": size,
+            "segment_size": segment_size,
+            "md5": md5,
+            "sha256": sha256,
+            "segment_hashes": hashes,
+            "base": os.path.abspath(base_image),
+            "base_relative": os.path.relpath(os.path.abspath(base_image), index_folder),
+            "base_sha256": base["sha256"],
+            "delta_file": os.path.basename(delta_path),
+            "changed_segments": changed,
+        }
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        return index
+
+
+class DeltaImageReader(io.RawIOBase):
+    """Imagen completa reconstruida bajo demanda a partir de la base y los segmentos del delta
+
+    La base puede ser a su vez una imagen dividida, EWF o delta (capturas incrementales encadenadas).
+    """
+
+    def __init__(self, index_path):
+        super().__init__()
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get("format") != DELTA_FORMAT:
+            raise ValueError(f"No es un índice de imagen delta: {index_path}")
+
+        folder = os.path.dirname(os.path.abspath(index_path))
+        base_path = os.path.normpath(os.path.join(folder, index["base_relative"]))
+        if not os.path.exists(base_path):
+            base_path = index["base"]
+
+        self.index_path = index_path
+        self.size = index["size"]
+        self.segment_size = index["segment_size"]
+        self.changed = {segment: offset for segment, offset in index["changed_segments"]}
+        self.delta = open(os.path.join(folder, index["delta_file"]), 'rb')
+        self.base = open_evidence(base_path)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Posición negativa")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        """Leer sin cruzar límites de segmento en cada tramo"""
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view) and self.position < self.size:
+            segment, within = divmod(self.position, self.segment_size)
+            length = min(len(view) - filled, self.segment_size - within, self.size - self.position)
+            if segment in self.changed:
+                stream = self.delta
+                stream.seek(self.changed[segment] + within)
+            else:
+                stream = self.base
+                stream.seek(self.position)
+            read = stream.readinto(view[filled:filled + length])
+            if not read:
+                break
+            filled += read
+            self.position += read
+        return filled
+
+    def read_at(self, offset, length):
+        """Leer `length` bytes desde `offset` (menos al final de la imagen)"""
+        buffer = bytearray(max(0, min(length, self.size - offset)))
+        self.seek(offset)
+        filled = self.readinto(buffer)
+        del buffer[filled:]
+        return buffer
+
+    def close(self):
+        if not self.closed:
+            self.delta.close()
+            self.base.close()
+        super().close()
+
+
+class DeltaImageView:
+    """Acceso por índice y rebanada a una imagen delta (para escáneres que recorren la imagen completa)"""
+
+    def __init__(self, image):
+        self.image = image
+
+    def __len__(self):
+        return self.image.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.image.size)
+            if step != 1:
+                raise ValueError("DeltaImageView solo admite rebanadas contiguas")
+            return bytes(self.image.read_at(start, max(0, stop - start)))
+        if key < 0:
+            key += self.image.size
+        if not 0 <= key < self.image.size:
+            raise IndexError("Posición fuera de la imagen")
+        return self.image.read_at(key, 1)[0]
+
+
+def hash_image(image, block_size=HASH_BLOCK_SIZE, governor=None, jobs=None):
+    """MD5 y SHA256 de una imagen (RAW, dividida o delta) leída en streaming, sin escribir nada"""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    buffer = bytearray(block_size)
+    with open_evidence(image) as src, memoryview(buffer) as view:
+        while True:
+            if jobs:
+                jobs.check()
+            count = src.readinto(buffer)
+            if not count:
+                break
+            if governor:
+                governor.throttle(count)
+            md5.update(view[:count])
+            sha256.update(view[:count])
+    return md5.hexdigest(), sha256.hexdigest()
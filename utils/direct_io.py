@@ -0,0 +1,445 @@
+"""
+Lectura directa (sin caché) para la adquisición de discos
+Lecturas alineadas al sector que no pasan por la caché del sistema, un anillo de búferes
+preasignados y hilos de lectura, escritura y hash conectados por colas, con escritura simultánea
+en varios destinos y verificación por relectura
+"""
+
+import io
+import os
+import mmap
+import time
+import queue
+import hashlib
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.delta_image import DEFAULT_SEGMENT_SIZE
+from utils.evidence_reader import split_part_path, split_parts
+from utils.job_control import get_job_control
+
+
+# Alineación de offsets, tamaños y direcciones de memoria (cubre sectores de 512 y 4K)
+ALIGNMENT = 4096
+
+CANDIDATE_BLOCK_SIZES = (256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Bytes leídos por cada tamaño candidato durante la calibración
+BENCHMARK_BYTES = 32 * 1024 * 1024
+
+# Un tamaño más pequeño se prefiere si rinde al menos este porcentaje del mejor
+BENCHMARK_TOLERANCE = 0.95
+
+DEFAULT_BUFFERS = 8
+
+# Cada cuántos bytes escritos se sincroniza el destino y se libera su caché (Linux)
+DROP_CACHE_BYTES = 256 * 1024 * 1024
+
+PROGRESS_INTERVAL = 30
+
+
+def open_direct(path):
+    """Abrir un archivo o dispositivo para lectura sin caché
+
+    Devuelve (archivo, directo). Si el sistema de archivos no admite lectura directa
+    se abre de forma normal y `directo` es False.
+    """
+    if os.name == "nt":
+        import ctypes
+        import msvcrt
+        from ctypes import wintypes
+
+        GENERIC_READ = 0x80000000
+        FILE_SHARE_READ_WRITE = 0x00000003
+        OPEN_EXISTING = 3
+        FILE_FLAG_NO_BUFFERING = 0x20000000
+        FILE_FLAG_SEQUENTIAL_SCAN = 0x08000000
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        handle = kernel32.CreateFileW(path, GENERIC_READ, FILE_SHARE_READ_WRITE, None, OPEN_EXISTING,
+                                      FILE_FLAG_NO_BUFFERING | FILE_FLAG_SEQUENTIAL_SCAN, None)
+        if handle == wintypes.HANDLE(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+        fd = msvcrt.open_osfhandle(handle, os.O_RDONLY | os.O_BINARY)
+        return io.FileIO(fd, 'rb', closefd=True), True
+
+    direct_flag = getattr(os, "O_DIRECT", 0)
+    if direct_flag:
+        try:
+            return io.FileIO(os.open(path, os.O_RDONLY | direct_flag), 'rb', closefd=True), True
+        except OSError:
+            pass
+
+    raw = io.FileIO(path, 'rb')
+    try:
+        import fcntl
+        if hasattr(fcntl, "F_NOCACHE"):
+            # macOS: sin O_DIRECT, pero se puede desactivar la caché del descriptor
+            fcntl.fcntl(raw.fileno(), fcntl.F_NOCACHE, 1)
+            return raw, True
+    except (ImportError, OSError):
+        pass
+    return raw, False
+
+
+def aligned_buffer(size):
+    """Búfer anónimo alineado a página (requisito de la lectura directa)"""
+    return mmap.mmap(-1, size)
+
+
+def read_full(raw, buffer):
+    """Llenar el búfer salvo al final del origen; devuelve los bytes leídos"""
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(view):
+        count = raw.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+        if filled % ALIGNMENT:
+            # Lectura corta no alineada: solo ocurre al final del origen
+            break
+    view.release()
+    return filled
+
+
+def benchmark_block_size(path, candidates=CANDIDATE_BLOCK_SIZES, sample_bytes=BENCHMARK_BYTES):
+    """Medir la velocidad de lectura directa con cada tamaño de bloque
+
+    Devuelve (tamaño elegido, {tamaño: MB/s}); se elige el bloque más pequeño cercano al mejor.
+    """
+    results = {}
+    raw, _ = open_direct(path)
+    try:
+        for block_size in candidates:
+            buffer = aligned_buffer(block_size)
+            raw.seek(0)
+            started = time.perf_counter()
+            total = 0
+            while total < sample_bytes:
+                count = read_full(raw, buffer)
+                if not count:
+                    break
+                total += count
+            elapsed = time.perf_counter() - started
+            buffer.close()
+            if total:
+                results[block_size] = total / (1024**2) / max(elapsed, 1e-6)
+    finally:
+        raw.close()
+
+    if not results:
+        return DEFAULT_BLOCK_SIZE, results
+    best = max(results.values())
+    chosen = min(size for size, speed in results.items() if speed >= best * BENCHMARK_TOLERANCE)
+    return chosen, results
+
+
+class SegmentDigests:
+    """Hash (SHA256 por defecto) por segmento de tamaño fijo sobre búferes de cualquier longitud"""
+
+    def __init__(self, segment_size=DEFAULT_SEGMENT_SIZE, algorithm=hashlib.sha256):
+        self.segment_size = segment_size
+        self.algorithm = algorithm
+        self.hashes = []
+        self.current = algorithm()
+        self.filled = 0
+
+    def update(self, view):
+        position = 0
+        while position < len(view):
+            take = min(self.segment_size - self.filled, len(view) - position)
+            self.current.update(view[position:position + take])
+            self.filled += take
+            position += take
+            if self.filled == self.segment_size:
+                self.hashes.append(self.current.hexdigest())
+                self.current = self.algorithm()
+                self.filled = 0
+
+    def finish(self):
+        if self.filled:
+            self.hashes.append(self.current.hexdigest())
+            self.filled = 0
+        return self.hashes
+
+
+class DirectImager:
+    """Adquisición con lectura directa y un anillo de búferes compartido por varios hilos
+
+    El hilo lector llena búferes libres; el escritor y los hilos de hash los consumen en orden
+    y el búfer vuelve al anillo cuando todos terminaron con él.
+    """
+
+    def __init__(self, app, block_size=None, buffers=DEFAULT_BUFFERS, segment_size=DEFAULT_SEGMENT_SIZE,
+                 governor=None, split_size=None):
+        self.app = app
+        # Con split_size cada destino se escribe en segmentos base.001, base.002, ...
+        self.split_size = split_size
+        # En modo de bajo impacto no se calibra: la prueba lee el disco a máxima velocidad
+        self.block_size = block_size or (DEFAULT_BLOCK_SIZE if governor else None)
+        self.governor = governor
+        self.jobs = get_job_control(app)
+        self.buffers = buffers
+        self.segment_size = segment_size
+
+    def image(self, source, destination, copies=()):
+        """Copiar el origen al destino (y a las copias) calculando MD5, SHA256 y hashes por segmento
+        en la misma lectura
+
+        Cada destino tiene su propio hilo escritor; el origen se lee y se hashea una sola vez.
+        Si la imagen se divide, MD5 y SHA256 de cada segmento se calculan en hilos propios.
+        """
+        block_size = self.block_size
+        if not block_size:
+            block_size, results = benchmark_block_size(source)
+            speeds = ", ".join(f"{size // 1024} KB: {speed:.0f} MB/s" for size, speed in results.items())
+            self.app.add_log(f"Calibración de lectura directa: {speeds}", "INFO")
+        self.app.add_log(f"Tamaño de bloque: {block_size // 1024} KB, {self.buffers} búferes", "INFO")
+
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        segments = SegmentDigests(self.segment_size)
+        destinations = [destination, *copies]
+        part_digests = []
+
+        with ExitStack() as stack:
+            writers = []
+            for path in destinations:
+                writer = SplitDestination(path, self.split_size) if self.split_size else DestinationWriter(open(path, 'wb'))
+                stack.callback(writer.close)
+                writers.append(writer)
+            consumers = [writer.write for writer in writers] + [md5.update, sha256.update, segments.update]
+            if self.split_size:
+                part_digests = [SegmentDigests(self.split_size, hashlib.md5), SegmentDigests(self.split_size, hashlib.sha256)]
+                consumers += [digests.update for digests in part_digests]
+            raw, direct = open_direct(source)
+            if not direct:
+                self.app.add_log("Lectura directa no disponible para este origen; se usa lectura normal", "WARNING")
+            try:
+                size, elapsed = self._run_pipeline(raw, block_size, consumers)
+            finally:
+                raw.close()
+            for writer in writers:
+                writer.finish()
+
+        parts = []
+        if self.split_size:
+            part_md5, part_sha256 = (digests.finish() for digests in part_digests)
+            for number, (path, part_md5, part_sha256) in enumerate(zip(writers[0].parts, part_md5, part_sha256)):
+                parts.append({
+                    "file": os.path.basename(path),
+                    "size": min(self.split_size, size - number * self.split_size),
+                    "md5": part_md5,
+                    "sha256": part_sha256,
+                })
+            destinations = [writer.parts[0] for writer in writers]
+
+        return {
+            "size": size,
+            "md5": md5.hexdigest(),
+            "sha256": sha256.hexdigest(),
+            "segment_size": self.segment_size,
+            "segment_hashes": segments.finish(),
+            "block_size": block_size,
+            "direct_io": direct,
+            "destinations": destinations,
+            "split_size": self.split_size,
+            "parts": parts,
+            "elapsed": round(elapsed, 1),
+            "throughput_mb_s": round(size / (1024**2) / max(elapsed, 1e-6), 1),
+        }
+
+    def _run_pipeline(self, raw, block_size, consumers):
+        """Leer el origen en el anillo de búferes y repartir cada bloque a los consumidores"""
+        ring = [aligned_buffer(block_size) for _ in range(self.buffers)]
+        free = queue.Queue()
+        for index in range(self.buffers):
+            free.put(index)
+        pending = [0] * self.buffers
+        pending_lock = threading.Lock()
+        queues = [queue.Queue() for _ in consumers]
+        errors = []
+
+        def release(index):
+            with pending_lock:
+                pending[index] -= 1
+                if pending[index] == 0:
+                    free.put(index)
+
+        def consume(work, function):
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                index, length = item
+                if not errors:
+                    view = memoryview(ring[index])[:length]
+                    try:
+                        function(view)
+                    except Exception as e:
+                        errors.append(e)
+                    finally:
+                        view.release()
+                release(index)
+
+        threads = [threading.Thread(target=consume, args=(work, function), daemon=True)
+                   for work, function in zip(queues, consumers)]
+        for thread in threads:
+            thread.start()
+
+        started = time.monotonic()
+        last_report = started
+        total = 0
+        try:
+            while not errors:
+                self.jobs.check()
+                index = free.get()
+                count = read_full(raw, ring[index])
+                if not count:
+                    free.put(index)
+                    break
+                with pending_lock:
+                    pending[index] = len(queues)
+                for work in queues:
+                    work.put((index, count))
+                total += count
+                if self.governor:
+                    self.governor.throttle(count)
+
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    self.app.add_log(
+                        f"  Leído: {total / (1024**3):.2f} GB ({total / (1024**2) / (now - started):.0f} MB/s)",
+                        "INFO"
+                    )
+                if count < block_size:
+                    break
+        finally:
+            for work in queues:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+            for buffer in ring:
+                buffer.close()
+
+        if errors:
+            raise errors[0]
+        return total, time.monotonic() - started
+
+
+class DestinationWriter:
+    """Escritura de un destino liberando de la caché del sistema lo ya escrito (Linux)
+
+    Evita que la imagen desplace de memoria los datos de trabajo del equipo analizado y que la
+    verificación posterior lea de la caché en lugar del disco.
+    """
+
+    def __init__(self, dst):
+        self.dst = dst
+        self.drop_cache = hasattr(os, "posix_fadvise")
+        self.pending = 0
+        self.position = 0
+
+    def write(self, view):
+        self.dst.write(view)
+        if not self.drop_cache:
+            return
+        self.pending += len(view)
+        if self.pending >= DROP_CACHE_BYTES:
+            self._drop()
+
+    def _drop(self):
+        self.dst.flush()
+        os.fdatasync(self.dst.fileno())
+        os.posix_fadvise(self.dst.fileno(), self.position, self.pending, os.POSIX_FADV_DONTNEED)
+        self.position += self.pending
+        self.pending = 0
+
+    def finish(self):
+        self.dst.flush()
+        if self.drop_cache and self.pending:
+            self._drop()
+
+    def close(self):
+        self.dst.close()
+
+
+class SplitDestination:
+    """Destino escrito en segmentos de tamaño fijo (.001, .002, ...) para unidades FAT32/exFAT"""
+
+    def __init__(self, base, split_size):
+        self.base = base
+        self.split_size = split_size
+        self.parts = []
+        self.writer = None
+        self.filled = 0
+
+    def write(self, view):
+        position = 0
+        while position < len(view):
+            if self.writer is None or self.filled == self.split_size:
+                self._next_part()
+            take = min(self.split_size - self.filled, len(view) - position)
+            self.writer.write(view[position:position + take])
+            self.filled += take
+            position += take
+
+    def _next_part(self):
+        if self.writer:
+            self.writer.finish()
+            self.writer.close()
+        path = split_part_path(self.base, len(self.parts) + 1)
+        self.writer = DestinationWriter(open(path, 'wb'))
+        self.parts.append(path)
+        self.filled = 0
+
+    def finish(self):
+        if self.writer is None:
+            # Origen vacío: un único segmento vacío
+            self._next_part()
+        self.writer.finish()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def hash_file_direct(path, block_size=DEFAULT_BLOCK_SIZE, governor=None, jobs=None):
+    """MD5 y SHA256 de un archivo (o de todos los segmentos de una imagen dividida) leído sin caché"""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    buffer = aligned_buffer(block_size)
+    try:
+        for part in split_parts(path):
+            raw, _ = open_direct(part)
+            try:
+                while True:
+                    if jobs:
+                        jobs.check()
+                    count = read_full(raw, buffer)
+                    if not count:
+                        break
+                    with memoryview(buffer) as view:
+                        md5.update(view[:count])
+                        sha256.update(view[:count])
+                    if governor:
+                        governor.throttle(count)
+                    if count < block_size:
+                        break
+            finally:
+                raw.close()
+    finally:
+        buffer.close()
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+def verify_destinations(paths, block_size=DEFAULT_BLOCK_SIZE, governor=None, jobs=None):
+    """Releer todos los destinos a la vez (un hilo por destino); devuelve {ruta: (md5, sha256)}"""
+    with ThreadPoolExecutor(max_workers=max(1, len(paths))) as executor:
+        futures = {path: executor.submit(hash_file_direct, path, block_size, governor, jobs) for path in paths}
+        return {path: future.result() for path, future in futures.items()}
@@ -0,0 +1,280 @@
+"""
+Mapa de entropía y de bloques en cero
+Entropía de Shannon por bloque, proporción de bloques vacíos e histograma de bytes
+para ubicar contenedores cifrados, regiones borradas y código empaquetado
+"""
+
+import os
+import csv
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from utils.evidence_reader import DEFAULT_CHUNK_SIZE, get_evidence_size, iter_chunk_ranges, map_region
+from utils.job_control import get_job_control
+
+
+# Bloque fino sobre el que se calcula la entropía
+BLOCK_SIZE = 4096
+
+# Cada entrada del mapa resume los bloques finos de 1 MiB
+MAP_BLOCK_SIZE = 1024 * 1024
+
+# Bloques finos procesados por cada llamada a bincount (acota la memoria temporal)
+BINCOUNT_BATCH = 1024
+
+# Entropía (bits/byte) a partir de la cual un bloque se considera cifrado o comprimido
+HIGH_ENTROPY = 7.5
+
+# Proporción de bloques de una entrada del mapa para clasificarla como región
+REGION_RATIO = 0.9
+
+MAP_DTYPE = np.dtype([
+    ("entropy_mean", "<f2"),
+    ("entropy_max", "<f2"),
+    ("zero_blocks", "<u2"),
+    ("high_blocks", "<u2"),
+])
+
+# c * log2(c) para cada conteo posible de un byte dentro de un bloque
+_CLOG2C = np.zeros(BLOCK_SIZE + 1)
+_CLOG2C[1:] = np.arange(1, BLOCK_SIZE + 1) * np.log2(np.arange(1, BLOCK_SIZE + 1))
+
+
+def block_entropy(data, block_size=BLOCK_SIZE):
+    """Entropía por bloque y conteo de bytes de un arreglo uint8 múltiplo de block_size
+
+    Devuelve (entropía por bloque, bloques en cero, histograma de bytes).
+    """
+    blocks = len(data) // block_size
+    entropy = np.empty(blocks)
+    zero = np.empty(blocks, dtype=bool)
+    histogram = np.zeros(256, dtype=np.int64)
+    table = _CLOG2C if block_size == BLOCK_SIZE else np.concatenate(
+        ([0.0], np.arange(1, block_size + 1) * np.log2(np.arange(1, block_size + 1)))
+    )
+
+    for first in range(0, blocks, BINCOUNT_BATCH):
+        count = min(BINCOUNT_BATCH, blocks - first)
+        batch = data[first * block_size:(first + count) * block_size].reshape(count, block_size)
+        # Un solo bincount para todos los bloques: cada bloque usa su propio rango de 256 valores
+        keys = batch + (np.arange(count, dtype=np.uint32) << 8)[:, None]
+        counts = np.bincount(keys.ravel(), minlength=count * 256).reshape(count, 256)
+        entropy[first:first + count] = np.log2(block_size) - table[counts].sum(axis=1) / block_size
+        zero[first:first + count] = counts[:, 0] == block_size
+        histogram += counts.sum(axis=0)
+
+    np.maximum(entropy, 0.0, out=entropy)
+    return entropy, zero, histogram
+
+
+def _map_chunk(task):
+    """Calcular las entradas del mapa de un bloque de la evidencia (proceso de trabajo)"""
+    path, offset, length = task
+    per_entry = MAP_BLOCK_SIZE // BLOCK_SIZE
+
+    with map_region(path, offset, length) as (buffer, start):
+        data = np.frombuffer(buffer, dtype=np.uint8, count=length, offset=start)
+        full = length - length % BLOCK_SIZE
+        entropy, zero, histogram = block_entropy(data[:full])
+        tail = data[full:]
+        if len(tail):
+            # Último bloque incompleto de la evidencia
+            tail_entropy, tail_zero, tail_histogram = block_entropy(tail, len(tail))
+            entropy = np.append(entropy, tail_entropy)
+            zero = np.append(zero, tail_zero)
+            histogram += tail_histogram
+        del data, tail
+
+    entries = -(-len(entropy) // per_entry)
+    padded = entries * per_entry - len(entropy)
+    valid = np.ones(len(entropy), dtype=bool)
+    if padded:
+        entropy = np.append(entropy, np.zeros(padded))
+        zero = np.append(zero, np.zeros(padded, dtype=bool))
+        valid = np.append(valid, np.zeros(padded, dtype=bool))
+
+    entropy = entropy.reshape(entries, per_entry)
+    entry_map = np.empty(entries, dtype=MAP_DTYPE)
+    entry_map["entropy_mean"] = entropy.sum(axis=1) / valid.reshape(entries, per_entry).sum(axis=1)
+    entry_map["entropy_max"] = entropy.max(axis=1)
+    entry_map["zero_blocks"] = zero.reshape(entries, per_entry).sum(axis=1)
+    entry_map["high_blocks"] = (entropy >= HIGH_ENTROPY).sum(axis=1)
+    blocks = valid.reshape(entries, per_entry).sum(axis=1)
+
+    return offset // MAP_BLOCK_SIZE, entry_map, blocks, histogram
+
+
+def load_map(map_path):
+    """Abrir un mapa de entropía sin cargarlo completo en memoria"""
+    return np.load(map_path, mmap_mode="r")
+
+
+def heat_strip(map_path, cells=400):
+    """Reducir el mapa a `cells` celdas (entropía media, proporción en cero) para graficarlo"""
+    entry_map = load_map(map_path)
+    if not len(entry_map):
+        return []
+    per_entry = MAP_BLOCK_SIZE // BLOCK_SIZE
+    strip = []
+    for part in np.array_split(np.arange(len(entry_map)), min(cells, len(entry_map))):
+        window = entry_map[part[0]:part[-1] + 1]
+        strip.append((
+            float(window["entropy_mean"].astype(np.float64).mean()),
+            float(window["zero_blocks"].sum()) / (len(window) * per_entry),
+        ))
+    return strip
+
+
+def heat_color(mean_entropy, zero_ratio):
+    """Color RGB (0-1) de una celda de la franja: azul = baja entropía, rojo = alta, gris = en cero"""
+    if zero_ratio >= 0.5:
+        return 0.75, 0.75, 0.75
+    level = min(1.0, max(0.0, mean_entropy / 8.0))
+    return level, 0.2 + 0.6 * (1 - abs(2 * level - 1)), 1 - level
+
+
+class EntropyMapper:
+    def __init__(self, app, output_folder, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.app = app
+        self.output_folder = output_folder
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.jobs = get_job_control(app)
+        # Los bloques de trabajo deben contener entradas completas del mapa
+        self.chunk_size = max(MAP_BLOCK_SIZE, chunk_size - chunk_size % MAP_BLOCK_SIZE)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def map_file(self, path):
+        """Generar el mapa de entropía de un archivo de evidencia"""
+        source_name = os.path.basename(path)
+        source_folder = os.path.join(self.output_folder, source_name)
+        os.makedirs(source_folder, exist_ok=True)
+
+        total_size = get_evidence_size(path)
+        entries = -(-total_size // MAP_BLOCK_SIZE)
+        map_path = os.path.join(source_folder, "entropy_map.npy")
+        work_path = map_path + ".part"
+        entry_map = np.lib.format.open_memmap(work_path, mode="w+", dtype=MAP_DTYPE, shape=(entries,))
+        blocks = np.zeros(entries, dtype=np.int64)
+        histogram = np.zeros(256, dtype=np.int64)
+
+        tasks = [(path, offset, length) for offset, length, _ in iter_chunk_ranges(total_size, self.chunk_size)]
+
+        def merge(result):
+            first, partial_map, partial_blocks, partial_histogram = result
+            entry_map[first:first + len(partial_map)] = partial_map
+            blocks[first:first + len(partial_blocks)] = partial_blocks
+            histogram[:] += partial_histogram
+
+        try:
+            try:
+                self._run_parallel(tasks, merge)
+            except (OSError, RuntimeError) as e:
+                # Al detener el análisis se terminan los procesos del pool: no es un fallo del entorno
+                self.jobs.check()
+                # Entornos sin soporte de procesos: repetir de forma secuencial
+                self.app.add_log(f"Mapeo paralelo no disponible ({str(e)}), continuando en modo secuencial", "WARNING")
+                for task in tasks:
+                    self.jobs.check()
+                    merge(_map_chunk(task))
+            entry_map.flush()
+        finally:
+            del entry_map
+        os.replace(work_path, map_path)
+
+        entry_map = load_map(map_path)
+        total_blocks = int(blocks.sum())
+        zero_blocks = int(entry_map["zero_blocks"].sum(dtype=np.int64))
+        high_blocks = int(entry_map["high_blocks"].sum(dtype=np.int64))
+        mean_entropy = float((entry_map["entropy_mean"].astype(np.float64) * blocks).sum() / max(1, total_blocks))
+
+        regions = self._find_regions(entry_map, blocks, total_size)
+        regions_csv = os.path.join(source_folder, "regions.csv")
+        with open(regions_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["start_offset", "end_offset", "size_bytes", "class", "entropy_mean"])
+            for region in regions:
+                writer.writerow([region["start"], region["end"], region["end"] - region["start"],
+                                 region["class"], f"{region['entropy_mean']:.3f}"])
+
+        histogram_csv = os.path.join(source_folder, "byte_histogram.csv")
+        with open(histogram_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["byte", "count"])
+            for value, count in enumerate(histogram.tolist()):
+                writer.writerow([f"0x{value:02x}", count])
+
+        largest = sorted(
+            (region for region in regions if region["class"] == "high_entropy"),
+            key=lambda region: region["start"] - region["end"]
+        )
+        return {
+            "size_bytes": total_size,
+            "block_size": BLOCK_SIZE,
+            "map_block_size": MAP_BLOCK_SIZE,
+            "blocks": total_blocks,
+            "mean_entropy": round(mean_entropy, 3),
+            "zero_ratio": round(zero_blocks / max(1, total_blocks), 4),
+            "high_entropy_ratio": round(high_blocks / max(1, total_blocks), 4),
+            "zero_regions": sum(1 for region in regions if region["class"] == "zero"),
+            "high_entropy_regions": len(largest),
+            "largest_high_entropy": [
+                {key: region[key] for key in ("start", "end", "entropy_mean")} for region in largest[:10]
+            ],
+            "map": map_path,
+            "regions_csv": regions_csv,
+            "histogram_csv": histogram_csv,
+            "output_folder": source_folder,
+        }
+
+    def _run_parallel(self, tasks, merge):
+        """Repartir los bloques entre procesos con un número acotado en vuelo"""
+        in_flight = set()
+        done_count = 0
+        next_report = 10
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for task in tasks:
+                self.jobs.check()
+                in_flight.add(executor.submit(_map_chunk, task))
+                if len(in_flight) >= self.max_workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        merge(future.result())
+                    done_count += len(finished)
+                    percent = done_count * 100 // len(tasks)
+                    if percent >= next_report:
+                        self.app.add_log(f"  Progreso del mapa de entropía: {percent}%", "INFO")
+                        next_report = (percent // 10 + 1) * 10
+
+            for future in in_flight:
+                merge(future.result())
+
+    def _find_regions(self, entry_map, blocks, total_size):
+        """Agrupar entradas consecutivas en regiones vacías o de alta entropía"""
+        # 0 = normal, 1 = en cero, 2 = alta entropía
+        classes = np.zeros(len(entry_map), dtype=np.int8)
+        threshold = np.maximum(1, np.ceil(blocks * REGION_RATIO))
+        classes[entry_map["zero_blocks"] >= threshold] = 1
+        classes[entry_map["high_blocks"] >= threshold] = 2
+
+        if not len(classes):
+            return []
+        boundaries = np.flatnonzero(np.diff(classes)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(classes)]))
+        means = entry_map["entropy_mean"].astype(np.float64)
+        names = {1: "zero", 2: "high_entropy"}
+
+        regions = []
+        for first, last in zip(starts.tolist(), ends.tolist()):
+            kind = int(classes[first])
+            if not kind:
+                continue
+            regions.append({
+                "start": first * MAP_BLOCK_SIZE,
+                "end": min(last * MAP_BLOCK_SIZE, total_size),
+                "class": names[kind],
+                "entropy_mean": float(means[first:last].mean()),
+            })
+        return regions
@@ -0,0 +1,152 @@
+"""
+Inventario de la evidencia del caso
+Recorre Hallazgos una sola vez con os.scandir y guarda tamaño, fecha y hashes de cada archivo.
+Las secciones del reporte, la caché y las instrucciones para Autopsy consultan el inventario
+en lugar de volver a listar carpetas y leer archivos en el disco de evidencia
+"""
+
+import os
+import json
+from datetime import datetime
+
+
+MANIFEST_FILE = "manifest.json"
+
+# Hashes calculados en la adquisición: archivo en Hallazgos/hashes → carpeta de la evidencia que describen
+HASH_RECORDS = (
+    ("hashes.txt", "dumps"),
+    ("disk_hashes.txt", "disk_images"),
+    ("chain_of_custody.txt", "disk_images"),
+)
+
+
+class EvidenceInventory:
+    """Archivos de Hallazgos indexados por ruta relativa (separada con "/")
+
+    Los métodos aceptan rutas relativas a Hallazgos o absolutas dentro de Hallazgos.
+    """
+
+    def __init__(self, evidence_folder):
+        self.evidence_folder = evidence_folder
+        self.findings = os.path.join(evidence_folder, "Hallazgos")
+        self.entries = {}
+        self.folders = {}
+        self.texts = {}
+        self.scanned = None
+
+    def scan(self):
+        """Recorrer Hallazgos una vez: los stat vienen de os.scandir, sin llamadas adicionales"""
+        self.entries = {}
+        self.folders = {}
+        self.texts = {}
+        pending = [""]
+        while pending:
+            relative = pending.pop()
+            names = []
+            try:
+                with os.scandir(self.path(relative)) as iterator:
+                    for entry in iterator:
+                        names.append(entry.name)
+                        key = f"{relative}/{entry.name}" if relative else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(key)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            except OSError:
+                continue
+            self.folders[relative] = names
+        self.scanned = datetime.now().isoformat()
+        self.load_digests()
+        return self
+
+    def load_digests(self):
+        """Asociar a cada evidencia el MD5/SHA256 registrado en la adquisición"""
+        for record, folder in HASH_RECORDS:
+            name = None
+            for line in self.read_text(f"hashes/{record}").splitlines():
+                line = line.strip()
+                if line.startswith("Archivo:"):
+                    name = line[len("Archivo:"):].strip()
+                elif name and line.startswith(("MD5:", "SHA256:")):
+                    algorithm, _, value = line.partition(":")
+                    entry = self.entries.get(f"{folder}/{name}")
+                    if entry is not None and value.strip():
+                        entry[algorithm.lower()] = value.strip()
+
+    def key(self, path):
+        """Ruta relativa a Hallazgos con "/" como separador"""
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.findings)
+        path = path.replace(os.sep, "/")
+        return "" if path == "." else path.strip("/")
+
+    def path(self, relative):
+        """Ruta absoluta de un archivo o carpeta del inventario"""
+        relative = self.key(relative)
+        return os.path.join(self.findings, *relative.split("/")) if relative else self.findings
+
+    def exists(self, path):
+        key = self.key(path)
+        return key in self.entries or key in self.folders
+
+    def is_dir(self, path):
+        return self.key(path) in self.folders
+
+    def listdir(self, folder):
+        """Nombres en la carpeta (archivos y subcarpetas); lista vacía si no existe"""
+        return list(self.folders.get(self.key(folder), []))
+
+    def files(self, folder):
+        """Archivos de la carpeta (sin subcarpetas)"""
+        folder = self.key(folder)
+        return [name for name in self.folders.get(folder, []) if f"{folder}/{name}" in self.entries]
+
+    def size(self, path):
+        entry = self.entries.get(self.key(path))
+        return entry["size"] if entry else 0
+
+    def digests(self, path):
+        """Hashes registrados en la adquisición ({"md5": ..., "sha256": ...}), si los hay"""
+        entry = self.entries.get(self.key(path), {})
+        return {algorithm: entry[algorithm] for algorithm in ("md5", "sha256") if algorithm in entry}
+
+    def read_text(self, path):
+        """Contenido de un archivo de texto, leído una sola vez; cadena vacía si no existe"""
+        key = self.key(path)
+        if key not in self.texts:
+            if key not in self.entries:
+                return ""
+            with open(self.path(key), 'r', encoding='utf-8', errors='replace') as f:
+                self.texts[key] = f.read()
+        return self.texts[key]
+
+    def fingerprint(self, path):
+        """Nombre, tamaño y fecha de un archivo o de todo el contenido de una carpeta (para la caché del reporte)"""
+        key = self.key(path)
+        if key in self.entries:
+            entry = self.entries[key]
+            return [key.rsplit("/", 1)[-1], entry["size"], entry["mtime_ns"]]
+        if key not in self.folders:
+            return None
+        prefix = f"{key}/" if key else ""
+        return [
+            [name[len(prefix):], entry["size"], entry["mtime_ns"]]
+            for name, entry in sorted(self.entries.items()) if name.startswith(prefix)
+        ]
+
+    def manifest(self):
+        """Inventario serializable: archivos con tamaño, fecha y hashes"""
+        return {
+            "evidence_folder": self.evidence_folder,
+            "scanned": self.scanned,
+            "files": dict(sorted(self.entries.items())),
+        }
+
+    def save(self, path=None):
+        """Guardar el inventario en Reporte/manifest.json"""
+        path = path or os.path.join(self.evidence_folder, "Reporte", MANIFEST_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest(), f, indent=1, ensure_ascii=False)
+        return path
@@ -0,0 +1,359 @@
+"""
+Lectura de evidencia por regiones
+Acceso mapeado en memoria (mmap) a volcados e imágenes de disco para los escáneres,
+incluidas las imágenes divididas en segmentos (.001, .002, ...), las imágenes EWF (E01)
+y las imágenes delta de la captura incremental vistas como un único archivo
+"""
+
+import io
+import os
+import json
+import mmap
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from utils.ewf_reader import EWFImage, EWFView, is_ewf
+
+
+# Tamaño por defecto de cada bloque de trabajo de los escáneres
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+# Regiones que cruzan segmentos (o de imágenes EWF) hasta este tamaño se copian a memoria
+# (admiten numpy y regex); las mayores se devuelven como una vista que lee bajo demanda
+SPLIT_COPY_LIMIT = 256 * 1024 * 1024
+
+# Índice de una imagen delta: la imagen se lee de la adquisición base y de los segmentos modificados
+DELTA_INDEX_SUFFIX = ".delta.json"
+
+# IOCTL_DISK_GET_LENGTH_INFO (Windows)
+_IOCTL_DISK_GET_LENGTH_INFO = 0x7405C
+
+
+def split_part_path(base, number):
+    """Ruta del segmento `number` (1, 2, ...) de una imagen dividida"""
+    return f"{base}.{number:03d}"
+
+
+def split_base(path):
+    """Nombre de la imagen sin el sufijo del primer segmento (.001); las demás rutas no cambian"""
+    return path[:-4] if path.endswith(".001") else path
+
+
+def split_parts(path):
+    """Segmentos de una imagen dividida a partir del primero (.001); [path] si no está dividida"""
+    if not path.endswith(".001"):
+        return [path]
+    base = split_base(path)
+    parts = []
+    while os.path.isfile(split_part_path(base, len(parts) + 1)):
+        parts.append(split_part_path(base, len(parts) + 1))
+    return parts or [path]
+
+
+def list_evidence_images(folder, extensions):
+    """Nombres de las imágenes de una carpeta con alguna de las extensiones
+
+    Una imagen dividida aparece una sola vez, por su primer segmento (disco.dd.001).
+    """
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(extensions) or (name.endswith(".001") and split_base(name).endswith(extensions)):
+            images.append(name)
+    return images
+
+
+def is_ewf_image(path):
+    """Indica si la ruta es el primer segmento de una imagen EWF (.E01)"""
+    return path.lower().endswith(".e01") and is_ewf(path)
+
+
+def is_delta_image(path):
+    """Indica si la ruta es el índice de una imagen delta (disk_original.delta.json)"""
+    return path.endswith(DELTA_INDEX_SUFFIX)
+
+
+def get_evidence_size(path):
+    """Obtener el tamaño en bytes de un archivo de evidencia o de un dispositivo de disco
+
+    En imágenes EWF es el tamaño del medio original, no el de los archivos comprimidos;
+    en imágenes delta, el del disco leído.
+    """
+    if is_delta_image(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["size"]
+    if is_ewf_image(path):
+        with EWFImage(path) as image:
+            return image.size
+    parts = split_parts(path)
+    if len(parts) > 1:
+        return sum(os.path.getsize(part) for part in parts)
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return get_device_size(path)
+
+
+def open_evidence(path):
+    """Abrir una evidencia como archivo binario de solo lectura (los segmentos como uno solo)"""
+    if is_delta_image(path):
+        # Importación diferida: delta_image abre sus imágenes base con este módulo
+        from utils.delta_image import DeltaImageReader
+        return DeltaImageReader(path)
+    if is_ewf_image(path):
+        return EWFImage(path)
+    parts = split_parts(path)
+    if len(parts) > 1:
+        return SplitImageReader(parts)
+    return open(path, 'rb')
+
+
+def get_device_size(path):
+    """Tamaño de un dispositivo de bloques (\\\\.\\PhysicalDriveN en Windows, /dev/... en Linux)"""
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        handle = kernel32.CreateFileW(path, 0, 3, None, 3, 0, None)  # FILE_SHARE_READ|WRITE, OPEN_EXISTING
+        if handle == wintypes.HANDLE(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            length = ctypes.c_longlong(0)
+            returned = wintypes.DWORD(0)
+            if not kernel32.DeviceIoControl(handle, _IOCTL_DISK_GET_LENGTH_INFO, None, 0,
+                                            ctypes.byref(length), ctypes.sizeof(length),
+                                            ctypes.byref(returned), None):
+                raise ctypes.WinError(ctypes.get_last_error())
+            return length.value
+        finally:
+            kernel32.CloseHandle(handle)
+
+    with open(path, 'rb') as f:
+        return f.seek(0, os.SEEK_END)
+
+
+def iter_chunk_ranges(total_size, chunk_size=DEFAULT_CHUNK_SIZE, overlap=0):
+    """Dividir la evidencia en bloques (offset, longitud, longitud_con_solape)
+
+    El solape permite detectar patrones que cruzan el límite entre bloques;
+    cada bloque solo reporta coincidencias que empiezan antes de offset + longitud.
+    """
+    offset = 0
+    while offset < total_size:
+        length = min(chunk_size, total_size - offset)
+        scan_length = min(length + overlap, total_size - offset)
+        yield offset, length, scan_length
+        offset += length
+
+
+@contextmanager
+def map_region(path, offset, length):
+    """Mapear una región de solo lectura del archivo
+
+    Devuelve (buffer, inicio) donde inicio es la posición de `offset` dentro
+    del buffer, ya que mmap exige offsets alineados a la granularidad del sistema.
+    En imágenes divididas, una región dentro de un segmento se mapea de ese segmento;
+    si cruza segmentos se copia a memoria o, si es muy grande, se devuelve una
+    SplitImageView que solo admite índices y rebanadas. Las imágenes EWF se descomprimen
+    de la misma forma: copia de la región o EWFView; las imágenes delta, copia o DeltaImageView.
+    """
+    if is_delta_image(path):
+        with _map_delta_region(path, offset, length) as region:
+            yield region
+        return
+    if is_ewf_image(path):
+        with _map_ewf_region(path, offset, length) as region:
+            yield region
+        return
+    parts = split_parts(path)
+    if len(parts) > 1:
+        with _map_split_region(parts, offset, length) as region:
+            yield region
+        return
+    with _map_file(path, offset, length) as region:
+        yield region
+
+
+@contextmanager
+def _map_file(path, offset, length):
+    granularity = mmap.ALLOCATIONGRANULARITY
+    aligned_offset = offset - (offset % granularity)
+    delta = offset - aligned_offset
+
+    with open(path, 'rb') as f:
+        if length <= 0:
+            yield b"", 0
+            return
+        mapped = mmap.mmap(f.fileno(), length + delta, access=mmap.ACCESS_READ, offset=aligned_offset)
+        try:
+            yield mapped, delta
+        finally:
+            mapped.close()
+
+
+@contextmanager
+def _map_split_region(parts, offset, length):
+    starts = _part_starts(parts)
+    index = bisect_right(starts, offset) - 1
+    part_end = starts[index + 1] if index + 1 < len(parts) else None
+    if part_end is None or offset + length <= part_end:
+        with _map_file(parts[index], offset - starts[index], length) as region:
+            yield region
+        return
+
+    if length <= SPLIT_COPY_LIMIT:
+        buffer = bytearray(length)
+        with SplitImageReader(parts) as reader:
+            reader.seek(offset)
+            filled = reader.readinto(buffer)
+        del buffer[filled:]
+        yield buffer, 0
+        return
+
+    view = SplitImageView(parts)
+    try:
+        yield view, offset
+    finally:
+        view.close()
+
+
+@contextmanager
+def _map_ewf_region(path, offset, length):
+    with EWFImage(path) as image:
+        if length <= SPLIT_COPY_LIMIT:
+            yield bytearray(image.read_at(offset, length)), 0
+        else:
+            yield EWFView(image), offset
+
+
+@contextmanager
+def _map_delta_region(path, offset, length):
+    from utils.delta_image import DeltaImageReader, DeltaImageView
+    with DeltaImageReader(path) as image:
+        if length <= SPLIT_COPY_LIMIT:
+            yield image.read_at(offset, length), 0
+        else:
+            yield DeltaImageView(image), offset
+
+
+def _part_starts(parts):
+    starts = [0]
+    for part in parts[:-1]:
+        starts.append(starts[-1] + os.path.getsize(part))
+    return starts
+
+
+class SplitImageReader(io.RawIOBase):
+    """Segmentos de una imagen dividida presentados como un único archivo con seek"""
+
+    def __init__(self, parts):
+        super().__init__()
+        self.parts = list(parts)
+        self.starts = _part_starts(self.parts)
+        self.size = self.starts[-1] + os.path.getsize(self.parts[-1])
+        self.handles = {}
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Posición negativa")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        """Leer sin cruzar límites de segmento en cada tramo"""
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view) and self.position < self.size:
+            index = bisect_right(self.starts, self.position) - 1
+            end = self.starts[index + 1] if index + 1 < len(self.starts) else self.size
+            length = min(len(view) - filled, end - self.position)
+            handle = self._handle(index)
+            handle.seek(self.position - self.starts[index])
+            read = handle.readinto(view[filled:filled + length])
+            if not read:
+                break
+            filled += read
+            self.position += read
+        return filled
+
+    def _handle(self, index):
+        if index not in self.handles:
+            self.handles[index] = open(self.parts[index], 'rb')
+        return self.handles[index]
+
+    def close(self):
+        if not self.closed:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles = {}
+        super().close()
+
+
+class SplitImageView:
+    """Acceso por índice y rebanada a una imagen dividida, mapeando cada segmento una vez"""
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.starts = _part_starts(self.parts)
+        self.size = self.starts[-1] + os.path.getsize(self.parts[-1])
+        self.maps = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step != 1:
+                raise ValueError("SplitImageView solo admite rebanadas contiguas")
+            return self._read(start, max(0, stop - start))
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("Posición fuera de la imagen")
+        index = bisect_right(self.starts, key) - 1
+        return self._map(index)[key - self.starts[index]]
+
+    def _read(self, offset, length):
+        chunks = []
+        while length > 0 and offset < self.size:
+            index = bisect_right(self.starts, offset) - 1
+            mapped = self._map(index)
+            within = offset - self.starts[index]
+            chunk = mapped[within:within + length]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+            length -= len(chunk)
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def _map(self, index):
+        if index not in self.maps:
+            with open(self.parts[index], 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    self.maps[index] = b""
+                else:
+                    self.maps[index] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.maps[index]
+
+    def close(self):
+        for mapped in self.maps.values():
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self.maps = {}
@@ -0,0 +1,385 @@
+"""
+Lectura de imágenes EWF (E01) sin bibliotecas externas
+Índice de secciones y tablas de chunks, caché LRU de chunks descomprimidos, acceso como
+archivo con seek y verificación del MD5 almacenado descomprimiendo en paralelo
+"""
+
+import io
+import os
+import zlib
+import struct
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+EWF_SIGNATURE = b"EVF\x09\x0d\x0a\xff\x00"
+FILE_HEADER_SIZE = 13
+
+# Descriptor de sección: tipo, offset de la siguiente, tamaño (con descriptor), relleno, adler32
+SECTION_DESCRIPTOR = struct.Struct("<16sQQ40sI")
+
+# Cabecera de tabla: entradas, relleno, offset base, relleno, adler32
+TABLE_HEADER = struct.Struct("<I4sQ4sI")
+
+COMPRESSED_FLAG = 0x80000000
+OFFSET_MASK = 0x7FFFFFFF
+
+# Tamaño de la sección de volumen en formato SMART (cantidad de sectores de 32 bits)
+SMART_VOLUME_SIZE = 94
+
+DEFAULT_CACHE_CHUNKS = 256
+TABLE_CACHE_SIZE = 64
+
+# Chunks en vuelo por hilo durante la verificación
+VERIFY_WINDOW = 16
+
+
+def is_ewf(path):
+    """Indica si el archivo empieza con la firma EWF (EVF)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(EWF_SIGNATURE)) == EWF_SIGNATURE
+    except OSError:
+        return False
+
+
+def segment_extension(number, first="E"):
+    """Extensión del segmento `number`: E01..E99, luego EAA..EZZ, FAA..."""
+    if number < 100:
+        return f"{first}{number:02d}"
+    index = number - 100
+    letter = chr(ord(first) + index // 676)
+    index %= 676
+    return f"{letter}{chr(ord('A') + index // 26)}{chr(ord('A') + index % 26)}"
+
+
+def ewf_segments(path):
+    """Segmentos de una imagen EWF a partir del primero (.E01)"""
+    base, extension = os.path.splitext(path)
+    first = extension[1:2] or "E"
+    lower = first.islower()
+    segments = []
+    while True:
+        name = segment_extension(len(segments) + 1, first.upper())
+        candidate = f"{base}.{name.lower() if lower else name}"
+        if not os.path.isfile(candidate):
+            break
+        segments.append(candidate)
+    return segments or [path]
+
+
+class EWFImage(io.RawIOBase):
+    """Imagen EWF presentada como el medio original: lectura con seek sobre chunks descomprimidos
+
+    Los chunks se leen bajo demanda; las tablas de chunks se cargan por sección y los
+    chunks descomprimidos se guardan en una caché LRU compartida por los hilos lectores.
+    """
+
+    def __init__(self, path, cache_chunks=DEFAULT_CACHE_CHUNKS):
+        super().__init__()
+        self.path = path
+        self.segments = ewf_segments(path)
+        self.handles = {}
+        self.io_lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.cache_chunks = cache_chunks
+        self.cache_lock = threading.Lock()
+        self.table_cache = OrderedDict()
+
+        self.chunk_size = 0
+        self.size = 0
+        self.chunk_count = 0
+        self.stored_md5 = None
+        self.stored_sha1 = None
+        self.header = {}
+        # Una tabla por sección "table": (primer chunk, entradas, segmento, offset de entradas, base, fin de datos)
+        self.tables = []
+        self.table_starts = []
+        self.position = 0
+
+        for number, segment in enumerate(self.segments):
+            self._index_segment(number, segment)
+        if not self.chunk_size:
+            raise ValueError(f"Imagen EWF sin sección de volumen: {os.path.basename(path)}")
+
+    # --- Índice de secciones ---
+
+    def _index_segment(self, number, segment):
+        f = self._handle(number)
+        with self.io_lock:
+            f.seek(0)
+            if f.read(FILE_HEADER_SIZE)[:len(EWF_SIGNATURE)] != EWF_SIGNATURE:
+                raise ValueError(f"No es un segmento EWF: {os.path.basename(segment)}")
+
+            offset = FILE_HEADER_SIZE
+            sectors_end = None
+            while True:
+                f.seek(offset)
+                raw = f.read(SECTION_DESCRIPTOR.size)
+                if len(raw) < SECTION_DESCRIPTOR.size:
+                    break
+                kind, next_offset, size, _, _ = SECTION_DESCRIPTOR.unpack(raw)
+                kind = kind.rstrip(b"\0").decode("ascii", "replace")
+                data_offset = offset + SECTION_DESCRIPTOR.size
+                data_size = size - SECTION_DESCRIPTOR.size
+
+                if kind in ("volume", "disk") and not self.chunk_size:
+                    self._read_volume(f.read(data_size), data_size)
+                elif kind == "sectors":
+                    sectors_end = offset + size
+                elif kind == "table":
+                    count, _, base, _, _ = TABLE_HEADER.unpack(f.read(TABLE_HEADER.size))
+                    # El último chunk de la tabla termina donde termina la sección sectors previa;
+                    # sin ella (EnCase 1-4) los chunks están dentro de la propia sección table
+                    end = sectors_end if sectors_end and sectors_end <= offset else offset + size
+                    self.tables.append((self.chunk_count, count, number, data_offset + TABLE_HEADER.size, base, end))
+                    self.table_starts.append(self.chunk_count)
+                    self.chunk_count += count
+                    sectors_end = None
+                elif kind == "hash":
+                    self.stored_md5 = f.read(16).hex()
+                elif kind == "digest":
+                    digest = f.read(36)
+                    self.stored_md5 = digest[:16].hex()
+                    self.stored_sha1 = digest[16:36].hex()
+                elif kind in ("header", "header2") and not self.header:
+                    self._read_header(f.read(data_size), kind)
+
+                if kind in ("next", "done") or next_offset <= offset:
+                    break
+                offset = next_offset
+
+    def _read_volume(self, data, data_size):
+        _, sectors_per_chunk, bytes_per_sector = struct.unpack_from("<III", data, 4)
+        if data_size == SMART_VOLUME_SIZE:
+            sector_count = struct.unpack_from("<I", data, 16)[0]
+        else:
+            sector_count = struct.unpack_from("<Q", data, 16)[0]
+        self.chunk_size = sectors_per_chunk * bytes_per_sector
+        self.size = sector_count * bytes_per_sector
+
+    def _read_header(self, data, kind):
+        """Datos del caso (examinador, número de caso, fecha) de la sección header"""
+        try:
+            text = zlib.decompress(data)
+            text = text.decode("utf-16" if kind == "header2" else "latin-1", "replace")
+        except (zlib.error, UnicodeDecodeError):
+            return
+        lines = [line.rstrip("\r") for line in text.split("\n")]
+        # Línea de nombres de campo y línea de valores separadas por tabulaciones
+        for index, line in enumerate(lines[:-1]):
+            names = line.split("\t")
+            values = lines[index + 1].split("\t")
+            if len(names) > 2 and len(names) == len(values) and "c" in names and "n" in names:
+                self.header = dict(zip(names, values))
+                return
+
+    # --- Acceso a chunks ---
+
+    def _handle(self, number):
+        if number not in self.handles:
+            self.handles[number] = open(self.segments[number], 'rb')
+        return self.handles[number]
+
+    def _table_entries(self, table_index):
+        with self.cache_lock:
+            if table_index in self.table_cache:
+                self.table_cache.move_to_end(table_index)
+                return self.table_cache[table_index]
+        _, count, number, entries_offset, _, _ = self.tables[table_index]
+        with self.io_lock:
+            f = self._handle(number)
+            f.seek(entries_offset)
+            entries = np.frombuffer(f.read(count * 4), dtype="<u4")
+        with self.cache_lock:
+            self.table_cache[table_index] = entries
+            if len(self.table_cache) > TABLE_CACHE_SIZE:
+                self.table_cache.popitem(last=False)
+        return entries
+
+    def _read_raw(self, chunk):
+        """Bytes almacenados del chunk; devuelve (datos, comprimido, longitud descomprimida)"""
+        table_index = bisect_right(self.table_starts, chunk) - 1
+        first, count, number, _, base, end = self.tables[table_index]
+        entries = self._table_entries(table_index)
+        within = chunk - first
+        entry = int(entries[within])
+        start = base + (entry & OFFSET_MASK)
+        compressed = bool(entry & COMPRESSED_FLAG)
+        length = min(self.chunk_size, self.size - chunk * self.chunk_size)
+
+        if compressed:
+            stop = base + (int(entries[within + 1]) & OFFSET_MASK) if within + 1 < count else end
+            stored = stop - start
+        else:
+            # Sin comprimir: datos seguidos de un adler32 que no forma parte del medio
+            stored = length
+        with self.io_lock:
+            f = self._handle(number)
+            f.seek(start)
+            data = f.read(stored)
+        return data, compressed, length
+
+    @staticmethod
+    def _decode(data, compressed, length):
+        if not compressed:
+            return data[:length]
+        # decompressobj ignora el relleno que algunas herramientas dejan tras el flujo zlib
+        return zlib.decompressobj().decompress(data, length)
+
+    def read_chunk(self, chunk):
+        """Chunk descomprimido (con caché LRU)"""
+        with self.cache_lock:
+            if chunk in self.cache:
+                self.cache.move_to_end(chunk)
+                return self.cache[chunk]
+        try:
+            data = self._decode(*self._read_raw(chunk))
+        except zlib.error as e:
+            raise OSError(f"Chunk EWF {chunk} corrupto: {str(e)}")
+        with self.cache_lock:
+            self.cache[chunk] = data
+            if len(self.cache) > self.cache_chunks:
+                self.cache.popitem(last=False)
+        return data
+
+    # --- Interfaz de archivo ---
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Posición negativa")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view) and self.position < self.size:
+            chunk, within = divmod(self.position, self.chunk_size)
+            data = self.read_chunk(chunk)
+            length = min(len(view) - filled, len(data) - within)
+            if length <= 0:
+                break
+            view[filled:filled + length] = data[within:within + length]
+            filled += length
+            self.position += length
+        return filled
+
+    def read_at(self, offset, length):
+        """Leer sin mover la posición (seguro entre hilos)"""
+        parts = []
+        end = min(offset + length, self.size)
+        while offset < end:
+            chunk, within = divmod(offset, self.chunk_size)
+            data = self.read_chunk(chunk)
+            piece = data[within:within + end - offset]
+            if not piece:
+                break
+            parts.append(piece)
+            offset += len(piece)
+        return parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def close(self):
+        if not self.closed:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles = {}
+            self.cache.clear()
+            self.table_cache.clear()
+        super().close()
+
+    # --- Verificación ---
+
+    def verify(self, max_workers=None, governor=None, jobs=None):
+        """Recalcular el MD5 (y el SHA1 si está almacenado) del medio
+
+        Los chunks se leen en orden y se descomprimen en un pool de hilos (zlib libera el GIL);
+        los hashes se actualizan en orden en el hilo actual. Con `jobs` (JobControl), la lectura
+        se interrumpe si se detiene el análisis.
+        """
+        workers = max_workers or min(8, os.cpu_count() or 1)
+        md5 = hashlib.md5()
+        sha1 = hashlib.sha1() if self.stored_sha1 else None
+        corrupt = []
+        pending = deque()
+
+        def consume(chunk, future):
+            try:
+                data = future.result()
+            except zlib.error:
+                corrupt.append(chunk)
+                data = bytes(min(self.chunk_size, self.size - chunk * self.chunk_size))
+            md5.update(data)
+            if sha1:
+                sha1.update(data)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk in range(self.chunk_count):
+                if jobs:
+                    jobs.check()
+                raw = self._read_raw(chunk)
+                if governor:
+                    governor.throttle(len(raw[0]))
+                pending.append((chunk, pool.submit(self._decode, *raw)))
+                if len(pending) >= workers * VERIFY_WINDOW:
+                    consume(*pending.popleft())
+            while pending:
+                consume(*pending.popleft())
+
+        result = {
+            "size": self.size,
+            "chunks": self.chunk_count,
+            "segments": len(self.segments),
+            "stored_md5": self.stored_md5,
+            "computed_md5": md5.hexdigest(),
+            "stored_sha1": self.stored_sha1,
+            "computed_sha1": sha1.hexdigest() if sha1 else None,
+            "corrupt_chunks": corrupt[:100],
+        }
+        if self.stored_md5:
+            result["verified"] = not corrupt and result["computed_md5"] == self.stored_md5 and (
+                not sha1 or result["computed_sha1"] == self.stored_sha1
+            )
+        else:
+            result["verified"] = None
+        return result
+
+
+class EWFView:
+    """Acceso por índice y rebanada a una imagen EWF (para escáneres que recorren la imagen completa)"""
+
+    def __init__(self, image):
+        self.image = image
+
+    def __len__(self):
+        return self.image.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.image.size)
+            if step != 1:
+                raise ValueError("EWFView solo admite rebanadas contiguas")
+            return self.image.read_at(start, max(0, stop - start))
+        if key < 0:
+            key += self.image.size
+        if not 0 <= key < self.image.size:
+            raise IndexError("Posición fuera de la imagen")
+        return self.image.read_at(key, 1)[0]
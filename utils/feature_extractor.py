@@ -0,0 +1,323 @@
+"""
+Extractor de características (estilo bulk_extractor)
+Busca URLs, correos, IPs, dominios y carteras de criptomonedas en volcados e imágenes
+"""
+
+import os
+import re
+import shutil
+import hashlib
+import heapq
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.evidence_reader import DEFAULT_CHUNK_SIZE, get_evidence_size, iter_chunk_ranges, map_region
+from utils.job_control import get_job_control
+
+
+# Solape entre bloques: longitud máxima de una característica
+CHUNK_OVERLAP = 4096
+
+# Entradas máximas por histograma antes de podar las menos frecuentes
+DEFAULT_HISTOGRAM_CAPACITY = 20000
+
+# Longitud máxima de una característica guardada
+MAX_FEATURE_LENGTH = 512
+
+_TLDS = (
+    rb"com|net|org|info|biz|io|co|me|xyz|top|online|site|club|app|dev|cloud|"
+    rb"gov|edu|mil|int|onion|ru|cn|uk|de|fr|es|it|nl|br|mx|ar|cl|pe|ec|us|ca|"
+    rb"jp|kr|in|au|su|tk|ml|ga|cf|gq|pw|cc|tv|ws|to"
+)
+
+# Escáneres compilados sobre bytes (ASCII / UTF-8)
+SCANNERS = {
+    "url": re.compile(
+        rb"(?:https?|ftp)://[A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=%]{3,2000}"
+    ),
+    "email": re.compile(
+        rb"(?<![A-Za-z0-9._%+\-])[A-Za-z0-9._%+\-]{1,64}@(?:[A-Za-z0-9\-]{1,63}\.){1,8}[A-Za-z]{2,24}(?![A-Za-z0-9\-])"
+    ),
+    "ip": re.compile(
+        rb"(?<![0-9.])(?:(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\.){3}"
+        rb"(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])(?![0-9.])"
+    ),
+    "domain": re.compile(
+        rb"(?<![A-Za-z0-9\-.@/])(?:[A-Za-z0-9](?:[A-Za-z0-9\-]{0,61}[A-Za-z0-9])?\.){1,8}(?:" + _TLDS + rb")(?![A-Za-z0-9\-])"
+    ),
+    "bitcoin": re.compile(
+        rb"(?<![A-Za-z0-9])(?:bc1[ac-hj-np-z02-9]{25,59}|[13][a-km-zA-HJ-NP-Z1-9]{25,34})(?![A-Za-z0-9])"
+    ),
+    "ethereum": re.compile(
+        rb"(?<![A-Za-z0-9])0x[a-fA-F0-9]{40}(?![A-Za-z0-9])"
+    ),
+    "monero": re.compile(
+        rb"(?<![A-Za-z0-9])4[0-9AB][1-9A-HJ-NP-Za-km-z]{93}(?![A-Za-z0-9])"
+    ),
+}
+
+# Las cadenas de Windows en memoria suelen estar en UTF-16LE
+_WIDE_RUN = re.compile(rb"(?:[\x20-\x7e]\x00){8,}")
+_WIDE_SCANNERS = {name: re.compile(p.pattern.decode("latin-1")) for name, p in SCANNERS.items()}
+
+_BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _valid_base58check(address):
+    """Validar el checksum de una dirección Bitcoin legada (Base58Check)"""
+    number = 0
+    for char in address:
+        number = number * 58 + _BASE58.index(char)
+    try:
+        raw = number.to_bytes(25, "big")
+    except OverflowError:
+        return False
+    checksum = hashlib.sha256(hashlib.sha256(raw[:-4]).digest()).digest()[:4]
+    return checksum == raw[-4:]
+
+
+def _normalize(scanner, feature):
+    """Normalizar una característica; devuelve None si no es válida"""
+    if len(feature) > MAX_FEATURE_LENGTH:
+        feature = feature[:MAX_FEATURE_LENGTH]
+    if scanner in ("email", "domain"):
+        return feature.lower()
+    if scanner == "url":
+        return feature.rstrip(".,;:)'\"")
+    if scanner == "bitcoin" and not feature.startswith("bc1"):
+        return feature if _valid_base58check(feature) else None
+    return feature
+
+
+class FeatureHistogram:
+    """Histograma de frecuencias acotado en memoria
+
+    Cada entrada guarda [frecuencia, primer_offset, último_offset]. Cuando se supera
+    el doble de la capacidad se descartan las entradas menos frecuentes, por lo que
+    la memoria no depende de la cantidad de características encontradas.
+    """
+
+    def __init__(self, capacity=DEFAULT_HISTOGRAM_CAPACITY):
+        self.capacity = capacity
+        self.entries = {}
+        self.total = 0
+        self.pruned = 0
+
+    def add(self, feature, count, first_offset, last_offset):
+        """Agregar ocurrencias de una característica"""
+        entry = self.entries.get(feature)
+        if entry is None:
+            self.entries[feature] = [count, first_offset, last_offset]
+            if len(self.entries) > 2 * self.capacity:
+                self._prune()
+        else:
+            entry[0] += count
+            if first_offset < entry[1]:
+                entry[1] = first_offset
+            if last_offset > entry[2]:
+                entry[2] = last_offset
+        self.total += count
+
+    def merge(self, entries, total, pruned=0):
+        """Combinar el histograma parcial de un bloque"""
+        for feature, (count, first_offset, last_offset) in entries.items():
+            self.add(feature, count, first_offset, last_offset)
+        # add() ya sumó las ocurrencias conservadas; se agregan las podadas en el bloque
+        self.total += total - sum(entry[0] for entry in entries.values())
+        self.pruned += pruned
+
+    def _prune(self):
+        """Conservar solo las entradas más frecuentes"""
+        keep = heapq.nlargest(self.capacity, self.entries.items(), key=lambda item: item[1][0])
+        self.pruned += len(self.entries) - len(keep)
+        self.entries = dict(keep)
+
+    def top(self, limit=None):
+        """Entradas ordenadas por frecuencia descendente"""
+        items = sorted(self.entries.items(), key=lambda item: (-item[1][0], item[1][1]))
+        return items[:limit] if limit else items
+
+
+def _scan_chunk(task):
+    """Escanear un bloque de la evidencia (se ejecuta en un proceso de trabajo)
+
+    El escaneo empieza CHUNK_OVERLAP bytes antes del bloque y termina CHUNK_OVERLAP bytes después;
+    solo se registran las coincidencias que empiezan dentro del bloque. Una característica que cruza
+    el límite inicial la consume entera la coincidencia que empieza antes, así que su sufijo no se
+    registra como otra característica.
+    """
+    path, offset, length, scan_length, parts_folder, chunk_index, capacity = task
+    lead = min(CHUNK_OVERLAP, offset)
+
+    histograms = {name: FeatureHistogram(capacity) for name in SCANNERS}
+    part_files = {}
+
+    def record(scanner, raw_feature, feature_offset):
+        feature = _normalize(scanner, raw_feature)
+        if not feature:
+            return
+        histograms[scanner].add(feature, 1, feature_offset, feature_offset)
+        handle = part_files.get(scanner)
+        if handle is None:
+            part_path = os.path.join(parts_folder, f"{scanner}_{chunk_index:08d}.txt")
+            handle = part_files[scanner] = open(part_path, 'w', encoding='utf-8')
+        handle.write(f"{feature_offset}\t{feature}\n")
+
+    try:
+        with map_region(path, offset - lead, lead + scan_length) as (buffer, start):
+            owned_start = start + lead
+            owned_end = owned_start + length
+            scan_end = owned_start + scan_length
+
+            for scanner, pattern in SCANNERS.items():
+                for match in pattern.finditer(buffer, start, scan_end):
+                    if match.start() >= owned_end:
+                        break
+                    if match.start() < owned_start:
+                        continue
+                    record(scanner, match.group().decode("latin-1"), offset + match.start() - owned_start)
+
+            for run in _WIDE_RUN.finditer(buffer, start, scan_end):
+                if run.start() >= owned_end:
+                    break
+                text = run.group().decode("utf-16-le")
+                for scanner, pattern in _WIDE_SCANNERS.items():
+                    for match in pattern.finditer(text):
+                        match_start = run.start() + 2 * match.start()
+                        if owned_start <= match_start < owned_end:
+                            record(scanner, match.group(), offset + match_start - owned_start)
+    finally:
+        for handle in part_files.values():
+            handle.close()
+
+    return chunk_index, {
+        name: (histogram.entries, histogram.total, histogram.pruned)
+        for name, histogram in histograms.items()
+        if histogram.total
+    }
+
+
+class FeatureExtractor:
+    def __init__(self, app, output_folder, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 histogram_capacity=DEFAULT_HISTOGRAM_CAPACITY):
+        self.app = app
+        self.output_folder = output_folder
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.histogram_capacity = histogram_capacity
+        self.jobs = get_job_control(app)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def scan_file(self, path, top_limit=25):
+        """Extraer características de un archivo de evidencia y generar histogramas"""
+        source_name = os.path.basename(path)
+        source_folder = os.path.join(self.output_folder, source_name)
+        os.makedirs(source_folder, exist_ok=True)
+        parts_folder = tempfile.mkdtemp(prefix="parts_", dir=source_folder)
+
+        total_size = get_evidence_size(path)
+        histograms = {name: FeatureHistogram(self.histogram_capacity) for name in SCANNERS}
+        tasks = (
+            (path, offset, length, scan_length, parts_folder, index, self.histogram_capacity)
+            for index, (offset, length, scan_length)
+            in enumerate(iter_chunk_ranges(total_size, self.chunk_size, CHUNK_OVERLAP))
+        )
+        chunk_count = max(1, -(-total_size // self.chunk_size))
+
+        try:
+            try:
+                self._run_parallel(tasks, histograms, chunk_count)
+            except (OSError, RuntimeError) as e:
+                # Al detener el análisis se terminan los procesos del pool: no es un fallo del entorno
+                self.jobs.check()
+                # Entornos sin soporte de procesos: repetir de forma secuencial
+                self.app.add_log(f"Escaneo paralelo no disponible ({str(e)}), continuando en modo secuencial", "WARNING")
+                shutil.rmtree(parts_folder, ignore_errors=True)
+                os.makedirs(parts_folder, exist_ok=True)
+                histograms = {name: FeatureHistogram(self.histogram_capacity) for name in SCANNERS}
+                for offset, length, scan_length in iter_chunk_ranges(total_size, self.chunk_size, CHUNK_OVERLAP):
+                    self.jobs.check()
+                    index = offset // self.chunk_size
+                    task = (path, offset, length, scan_length, parts_folder, index, self.histogram_capacity)
+                    self._merge_result(_scan_chunk(task), histograms)
+
+            self._write_feature_files(parts_folder, source_folder)
+        finally:
+            shutil.rmtree(parts_folder, ignore_errors=True)
+
+        summary = self._write_histograms(histograms, source_folder, top_limit)
+        summary["size_bytes"] = total_size
+        summary["output_folder"] = source_folder
+        return summary
+
+    def _run_parallel(self, tasks, histograms, chunk_count):
+        """Repartir los bloques entre procesos con un número acotado en vuelo"""
+        in_flight = set()
+        done_count = 0
+        next_report = 10
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            for task in tasks:
+                self.jobs.check()
+                in_flight.add(executor.submit(_scan_chunk, task))
+                if len(in_flight) >= self.max_workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._merge_result(future.result(), histograms)
+                    done_count += len(finished)
+                    next_report = self._report_progress(done_count, chunk_count, next_report)
+
+            for future in in_flight:
+                self._merge_result(future.result(), histograms)
+
+    def _report_progress(self, done_count, chunk_count, next_report):
+        """Registrar el avance cada 10%"""
+        percent = done_count * 100 // chunk_count
+        if percent >= next_report:
+            self.app.add_log(f"  Progreso de extracción: {percent}%", "INFO")
+            next_report = (percent // 10 + 1) * 10
+        return next_report
+
+    def _merge_result(self, result, histograms):
+        """Incorporar los histogramas parciales de un bloque"""
+        _, partial = result
+        for name, (entries, total, pruned) in partial.items():
+            histograms[name].merge(entries, total, pruned)
+
+    def _write_feature_files(self, parts_folder, source_folder):
+        """Concatenar los archivos parciales en orden de offset (sin cargarlos en memoria)"""
+        parts = sorted(os.listdir(parts_folder))
+        for scanner in SCANNERS:
+            scanner_parts = [p for p in parts if p.startswith(f"{scanner}_")]
+            feature_file = os.path.join(source_folder, f"{scanner}.txt")
+            with open(feature_file, 'w', encoding='utf-8') as out:
+                out.write(f"# offset\t{scanner}\n")
+                for part in scanner_parts:
+                    with open(os.path.join(parts_folder, part), 'r', encoding='utf-8') as f:
+                        shutil.copyfileobj(f, out)
+
+    def _write_histograms(self, histograms, source_folder, top_limit):
+        """Guardar los histogramas completos y devolver el resumen para los hallazgos"""
+        summary = {"scanners": {}}
+
+        for scanner, histogram in histograms.items():
+            histogram_file = os.path.join(source_folder, f"{scanner}_histogram.txt")
+            ordered = histogram.top()
+
+            with open(histogram_file, 'w', encoding='utf-8') as f:
+                f.write(f"# n={histogram.total}\tunicos={len(ordered)}\tpodados={histogram.pruned}\n")
+                f.write("# frecuencia\tcaracteristica\tprimer_offset\tultimo_offset\n")
+                for feature, (count, first_offset, last_offset) in ordered:
+                    f.write(f"{count}\t{feature}\t{first_offset}\t{last_offset}\n")
+
+            summary["scanners"][scanner] = {
+                "total": histogram.total,
+                "unique": len(ordered),
+                "approximate": histogram.pruned > 0,
+                "top": [
+                    {"feature": feature, "count": count, "first_offset": first_offset, "last_offset": last_offset}
+                    for feature, (count, first_offset, last_offset) in ordered[:top_limit]
+                ],
+            }
+
+        return summary
@@ -0,0 +1,348 @@
+"""
+Catálogo indexado del sistema de archivos
+Carga la salida de fls en formato bodyfile en SQLite para búsquedas rápidas por nombre y ruta
+"""
+
+import os
+import re
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+
+INSERT_BATCH = 50000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    image TEXT NOT NULL,
+    partition_offset INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    inode TEXT,
+    mode TEXT,
+    size INTEGER,
+    atime INTEGER,
+    mtime INTEGER,
+    ctime INTEGER,
+    crtime INTEGER,
+    deleted INTEGER NOT NULL,
+    md5 TEXT,
+    known TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    bodyfile TEXT PRIMARY KEY,
+    image TEXT,
+    partition_offset INTEGER,
+    entries INTEGER,
+    loaded_at TEXT
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext, deleted, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_name ON files(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_files_path ON files(path COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+CREATE INDEX IF NOT EXISTS idx_files_ctime ON files(ctime);
+CREATE INDEX IF NOT EXISTS idx_files_deleted ON files(deleted, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_md5 ON files(md5);
+"""
+
+_DELETED_SUFFIXES = (" (deleted-realloc)", " (deleted)")
+
+
+def parse_bodyfile_line(line):
+    """Decodificar una línea bodyfile (MD5|nombre|inodo|modo|UID|GID|tamaño|atime|mtime|ctime|crtime)"""
+    parts = line.rstrip("\r\n").split("|")
+    if len(parts) < 11:
+        return None
+
+    md5 = parts[0]
+    inode, mode, _, _, size, atime, mtime, ctime, crtime = parts[-9:]
+    path = "|".join(parts[1:-9])
+    if path.startswith("//"):
+        # fls -m / antepone el punto de montaje a rutas que ya empiezan con "/"
+        path = path[1:]
+
+    deleted = 0
+    for suffix in _DELETED_SUFFIXES:
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+            deleted = 1
+            break
+
+    try:
+        return {
+            "md5": md5 if md5.strip("0") else "",
+            "path": path,
+            "inode": inode,
+            "mode": mode,
+            "size": int(size),
+            "atime": int(atime),
+            "mtime": int(mtime),
+            "ctime": int(ctime),
+            "crtime": int(crtime),
+            "deleted": deleted,
+        }
+    except ValueError:
+        return None
+
+
+def _split_name(path):
+    """Obtener nombre y extensión (en minúsculas) de una ruta"""
+    name = path.rsplit("/", 1)[-1]
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name.strip(".") else ""
+    return name, ext
+
+
+class FileSystemCatalog:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(_SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(files)")}
+        if "known" not in columns:
+            # Catálogos creados antes de la clasificación por conjuntos de hashes
+            self.connection.execute("ALTER TABLE files ADD COLUMN known TEXT")
+        self.has_trigram = self._create_trigram_index()
+
+    def close(self):
+        """Cerrar la base de datos"""
+        self.connection.close()
+
+    def _create_trigram_index(self):
+        """Crear el índice de trigramas FTS5 sobre los nombres (SQLite >= 3.34)"""
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS files_trigram "
+                "USING fts5(name, content='files', content_rowid='id', tokenize='trigram')"
+            )
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def ingest_bodyfile(self, bodyfile, image, partition_offset):
+        """Cargar un bodyfile de fls en streaming; devuelve el número de entradas"""
+        cursor = self.connection.cursor()
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("DELETE FROM files WHERE image = ? AND partition_offset = ?", (image, partition_offset))
+
+        count = 0
+        batch = []
+        insert = (
+            "INSERT INTO files (image, partition_offset, path, name, ext, inode, mode, size, "
+            "atime, mtime, ctime, crtime, deleted, md5) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+
+        with open(bodyfile, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                entry = parse_bodyfile_line(line)
+                # Las entradas ($FILE_NAME) solo aportan marcas de tiempo a la línea de tiempo
+                if not entry or entry["path"].endswith(" ($FILE_NAME)"):
+                    continue
+                name, ext = _split_name(entry["path"])
+                batch.append((
+                    image, partition_offset, entry["path"], name, ext, entry["inode"], entry["mode"],
+                    entry["size"], entry["atime"], entry["mtime"], entry["ctime"], entry["crtime"],
+                    entry["deleted"], entry["md5"],
+                ))
+                if len(batch) >= INSERT_BATCH:
+                    cursor.executemany(insert, batch)
+                    count += len(batch)
+                    batch = []
+
+        if batch:
+            cursor.executemany(insert, batch)
+            count += len(batch)
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+            (os.path.basename(bodyfile), image, partition_offset, count, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        self.connection.commit()
+        return count
+
+    def build_indexes(self):
+        """Crear índices después de la carga masiva (más rápido que indexar al insertar)"""
+        self.connection.executescript(_INDEXES)
+        if self.has_trigram:
+            self.connection.execute("INSERT INTO files_trigram(files_trigram) VALUES('rebuild')")
+        self.connection.execute("ANALYZE")
+        self.connection.commit()
+
+    def md5_values(self):
+        """MD5 distintos presentes en el catálogo"""
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT md5 FROM files WHERE md5 != ''")]
+
+    def mark_known(self, matches):
+        """Registrar la clasificación (known_good/known_bad) de cada MD5 coincidente"""
+        self.connection.execute("UPDATE files SET known = NULL WHERE known IS NOT NULL")
+        self.connection.executemany(
+            "UPDATE files SET known = ? WHERE md5 = ?",
+            [(category, md5) for md5, (category, _) in matches.items()],
+        )
+        self.connection.commit()
+
+    def known_files(self, category, limit=1000):
+        """Archivos marcados con una categoría de hashes conocidos"""
+        rows = self.connection.execute(
+            "SELECT image, path, md5 FROM files WHERE known = ? LIMIT ?", (category, limit)
+        )
+        return [{"image": image, "path": path, "md5": md5} for image, path, md5 in rows]
+
+    def iter_files(self, batch_size=1000, start_id=None, stop_id=None):
+        """Recorrer el catálogo en orden de carga, leyendo de a `batch_size` filas
+
+        `start_id`/`stop_id` acotan el recorrido a los ids [start_id, stop_id) sin leer los anteriores.
+        """
+        clauses = []
+        params = []
+        if start_id is not None:
+            clauses.append("id >= ?")
+            params.append(start_id)
+        if stop_id is not None:
+            clauses.append("id < ?")
+            params.append(stop_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self.connection.execute(
+            f"SELECT image, path, size, mtime, deleted, md5, known FROM files{where} ORDER BY id", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def id_ranges(self, every):
+        """Tramos de `every` archivos en orden de carga, como (id inicial, id final excluido o None)"""
+        cursor = self.connection.execute("SELECT id FROM files ORDER BY id")
+        starts = []
+        while True:
+            rows = cursor.fetchmany(every)
+            if not rows:
+                break
+            starts.append(rows[0][0])
+        return list(zip(starts, starts[1:] + [None])) or [(None, None)]
+
+    def search(self, pattern=None, deleted=None, since=None, until=None, limit=1000, hide_known=False):
+        """Buscar archivos por patrón de nombre/ruta y filtros de estado y fecha
+
+        pattern admite comodines (`*.ps1`, `*mimikatz*`, `/Users/*/AppData/*`).
+        since/until (epoch) se comparan con mtime y ctime: un borrado actualiza
+        la fecha de cambio de metadatos. hide_known omite los archivos known_good.
+        """
+        clauses = []
+        params = []
+
+        if pattern:
+            clause, clause_params = self._pattern_clause(pattern)
+            clauses.append(clause)
+            params += clause_params
+        if deleted is not None:
+            clauses.append("deleted = ?")
+            params.append(1 if deleted else 0)
+        if since is not None:
+            clauses.append("(mtime >= ? OR ctime >= ?)")
+            params += [since, since]
+        if until is not None:
+            clauses.append("(mtime <= ? AND ctime <= ?)")
+            params += [until, until]
+        if hide_known:
+            clauses.append("(known IS NULL OR known != 'known_good')")
+
+        query = "SELECT image, partition_offset, path, inode, size, atime, mtime, ctime, crtime, deleted, md5, known FROM files"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        # Con patrón, "+mtime" evita que SQLite recorra el índice de fechas en lugar del filtro por nombre
+        query += " ORDER BY +mtime DESC LIMIT ?" if pattern else " ORDER BY mtime DESC LIMIT ?"
+        params.append(limit)
+
+        columns = ["image", "partition_offset", "path", "inode", "size", "atime", "mtime", "ctime", "crtime", "deleted", "md5", "known"]
+        return [dict(zip(columns, row)) for row in self.connection.execute(query, params)]
+
+    def _pattern_clause(self, pattern):
+        """Traducir un patrón con comodines a la consulta que aprovecha los índices"""
+        # *.ext -> índice por extensión
+        match = re.fullmatch(r"\*\.([^*?/\[\]]+)", pattern)
+        if match:
+            return "ext = ?", [match.group(1).lower()]
+
+        target = "path" if "/" in pattern else "name"
+        clauses = [f"lower({target}) GLOB ?"]
+        params = [pattern.lower()]
+
+        # Prefijo literal -> rango sobre el índice NOCASE (LIKE sin ESCAPE para que SQLite lo optimice)
+        prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        if prefix and not re.search(r"[%_]", prefix):
+            clauses.insert(0, f"{target} LIKE ?")
+            params.insert(0, prefix + "%")
+        elif target == "name" and self.has_trigram:
+            # Subcadenas del nombre -> prefiltro por trigramas
+            literals = [part for part in re.split(r"[*?\[\]]+", pattern) if len(part) >= 3]
+            if literals:
+                fts_query = " AND ".join('"' + part.replace('"', '""') + '"' for part in literals)
+                clauses.insert(0, "id IN (SELECT rowid FROM files_trigram WHERE files_trigram MATCH ?)")
+                params.insert(0, fts_query)
+
+        # ...*.ext -> acotar también por el índice de extensión
+        match = re.search(r"\*\.([^*?/\[\]]+)$", pattern)
+        if match:
+            clauses.insert(0, "ext = ?")
+            params.insert(0, match.group(1).lower())
+
+        return " AND ".join(clauses), params
+
+    def summary(self, top=10):
+        """Estadísticas del catálogo para los hallazgos"""
+        total, deleted, known_good, known_bad = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(deleted), 0), "
+            "COALESCE(SUM(known = 'known_good'), 0), COALESCE(SUM(known = 'known_bad'), 0) FROM files"
+        ).fetchone()
+        extensions = self.connection.execute(
+            "SELECT ext, COUNT(*) FROM files WHERE ext != '' GROUP BY ext ORDER BY COUNT(*) DESC LIMIT ?", (top,)
+        ).fetchall()
+        return {
+            "database": self.db_path,
+            "total_entries": total,
+            "deleted_entries": deleted,
+            "known_good_entries": known_good,
+            "known_bad_entries": known_bad,
+            "trigram_index": self.has_trigram,
+            "top_extensions": [{"ext": ext, "count": count} for ext, count in extensions],
+        }
+
+
+def main():
+    """Consultar un catálogo existente sin volver a ejecutar TSK"""
+    parser = argparse.ArgumentParser(description="Búsqueda en el catálogo de archivos de ForensicFlow")
+    parser.add_argument("database", help="Ruta de catalog.db")
+    parser.add_argument("pattern", nargs="?", help="Patrón de nombre o ruta (ej. *.ps1)")
+    parser.add_argument("--deleted", action="store_true", help="Solo archivos eliminados")
+    parser.add_argument("--days", type=float, help="Solo archivos modificados en los últimos N días")
+    parser.add_argument("--hide-known", action="store_true", help="Ocultar archivos conocidos (known_good)")
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    catalog = FileSystemCatalog(args.database)
+    since = time.time() - args.days * 86400 if args.days else None
+    started = time.perf_counter()
+    rows = catalog.search(args.pattern, deleted=True if args.deleted else None, since=since, limit=args.limit,
+                          hide_known=args.hide_known)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    for row in rows:
+        mtime = datetime.fromtimestamp(row["mtime"]).strftime("%Y-%m-%d %H:%M:%S") if row["mtime"] else "-"
+        flag = " (eliminado)" if row["deleted"] else ""
+        if row["known"] == "known_bad":
+            flag += " [KNOWN BAD]"
+        print(f"{mtime}  {row['size']:>12}  {row['image']}@{row['partition_offset']}  {row['path']}{flag}")
+    print(f"\n{len(rows)} resultados en {elapsed:.1f} ms")
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
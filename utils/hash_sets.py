@@ -0,0 +1,428 @@
+"""
+Conjuntos de hashes de archivos conocidos (known-good / known-bad)
+Archivo binario ordenado con filtro de Bloom e índice por prefijo, consultado mediante mmap
+"""
+
+import os
+import re
+import json
+import mmap
+import shutil
+import sqlite3
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+
+DEFAULT_LIBRARY = os.path.join(os.path.expanduser("~"), "ForensicFlow_Tools", "hash_sets")
+
+CATEGORIES = ("known_good", "known_bad")
+
+# Longitud en hexadecimal -> (tipo, bytes del digest)
+HASH_TYPES = {32: ("md5", 16), 40: ("sha1", 20), 64: ("sha256", 32)}
+DIGEST_SIZES = {name: size for name, size in HASH_TYPES.values()}
+
+# ~0,05 % de falsos positivos en el filtro de Bloom
+BLOOM_BITS_PER_ITEM = 16
+BLOOM_PROBES = 11
+
+# Particiones por los 6 bits altos del digest: ordenar cada una por separado da el orden global
+PARTITION_BITS = 6
+INDEX_BITS = 16
+
+READ_BLOCK = 64 * 1024 * 1024
+BLOOM_BLOCK = 512 * 1024
+
+# Secuencias hexadecimales completas; solo se conservan las de longitud 32, 40 o 64
+_HEX_RUN = re.compile(rb"[0-9A-Fa-f]{32,}")
+
+_NIBBLES = np.full(256, 0, dtype=np.uint8)
+for _index, _char in enumerate(b"0123456789abcdef"):
+    _NIBBLES[_char] = _index
+for _index, _char in enumerate(b"ABCDEF"):
+    _NIBBLES[_char] = 10 + _index
+
+_MASK64 = (1 << 64) - 1
+
+
+def hex_to_digests(tokens, size):
+    """Convertir hashes hexadecimales de igual longitud a un arreglo (n, size) de bytes"""
+    text = np.frombuffer(b"".join(tokens), dtype=np.uint8).reshape(-1, size * 2)
+    nibbles = _NIBBLES[text]
+    return (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+
+
+def _bloom_positions(digests, bits):
+    """Posiciones del filtro (doble hashing sobre los primeros 16 bytes del digest)"""
+    words = np.ascontiguousarray(digests[:, :16]).view("<u8")
+    h1 = words[:, 0]
+    h2 = words[:, 1] | np.uint64(1)
+    probes = np.arange(BLOOM_PROBES, dtype=np.uint64)
+    return (h1[:, None] + probes[None, :] * h2[:, None]) % np.uint64(bits)
+
+
+class HashSetBuilder:
+    """Importa listas de hashes (NSRL, md5sum, hashdeep, una por línea) a un conjunto"""
+
+    def __init__(self, library, name, category):
+        if category not in CATEGORIES:
+            raise ValueError(f"Categoría inválida: {category} (use {', '.join(CATEGORIES)})")
+        self.folder = os.path.join(library, name)
+        self.name = name
+        self.category = category
+        self.work_folder = os.path.join(self.folder, "_import")
+        self.sources = []
+        shutil.rmtree(self.work_folder, ignore_errors=True)
+        os.makedirs(self.work_folder, exist_ok=True)
+
+        metadata = self._load_metadata()
+        if metadata:
+            # Importación incremental: los hashes existentes se vuelven a particionar
+            self.sources = metadata.get("sources", [])
+            for hash_type in metadata.get("counts", {}):
+                size = DIGEST_SIZES[hash_type]
+                sorted_path = os.path.join(self.folder, f"{hash_type}.sorted")
+                with open(sorted_path, 'rb') as f:
+                    while block := f.read(READ_BLOCK - READ_BLOCK % size):
+                        self._partition(hash_type, np.frombuffer(block, dtype=np.uint8).reshape(-1, size))
+
+    def _load_metadata(self):
+        """Leer set.json si el conjunto ya existe"""
+        path = os.path.join(self.folder, "set.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def add_file(self, path):
+        """Extraer hashes de un archivo en bloques; devuelve cuántos se leyeron"""
+        with open(path, 'rb') as f:
+            is_sqlite = f.read(16) == b"SQLite format 3\0"
+
+        found = 0
+        for data in (self._sqlite_blocks(path) if is_sqlite else self._text_blocks(path)):
+            by_length = {}
+            for token in _HEX_RUN.findall(data):
+                by_length.setdefault(len(token), []).append(token)
+            for length, tokens in by_length.items():
+                if length not in HASH_TYPES:
+                    continue
+                hash_type, size = HASH_TYPES[length]
+                self._partition(hash_type, hex_to_digests(tokens, size))
+                found += len(tokens)
+
+        self.sources.append({
+            "file": os.path.basename(path),
+            "hashes": found,
+            "imported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        return found
+
+    def _text_blocks(self, path):
+        """Bloques de líneas completas de un archivo de texto"""
+        with open(path, 'rb') as f:
+            remainder = b""
+            while block := f.read(READ_BLOCK):
+                data = remainder + block
+                cut = data.rfind(b"\n") + 1
+                data, remainder = data[:cut], data[cut:]
+                if data:
+                    yield data
+            if remainder:
+                yield remainder
+
+    def _sqlite_blocks(self, path):
+        """Bloques de hashes de una base NSRL RDSv3 (tabla FILE)"""
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            columns = {row[1].lower() for row in connection.execute("PRAGMA table_info(FILE)")}
+            selected = [column for column in ("sha256", "sha1", "md5") if column in columns]
+            if not selected:
+                raise ValueError(f"{os.path.basename(path)} no contiene una tabla FILE con hashes")
+            cursor = connection.execute(f"SELECT {', '.join(selected)} FROM FILE")
+            while rows := cursor.fetchmany(500000):
+                yield "\n".join(" ".join(value for value in row if value) for row in rows).encode("ascii", "ignore")
+        finally:
+            connection.close()
+
+    def _partition(self, hash_type, digests):
+        """Repartir digests en archivos temporales según sus bits altos"""
+        partitions = digests[:, 0] >> (8 - PARTITION_BITS)
+        order = np.argsort(partitions, kind="stable")
+        digests = digests[order]
+        bounds = np.searchsorted(partitions[order], np.arange((1 << PARTITION_BITS) + 1))
+        for partition in range(1 << PARTITION_BITS):
+            start, end = bounds[partition], bounds[partition + 1]
+            if start == end:
+                continue
+            path = os.path.join(self.work_folder, f"{hash_type}_{partition:02x}.part")
+            with open(path, 'ab') as f:
+                f.write(digests[start:end].tobytes())
+
+    def finish(self):
+        """Ordenar, eliminar duplicados y escribir archivo ordenado, índice y filtro de Bloom"""
+        counts = {}
+        blooms = {}
+
+        for hash_type, size in DIGEST_SIZES.items():
+            parts = [
+                os.path.join(self.work_folder, f"{hash_type}_{partition:02x}.part")
+                for partition in range(1 << PARTITION_BITS)
+            ]
+            if not any(os.path.exists(part) for part in parts):
+                continue
+
+            sorted_path = os.path.join(self.work_folder, f"{hash_type}.sorted")
+            index = np.zeros(1 << INDEX_BITS, dtype=np.uint64)
+            total = 0
+            with open(sorted_path, 'wb') as out:
+                for part in parts:
+                    if not os.path.exists(part):
+                        continue
+                    # Cada partición cabe en memoria (1/64 del total)
+                    values = np.unique(np.fromfile(part, dtype=f"S{size}"))
+                    raw = values.view(np.uint8).reshape(-1, size)
+                    prefixes = (raw[:, 0].astype(np.int64) << 8) | raw[:, 1]
+                    index += np.bincount(prefixes, minlength=1 << INDEX_BITS).astype(np.uint64)
+                    out.write(values.tobytes())
+                    total += len(values)
+                    os.remove(part)
+
+            offsets = np.zeros((1 << INDEX_BITS) + 1, dtype=np.uint64)
+            np.cumsum(index, out=offsets[1:])
+            offsets.tofile(os.path.join(self.work_folder, f"{hash_type}.index"))
+
+            bits = max(total * BLOOM_BITS_PER_ITEM, 8192)
+            bits -= bits % 8
+            self._build_bloom(sorted_path, size, bits, os.path.join(self.work_folder, f"{hash_type}.bloom"))
+
+            counts[hash_type] = total
+            blooms[hash_type] = bits
+
+        metadata = {
+            "name": self.name,
+            "category": self.category,
+            "counts": counts,
+            "bloom_bits": blooms,
+            "bloom_probes": BLOOM_PROBES,
+            "index_bits": INDEX_BITS,
+            "sources": self.sources,
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(os.path.join(self.work_folder, "set.json"), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=4, ensure_ascii=False)
+
+        # Reemplazar los archivos del conjunto solo cuando la importación terminó
+        for name in os.listdir(self.work_folder):
+            os.replace(os.path.join(self.work_folder, name), os.path.join(self.folder, name))
+        os.rmdir(self.work_folder)
+        return metadata
+
+    def _build_bloom(self, sorted_path, size, bits, bloom_path):
+        """Construir el filtro de Bloom sobre un mapa en disco (memoria acotada)"""
+        bloom = np.memmap(bloom_path, dtype=np.uint8, mode='w+', shape=(bits // 8,))
+        digests = np.memmap(sorted_path, dtype=np.uint8, mode='r').reshape(-1, size)
+        for start in range(0, len(digests), BLOOM_BLOCK):
+            positions = _bloom_positions(digests[start:start + BLOOM_BLOCK], bits).ravel()
+            offsets = (positions >> np.uint64(3)).astype(np.int64)
+            bit_numbers = (positions & np.uint64(7)).astype(np.uint8)
+            # Un bit a la vez: los índices repetidos escriben el mismo valor, sin perder actualizaciones
+            for bit in range(8):
+                selected = offsets[bit_numbers == bit]
+                bloom[selected] |= np.uint8(1 << bit)
+        bloom.flush()
+        del bloom, digests
+
+
+class HashSet:
+    """Conjunto importado, abierto en modo lectura mediante mmap"""
+
+    def __init__(self, folder):
+        with open(os.path.join(folder, "set.json"), 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        self.name = self.metadata["name"]
+        self.category = self.metadata["category"]
+        self.tables = {}
+        self._files = []
+
+        for hash_type, count in self.metadata["counts"].items():
+            if not count:
+                continue
+            size = DIGEST_SIZES[hash_type]
+            self.tables[hash_type] = {
+                "size": size,
+                "bits": self.metadata["bloom_bits"][hash_type],
+                "sorted": self._map(os.path.join(folder, f"{hash_type}.sorted")),
+                "bloom": self._map(os.path.join(folder, f"{hash_type}.bloom")),
+                "index": np.fromfile(os.path.join(folder, f"{hash_type}.index"), dtype=np.uint64),
+                "values": np.memmap(os.path.join(folder, f"{hash_type}.sorted"), dtype=f"S{size}", mode='r'),
+            }
+
+    def _map(self, path):
+        """Mapear un archivo del conjunto en solo lectura"""
+        f = open(path, 'rb')
+        self._files.append(f)
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Liberar los mapas de memoria"""
+        for table in self.tables.values():
+            table["sorted"].close()
+            table["bloom"].close()
+            del table["values"]
+        for f in self._files:
+            f.close()
+        self.tables = {}
+
+    def __contains__(self, hex_hash):
+        """Consulta individual: filtro de Bloom y búsqueda binaria dentro del bucket del prefijo"""
+        hash_info = HASH_TYPES.get(len(hex_hash))
+        table = self.tables.get(hash_info[0]) if hash_info else None
+        if table is None:
+            return False
+        try:
+            digest = bytes.fromhex(hex_hash)
+        except ValueError:
+            return False
+
+        h1 = int.from_bytes(digest[0:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bloom, bits = table["bloom"], table["bits"]
+        for probe in range(BLOOM_PROBES):
+            position = ((h1 + probe * h2) & _MASK64) % bits
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+
+        size = table["size"]
+        prefix = (digest[0] << 8) | digest[1]
+        low, high = int(table["index"][prefix]), int(table["index"][prefix + 1])
+        data = table["sorted"]
+        while low < high:
+            middle = (low + high) // 2
+            value = data[middle * size:(middle + 1) * size]
+            if value < digest:
+                low = middle + 1
+            elif value > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+    def contains_many(self, hash_type, digests):
+        """Consulta por lotes: máscara booleana para un arreglo (n, tamaño) de digests"""
+        table = self.tables.get(hash_type)
+        if table is None or not len(digests):
+            return np.zeros(len(digests), dtype=bool)
+
+        bloom = np.frombuffer(table["bloom"], dtype=np.uint8)
+        positions = _bloom_positions(digests, table["bits"])
+        hits = ((bloom[(positions >> np.uint64(3)).astype(np.int64)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+        del bloom
+
+        result = np.zeros(len(digests), dtype=bool)
+        candidates = np.nonzero(hits)[0]
+        if len(candidates):
+            queries = np.ascontiguousarray(digests[candidates]).view(f"S{table['size']}").ravel()
+            values = table["values"]
+            found = np.searchsorted(values, queries)
+            found = np.minimum(found, len(values) - 1)
+            result[candidates] = values[found] == queries
+        return result
+
+
+class HashSetLibrary:
+    """Todos los conjuntos de una carpeta; known_bad tiene prioridad sobre known_good"""
+
+    def __init__(self, library=DEFAULT_LIBRARY):
+        self.library = library
+        self.sets = []
+        if os.path.isdir(library):
+            for name in sorted(os.listdir(library)):
+                if os.path.exists(os.path.join(library, name, "set.json")):
+                    self.sets.append(HashSet(os.path.join(library, name)))
+        self.sets.sort(key=lambda hash_set: hash_set.category != "known_bad")
+
+    def close(self):
+        """Cerrar todos los conjuntos"""
+        for hash_set in self.sets:
+            hash_set.close()
+
+    def lookup(self, hex_hash):
+        """Clasificar un hash: (categoría, conjunto) o None"""
+        hex_hash = hex_hash.strip().lower()
+        for hash_set in self.sets:
+            if hex_hash in hash_set:
+                return hash_set.category, hash_set.name
+        return None
+
+    def classify(self, hex_hashes):
+        """Clasificar muchos hashes a la vez -> {hash: (categoría, conjunto)}"""
+        matches = {}
+        by_length = {}
+        for value in set(h.strip().lower() for h in hex_hashes if h):
+            if len(value) in HASH_TYPES and _HEX_RUN.fullmatch(value.encode("ascii", "ignore")):
+                by_length.setdefault(len(value), []).append(value)
+
+        for length, values in by_length.items():
+            hash_type, size = HASH_TYPES[length]
+            digests = hex_to_digests([value.encode("ascii") for value in values], size)
+            pending = np.ones(len(values), dtype=bool)
+            for hash_set in self.sets:
+                found = hash_set.contains_many(hash_type, digests) & pending
+                for index in np.nonzero(found)[0]:
+                    matches[values[index]] = (hash_set.category, hash_set.name)
+                pending &= ~found
+        return matches
+
+    def summary(self):
+        """Conjuntos cargados y número de hashes por tipo"""
+        return [
+            {"name": hash_set.name, "category": hash_set.category, "counts": hash_set.metadata["counts"]}
+            for hash_set in self.sets
+        ]
+
+
+def main():
+    """Importar conjuntos de hashes y hacer consultas desde la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Conjuntos de hashes conocidos de ForensicFlow")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY, help="Carpeta de conjuntos de hashes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Importar listas de hashes (NSRL, md5sum, hashdeep)")
+    import_parser.add_argument("name", help="Nombre del conjunto (ej. nsrl)")
+    import_parser.add_argument("category", choices=CATEGORIES)
+    import_parser.add_argument("files", nargs="+")
+
+    lookup_parser = commands.add_parser("lookup", help="Consultar hashes")
+    lookup_parser.add_argument("hashes", nargs="+")
+
+    commands.add_parser("list", help="Listar conjuntos importados")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        builder = HashSetBuilder(args.library, args.name, args.category)
+        for path in args.files:
+            found = builder.add_file(path)
+            print(f"{os.path.basename(path)}: {found} hashes")
+        metadata = builder.finish()
+        counts = ", ".join(f"{hash_type}: {count}" for hash_type, count in metadata["counts"].items())
+        print(f"Conjunto {args.name} ({args.category}) actualizado - {counts}")
+
+    elif args.command == "lookup":
+        library = HashSetLibrary(args.library)
+        for value in args.hashes:
+            match = library.lookup(value)
+            print(f"{value}  {match[0] + ' (' + match[1] + ')' if match else 'desconocido'}")
+        library.close()
+
+    else:
+        library = HashSetLibrary(args.library)
+        for entry in library.summary():
+            counts = ", ".join(f"{hash_type}: {count}" for hash_type, count in entry["counts"].items())
+            print(f"{entry['name']} [{entry['category']}] {counts}")
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Control de trabajos del análisis en curso
+Las herramientas externas (dd, WinPmem, Volatility, TSK) se lanzan en su propio grupo de procesos
+y quedan registradas; al detener el análisis se marca la cancelación, que los bucles de lectura,
+hash y análisis consultan, y se termina el árbol de procesos completo en pocos segundos
+"""
+
+import os
+import signal
+import threading
+import subprocess
+
+
+# Segundos que se espera a que los procesos terminen antes de forzar su cierre
+CANCEL_GRACE = 3
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class Cancelled(BaseException):
+    """El usuario detuvo el análisis
+
+    Deriva de BaseException, como KeyboardInterrupt, para atravesar los `except Exception`
+    de las fases, que registran el error y continúan con el paso siguiente.
+    """
+
+
+def _kill_tree(processes, grace=CANCEL_GRACE):
+    """Terminar los procesos y sus descendientes; los que no terminan en `grace` segundos se fuerzan"""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        targets = []
+        for process in processes:
+            try:
+                parent = psutil.Process(process.pid)
+                targets += [parent] + parent.children(recursive=True)
+            except psutil.Error:
+                continue
+        for target in targets:
+            try:
+                target.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(targets, timeout=grace)
+        for target in alive:
+            try:
+                target.kill()
+            except psutil.Error:
+                pass
+        return
+
+    for process in processes:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+            continue
+        try:
+            # Cada herramienta es líder de su grupo: se termina el grupo completo
+            os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            continue
+    for process in processes:
+        if os.name == "nt":
+            continue
+        try:
+            process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+
+class JobControl:
+    """Cancelación cooperativa y procesos externos del análisis en curso (seguro entre hilos)"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        """Llamar en los bucles largos: lanza Cancelled si se detuvo el análisis"""
+        if self.event.is_set():
+            raise Cancelled("Análisis detenido por el usuario")
+
+    def wait(self, timeout):
+        """Esperar `timeout` segundos o hasta que se detenga el análisis; lanza Cancelled en ese caso"""
+        if self.event.wait(timeout):
+            self.check()
+
+    def popen(self, cmd, **kwargs):
+        """subprocess.Popen en un grupo de procesos propio, registrado hasta llamar a release()"""
+        self.check()
+        if os.name == "nt":
+            kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs.setdefault("start_new_session", True)
+        process = subprocess.Popen(cmd, **kwargs)
+        with self.lock:
+            self.processes.add(process)
+        # Cancelado mientras se lanzaba: no debe quedar suelto
+        if self.event.is_set():
+            _kill_tree([process], grace=0)
+        return process
+
+    def release(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+    def run(self, cmd, timeout=None, capture_output=False, text=False, **kwargs):
+        """Equivalente a subprocess.run con el proceso registrado; lanza Cancelled si se detuvo el análisis"""
+        if capture_output:
+            kwargs["stdout"] = subprocess.PIPE
+            kwargs["stderr"] = subprocess.PIPE
+        process = self.popen(cmd, text=text, **kwargs)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_tree([process], grace=0)
+            process.communicate()
+            raise
+        finally:
+            self.release(process)
+        self.check()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def cancel(self, grace=CANCEL_GRACE):
+        """Detener el análisis: marcar la cancelación y terminar las herramientas y los procesos auxiliares"""
+        self.event.set()
+        with self.lock:
+            processes = list(self.processes)
+        _kill_tree(processes, grace)
+
+        # Procesos de cálculo (entropía, características, reporte) que no son herramientas registradas
+        try:
+            import psutil
+        except ImportError:
+            return
+        workers = psutil.Process().children(recursive=True)
+        for worker in workers:
+            try:
+                worker.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(workers, timeout=grace)
+        for worker in alive:
+            try:
+                worker.kill()
+            except psutil.Error:
+                pass
+
+
+# Para componentes usados sin aplicación (por ejemplo desde la línea de comandos): nunca se cancela
+_DEFAULT = JobControl()
+
+
+def get_job_control(app):
+    """Control de trabajos de la aplicación, o uno que nunca se cancela"""
+    return getattr(app, 'jobs', None) or _DEFAULT
@@ -1,40 +1,185 @@
 """
 Logger para registrar eventos del análisis
+Las entradas se escriben a disco (JSON-lines y texto) desde un hilo propio, por lotes;
+en memoria solo se conserva un búfer circular con las últimas entradas para la GUI
 """
 
 import os
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+from itertools import islice
 from datetime import datetime
 
 
+# Entradas que se conservan en memoria
+DEFAULT_CAPACITY = 5000
+
+# Entradas que el hilo escritor toma de la cola por cada escritura
+FLUSH_BATCH = 512
+
+# Niveles que fuerzan fsync del lote: hitos de la cadena de custodia que deben sobrevivir a un corte
+SYNC_LEVELS = ("PHASE", "SUCCESS", "WARNING", "ERROR")
+
+LOG_NAME = "forensicflow_log"
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_STOP = object()
+
+
 class Logger:
-    def __init__(self):
-        self.log_entries = []
-        
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.log_entries = deque(maxlen=capacity)
+        # Entradas registradas desde el inicio y posición donde empezó la ejecución actual
+        self.logged = 0
+        self.run_start = 0
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.writer = None
+        self.jsonl_path = None
+        self.text_path = None
+        atexit.register(self.close)
+
     def log(self, message, level="INFO"):
-        """Agregar entrada al log"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entry = {
-            "timestamp": timestamp,
-            "level": level,
-            "message": message
-        }
-        self.log_entries.append(entry)
-        
+        """Agregar entrada al log (no bloquea: la escritura a disco la hace el hilo escritor)"""
+        record = (time.time(), level, message)
+        with self.lock:
+            self.log_entries.append(record)
+            self.logged += 1
+            if self.writer is not None:
+                self.queue.put(record)
+
+    def start_run(self):
+        """Marcar el comienzo de una ejecución: deja de escribir en el log del caso anterior y
+        solo las entradas desde aquí pasan al log del caso nuevo al adjuntarlo
+        """
+        self.close()
+        with self.lock:
+            self.run_start = self.logged
+            self.jsonl_path = None
+            self.text_path = None
+
+    def attach(self, folder, name=LOG_NAME):
+        """Empezar a escribir el log en `folder` (<name>.jsonl y <name>.txt)
+
+        Se copian las entradas previas de la ejecución actual, no las de casos anteriores de la sesión.
+        """
+        self.close()
+        os.makedirs(folder, exist_ok=True)
+        self.jsonl_path = os.path.join(folder, f"{name}.jsonl")
+        self.text_path = os.path.join(folder, f"{name}.txt")
+        jsonl_file = open(self.jsonl_path, 'a', encoding='utf-8')
+        text_file = open(self.text_path, 'a', encoding='utf-8')
+        if text_file.tell() == 0:
+            text_file.write("FORENSICFLOW - LOG DE EVENTOS\n")
+            text_file.write("="*60 + "\n\n")
+
+        with self.lock:
+            first = self.logged - len(self.log_entries)
+            for record in islice(self.log_entries, max(0, self.run_start - first), None):
+                self.queue.put(record)
+            self.writer = threading.Thread(
+                target=self._write_loop, args=(jsonl_file, text_file), name="logger-writer", daemon=True
+            )
+            self.writer.start()
+
+    def _write_loop(self, jsonl_file, text_file):
+        """Escribir lo que haya en la cola en un solo lote; fsync si el lote tiene hitos"""
+        running = True
+        while running:
+            items = [self.queue.get()]
+            while len(items) < FLUSH_BATCH:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            waiters = []
+            durable = False
+            try:
+                for item in items:
+                    if item is _STOP:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        entry = _entry(item)
+                        jsonl_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                        text_file.write(f"[{entry['timestamp']}] [{entry['level']}] {entry['message']}\n")
+                        durable = durable or entry["level"] in SYNC_LEVELS
+                jsonl_file.flush()
+                text_file.flush()
+                if durable:
+                    os.fsync(jsonl_file.fileno())
+                    os.fsync(text_file.fileno())
+            except Exception as e:
+                print(f"Error al guardar log: {str(e)}")
+            for waiter in waiters:
+                waiter.set()
+        jsonl_file.close()
+        text_file.close()
+
+    def flush(self, timeout=5):
+        """Esperar a que todo lo registrado hasta ahora esté en disco"""
+        with self.lock:
+            if self.writer is None:
+                return True
+            done = threading.Event()
+            self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Vaciar la cola y detener el hilo escritor"""
+        with self.lock:
+            writer, self.writer = self.writer, None
+            if writer is not None:
+                self.queue.put(_STOP)
+        if writer is not None:
+            writer.join(timeout=5)
+
     def save_to_file(self, filepath):
         """Guardar log en archivo"""
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write("FORENSICFLOW - LOG DE EVENTOS\n")
                 f.write("="*60 + "\n\n")
-                
-                for entry in self.log_entries:
+
+                for entry in self.iter_entries():
                     f.write(f"[{entry['timestamp']}] [{entry['level']}] {entry['message']}\n")
-                    
+
             return True
         except Exception as e:
             print(f"Error al guardar log: {str(e)}")
             return False
-            
+
     def get_entries(self):
-        """Obtener todas las entradas del log"""
-        return self.log_entries
+        """Obtener las últimas entradas del log (búfer en memoria)"""
+        with self.lock:
+            records = list(self.log_entries)
+        return [_entry(record) for record in records]
+
+    def iter_entries(self):
+        """Todas las entradas del log: se leen del archivo JSON-lines si el log está en disco"""
+        if not self.jsonl_path or not self.flush():
+            yield from self.get_entries()
+            return
+        with open(self.jsonl_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Última línea incompleta tras un corte
+                    continue
+
+
+def _entry(record):
+    timestamp, level, message = record
+    return {
+        "timestamp": datetime.fromtimestamp(timestamp).strftime(TIMESTAMP_FORMAT),
+        "level": level,
+        "message": message
+    }
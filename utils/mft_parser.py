@@ -0,0 +1,586 @@
+"""
+Analizador nativo de la $MFT de NTFS
+Decodifica registros FILE por lotes (NumPy) desde capturas selectivas o imágenes completas, sin TSK
+"""
+
+import os
+import csv
+import struct
+import hashlib
+
+import numpy as np
+
+from utils.evidence_reader import get_evidence_size, iter_chunk_ranges, map_region
+from utils.job_control import get_job_control
+
+
+# 'FILE' en little endian
+FILE_MAGIC = 0x454C4946
+
+# Las secuencias de actualización (fixups) protegen cada bloque de 512 bytes del registro
+FIXUP_STRIDE = 512
+
+DEFAULT_RECORD_SIZE = 1024
+DEFAULT_BATCH_RECORDS = 16384
+SCAN_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Diferencia entre FILETIME (1601) y epoch Unix, en intervalos de 100 ns
+FILETIME_EPOCH = 116444736000000000
+
+# Fechas posteriores al año 9999 provienen de registros dañados
+MAX_TIMESTAMP = 253402300799
+
+ROOT_RECORD = 5
+RECORD_MASK = 0xFFFFFFFFFFFF
+
+ATTR_STANDARD_INFORMATION = 0x10
+ATTR_FILE_NAME = 0x30
+ATTR_DATA = 0x80
+ATTR_END = 0xFFFFFFFF
+
+NAMESPACE_DOS = 2
+
+FLAG_IN_USE = 0x01
+FLAG_DIRECTORY = 0x02
+
+_ATTR_HEADER = struct.Struct("<IIBBH")
+_RESIDENT_VALUE = struct.Struct("<IH")
+_FILE_NAME_VALUE = struct.Struct("<QQQQQ8xQ8xBB")
+_UINT64 = struct.Struct("<Q")
+
+MFT_FIELDS = [
+    "record", "sequence", "in_use", "directory", "parent_record", "parent_sequence", "path",
+    "size", "si_created", "si_modified", "si_mft_modified", "si_accessed",
+    "fn_created", "fn_modified", "fn_mft_modified", "fn_accessed",
+    "links", "ads", "resident_size", "resident_file", "resident_md5",
+]
+
+
+def _header_dtype(record_size):
+    """Cabecera fija del registro FILE como arreglo estructurado (un elemento por registro)"""
+    return np.dtype({
+        "names": ["signature", "usa_offset", "usa_count", "lsn", "sequence", "link_count",
+                  "attrs_offset", "flags", "bytes_in_use", "base_record", "record_number"],
+        "formats": ["<u4", "<u2", "<u2", "<u8", "<u2", "<u2", "<u2", "<u2", "<u4", "<u8", "<u4"],
+        "offsets": [0, 4, 6, 8, 16, 18, 20, 22, 24, 32, 44],
+        "itemsize": record_size,
+    })
+
+
+def filetime_to_unix(value):
+    """FILETIME -> epoch Unix (0 si no hay fecha); acepta escalares o arreglos"""
+    if isinstance(value, np.ndarray):
+        value = value.astype(np.int64)
+        seconds = (value - FILETIME_EPOCH) // 10000000
+        return np.where((value > FILETIME_EPOCH) & (seconds <= MAX_TIMESTAMP), seconds, 0)
+    seconds = (value - FILETIME_EPOCH) // 10000000
+    return seconds if value > FILETIME_EPOCH and seconds <= MAX_TIMESTAMP else 0
+
+
+def format_times(timestamps):
+    """Arreglo de epoch -> texto UTC para el CSV (vacío si no hay fecha)"""
+    text = np.datetime_as_string(timestamps.astype("datetime64[s]"), unit="s")
+    text = np.char.replace(text, "T", " ")
+    return np.where(timestamps > 0, text, "")
+
+
+def _gather(data, rows, offsets, width):
+    """Copiar `width` bytes desde un offset distinto en cada fila"""
+    columns = np.clip(offsets[:, None] + np.arange(width), 0, data.shape[1] - 1)
+    return np.ascontiguousarray(data[rows[:, None], columns])
+
+
+def _unpack(fmt, buffer, offset):
+    """struct.unpack_from sobre rebanadas (admite vistas de imágenes divididas)"""
+    return struct.unpack(fmt, buffer[offset:offset + struct.calcsize(fmt)])
+
+
+def find_ntfs_volumes(buffer, size):
+    """Localizar sectores de arranque NTFS en el volumen, el MBR o la GPT"""
+    candidates = [0]
+
+    if size >= 512 and buffer[510:512] == b"\x55\xaa":
+        for index in range(4):
+            entry = 446 + index * 16
+            partition_type = buffer[entry + 4]
+            start = _unpack("<I", buffer, entry + 8)[0]
+            if start and partition_type != 0xEE:
+                candidates.append(start * 512)
+
+    if size >= 1024 and buffer[512:520] == b"EFI PART":
+        entries_lba, count, entry_size = _unpack("<QII", buffer, 512 + 72)
+        for index in range(min(count, 128)):
+            entry = entries_lba * 512 + index * entry_size
+            if entry_size < 48 or entry + 48 > size:
+                break
+            first_lba = _unpack("<Q", buffer, entry + 32)[0]
+            if first_lba:
+                candidates.append(first_lba * 512)
+
+    volumes = []
+    for offset in sorted(set(candidates)):
+        if offset + 512 > size or buffer[offset + 3:offset + 11] != b"NTFS    ":
+            continue
+        bytes_per_sector = _unpack("<H", buffer, offset + 0x0B)[0]
+        sectors_per_cluster = buffer[offset + 0x0D]
+        if sectors_per_cluster > 0x80:
+            # Clústeres grandes: el valor se codifica como 2^(256 - n)
+            sectors_per_cluster = 1 << (256 - sectors_per_cluster)
+        mft_lcn = _unpack("<Q", buffer, offset + 0x30)[0]
+        clusters_per_record = _unpack("<b", buffer, offset + 0x40)[0]
+
+        if bytes_per_sector not in (512, 1024, 2048, 4096) or not sectors_per_cluster:
+            continue
+        cluster_size = bytes_per_sector * sectors_per_cluster
+        if clusters_per_record > 0:
+            record_size = clusters_per_record * cluster_size
+        else:
+            record_size = 1 << -clusters_per_record
+
+        volumes.append({
+            "offset": offset,
+            "cluster_size": cluster_size,
+            "record_size": record_size,
+            "mft_offset": offset + mft_lcn * cluster_size,
+        })
+    return volumes
+
+
+def parse_data_runs(data, pos, end):
+    """Decodificar la lista de runs de un atributo no residente -> [(lcn, clústeres)]"""
+    runs = []
+    lcn = 0
+    while pos < end:
+        header = data[pos]
+        if header == 0:
+            break
+        length_size = header & 0x0F
+        offset_size = header >> 4
+        if not length_size or pos + 1 + length_size + offset_size > end:
+            break
+        length = int.from_bytes(data[pos + 1:pos + 1 + length_size], "little")
+        if offset_size:
+            lcn += int.from_bytes(data[pos + 1 + length_size:pos + 1 + length_size + offset_size], "little", signed=True)
+            runs.append((lcn, length))
+        else:
+            runs.append((None, length))  # Run disperso (sparse)
+        pos += 1 + length_size + offset_size
+    return runs
+
+
+def decode_batch(raw, record_size):
+    """Aplicar fixups y decodificar las cabeceras de un lote de registros
+
+    Devuelve (datos, cabeceras, válidos, tiempos_SI). Las operaciones sobre las
+    cabeceras, los fixups y las marcas de $STANDARD_INFORMATION son vectoriales;
+    solo los atributos variables se recorren después registro a registro.
+    """
+    data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, record_size).copy()
+    headers = data.view(_header_dtype(record_size)).reshape(-1)
+    sectors = record_size // FIXUP_STRIDE
+
+    valid = (
+        (headers["signature"] == FILE_MAGIC)
+        & (headers["usa_count"] == sectors + 1)
+        & (headers["attrs_offset"] >= 24)
+        & (headers["attrs_offset"] < record_size - 8)
+        & (headers["bytes_in_use"] <= record_size)
+    )
+
+    for usa_offset in np.unique(headers["usa_offset"][valid]):
+        rows = np.nonzero(valid & (headers["usa_offset"] == usa_offset))[0]
+        usa_offset = int(usa_offset)
+        if usa_offset + 2 * (sectors + 1) > record_size:
+            valid[rows] = False
+            continue
+        usn = data[rows, usa_offset:usa_offset + 2]
+        for sector in range(1, sectors + 1):
+            end = sector * FIXUP_STRIDE
+            # Una marca distinta al USN indica una escritura incompleta (registro corrupto)
+            torn = ~(data[rows, end - 2:end] == usn).all(axis=1)
+            valid[rows[torn]] = False
+            data[rows, end - 2:end] = data[rows, usa_offset + 2 * sector:usa_offset + 2 * sector + 2]
+
+    si_times = np.zeros((len(data), 4), dtype=np.int64)
+    rows = np.nonzero(valid)[0]
+    if len(rows):
+        attrs = headers["attrs_offset"][rows].astype(np.int64)
+        first = _gather(data, rows, attrs, 24)
+        attr_type = first[:, 0:4].copy().view("<u4").reshape(-1)
+        resident = first[:, 8] == 0
+        value_offset = first[:, 20:22].copy().view("<u2").reshape(-1).astype(np.int64)
+        has_si = (attr_type == ATTR_STANDARD_INFORMATION) & resident & (attrs + value_offset + 32 <= record_size)
+        si_rows = rows[has_si]
+        if len(si_rows):
+            times = _gather(data, si_rows, attrs[has_si] + value_offset[has_si], 32).view("<u8")
+            si_times[si_rows] = filetime_to_unix(times)
+
+    return data, headers, valid, si_times
+
+
+def parse_attributes(record, attrs_offset, bytes_in_use):
+    """Recorrer los atributos variables: nombres ($FILE_NAME) y contenido ($DATA)"""
+    names = []
+    data_size = None
+    resident = None
+    ads = []
+
+    pos = attrs_offset
+    end = bytes_in_use if bytes_in_use < len(record) else len(record)
+    while pos + 16 <= end:
+        attr_type, length, non_resident, name_length, name_offset = _ATTR_HEADER.unpack_from(record, pos)
+        if attr_type == ATTR_END or length < 16 or pos + length > end:
+            break
+        attr_name = ""
+        if name_length:
+            attr_name = record[pos + name_offset:pos + name_offset + name_length * 2].decode("utf-16-le", "replace")
+
+        if not non_resident:
+            value_length, value_offset = _RESIDENT_VALUE.unpack_from(record, pos + 16)
+            value = record[pos + value_offset:pos + value_offset + value_length]
+        else:
+            value = None
+
+        if attr_type == ATTR_FILE_NAME and value is not None and len(value) >= 66:
+            (parent_ref, created, modified, mft_modified, accessed,
+             real_size, length_chars, namespace) = _FILE_NAME_VALUE.unpack_from(value)
+            names.append({
+                "name": value[66:66 + length_chars * 2].decode("utf-16-le", "replace"),
+                "namespace": namespace,
+                "parent_record": parent_ref & RECORD_MASK,
+                "parent_sequence": parent_ref >> 48,
+                # FILETIME sin convertir: se convierten por lotes al escribir el listado
+                "times": (created, modified, mft_modified, accessed),
+                "size": real_size,
+            })
+        elif attr_type == ATTR_DATA:
+            if attr_name:
+                ads.append(attr_name)
+            elif value is not None:
+                data_size = len(value)
+                resident = value
+            elif pos + 56 <= end:
+                data_size = _UINT64.unpack_from(record, pos + 48)[0]
+
+        pos += length
+
+    return names, data_size, resident, ads
+
+
+class MFTParser:
+    def __init__(self, app, output_folder, batch_records=DEFAULT_BATCH_RECORDS, max_resident_files=10000):
+        self.app = app
+        self.output_folder = output_folder
+        self.batch_records = batch_records
+        self.max_resident_files = max_resident_files
+        self.jobs = get_job_control(app)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def parse_image(self, path):
+        """Analizar la $MFT de cada volumen NTFS de una imagen o captura
+
+        Si la $MFT del volumen está dentro del archivo se recorre siguiendo sus
+        runs; si no (captura parcial), se buscan firmas FILE alineadas a 512 bytes.
+        """
+        size = get_evidence_size(path)
+        name = os.path.basename(path)
+
+        with map_region(path, 0, size) as (mapped, _):
+            volumes = find_ntfs_volumes(mapped, size)
+
+            results = []
+            for volume in volumes:
+                extents = self._mft_extents(mapped, size, volume)
+                if extents:
+                    self.app.add_log(
+                        f"  Volumen NTFS en offset {volume['offset']}: $MFT en {volume['mft_offset']} ({len(extents)} fragmentos)",
+                        "INFO"
+                    )
+                    records = self._parse_extents(mapped, extents, volume["record_size"])
+                    mode = "mft"
+                else:
+                    self.app.add_log(
+                        f"  Volumen NTFS en offset {volume['offset']}: $MFT fuera de la captura, buscando registros FILE",
+                        "INFO"
+                    )
+                    records = self._scan_records(path, volume["offset"], size, volume["record_size"])
+                    mode = "scan"
+                results.append(self._write_results(name, volume["offset"], records, mode))
+
+            if not volumes:
+                self.app.add_log("  Sin sector de arranque NTFS; buscando registros FILE en toda la captura", "INFO")
+                records = self._scan_records(path, 0, size, DEFAULT_RECORD_SIZE)
+                if records:
+                    results.append(self._write_results(name, 0, records, "scan"))
+
+        return {"source": name, "size_bytes": size, "volumes": results}
+
+    def _mft_extents(self, mapped, size, volume):
+        """Ubicar la $MFT completa a partir de los runs de su propio registro (registro 0)"""
+        record_size = volume["record_size"]
+        start = volume["mft_offset"]
+        if record_size % FIXUP_STRIDE or start + record_size > size:
+            return []
+
+        data, headers, valid, _ = decode_batch(mapped[start:start + record_size], record_size)
+        if not valid[0]:
+            return []
+        record = data[0].tobytes()
+
+        pos = int(headers["attrs_offset"][0])
+        end = int(headers["bytes_in_use"][0])
+        while pos + 16 <= end:
+            attr_type, length = struct.unpack_from("<II", record, pos)
+            if attr_type == ATTR_END or length < 16:
+                break
+            if attr_type == ATTR_DATA and record[pos + 8] and not record[pos + 9]:
+                runs_offset = struct.unpack_from("<H", record, pos + 32)[0]
+                real_size = struct.unpack_from("<Q", record, pos + 48)[0]
+                runs = parse_data_runs(record, pos + runs_offset, pos + length)
+
+                extents = []
+                first_record = 0
+                remaining = real_size
+                for lcn, clusters in runs:
+                    length_bytes = min(clusters * volume["cluster_size"], remaining)
+                    if lcn is not None:
+                        offset = volume["offset"] + lcn * volume["cluster_size"]
+                        # Capturas parciales: solo la parte de la $MFT que está en el archivo
+                        available = max(0, min(length_bytes, size - offset))
+                        available -= available % record_size
+                        if available:
+                            extents.append((offset, available, first_record))
+                    first_record += length_bytes // record_size
+                    remaining -= length_bytes
+                    if remaining <= 0:
+                        break
+                return extents
+            pos += length
+        return []
+
+    def _parse_extents(self, mapped, extents, record_size):
+        """Decodificar la $MFT por lotes; el número de registro es su posición en la $MFT"""
+        records = {}
+        for offset, length, first_record in extents:
+            for start in range(0, length, self.batch_records * record_size):
+                self.jobs.check()
+                count = min(self.batch_records * record_size, length - start)
+                raw = mapped[offset + start:offset + start + count]
+                self._collect(raw, record_size, first_record + start // record_size, records)
+        return records
+
+    def _scan_records(self, path, start, size, record_size):
+        """Buscar registros FILE sueltos (la $MFT no está completa en la captura)"""
+        records = {}
+        for offset, length, scan_length in iter_chunk_ranges(size - start, SCAN_CHUNK_SIZE, record_size):
+            self.jobs.check()
+            offset += start
+            with map_region(path, offset, scan_length) as (mapped, delta):
+                words = np.frombuffer(mapped, dtype="<u4", count=scan_length // 4, offset=delta)
+                hits = np.nonzero(words[::FIXUP_STRIDE // 4] == FILE_MAGIC)[0] * FIXUP_STRIDE
+                hits = hits[(hits < length) & (hits + record_size <= scan_length)]
+                if len(hits):
+                    # Vista de todas las posiciones alineadas a 512 bytes; se copian solo las filas con firma
+                    raw = np.frombuffer(mapped, dtype=np.uint8, count=scan_length, offset=delta)
+                    positions = np.lib.stride_tricks.as_strided(
+                        raw, shape=((scan_length - record_size) // FIXUP_STRIDE + 1, record_size),
+                        strides=(FIXUP_STRIDE, 1), writeable=False,
+                    )
+                    for first in range(0, len(hits), self.batch_records):
+                        batch = positions[hits[first:first + self.batch_records] // FIXUP_STRIDE]
+                        self._collect(batch.tobytes(), record_size, None, records)
+                    del raw, positions
+                del words
+        return records
+
+    def _collect(self, raw, record_size, first_record, records):
+        """Decodificar un lote y fusionar los registros (incluidos los de extensión)"""
+        data, headers, valid, si_times = decode_batch(raw, record_size)
+
+        # Columnas como listas de Python: acceder campo a campo al arreglo estructurado es lento
+        rows = np.nonzero(valid)[0]
+        blob = data.tobytes()
+        fields = {name: headers[name][rows].tolist() for name in (
+            "usa_offset", "record_number", "attrs_offset", "bytes_in_use", "base_record", "lsn", "sequence", "flags")}
+        si_rows = si_times[rows].tolist()
+
+        for position, index in enumerate(rows.tolist()):
+            if first_record is not None:
+                number = first_record + index
+            elif fields["usa_offset"][position] >= 48:
+                # Fuera de la $MFT el número sale de la cabecera (NTFS 3.1+)
+                number = fields["record_number"][position]
+            else:
+                continue
+
+            names, data_size, resident, ads = parse_attributes(
+                blob[index * record_size:(index + 1) * record_size],
+                fields["attrs_offset"][position], fields["bytes_in_use"][position],
+            )
+
+            base = fields["base_record"][position] & RECORD_MASK
+            if base:
+                # Registro de extensión: sus atributos pertenecen al registro base
+                entry = records.setdefault(base, self._empty_entry())
+                entry["names"] += names
+                entry["ads"] += ads
+                if data_size is not None and entry["size"] is None:
+                    entry["size"] = data_size
+                continue
+
+            entry = records.get(number)
+            lsn = fields["lsn"][position]
+            if entry and entry["lsn"] > lsn:
+                # Copia más antigua del mismo registro (p. ej. $MFTMirr)
+                continue
+            extension_names = entry["names"] if entry and entry["sequence"] is None else []
+            extension_ads = entry["ads"] if entry and entry["sequence"] is None else []
+
+            records[number] = {
+                "sequence": fields["sequence"][position],
+                "lsn": lsn,
+                "in_use": bool(fields["flags"][position] & FLAG_IN_USE),
+                "directory": bool(fields["flags"][position] & FLAG_DIRECTORY),
+                "si_times": si_rows[position],
+                "names": names + extension_names,
+                "size": data_size,
+                "resident": resident,
+                "ads": ads + extension_ads,
+            }
+
+    def _empty_entry(self):
+        """Marcador para registros base aún no vistos"""
+        return {"sequence": None, "lsn": -1, "in_use": False, "directory": False,
+                "si_times": [0, 0, 0, 0], "names": [], "size": None, "resident": None, "ads": []}
+
+    def _primary_name(self, entry):
+        """Nombre Win32/POSIX del registro (el nombre DOS 8.3 solo si no hay otro)"""
+        names = entry["names"]
+        if not names:
+            return None
+        for candidate in names:
+            if candidate["namespace"] != NAMESPACE_DOS:
+                return candidate
+        return names[0]
+
+    def _resolve_paths(self, records):
+        """Reconstruir rutas completas siguiendo las referencias al directorio padre"""
+        primary = {number: self._primary_name(entry) for number, entry in records.items()}
+        paths = {ROOT_RECORD: ""}
+
+        def resolve(number):
+            chain = []
+            current = number
+            while current not in paths:
+                name = primary.get(current)
+                if name is None or len(chain) > 256:
+                    paths[current] = "/$OrphanFiles"
+                    break
+                chain.append((current, name["name"]))
+                parent = name["parent_record"]
+                parent_entry = records.get(parent)
+                if parent != current and parent in paths and parent_entry is None:
+                    # La raíz (registro 5) puede faltar en una captura parcial
+                    current = parent
+                    continue
+                if parent == current or parent_entry is None or (
+                        parent_entry["sequence"] is not None and name["parent_sequence"]
+                        and parent_entry["sequence"] != name["parent_sequence"]):
+                    # Padre desconocido o reutilizado: el archivo queda huérfano
+                    paths[current] = "/$OrphanFiles/" + name["name"]
+                    chain.pop()
+                    break
+                current = parent
+            for child, child_name in reversed(chain):
+                parent = primary[child]["parent_record"]
+                paths[child] = paths[parent] + "/" + child_name
+            return paths[number]
+
+        return {number: (resolve(number) or "/") for number in records if primary.get(number)}, primary
+
+    def _write_results(self, image_name, volume_offset, records, mode):
+        """Escribir listado CSV, bodyfile compatible con fls y datos residentes"""
+        suffix = f"{image_name}_o{volume_offset // 512}"
+        csv_path = os.path.join(self.output_folder, f"mft_{suffix}.csv")
+        body_path = os.path.join(self.output_folder, f"mft_{suffix}.body")
+        resident_folder = os.path.join(self.output_folder, f"resident_{suffix}")
+
+        paths, primary = self._resolve_paths(records)
+        numbers = [number for number in sorted(paths) if records[number]["sequence"] is not None]
+        counts = {"records": 0, "in_use": 0, "deleted": 0, "directories": 0, "orphans": 0, "resident_files": 0}
+
+        # Conversión y formato de las 8 marcas de tiempo por registro en una sola pasada vectorial
+        si_times = np.array([records[number]["si_times"] for number in numbers], dtype=np.int64).reshape(-1, 4)
+        fn_raw = np.array([primary[number]["times"] for number in numbers], dtype=np.uint64).reshape(-1, 4)
+        fn_times = filetime_to_unix(fn_raw)
+        si_text = format_times(si_times).tolist()
+        fn_text = format_times(fn_times).tolist()
+        si_times = si_times.tolist()
+        fn_times = fn_times.tolist()
+
+        with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file, \
+                open(body_path, 'w', encoding='utf-8') as body_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(MFT_FIELDS)
+
+            for row, number in enumerate(numbers):
+                entry = records[number]
+                name = primary[number]
+                path = paths[number]
+                size = entry["size"] if entry["size"] is not None else name["size"]
+                si_created, si_modified, si_mft_modified, si_accessed = si_times[row]
+                fn_created, fn_modified, fn_mft_modified, fn_accessed = fn_times[row]
+
+                counts["records"] += 1
+                counts["in_use" if entry["in_use"] else "deleted"] += 1
+                counts["directories"] += entry["directory"]
+                counts["orphans"] += path.startswith("/$OrphanFiles")
+
+                resident_file = ""
+                # MD5 del contenido residente: permite clasificarlo con los conjuntos de hashes
+                md5 = hashlib.md5(entry["resident"]).hexdigest() if entry["resident"] and not entry["directory"] else ""
+                if (entry["resident"] and not entry["directory"]
+                        and counts["resident_files"] < self.max_resident_files):
+                    os.makedirs(resident_folder, exist_ok=True)
+                    safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in name["name"])[:80]
+                    resident_file = f"{number}_{safe_name}"
+                    with open(os.path.join(resident_folder, resident_file), 'wb') as out:
+                        out.write(entry["resident"])
+                    counts["resident_files"] += 1
+
+                writer.writerow([
+                    number, entry["sequence"], int(entry["in_use"]), int(entry["directory"]),
+                    name["parent_record"], name["parent_sequence"], path, size,
+                    *si_text[row], *fn_text[row],
+                    len([n for n in entry["names"] if n["namespace"] != NAMESPACE_DOS]),
+                    ";".join(entry["ads"]),
+                    len(entry["resident"]) if entry["resident"] else 0,
+                    resident_file,
+                    md5,
+                ])
+
+                # Mismo formato que fls -m: el catálogo y la línea de tiempo lo consumen igual
+                mode_text = "d/drwxrwxrwx" if entry["directory"] else "r/rrwxrwxrwx"
+                flag = "" if entry["in_use"] else " (deleted)"
+                inode = f"{number}-{entry['sequence']}"
+                body_file.write(
+                    f"{md5 or 0}|{path}{flag}|{inode}|{mode_text}|0|0|{size}|"
+                    f"{si_accessed}|{si_modified}|{si_mft_modified}|{si_created}\n"
+                )
+                body_file.write(
+                    f"0|{path} ($FILE_NAME)|{inode}|{mode_text}|0|0|{name['size']}|"
+                    f"{fn_accessed}|{fn_modified}|{fn_mft_modified}|{fn_created}\n"
+                )
+
+        self.app.add_log(
+            f"  {counts['records']} registros ({counts['deleted']} eliminados, {counts['orphans']} huérfanos) -> {os.path.basename(csv_path)}",
+            "INFO"
+        )
+        return {
+            "volume_offset": volume_offset,
+            "mode": mode,
+            "csv": csv_path,
+            "bodyfile": body_path,
+            "resident_folder": resident_folder if counts["resident_files"] else None,
+            **counts,
+        }
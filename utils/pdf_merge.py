@@ -0,0 +1,62 @@
+"""
+Unión de las secciones del reporte PDF
+Concatena los PDF renderizados por separado, estampa la numeración de páginas y agrega marcadores (pypdf)
+"""
+
+import io
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = PdfWriter = None
+
+
+def merge_available():
+    """Indica si pypdf está instalado"""
+    return PdfWriter is not None
+
+
+def count_pages(path):
+    """Cantidad de páginas de un PDF"""
+    return len(PdfReader(path).pages)
+
+
+def page_number_overlay(total, pagesize=letter):
+    """PDF en memoria con el pie "Página N de M" en cada una de las `total` páginas"""
+    buffer = io.BytesIO()
+    overlay = canvas.Canvas(buffer, pagesize=pagesize)
+    width = pagesize[0]
+    for number in range(1, total + 1):
+        overlay.setFont("Helvetica", 8)
+        overlay.drawRightString(width - 72, 24, f"Página {number} de {total}")
+        overlay.showPage()
+    overlay.save()
+    buffer.seek(0)
+    return buffer
+
+
+def merge_sections(paths, output, outline=(), unnumbered=1):
+    """Unir los PDF en orden, numerar las páginas y crear los marcadores
+
+    `outline` son pares (título, página) con la página contada desde 1.
+    Las primeras `unnumbered` páginas (portada) quedan sin número.
+    Devuelve el total de páginas.
+    """
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+
+    total = len(writer.pages)
+    overlay = PdfReader(page_number_overlay(total))
+    for index in range(unnumbered, total):
+        writer.pages[index].merge_page(overlay.pages[index])
+
+    for title, page in outline:
+        writer.add_outline_item(title, page - 1)
+
+    with open(output, 'wb') as f:
+        writer.write(f)
+    return total
@@ -0,0 +1,368 @@
+"""
+Recuperación (carving) de ejecutables PE desde volcados de memoria
+Busca cabeceras MZ/PE, valida la tabla de secciones y reconstruye la imagen
+"""
+
+import os
+import csv
+import json
+import struct
+import hashlib
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.evidence_reader import DEFAULT_CHUNK_SIZE, get_evidence_size, iter_chunk_ranges, map_region
+from utils.job_control import get_job_control
+
+
+# Solape entre bloques: suficiente para validar cabecera y tabla de secciones
+HEADER_WINDOW = 8192
+
+# Tamaño máximo de una imagen reconstruida
+MAX_IMAGE_SIZE = 256 * 1024 * 1024
+
+PAGE_SIZE = 4096
+
+_MACHINES = {
+    0x014c: "x86",
+    0x8664: "x64",
+    0x01c0: "ARM",
+    0x01c4: "ARMv7",
+    0xaa64: "ARM64",
+    0x0200: "IA64",
+}
+
+IMAGE_FILE_DLL = 0x2000
+IMAGE_SUBSYSTEM_NATIVE = 1
+
+MANIFEST_FIELDS = [
+    "file", "offset", "layout", "status", "size", "machine", "type", "timestamp",
+    "sections", "export_name", "zero_pages", "md5", "sha256", "duplicate_of",
+]
+
+
+def parse_pe_header(data, pos=0, end=None):
+    """Validar y decodificar una cabecera PE; devuelve None si no es válida"""
+    end = len(data) if end is None else end
+    if pos + 0x40 > end or data[pos:pos + 2] != b"MZ":
+        return None
+
+    e_lfanew = struct.unpack_from("<I", data, pos + 0x3c)[0]
+    if e_lfanew < 0x40 or e_lfanew > 0x1000:
+        return None
+
+    pe = pos + e_lfanew
+    if pe + 24 > end or data[pe:pe + 4] != b"PE\0\0":
+        return None
+
+    machine, section_count, timestamp, _, _, optional_size, characteristics = struct.unpack_from("<HHIIIHH", data, pe + 4)
+    if machine not in _MACHINES or not 1 <= section_count <= 96:
+        return None
+
+    optional = pe + 24
+    section_table = optional + optional_size
+    if section_table + section_count * 40 > end:
+        return None
+
+    magic = struct.unpack_from("<H", data, optional)[0]
+    if magic == 0x10b and optional_size >= 0xe0:
+        image_base = struct.unpack_from("<I", data, optional + 28)[0]
+        directories = optional + 96
+    elif magic == 0x20b and optional_size >= 0xf0:
+        image_base = struct.unpack_from("<Q", data, optional + 24)[0]
+        directories = optional + 112
+    else:
+        return None
+
+    section_alignment, file_alignment = struct.unpack_from("<II", data, optional + 32)
+    size_of_image, size_of_headers = struct.unpack_from("<II", data, optional + 56)
+    subsystem = struct.unpack_from("<H", data, optional + 68)[0]
+    directory_count = struct.unpack_from("<I", data, directories - 4)[0]
+
+    if file_alignment == 0 or file_alignment & (file_alignment - 1) or file_alignment > 0x10000:
+        return None
+    if section_alignment < file_alignment and section_alignment >= PAGE_SIZE:
+        return None
+    if not 0 < size_of_headers <= size_of_image <= MAX_IMAGE_SIZE:
+        return None
+
+    sections = []
+    previous_va = -1
+    slack = max(section_alignment, PAGE_SIZE)
+    for index in range(section_count):
+        entry = section_table + index * 40
+        name = data[entry:entry + 8].rstrip(b"\0").decode("latin-1", "replace")
+        virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from("<IIII", data, entry + 8)
+        flags = struct.unpack_from("<I", data, entry + 36)[0]
+
+        if virtual_address <= previous_va or virtual_address + min(virtual_size, raw_size or virtual_size) > size_of_image + slack:
+            return None
+        if raw_size and raw_pointer + raw_size > MAX_IMAGE_SIZE:
+            return None
+        previous_va = virtual_address
+
+        sections.append({
+            "name": name,
+            "virtual_size": virtual_size,
+            "virtual_address": virtual_address,
+            "raw_size": raw_size,
+            "raw_pointer": raw_pointer,
+            "characteristics": flags,
+        })
+
+    export_rva = 0
+    if directory_count > 0 and directories + 8 <= end:
+        export_rva = struct.unpack_from("<I", data, directories)[0]
+
+    return {
+        "machine": _MACHINES[machine],
+        "timestamp": timestamp,
+        "characteristics": characteristics,
+        "pe32_plus": magic == 0x20b,
+        "image_base": image_base,
+        "section_alignment": section_alignment,
+        "file_alignment": file_alignment,
+        "size_of_image": size_of_image,
+        "size_of_headers": size_of_headers,
+        "subsystem": subsystem,
+        "export_rva": export_rva,
+        "sections": sections,
+    }
+
+
+def _scan_pe_chunk(task):
+    """Buscar cabeceras PE válidas en un bloque (proceso de trabajo)"""
+    path, offset, length, scan_length = task
+    candidates = []
+
+    with map_region(path, offset, scan_length) as (buffer, start):
+        owned_end = start + length
+        scan_end = start + scan_length
+        position = buffer.find(b"MZ", start, owned_end)
+
+        while position != -1:
+            header = parse_pe_header(buffer, position, scan_end)
+            if header:
+                header["offset"] = offset + position - start
+                candidates.append(header)
+            position = buffer.find(b"MZ", position + 1, owned_end)
+
+    return candidates
+
+
+class PECarver:
+    def __init__(self, app, output_folder, max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_files=20000, batch_size=64):
+        self.app = app
+        self.output_folder = output_folder
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.jobs = get_job_control(app)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def carve(self, dump_path):
+        """Escanear el volcado en paralelo y extraer cada ejecutable válido"""
+        total_size = get_evidence_size(dump_path)
+        source = os.path.basename(dump_path)
+        manifest_csv = os.path.join(self.output_folder, "manifest.csv")
+        manifest_json = os.path.join(self.output_folder, "manifest.json")
+
+        entries = []
+        seen_hashes = {}
+        tasks = (
+            (dump_path, offset, length, scan_length)
+            for offset, length, scan_length in iter_chunk_ranges(total_size, self.chunk_size, HEADER_WINDOW)
+        )
+
+        with open(manifest_csv, 'w', newline='', encoding='utf-8') as csv_file, \
+                map_region(dump_path, 0, total_size) as (dump, _), \
+                ThreadPoolExecutor(max_workers=min(4, self.max_workers)) as writers:
+            writer = csv.DictWriter(csv_file, fieldnames=MANIFEST_FIELDS)
+            writer.writeheader()
+
+            def handle(candidates):
+                # Lotes: reconstrucción, hash y escritura concurrentes
+                for start in range(0, len(candidates), self.batch_size):
+                    if len(entries) >= self.max_files:
+                        return
+                    batch = candidates[start:start + self.batch_size][:self.max_files - len(entries)]
+                    for entry in writers.map(lambda header: self._carve_one(dump, total_size, header, source), batch):
+                        if entry is None:
+                            continue
+                        if entry["sha256"] in seen_hashes:
+                            entry["duplicate_of"] = seen_hashes[entry["sha256"]]
+                            os.remove(os.path.join(self.output_folder, entry["file"]))
+                        else:
+                            seen_hashes[entry["sha256"]] = entry["file"]
+                        writer.writerow(entry)
+                        entries.append(entry)
+
+            in_flight = set()
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                for task in tasks:
+                    self.jobs.check()
+                    in_flight.add(executor.submit(_scan_pe_chunk, task))
+                    if len(in_flight) >= self.max_workers * 2:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            handle(future.result())
+                for future in in_flight:
+                    handle(future.result())
+
+        entries.sort(key=lambda entry: entry["offset"])
+        summary = {
+            "source": source,
+            "carved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "total_found": len(entries),
+            "unique": len(seen_hashes),
+            "truncated_by_limit": len(entries) >= self.max_files,
+            "output_folder": self.output_folder,
+            "files": entries,
+        }
+        with open(manifest_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+
+        return summary
+
+    def _carve_one(self, dump, dump_size, header, source):
+        """Reconstruir, guardar y calcular hashes de un ejecutable"""
+        try:
+            return self._carve_image(dump, dump_size, header)
+        except (OSError, ValueError, struct.error) as e:
+            self.app.add_log(f"  No se pudo recuperar PE en 0x{header['offset']:x} ({source}): {str(e)}", "WARNING")
+            return None
+
+    def _carve_image(self, dump, dump_size, header):
+        """Escribir la imagen reconstruida y armar su entrada del manifiesto"""
+        offset = header["offset"]
+        layout = self._detect_layout(dump, dump_size, header)
+        image, complete = self._reconstruct(dump, dump_size, header, layout)
+
+        kind = "exe"
+        if header["characteristics"] & IMAGE_FILE_DLL:
+            kind = "dll"
+        elif header["subsystem"] == IMAGE_SUBSYSTEM_NATIVE:
+            kind = "sys"
+
+        filename = f"carved_{offset:012x}_{layout}.{kind}"
+        with open(os.path.join(self.output_folder, filename), 'wb') as f:
+            f.write(image)
+
+        zero_page = bytes(PAGE_SIZE)
+        zero_pages = sum(
+            1 for page in range(0, len(image), PAGE_SIZE)
+            if image[page:page + PAGE_SIZE] == zero_page[:len(image[page:page + PAGE_SIZE])]
+        )
+
+        return {
+            "file": filename,
+            "offset": offset,
+            "layout": layout,
+            "status": "completo" if complete else "truncado",
+            "size": len(image),
+            "machine": header["machine"],
+            "type": kind,
+            "timestamp": datetime.fromtimestamp(header["timestamp"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "sections": ",".join(section["name"] for section in header["sections"]),
+            "export_name": self._export_name(image, header),
+            "zero_pages": zero_pages,
+            "md5": hashlib.md5(image).hexdigest(),
+            "sha256": hashlib.sha256(image).hexdigest(),
+            "duplicate_of": "",
+        }
+
+    def _detect_layout(self, dump, dump_size, header):
+        """Determinar si la imagen está mapeada en memoria ('mem') o en formato de archivo ('file')"""
+        offset = header["offset"]
+        if offset % PAGE_SIZE:
+            return "file"
+
+        for section in header["sections"]:
+            if not section["raw_size"] or section["raw_pointer"] == section["virtual_address"]:
+                continue
+            sample = min(512, section["raw_size"])
+            as_memory = dump[offset + section["virtual_address"]:offset + section["virtual_address"] + sample]
+            as_file = dump[offset + section["raw_pointer"]:offset + section["raw_pointer"] + sample]
+            if not as_memory:
+                return "file"
+            return "mem" if as_memory.count(0) < as_file.count(0) else "file"
+
+        return "mem"
+
+    def _reconstruct(self, dump, dump_size, header, layout):
+        """Reconstruir el archivo PE a partir de su representación en el volcado
+
+        Devuelve el contenido (bytes o bytearray, sin copias adicionales) y si quedó completo.
+        """
+        offset = header["offset"]
+        sections = header["sections"]
+        file_size = max(
+            [header["size_of_headers"]] + [s["raw_pointer"] + s["raw_size"] for s in sections if s["raw_size"]]
+        )
+        file_size = min(file_size, MAX_IMAGE_SIZE)
+
+        if layout == "file":
+            available = min(file_size, dump_size - offset)
+            return bytes(dump[offset:offset + available]), available == file_size
+
+        # Imagen mapeada: llevar cada sección de su dirección virtual a su posición en disco.
+        # El tamaño lo fijan las secciones presentes en el volcado, no lo que declara el encabezado.
+        complete = True
+        headers_size = min(header["size_of_headers"], file_size, dump_size - offset)
+        copies = []
+        for section in sections:
+            if not section["raw_size"]:
+                continue
+            length = section["raw_size"]
+            if section["virtual_size"]:
+                length = min(length, max(section["virtual_size"], 0))
+            source = offset + section["virtual_address"]
+            available = max(0, min(length, dump_size - source))
+            target = section["raw_pointer"]
+            if target + available > file_size:
+                available = max(0, file_size - target)
+            if available < length:
+                complete = False
+            if available:
+                copies.append((target, source, available))
+
+        image = bytearray(max([headers_size] + [target + available for target, _, available in copies]))
+        image[:headers_size] = dump[offset:offset + headers_size]
+        for target, source, available in copies:
+            image[target:target + available] = dump[source:source + available]
+
+        return image, complete
+
+    def _export_name(self, image, header):
+        """Leer el nombre interno del módulo desde el directorio de exportaciones"""
+        try:
+            rva = header["export_rva"]
+            if not rva:
+                return ""
+            directory = self._rva_to_offset(header, rva)
+            if directory is None or directory + 40 > len(image):
+                return ""
+            name_offset = self._rva_to_offset(header, struct.unpack_from("<I", image, directory + 12)[0])
+            if name_offset is None:
+                return ""
+            end = image.find(b"\0", name_offset, name_offset + 256)
+            if end == -1:
+                return ""
+            name = image[name_offset:end].decode("latin-1")
+            return name if name.isprintable() else ""
+        except struct.error:
+            return ""
+
+    def _rva_to_offset(self, header, rva):
+        """Traducir una RVA a offset dentro del archivo reconstruido"""
+        if rva < header["size_of_headers"]:
+            return rva
+        for section in header["sections"]:
+            start = section["virtual_address"]
+            if start <= rva < start + max(section["virtual_size"], section["raw_size"]):
+                delta = rva - start
+                if delta < section["raw_size"]:
+                    return section["raw_pointer"] + delta
+        return None
@@ -0,0 +1,412 @@
+"""
+Apéndices del reporte con todos los hallazgos
+Las filas se leen por lotes desde los archivos de resultados (salidas de Volatility, CSV, catálogo SQLite)
+y se entregan a ReportLab como tablas LongTable de tamaño fijo, de modo que la memoria no crece con la evidencia
+"""
+
+import os
+import csv
+from datetime import datetime, timezone
+
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.lib.units import inch
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import LongTable, TableStyle, Preformatted, Paragraph, Spacer, PageBreakIfNotEmpty
+
+from utils.fs_catalog import FileSystemCatalog
+from utils.tracing import TRACE_FILE, trace_rows
+
+
+# Filas por tabla: ReportLab parte cada tabla página a página, con tablas cortas el costo es lineal
+APPENDIX_BATCH_ROWS = 400
+
+# Líneas por bloque de texto preformateado (hashes, cadena de custodia)
+TEXT_BATCH_LINES = 120
+
+# Filas por parte al renderizar un apéndice largo en varios procesos
+APPENDIX_PART_ROWS = 4000
+
+# Flowables que se mantienen generados por adelantado
+STREAM_LOOKAHEAD = 8
+
+# Ancho útil de la página carta con márgenes de 72 pt
+PAGE_WIDTH = 6.5 * inch
+
+TABLE_FONT_SIZE = 6
+
+# Ancho de un carácter de Helvetica respecto del tamaño de fuente (cifras y mayúsculas, con margen)
+CHAR_WIDTH_RATIO = 0.6
+
+# Peso relativo de las columnas conocidas de Volatility (las demás pesan 1)
+VOLATILITY_COLUMN_WEIGHTS = {
+    "Args": 6, "ImageFileName": 2, "Process": 2, "Owner": 1.5, "Offset": 1.5, "Offset(V)": 1.5,
+    "LocalAddr": 2, "ForeignAddr": 2, "Local Address": 2, "Foreign Address": 2,
+    "CreateTime": 2, "ExitTime": 2, "Created": 2,
+}
+
+APPENDIX_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), HexColor('#00d9ff')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), TABLE_FONT_SIZE),
+    ('LEADING', (0, 0), (-1, -1), TABLE_FONT_SIZE + 1),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f0f0f0')])
+])
+
+
+class FlowableStream(list):
+    """Lista de flowables que se completa a demanda desde un generador
+
+    SimpleDocTemplate.build consume la lista por el frente y consulta len() en cada vuelta;
+    aquí len() repone elementos, por lo que solo hay unos pocos flowables vivos a la vez.
+    """
+
+    def __init__(self, head, tail, lookahead=STREAM_LOOKAHEAD):
+        super().__init__(head)
+        self.tail = iter(tail)
+        self.lookahead = lookahead
+
+    def __len__(self):
+        while self.tail is not None and super().__len__() < self.lookahead:
+            try:
+                self.append(next(self.tail))
+            except StopIteration:
+                self.tail = None
+        return super().__len__()
+
+
+class Appendix:
+    """Un apéndice: título, descripción, encabezados y filas leídas en streaming
+
+    `rows` es una función que devuelve un iterable; se invoca al renderizar, no al armar
+    el índice de apéndices. `widths` son proporciones del ancho de página. Sin encabezados,
+    las filas son líneas de texto preformateado. `parts` reparte el apéndice en partes:
+    cada elemento son los argumentos (inicio, fin) con los que `rows` lee solo esa parte
+    (offsets en bytes o ids del catálogo), sin recorrer las anteriores. `sources` son
+    los archivos de los que se leen las filas.
+    """
+
+    def __init__(self, key, title, description, rows, header=None, widths=None, total=None, parts=None, sources=()):
+        self.key = key
+        self.title = title
+        self.description = description
+        self.rows = rows
+        self.header = header
+        self.widths = widths
+        self.total = total
+        self.parts = list(parts or [])
+        self.sources = list(sources)
+        self.letter = ""
+
+    @property
+    def label(self):
+        return f"Apéndice {self.letter}"
+
+    def part_count(self):
+        """Cantidad de partes (al menos una)"""
+        return max(1, len(self.parts))
+
+    def part_rows(self, part):
+        """Filas de una parte, leídas desde su posición"""
+        if not self.parts:
+            return self.rows()
+        return self.rows(*self.parts[part])
+
+
+def wrap_cell(value, width):
+    """Cortar el texto en líneas del ancho de la columna (las celdas de texto plano no ajustan solas)"""
+    text = "" if value is None else str(value)
+    chars = max(4, int((width - 4) / (TABLE_FONT_SIZE * CHAR_WIDTH_RATIO)))
+    if len(text) <= chars and "\n" not in text:
+        return text
+    lines = []
+    for line in text.splitlines() or [""]:
+        lines += [line[i:i + chars] for i in range(0, max(1, len(line)), chars)]
+    return "\n".join(lines)
+
+
+def iter_batches(rows, size):
+    """Agrupar un iterable en listas de `size` elementos"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def appendix_flowables(appendices, heading_style, normal_style, part=None, batch_rows=APPENDIX_BATCH_ROWS):
+    """Generar los flowables de los apéndices sin materializar sus filas
+
+    Con `part` solo se generan las filas de esa parte; el título va en la primera.
+    """
+    mono_style = ParagraphStyle('AppendixMono', parent=normal_style, fontName='Courier', fontSize=7, leading=8)
+    for appendix in appendices:
+        yield PageBreakIfNotEmpty()
+        if not part:
+            yield Paragraph(f"{appendix.label.upper()}. {appendix.title.upper()}", heading_style)
+            description = appendix.description
+            if appendix.total is not None:
+                description += f" ({appendix.total} registros)"
+            yield Paragraph(description, normal_style)
+            yield Spacer(1, 0.1*inch)
+
+        rows = appendix.rows() if part is None else appendix.part_rows(part)
+        count = 0
+        if appendix.header:
+            widths = [PAGE_WIDTH * ratio / sum(appendix.widths) for ratio in appendix.widths]
+            for batch in iter_batches(rows, batch_rows):
+                data = [[wrap_cell(name, width) for name, width in zip(appendix.header, widths)]]
+                for row in batch:
+                    data.append([wrap_cell(value, width) for value, width in zip(row, widths)])
+                count += len(batch)
+                table = LongTable(data, colWidths=widths, repeatRows=1)
+                table.setStyle(APPENDIX_TABLE_STYLE)
+                yield table
+        else:
+            for batch in iter_batches(rows, TEXT_BATCH_LINES):
+                count += len(batch)
+                yield Preformatted("\n".join(batch), mono_style, maxLineLength=110, newLineChars="")
+
+        if not count and not part:
+            yield Paragraph("Sin registros", normal_style)
+
+
+def text_lines(path, start=0, stop=None):
+    """Líneas de un archivo de texto, sin cargarlo completo; `start`/`stop` en bytes (de line_ranges)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            if stop is not None and position >= stop:
+                break
+            position += len(line)
+            yield line.decode('utf-8', errors='replace').rstrip("\r\n")
+
+
+def line_ranges(path, every=APPENDIX_PART_ROWS, stop_at=None):
+    """Tramos de `every` líneas como (inicio, fin) en bytes, calculados en una sola lectura
+
+    Con `stop_at` el contenido termina en la primera línea que empieza así. Cada parte de un
+    apéndice lee su tramo con seek en lugar de recorrer el archivo desde el principio.
+    """
+    starts = [0]
+    count = 0
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if stop_at and line.startswith(stop_at):
+                break
+            count += 1
+            position += len(line)
+            if count % every == 0:
+                starts.append(position)
+    return [(start, end) for start, end in zip(starts, starts[1:] + [position]) if end > start]
+
+
+def volatility_header(path):
+    """Columnas de la salida tabular de un plugin de Volatility"""
+    for line in text_lines(path):
+        if _is_volatility_banner(line):
+            continue
+        return line.split("\t") if "\t" in line else line.split()
+    return []
+
+
+def volatility_rows(path, columns, start=0, stop=None):
+    """Filas de la salida de Volatility (tabuladas en Volatility 3, por espacios en la simulada)
+
+    Las partes posteriores a la primera empiezan después del encabezado.
+    """
+    header_seen = start > 0
+    for line in text_lines(path, start, stop):
+        if line.startswith("ERRORS:"):
+            break
+        if _is_volatility_banner(line):
+            continue
+        if not header_seen:
+            header_seen = True
+            continue
+        values = line.split("\t") if "\t" in line else line.split(None, columns - 1)
+        yield (values + [""] * columns)[:columns]
+
+
+def _is_volatility_banner(line):
+    stripped = line.strip()
+    return not stripped or stripped.startswith(("Volatility 3 Framework", "Progress:", "*"))
+
+
+def csv_rows(path, fields, start=0, stop=None):
+    """Columnas elegidas de un CSV con encabezado (un registro por línea)"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    lines = text_lines(path, start, stop)
+    if start == 0:
+        next(lines, None)
+    for row in csv.DictReader(lines, fieldnames=header):
+        yield [row.get(field, "") for field in fields]
+
+
+def histogram_rows(path, start=0, stop=None):
+    """Histograma de características: frecuencia, característica, primer y último offset"""
+    for line in text_lines(path, start, stop):
+        if line.startswith("#") or not line:
+            continue
+        count, feature, first_offset, last_offset = (line.split("\t") + ["", "", ""])[:4]
+        yield [count, feature, _hex(first_offset), _hex(last_offset)]
+
+
+def catalog_rows(db_path, start_id=None, stop_id=None):
+    """Archivos del catálogo leídos por lotes desde SQLite (ids [start_id, stop_id))"""
+    catalog = FileSystemCatalog(db_path)
+    try:
+        for image, path, size, mtime, deleted, md5, known in catalog.iter_files(start_id=start_id, stop_id=stop_id):
+            yield [image, path, size, _utc(mtime), "sí" if deleted else "", md5 or "", known or ""]
+    finally:
+        catalog.close()
+
+
+def catalog_ranges(db_path, every=APPENDIX_PART_ROWS):
+    """Tramos de ids del catálogo para repartir su apéndice en partes"""
+    catalog = FileSystemCatalog(db_path)
+    try:
+        return catalog.id_ranges(every)
+    finally:
+        catalog.close()
+
+
+def _hex(value):
+    try:
+        return f"0x{int(value):x}"
+    except ValueError:
+        return value
+
+
+def _utc(timestamp):
+    if not timestamp:
+        return ""
+    try:
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    except (OverflowError, OSError, ValueError):
+        return str(timestamp)
+
+
+def build_appendices(inventory, analysis):
+    """Apéndices disponibles según el inventario de la evidencia, con su letra asignada"""
+    findings = inventory.findings
+    volatility_output = os.path.join(findings, "volatility_output")
+    appendices = []
+
+    volatility_plugins = (
+        ("pslist", "Procesos en ejecución", "Salida completa de Volatility pslist"),
+        ("netscan", "Conexiones de red", "Salida completa de Volatility netscan"),
+        ("cmdline", "Líneas de comando", "Salida completa de Volatility cmdline"),
+    )
+    for module, title, description in volatility_plugins:
+        path = os.path.join(volatility_output, f"{module}.txt")
+        header = volatility_header(path) if inventory.exists(path) else []
+        if header:
+            appendices.append(Appendix(
+                module, title, description,
+                rows=lambda start=0, stop=None, path=path, columns=len(header): volatility_rows(path, columns, start, stop),
+                header=header, widths=[VOLATILITY_COLUMN_WEIGHTS.get(name, 1) for name in header],
+                parts=line_ranges(path, stop_at=b"ERRORS:"), sources=[path],
+            ))
+
+    catalog = analysis.get("catalog", {})
+    catalog_db = os.path.join(findings, "tsk_output", "catalog.db")
+    if catalog.get("total_entries") and inventory.exists(catalog_db):
+        appendices.append(Appendix(
+            "catalog", "Archivos del sistema de archivos", "Catálogo completo (tsk_output/catalog.db), fechas en UTC",
+            rows=lambda start=None, stop=None: catalog_rows(catalog_db, start, stop),
+            header=["Imagen", "Ruta", "Tamaño", "Modificado", "Eliminado", "MD5", "Clasificación"],
+            widths=[1, 4, 0.8, 1.7, 1, 2.9, 1.5], total=catalog["total_entries"],
+            parts=catalog_ranges(catalog_db), sources=[catalog_db],
+        ))
+
+    carved_csv = os.path.join(findings, "carved", "manifest.csv")
+    if inventory.exists(carved_csv):
+        fields = ["file", "offset", "type", "machine", "export_name", "status", "duplicate_of", "sha256"]
+        appendices.append(Appendix(
+            "carved", "Ejecutables recuperados de memoria", "Manifiesto completo (carved/manifest.csv)",
+            rows=lambda start=0, stop=None: csv_rows(carved_csv, fields, start, stop),
+            header=["Archivo", "Offset", "Tipo", "Máquina", "Nombre interno", "Estado", "Duplicado de", "SHA256"],
+            widths=[1.6, 0.9, 0.6, 0.7, 1.2, 0.7, 1.2, 3.2],
+            total=analysis.get("carved", {}).get("total_found"), parts=line_ranges(carved_csv),
+            sources=[carved_csv],
+        ))
+
+    known_csv = os.path.join(findings, "known_files", "classification.csv")
+    if inventory.exists(known_csv):
+        appendices.append(Appendix(
+            "known_files", "Clasificación por conjuntos de hashes", "Coincidencias completas (known_files/classification.csv)",
+            rows=lambda start=0, stop=None: csv_rows(known_csv, ["source", "item", "hash", "category", "hash_set"],
+                                                     start, stop),
+            header=["Origen", "Elemento", "Hash", "Categoría", "Conjunto"],
+            widths=[0.7, 3, 2.6, 0.9, 1], parts=line_ranges(known_csv),
+            sources=[known_csv],
+        ))
+
+    for source in sorted(analysis.get("features", {})):
+        source_folder = os.path.join(findings, "features", source)
+        if not inventory.is_dir(source_folder):
+            continue
+        for name in sorted(inventory.listdir(source_folder)):
+            if not name.endswith("_histogram.txt"):
+                continue
+            scanner = name[:-len("_histogram.txt")]
+            path = os.path.join(source_folder, name)
+            appendices.append(Appendix(
+                f"features:{source}:{scanner}", f"Características {scanner} - {source}",
+                f"Histograma completo (features/{source}/{name})",
+                rows=lambda start=0, stop=None, path=path: histogram_rows(path, start, stop),
+                header=["Frecuencia", "Característica", "Primer offset", "Último offset"],
+                widths=[0.8, 4.5, 1, 1],
+                total=analysis["features"][source].get("scanners", {}).get(scanner, {}).get("unique"),
+                parts=line_ranges(path), sources=[path],
+            ))
+
+    for key, title, path in (
+        ("chain_of_custody", "Cadena de custodia", os.path.join(findings, "hashes", "chain_of_custody.txt")),
+        ("hashes", "Hashes de integridad", os.path.join(findings, "hashes", "hashes.txt")),
+        ("disk_hashes", "Hashes de la captura selectiva de disco", os.path.join(findings, "hashes", "disk_hashes.txt")),
+    ):
+        if inventory.exists(path):
+            # El inventario ya leyó estos archivos para asociar los hashes a cada evidencia
+            lines = inventory.read_text(path).splitlines()
+            appendices.append(Appendix(
+                key, title, f"Contenido completo de Hallazgos/hashes/{os.path.basename(path)}",
+                rows=lambda lines=lines: iter(lines), total=len(lines), sources=[path],
+            ))
+
+    trace_file = os.path.join(findings, *TRACE_FILE.split("/"))
+    if inventory.exists(trace_file):
+        spans = list(trace_rows(trace_file))
+        appendices.append(Appendix(
+            "performance", "Rendimiento",
+            "Etapas medidas (performance/trace.json): tiempos en segundos; memoria, datos procesados y E/S en MB",
+            rows=lambda spans=spans: iter(spans),
+            header=["Etapa", "Tipo", "Inicio", "Duración", "CPU", "CPU hijos", "RSS máx.", "Procesado", "Lectura", "Escritura"],
+            widths=[3.4, 0.9, 0.7, 0.8, 0.7, 0.8, 0.8, 0.9, 0.8, 0.8], total=len(spans), sources=[trace_file],
+        ))
+
+    for index, appendix in enumerate(appendices):
+        appendix.letter = _letter(index)
+    return appendices
+
+
+def _letter(index):
+    """A, B, ..., Z, AA, AB, ..."""
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord("A") + remainder) + label
+    return label
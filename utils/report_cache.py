@@ -0,0 +1,69 @@
+"""
+Caché de secciones del reporte PDF
+Cada sección renderizada se guarda con el digest de sus entradas; al regenerar el reporte
+solo se vuelven a renderizar las secciones cuyas entradas cambiaron
+"""
+
+import os
+import json
+import hashlib
+
+
+INDEX_FILE = "index.json"
+
+
+def digest_inputs(*values):
+    """SHA256 de valores serializables en JSON (el orden de las claves no afecta)"""
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """SHA256 del contenido de un archivo pequeño (notas, código del renderizador); None si no existe"""
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class SectionCache:
+    """PDF de secciones indexados por trabajo (sección y parte) con el digest de sus entradas"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self.used = set()
+
+    def path(self, digest):
+        return os.path.join(self.folder, f"{digest}.pdf")
+
+    def lookup(self, job_id, digest):
+        """Páginas de la sección guardada con ese digest; None si hay que renderizarla"""
+        entry = self.index.get(job_id)
+        self.used.add(digest)
+        if entry and entry["digest"] == digest and os.path.exists(self.path(digest)):
+            return entry["pages"]
+        return None
+
+    def store(self, job_id, digest, pages):
+        """Registrar una sección recién renderizada en `path(digest)`"""
+        self.index[job_id] = {"digest": digest, "pages": pages}
+        self.used.add(digest)
+
+    def save(self, job_ids):
+        """Guardar el índice y borrar los PDF que ya no corresponden a ninguna sección"""
+        self.index = {job_id: entry for job_id, entry in self.index.items() if job_id in job_ids}
+        for name in os.listdir(self.folder):
+            if name.endswith(".pdf") and name[:-4] not in self.used:
+                os.remove(os.path.join(self.folder, name))
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1)
@@ -0,0 +1,301 @@
+"""
+Exportación del reporte a HTML, JSON y CSV
+Los tres formatos se generan desde el modelo del reporte (utils/report_model.py) y leen las filas
+de los apéndices en streaming, igual que el PDF: la memoria no crece con la cantidad de hallazgos
+"""
+
+import os
+import re
+import csv
+import html
+import json
+from datetime import datetime
+
+from utils.entropy_map import heat_strip, heat_color
+
+
+# Filas por página en las tablas de apéndices del HTML (paginadas en el navegador)
+HTML_PAGE_ROWS = 100
+
+FONT_TAG = re.compile(r"<font([^>]*)>")
+FONT_ATTRIBUTE = re.compile(r"(\w+)\s*=\s*['\"]([^'\"]*)['\"]")
+LINE_BREAK = re.compile(r"<br\s*/?>")
+TAG = re.compile(r"<[^>]+>")
+
+HTML_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; font-size: 14px; margin: 0 auto; max-width: 1100px; padding: 0 24px 48px; color: #222; }
+h1 { color: #00d9ff; text-align: center; margin-top: 48px; }
+h2 { color: #00d9ff; border-bottom: 1px solid #ddd; padding-bottom: 4px; margin-top: 36px; }
+h3 { margin-top: 24px; }
+nav { background: #f6f6f6; padding: 8px 16px; margin: 24px 0; }
+nav a { display: block; padding: 2px 0; color: #0077aa; text-decoration: none; }
+#search { position: sticky; top: 0; background: #fff; padding: 8px 0; border-bottom: 1px solid #ddd; }
+#search input { width: 100%; font-size: 14px; padding: 6px; box-sizing: border-box; }
+table { border-collapse: collapse; margin: 8px 0; }
+td, th { border: 1px solid #999; padding: 3px 6px; text-align: left; vertical-align: top; }
+table.data th { background: #00d9ff; color: #fff; }
+table.data tr:nth-child(even) td { background: #f0f0f0; }
+table.fields th { background: #888; color: #000; }
+table.appendix { width: 100%; font-size: 12px; }
+table.appendix td { word-break: break-all; }
+.mono, table.text td { font-family: Courier, monospace; white-space: pre-wrap; }
+.pager { margin: 8px 0; }
+.pager button { min-width: 32px; }
+.strip { display: flex; height: 24px; margin: 6px 0; }
+.strip div { flex: 1; }
+"""
+
+# Búsqueda y paginación de los apéndices: las filas van como JSON dentro de cada sección
+HTML_SCRIPT = """
+const PAGE_ROWS = %d;
+const appendices = Array.from(document.querySelectorAll("section.appendix")).map(section => {
+  const rows = JSON.parse(section.querySelector("script.rows").textContent);
+  return { section, rows, matches: rows, page: 0, text: null };
+});
+function render(appendix) {
+  const pages = Math.max(1, Math.ceil(appendix.matches.length / PAGE_ROWS));
+  appendix.page = Math.min(Math.max(appendix.page, 0), pages - 1);
+  const start = appendix.page * PAGE_ROWS;
+  const body = appendix.section.querySelector("tbody");
+  body.replaceChildren(...appendix.matches.slice(start, start + PAGE_ROWS).map(row => {
+    const tr = document.createElement("tr");
+    for (const value of row) {
+      const td = document.createElement("td");
+      td.textContent = value;
+      tr.appendChild(td);
+    }
+    return tr;
+  }));
+  appendix.section.querySelector(".page").textContent =
+    `Página ${appendix.page + 1} de ${pages} (${appendix.matches.length} de ${appendix.rows.length} filas)`;
+}
+function search(query) {
+  query = query.trim().toLowerCase();
+  for (const appendix of appendices) {
+    if (query && appendix.text === null) {
+      appendix.text = appendix.rows.map(row => row.join("\\t").toLowerCase());
+    }
+    appendix.matches = query ? appendix.rows.filter((row, index) => appendix.text[index].includes(query)) : appendix.rows;
+    appendix.page = 0;
+    render(appendix);
+  }
+}
+for (const appendix of appendices) {
+  appendix.section.querySelectorAll(".pager button").forEach(button => button.addEventListener("click", () => {
+    appendix.page += Number(button.dataset.step);
+    render(appendix);
+  }));
+  render(appendix);
+}
+let pending = null;
+document.querySelector("#search input").addEventListener("input", event => {
+  clearTimeout(pending);
+  pending = setTimeout(() => search(event.target.value), 250);
+});
+""" % HTML_PAGE_ROWS
+
+
+def markup_text(text):
+    """Texto plano a partir del marcado de ReportLab (saltos de línea conservados)"""
+    text = html.unescape(TAG.sub("", LINE_BREAK.sub("\n", text)))
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def markup_html(text):
+    """Traducir el marcado de ReportLab a HTML (<font> pasa a <span> con estilo)"""
+    def font(match):
+        styles = []
+        for name, value in FONT_ATTRIBUTE.findall(match.group(1)):
+            if name == "face":
+                styles.append("font-family: Courier, monospace" if value.lower().startswith("courier") else f"font-family: {value}")
+            elif name == "size":
+                styles.append(f"font-size: {value}pt")
+            elif name == "color":
+                styles.append(f"color: {value}")
+        return f"<span style=\"{'; '.join(styles)}\">"
+    return FONT_TAG.sub(font, text).replace("</font>", "</span>")
+
+
+def cell_text(value):
+    return "" if value is None else str(value)
+
+
+def appendix_rows(appendix):
+    """Filas de un apéndice como listas (los apéndices de texto tienen una columna por línea)"""
+    for row in appendix.rows():
+        yield list(row) if appendix.header else [row]
+
+
+def _file_name(value):
+    return re.sub(r"[^\w.-]+", "_", value).strip("_")
+
+
+def table_header(block):
+    """Encabezado y filas de una tabla del modelo"""
+    if block["style"] == "data":
+        return block["rows"][0], block["rows"][1:]
+    return ["Campo", "Valor"], block["rows"]
+
+
+def export_json(model, path):
+    """Reporte en JSON para ingesta en el SIEM: resultados consolidados, secciones y apéndices completos
+
+    El archivo se escribe por partes; las filas de los apéndices no se cargan en memoria.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("{\n")
+        f.write(f'"generator": "ForensicFlow v1.0",\n"generated": {json.dumps(datetime.now().isoformat())},\n')
+        f.write(f'"evidence_folder": {json.dumps(model.evidence_folder, ensure_ascii=False)},\n')
+        f.write(f'"analysis": {json.dumps(model.report_data.get("analysis", {}), ensure_ascii=False, default=str)},\n')
+
+        f.write('"sections": [')
+        for index, (key, title, blocks) in enumerate(model.sections()):
+            section = {"key": key, "title": title, "blocks": [json_block(block) for block in blocks if block["type"] != "spacer"]}
+            f.write(("," if index else "") + "\n" + json.dumps(section, ensure_ascii=False, default=str))
+        f.write("\n],\n")
+
+        f.write('"appendices": [')
+        for index, appendix in enumerate(model.appendices.values()):
+            metadata = {
+                "key": appendix.key, "letter": appendix.letter, "title": appendix.title,
+                "description": appendix.description, "total": appendix.total, "header": appendix.header
+            }
+            f.write(("," if index else "") + "\n" + json.dumps(metadata, ensure_ascii=False)[:-1] + ', "rows": [')
+            for count, row in enumerate(appendix.rows()):
+                f.write(("," if count else "") + "\n" + json.dumps(row, ensure_ascii=False, default=str))
+            f.write("\n]}")
+        f.write("\n]\n}\n")
+    return path
+
+
+def json_block(block):
+    """Bloque del modelo con el texto sin marcado"""
+    if block["type"] in ("heading", "paragraph"):
+        return dict(block, text=markup_text(block["text"]))
+    if block["type"] == "table":
+        header, rows = table_header(block)
+        return {"type": "table", "name": block["name"], "header": header, "rows": rows}
+    return block
+
+
+def export_csv(model, folder):
+    """Un CSV por tabla: las de cada sección y las de los apéndices tabulares
+
+    Devuelve la lista de archivos generados.
+    """
+    os.makedirs(folder, exist_ok=True)
+    written = []
+    for key, _, blocks in model.sections():
+        for block in blocks:
+            if block["type"] != "table":
+                continue
+            header, rows = table_header(block)
+            written.append(write_csv(os.path.join(folder, f"{key}_{_file_name(block['name'])}.csv"), header, rows))
+    for appendix in model.appendices.values():
+        if appendix.header:
+            path = os.path.join(folder, f"apendice_{appendix.letter}_{_file_name(appendix.key)}.csv")
+            written.append(write_csv(path, appendix.header, appendix.rows()))
+    return written
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([cell_text(value) for value in row])
+    return path
+
+
+def export_html(model, path):
+    """Reporte HTML estático de un solo archivo
+
+    Las secciones se escriben como HTML; las filas de cada apéndice van como JSON en la página y se
+    buscan y paginan en el navegador, sin servidor.
+    """
+    sections = list(model.sections())
+    appendices = list(model.appendices.values())
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html>\n<html lang=\"es\">\n<head>\n<meta charset=\"utf-8\">\n")
+        f.write(f"<title>Reporte forense - {html.escape(os.path.basename(model.evidence_folder))}</title>\n")
+        f.write(f"<style>{HTML_STYLE}</style>\n</head>\n<body>\n")
+
+        # Índice
+        f.write("<nav>\n")
+        for key, title, _ in sections:
+            if title:
+                f.write(f"<a href=\"#{key}\">{html.escape(title)}</a>\n")
+        for appendix in appendices:
+            f.write(f"<a href=\"#apendice-{appendix.letter}\">{html.escape(appendix.label)}: {html.escape(appendix.title)}</a>\n")
+        f.write("</nav>\n")
+
+        for key, _, blocks in sections:
+            f.write(f"<section id=\"{key}\">\n")
+            for block in blocks:
+                f.write(html_block(block))
+            f.write("</section>\n")
+
+        if appendices:
+            f.write("<div id=\"search\"><input type=\"search\" placeholder=\"Buscar en los apéndices...\"></div>\n")
+        for appendix in appendices:
+            write_html_appendix(f, appendix)
+
+        f.write(f"<script>{HTML_SCRIPT}</script>\n</body>\n</html>\n")
+    return path
+
+
+def html_block(block):
+    """HTML de un bloque del modelo"""
+    kind = block["type"]
+    if kind == "heading":
+        level = block["level"] + 1
+        return f"<h{level}>{markup_html(block['text'])}</h{level}>\n"
+    if kind == "paragraph":
+        return f"<p>{markup_html(block['text'])}</p>\n"
+    if kind == "table":
+        header, rows = table_header(block)
+        lines = [f"<table class=\"{block['style']}\">"]
+        if block["style"] == "data":
+            lines.append("<tr>" + "".join(f"<th>{html.escape(cell_text(value))}</th>" for value in header) + "</tr>")
+            for row in rows:
+                lines.append("<tr>" + "".join(f"<td>{html.escape(cell_text(value))}</td>" for value in row) + "</tr>")
+        else:
+            for label, value in rows:
+                lines.append(f"<tr><th>{html.escape(cell_text(label))}</th><td>{html.escape(cell_text(value))}</td></tr>")
+        lines.append("</table>\n")
+        return "\n".join(lines)
+    if kind == "entropy_strip" and os.path.exists(block["map"]):
+        cells = "".join(
+            "<div style=\"background: rgb({}, {}, {})\"></div>".format(*(int(channel * 255) for channel in heat_color(*cell)))
+            for cell in heat_strip(block["map"])
+        )
+        return f"<div class=\"strip\">{cells}</div>\n"
+    return ""
+
+
+def write_html_appendix(f, appendix):
+    """Sección de un apéndice: tabla vacía que llena el script con las filas de la página actual"""
+    description = appendix.description
+    if appendix.total is not None:
+        description += f" ({appendix.total} registros)"
+    header = "".join(f"<th>{html.escape(name)}</th>" for name in appendix.header or [])
+    f.write(f"<section class=\"appendix\" id=\"apendice-{appendix.letter}\">\n")
+    f.write(f"<h2>{html.escape(appendix.label)}: {html.escape(appendix.title)}</h2>\n<p>{html.escape(description)}</p>\n")
+    f.write("<div class=\"pager\"><button data-step=\"-1\">&#9664;</button> <span class=\"page\"></span> "
+            "<button data-step=\"1\">&#9654;</button></div>\n")
+    f.write(f"<table class=\"appendix data{'' if appendix.header else ' text'}\"><thead><tr>{header}</tr></thead><tbody></tbody></table>\n")
+    # "</" cerraría el <script> antes de tiempo
+    f.write("<script type=\"application/json\" class=\"rows\">[")
+    for count, row in enumerate(appendix_rows(appendix)):
+        line = json.dumps([cell_text(value) for value in row], ensure_ascii=False).replace("</", "<\\/")
+        f.write(("," if count else "") + "\n" + line)
+    f.write("\n]</script>\n</section>\n")
+
+
+# Exportadores por formato: función(modelo, ruta de salida)
+EXPORTERS = {
+    "html": export_html,
+    "json": export_json,
+    "csv": export_csv,
+}
@@ -0,0 +1,733 @@
+"""
+Modelo del reporte
+Cada sección se describe con bloques independientes del formato (títulos, párrafos, tablas, franjas de entropía);
+los renderizadores PDF, HTML, JSON y CSV parten del mismo modelo. El texto de los párrafos usa el marcado
+de ReportLab (<b>, <br/>, <font>), que el renderizador HTML traduce y los exportadores de datos eliminan.
+"""
+
+import os
+import json
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from utils.rescue_imager import RescueMap, BAD_SECTOR, FINISHED, NON_TRIED, NON_TRIMMED
+
+
+# Secciones del reporte en orden: (clave, título en el índice, método que arma sus bloques)
+REPORT_SECTIONS = (
+    ("cover", None, "build_cover_section"),
+    ("summary", "1-3. Resumen ejecutivo, información del caso y evidencia", "build_summary_section"),
+    ("custody", "4. Cadena de custodia y captura de disco", "build_custody_section"),
+    ("memory", "5.1-5.4 Memoria: captura, sistema, Volatility y ejecutables", "build_memory_section"),
+    ("disk", "5.5-5.8 Disco: TSK, características, hashes conocidos y entropía", "build_disk_section"),
+    ("timeline", "5.9 Línea de tiempo multi-fuente", "build_timeline_section"),
+    ("closing", "6-8. Recomendaciones, Autopsy y apéndices", "build_closing_section"),
+)
+
+# Dentro de Reporte: notas del analista por sección (<clave>.txt)
+NOTES_FOLDER = "notas"
+
+
+def heading(text, level=1):
+    """Título: 0 = portada, 1 = sección, 2 = subsección"""
+    return {"type": "heading", "level": level, "text": text}
+
+
+def paragraph(text, style="normal"):
+    """Párrafo con marcado de ReportLab; `plain` es el estilo sin justificar de la portada"""
+    return {"type": "paragraph", "style": style, "text": text}
+
+
+def spacer(height):
+    """Espacio vertical en pulgadas"""
+    return {"type": "spacer", "height": height}
+
+
+def table(name, rows, widths, font_size=9, style="data"):
+    """Tabla; en `data` la primera fila es el encabezado, en `fields` la primera columna son etiquetas
+
+    `name` identifica la tabla al exportarla (CSV), `widths` son anchos de columna en pulgadas.
+    """
+    return {"type": "table", "name": name, "style": style, "rows": rows, "widths": widths, "font_size": font_size}
+
+
+def entropy_strip(map_path):
+    """Franja de calor con el mapa de entropía de una evidencia"""
+    return {"type": "entropy_strip", "map": map_path}
+
+
+def note_path(evidence_folder, key):
+    """Archivo de notas del analista de una sección"""
+    return os.path.join(evidence_folder, "Reporte", NOTES_FOLDER, f"{key}.txt")
+
+
+class ReportModel:
+    """Contenido del reporte armado a partir de los resultados consolidados y los apéndices"""
+
+    def __init__(self, evidence_folder, report_data, appendices):
+        self.evidence_folder = evidence_folder
+        self.report_data = report_data
+        self.appendices = appendices
+        # Inventario de Hallazgos armado al consolidar: las secciones no vuelven a listar el disco
+        self.inventory = report_data["inventory"]
+
+    def sections(self):
+        """Secciones en orden: (clave, título en el índice, bloques)"""
+        for key, title, _ in REPORT_SECTIONS:
+            yield key, title, self.section(key)
+
+    def section(self, key):
+        """Bloques de una sección, con las notas del analista al final"""
+        builder = {section: method for section, _, method in REPORT_SECTIONS}[key]
+        return getattr(self, builder)() + self.build_notes(key)
+
+    def build_notes(self, key):
+        """Notas del analista, si las hay"""
+        path = note_path(self.evidence_folder, key)
+        if not os.path.isfile(path):
+            return []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read().strip()
+        if not text:
+            return []
+        return [
+            spacer(0.2),
+            paragraph("<b>Notas del analista:</b>"),
+            paragraph(escape(text).replace('\n', '<br/>'))
+        ]
+
+    def build_cover_section(self):
+        """Portada"""
+        blocks = []
+
+        # === PORTADA ===
+        blocks.append(spacer(2))
+        blocks.append(heading("REPORTE DE ANÁLISIS FORENSE DIGITAL", 0))
+        blocks.append(spacer(0.5))
+        blocks.append(paragraph(f"ForensicFlow v1.0", "plain"))
+        blocks.append(spacer(0.3))
+        blocks.append(paragraph(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", "plain"))
+
+        return blocks
+
+    def build_summary_section(self):
+        """Resumen ejecutivo, información del caso y evidencia recolectada"""
+        blocks = []
+
+        # === RESUMEN EJECUTIVO ===
+        blocks.append(heading("1. RESUMEN EJECUTIVO"))
+        blocks.append(spacer(0.2))
+
+        summary_text = """
+        Este reporte presenta los resultados del análisis forense digital automatizado 
+        realizado mediante ForensicFlow. El análisis incluye la adquisición de memoria volátil, 
+        análisis de procesos, conexiones de red y artefactos del sistema.
+        """
+        blocks.append(paragraph(summary_text))
+        blocks.append(spacer(0.3))
+
+        # === INFORMACIÓN DEL CASO ===
+        blocks.append(heading("2. INFORMACIÓN DEL CASO"))
+        blocks.append(spacer(0.2))
+
+        case_data = [
+            ["Analista:", "ForensicFlow Automated System"],
+            ["Fecha de análisis:", datetime.now().strftime('%d/%m/%Y %H:%M:%S')],
+            ["Ubicación de evidencia:", self.evidence_folder],
+            ["Herramientas utilizadas:", "WinPmem, Volatility 3, TSK"]
+        ]
+
+        blocks.append(table("informacion_caso", case_data, [2, 4], font_size=10, style="fields"))
+        blocks.append(spacer(0.3))
+
+        # === EVIDENCIA RECOLECTADA ===
+        blocks.append(heading("3. EVIDENCIA RECOLECTADA"))
+        blocks.append(spacer(0.2))
+
+        if "evidence_files" in self.report_data:
+            evidence_text = "Archivos de evidencia adquiridos:<br/><br/>"
+            for file in self.report_data["evidence_files"]:
+                # Obtener tamaño del archivo
+                file_path = f"dumps/{file}"
+                if self.inventory.exists(file_path):
+                    size_mb = self.inventory.size(file_path) / (1024**2)
+                    evidence_text += f"• {file} ({size_mb:.2f} MB)<br/>"
+                else:
+                    evidence_text += f"• {file}<br/>"
+            blocks.append(paragraph(evidence_text))
+
+        blocks.append(spacer(0.3))
+
+        return blocks
+
+    def build_custody_section(self):
+        """Hashes de integridad, captura de disco y cadena de custodia"""
+        blocks = []
+
+        # === HASHES DE INTEGRIDAD ===
+        blocks.append(heading("4. CADENA DE CUSTODIA - HASHES"))
+        blocks.append(spacer(0.2))
+
+        if "hashes" in self.appendices:
+            blocks.append(paragraph(
+                f"Los hashes MD5/SHA256 de toda la evidencia adquirida se listan en el {self.appendices['hashes'].label}."))
+
+
+        # === 4.1 CAPTURA DE DISCO Y CHAIN OF CUSTODY ===
+        blocks.append(heading("4.1 Captura de Disco y Cadena de Custodia", 2))
+        blocks.append(spacer(0.1))
+
+        disk_folder = os.path.join(self.evidence_folder, "Hallazgos", "disk_images")
+
+        if self.inventory.is_dir("disk_images"):
+            disk_files = self.inventory.listdir("disk_images")
+
+            if disk_files:
+                # Determinar modo de captura
+                has_complete = any(
+                    name in f for f in disk_files
+                    for name in ('disk_original.dd', 'disk_working_copy.dd', 'disk_original.delta')
+                )
+                has_selective = any(f in ['mbr.bin', 'partition_table.bin', 'boot_sector.bin'] for f in disk_files)
+
+                if has_complete:
+                    blocks.append(paragraph("<b>Modo de Captura:</b> CAPTURA FORENSE COMPLETA"))
+                    blocks.append(spacer(0.1))
+
+                    # Captura incremental: imagen delta enlazada a una adquisición previa
+                    delta_index = os.path.join(disk_folder, "disk_original.delta.json")
+                    if self.inventory.exists(delta_index):
+                        try:
+                            with open(delta_index, 'r', encoding='utf-8') as f:
+                                delta = json.load(f)
+                            delta_info = f"<b>Adquisición incremental:</b> {len(delta['changed_segments'])} de "
+                            delta_info += f"{len(delta['segment_hashes'])} segmentos modificados respecto de la imagen base "
+                            delta_info += f"({os.path.basename(os.path.dirname(os.path.dirname(os.path.dirname(delta['base']))))})"
+                            blocks.append(paragraph(delta_info))
+                            blocks.append(spacer(0.1))
+                        except (OSError, ValueError, KeyError):
+                            pass
+
+                    # Captura tolerante a errores: resumen del mapa de sectores
+                    map_file = os.path.join(disk_folder, "disk_original.map")
+                    original_image = os.path.join(disk_folder, "disk_original.dd")
+                    if self.inventory.exists(map_file) and self.inventory.exists(original_image):
+                        try:
+                            totals = RescueMap.load(map_file, self.inventory.size(original_image)).totals()
+                            unreadable = totals[BAD_SECTOR] + totals[NON_TRIMMED] + totals[NON_TRIED]
+                            map_info = f"<b>Lectura tolerante a errores:</b> {totals[FINISHED]} bytes leídos, "
+                            map_info += f"{unreadable} bytes ilegibles (rellenados con ceros). "
+                            map_info += "Mapa de sectores: disk_images/disk_original.map"
+                            blocks.append(paragraph(map_info))
+                            blocks.append(spacer(0.1))
+                        except (OSError, ValueError, IndexError):
+                            pass
+
+                    # La cadena de custodia completa va en su apéndice
+                    if "chain_of_custody" in self.appendices:
+                        blocks.append(paragraph(
+                            f"<b>Cadena de custodia:</b> registro completo en el {self.appendices['chain_of_custody'].label}"))
+
+                    custody_info = """
+                    <b>Procedimiento Forense Aplicado:</b><br/>
+                    1. Captura bit a bit del disco completo<br/>
+                    2. Cálculo de hash criptográfico (MD5/SHA256) de la imagen original<br/>
+                    3. Protección de la imagen original (solo lectura)<br/>
+                    4. Creación de copia de trabajo verificada<br/>
+                    5. Verificación de integridad mediante comparación de hashes<br/>
+                    6. Análisis realizado ÚNICAMENTE sobre copia de trabajo<br/>
+                    <br/>
+                    <b>Cumplimiento:</b> Este procedimiento cumple con los estándares forenses para preservar la cadena de custodia y garantizar la integridad de la evidencia original.
+                    """
+                    blocks.append(spacer(0.1))
+                    blocks.append(paragraph(custody_info))
+
+                elif has_selective:
+                    blocks.append(paragraph("<b>Modo de Captura:</b> CAPTURA SELECTIVA DE ÁREAS CRÍTICAS"))
+                    blocks.append(spacer(0.1))
+
+                    selective_info = """
+                    <b>Áreas Capturadas:</b><br/>
+                    • <b>MBR (Master Boot Record)</b> - 512 bytes<br/>
+                    • <b>Tabla de Particiones</b> - 64 KB<br/>
+                    • <b>Sector de Arranque y $MFT</b> - 100 MB<br/>
+                    <br/>
+                    <b>Propósito:</b> Captura rápida de áreas críticas del disco que contienen información esencial sobre la estructura del sistema de archivos, particiones y archivos principales.<br/>
+                    <br/>
+                    <b>Integridad:</b> Cada archivo capturado tiene su hash MD5/SHA256 calculado y documentado.
+                    """
+                    blocks.append(paragraph(selective_info))
+
+                    if "disk_hashes" in self.appendices:
+                        blocks.append(spacer(0.1))
+                        blocks.append(paragraph(
+                            f"<b>Hashes de Integridad:</b> ver {self.appendices['disk_hashes'].label}"))
+
+                # Listar archivos capturados
+                blocks.append(spacer(0.1))
+                blocks.append(paragraph(f"<b>Archivos de imagen de disco generados:</b> {len(disk_files)}"))
+                files_text = ""
+                for f in disk_files:
+                    file_path = os.path.join(disk_folder, f)
+                    if self.inventory.exists(file_path):
+                        size_mb = self.inventory.size(file_path) / (1024**2)
+                        if size_mb >= 1024:
+                            size_str = f"{size_mb/1024:.2f} GB"
+                        else:
+                            size_str = f"{size_mb:.2f} MB"
+                        files_text += f"• {f} ({size_str})<br/>"
+                blocks.append(paragraph(files_text))
+
+                # Imágenes EWF (E01): MD5 almacenado frente al recalculado
+                ewf = self.report_data.get("analysis", {}).get("ewf", {})
+                for name, result in ewf.items():
+                    status = {True: "✓ VERIFICADO", False: "✗ NO COINCIDE", None: "sin hash almacenado"}[result.get("verified")]
+                    ewf_info = f"<b>Imagen EWF {name}:</b> {result.get('size', 0) / (1024**3):.2f} GB en "
+                    ewf_info += f"{result.get('segments', 1)} segmentos - {status}<br/>"
+                    ewf_info += f"<font face='Courier' size='7'>MD5 almacenado: {result.get('stored_md5') or '-'}<br/>"
+                    ewf_info += f"MD5 calculado:  {result.get('computed_md5', '-')}</font>"
+                    case = result.get("case") or {}
+                    if case:
+                        ewf_info += f"<br/>Caso: {case.get('c', '-')} - Evidencia: {case.get('n', '-')} - Examinador: {case.get('e', '-')}"
+                    blocks.append(spacer(0.05))
+                    blocks.append(paragraph(ewf_info))
+
+            else:
+                blocks.append(paragraph("No se realizó captura de disco en este análisis"))
+        else:
+            blocks.append(paragraph("No se realizó captura de disco en este análisis"))
+
+        blocks.append(spacer(0.3))
+
+        return blocks
+
+    def build_memory_section(self):
+        """Captura y análisis de memoria, información del sistema y ejecutables recuperados"""
+        blocks = []
+
+        # === HALLAZGOS DEL ANÁLISIS ===
+        blocks.append(heading("5. HALLAZGOS DEL ANÁLISIS"))
+        blocks.append(spacer(0.2))
+
+        # === 5.1 CAPTURA DE MEMORIA (WinPmem) ===
+        blocks.append(heading("5.1 Captura de Memoria Volátil (WinPmem)", 2))
+        blocks.append(spacer(0.1))
+
+        # Información de captura de memoria
+        dumps_folder = os.path.join(self.evidence_folder, "Hallazgos", "dumps")
+        memory_dump = os.path.join(dumps_folder, "memory_dump.raw")
+
+        if self.inventory.exists(memory_dump):
+            dump_size_gb = self.inventory.size(memory_dump) / (1024**3)
+            memory_info = f"""
+            <b>Herramienta:</b> WinPmem v4.0<br/>
+            <b>Archivo generado:</b> memory_dump.raw<br/>
+            <b>Tamaño del volcado:</b> {dump_size_gb:.2f} GB<br/>
+            <b>Estado:</b> Captura exitosa - Evidencia preservada<br/>
+            <b>Tipo:</b> Volcado completo de memoria RAM (formato RAW)<br/>
+            <b>Integridad:</b> Verificada mediante hashes MD5/SHA256<br/>
+            """
+            blocks.append(paragraph(memory_info))
+        else:
+            blocks.append(paragraph("Volcado de memoria simulado utilizado para demostración"))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.2 INFORMACIÓN DEL SISTEMA ===
+        blocks.append(heading("5.2 Información del Sistema Capturada", 2))
+        blocks.append(spacer(0.1))
+
+        # Parsear información básica del system_info.txt
+        system_info_file = os.path.join(dumps_folder, "system_info.txt")
+        if self.inventory.exists(system_info_file):
+            try:
+                content = self.inventory.read_text(system_info_file)
+
+                # Extraer información relevante
+                system_summary = "<b>Comandos ejecutados:</b><br/>"
+                system_summary += "• systeminfo - Información general del sistema<br/>"
+                system_summary += "• wmic process - Lista de procesos en ejecución<br/>"
+                system_summary += "• netstat -ano - Conexiones de red activas<br/>"
+                system_summary += "• tasklist /v - Tareas del sistema detalladas<br/>"
+                system_summary += "• ipconfig /all - Configuración de red completa<br/><br/>"
+
+                # Obtener algunas líneas de systeminfo si están disponibles
+                if "Host Name:" in content:
+                    lines = content.split('\n')
+                    important_info = []
+                    for line in lines:
+                        if any(keyword in line for keyword in ["Host Name:", "OS Name:", "OS Version:", "System Type:"]):
+                            important_info.append(line.strip())
+
+                    if important_info:
+                        system_summary += "<b>Información extraída:</b><br/>"
+                        system_summary += "<font face='Courier' size='8'>"
+                        for info in important_info[:6]:
+                            system_summary += f"{info}<br/>"
+                        system_summary += "</font>"
+
+                blocks.append(paragraph(system_summary))
+            except:
+                blocks.append(paragraph("Información del sistema capturada correctamente"))
+        else:
+            blocks.append(paragraph("No se capturó información adicional del sistema"))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.3 ANÁLISIS DE MEMORIA (Volatility) ===
+        blocks.append(heading("5.3 Análisis de Memoria (Volatility)", 2))
+        blocks.append(spacer(0.1))
+
+        if "analysis" in self.report_data:
+            analysis = self.report_data["analysis"]
+
+            # PROCESOS (pslist)
+            if "pslist" in analysis:
+                pslist_data = analysis['pslist']
+                total_processes = pslist_data.get('total_count', 0)
+                processes = pslist_data.get('processes', [])
+
+                blocks.append(paragraph(f"<b>Procesos en Ejecución:</b> {total_processes} procesos detectados{self.appendix_reference('pslist')}"))
+                blocks.append(spacer(0.1))
+
+                if processes:
+                    # Crear tabla de procesos
+                    process_table_data = [["PID", "Nombre del Proceso"]]
+                    for proc in processes[:15]:  # Primeros 15 procesos
+                        if isinstance(proc, dict):
+                            process_table_data.append([proc.get('pid', '?'), proc.get('name', 'Unknown')])
+                        else:
+                            process_table_data.append(['?', str(proc)])
+
+                    blocks.append(table("procesos", process_table_data, [1, 4], font_size=9))
+                    blocks.append(spacer(0.2))
+
+            # CONEXIONES DE RED (netscan)
+            if "netscan" in analysis:
+                netscan_data = analysis['netscan']
+                total_connections = netscan_data.get('total_count', 0)
+                connections = netscan_data.get('connections', [])
+
+                blocks.append(paragraph(f"<b>Conexiones de Red:</b> {total_connections} conexiones activas detectadas{self.appendix_reference('netscan')}"))
+                blocks.append(spacer(0.1))
+
+                if connections:
+                    conn_text = ""
+                    for i, conn in enumerate(connections[:10], 1):
+                        conn_text += f"{i}. {conn}<br/>"
+                    blocks.append(paragraph(f"<font face='Courier' size='8'>{conn_text}</font>"))
+                    blocks.append(spacer(0.2))
+
+            # LÍNEAS DE COMANDO (cmdline)
+            if "cmdline" in analysis:
+                cmdline_data = analysis['cmdline']
+                cmdlines = cmdline_data.get('cmdlines', [])
+
+                if cmdlines:
+                    blocks.append(paragraph(f"<b>Líneas de Comando de Procesos:</b>{self.appendix_reference('cmdline')}"))
+                    blocks.append(spacer(0.1))
+
+                    cmd_text = ""
+                    for i, cmd in enumerate(cmdlines[:8], 1):
+                        cmd_text += f"{i}. {cmd}<br/>"
+                    blocks.append(paragraph(f"<font face='Courier' size='7'>{cmd_text}</font>"))
+                    blocks.append(spacer(0.2))
+
+            # INFORMACIÓN ADICIONAL
+            blocks.append(paragraph("<b>Módulos Volatility Ejecutados:</b>"))
+            modules_executed = []
+            for key in analysis.keys():
+                if key in ['pslist', 'netscan', 'dlllist', 'cmdline', 'filescan']:
+                    modules_executed.append(f"• {key}")
+            if modules_executed:
+                blocks.append(paragraph("<br/>".join(modules_executed)))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.4 EJECUTABLES RECUPERADOS DE MEMORIA ===
+        blocks.append(heading("5.4 Ejecutables Recuperados de Memoria (Carving PE)", 2))
+        blocks.append(spacer(0.1))
+
+        carved = self.report_data.get("analysis", {}).get("carved", {})
+        if carved:
+            carved_info = f"<b>Volcado analizado:</b> {carved.get('source', '')}<br/>"
+            carved_info += f"<b>Ejecutables recuperados:</b> {carved.get('total_found', 0)} ({carved.get('unique', 0)} únicos)<br/>"
+            carved_info += f"<b>Ubicación:</b> Hallazgos/carved (manifest.json / manifest.csv){self.appendix_reference('carved')}<br/>"
+            blocks.append(paragraph(carved_info))
+            blocks.append(spacer(0.1))
+
+            carved_files = carved.get("files", [])
+            if carved_files:
+                carved_table_data = [["Offset", "Tipo", "Nombre interno", "Estado", "SHA256"]]
+                for entry in carved_files[:15]:
+                    carved_table_data.append([
+                        f"0x{entry.get('offset', 0):x}",
+                        f"{entry.get('type', '')} ({entry.get('machine', '')})",
+                        entry.get("export_name", "") or "-",
+                        entry.get("status", ""),
+                        entry.get("sha256", "")[:32] + "..."
+                    ])
+                blocks.append(table("ejecutables_recuperados", carved_table_data, [0.9, 0.9, 1.3, 0.8, 2.7], font_size=7))
+        else:
+            blocks.append(paragraph("No se recuperaron ejecutables del volcado de memoria"))
+
+        blocks.append(spacer(0.3))
+
+        return blocks
+
+    def build_disk_section(self):
+        """Análisis de disco, características, conjuntos de hashes y entropía"""
+        blocks = []
+
+        # === 5.5 ANÁLISIS DE DISCO (TSK) ===
+        blocks.append(heading("5.5 Análisis de Disco (The Sleuth Kit)", 2))
+        blocks.append(spacer(0.1))
+
+        # Verificar si se ejecutó TSK
+        tsk_output_folder = os.path.join(self.evidence_folder, "Hallazgos", "tsk_output")
+        tsk_results = self.report_data.get("analysis", {}).get("tsk", {})
+        if tsk_results:
+            tsk_files = self.inventory.listdir(tsk_output_folder)
+            tsk_info = f"<b>Herramienta:</b> The Sleuth Kit (TSK)<br/>"
+            tsk_info += f"<b>Archivos generados:</b> {len(tsk_files)} archivos de análisis<br/>"
+            tsk_info += f"<b>Comandos ejecutados:</b><br/>"
+            tsk_info += "• mmls - Información de particiones del disco<br/>"
+            tsk_info += "• fsstat - Información del sistema de archivos por partición<br/>"
+            tsk_info += "• fls - Listado recursivo de archivos por partición (formato bodyfile)<br/>"
+            tsk_info += "• istat - Metadatos del directorio raíz<br/><br/>"
+
+            for image, result in tsk_results.items():
+                tsk_info += f"<b>Imagen:</b> {image}<br/>"
+                for partition in result.get("partitions", []):
+                    size_gb = partition.get("length", 0) * partition.get("sector_size", 512) / (1024**3)
+                    fs_type = partition.get("file_system", "")
+                    tsk_info += f"• Partición {partition.get('slot')} - offset {partition.get('start')} ({size_gb:.2f} GB) {partition.get('description', '')} {fs_type}<br/>"
+                failed = [job for job in result.get("jobs", []) if job.get("status") != "ok"]
+                for job in failed:
+                    tsk_info += f"• <font color='red'>{job.get('tool')} (offset {job.get('offset')}): {job.get('status')}</font><br/>"
+                tsk_info += "<br/>"
+
+            tsk_info += f"<b>Archivos de salida:</b><br/>"
+            for tsk_file in tsk_files[:5]:
+                tsk_info += f"• {tsk_file}<br/>"
+            blocks.append(paragraph(tsk_info))
+        else:
+            blocks.append(paragraph("TSK no fue ejecutado - No se encontraron imágenes de disco (.dd, .img, .E01) o TSK no está instalado"))
+
+        # Listados obtenidos directamente de la $MFT (capturas selectivas o sin TSK)
+        mft_results = self.report_data.get("analysis", {}).get("mft", {})
+        if mft_results:
+            mft_info = "<br/><b>Análisis nativo de la $MFT (sin TSK):</b><br/>"
+            for image, result in mft_results.items():
+                for volume in result.get("volumes", []):
+                    method = "$MFT completa" if volume.get("mode") == "mft" else "búsqueda de registros FILE"
+                    mft_info += f"• {image} (offset {volume.get('volume_offset', 0) // 512}, {method}): "
+                    mft_info += f"{volume.get('records', 0)} registros, {volume.get('deleted', 0)} eliminados, "
+                    mft_info += f"{volume.get('orphans', 0)} huérfanos, {volume.get('resident_files', 0)} archivos residentes<br/>"
+            mft_info += "<b>Ubicación:</b> Hallazgos/mft (listado CSV y bodyfile por volumen)<br/>"
+            blocks.append(paragraph(mft_info))
+
+        catalog = self.report_data.get("analysis", {}).get("catalog", {})
+        if catalog:
+            catalog_info = f"<br/><b>Catálogo de archivos:</b> {catalog.get('total_entries', 0)} entradas "
+            catalog_info += f"({catalog.get('deleted_entries', 0)} eliminadas) - tsk_output/catalog.db{self.appendix_reference('catalog')}<br/>"
+            if catalog.get("known_good_entries") or catalog.get("known_bad_entries"):
+                catalog_info += f"<b>Hashes conocidos:</b> {catalog.get('known_good_entries', 0)} known-good, "
+                catalog_info += f"{catalog.get('known_bad_entries', 0)} known-bad<br/>"
+            extensions = ", ".join(f"{item['ext']} ({item['count']})" for item in catalog.get("top_extensions", []))
+            if extensions:
+                catalog_info += f"<b>Extensiones más frecuentes:</b> {extensions}<br/>"
+            blocks.append(paragraph(catalog_info))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.6 EXTRACCIÓN DE CARACTERÍSTICAS ===
+        blocks.append(heading("5.6 Extracción de Características (URLs, Correos, IPs, Dominios, Carteras)", 2))
+        blocks.append(spacer(0.1))
+
+        features = self.report_data.get("analysis", {}).get("features", {})
+        if features:
+            for source, summary in features.items():
+                scanners = summary.get("scanners", {})
+                totals = ", ".join(
+                    f"{scanner}: {data.get('total', 0)} ({data.get('unique', 0)} únicos)"
+                    for scanner, data in scanners.items() if data.get("total")
+                )
+                blocks.append(paragraph(f"<b>Evidencia:</b> {source}<br/><b>Ocurrencias:</b> {totals or 'Sin coincidencias'}"))
+                blocks.append(spacer(0.1))
+
+                feature_table_data = [["Tipo", "Característica", "Frecuencia", "Primer offset", "Último offset"]]
+                for scanner, data in scanners.items():
+                    for item in data.get("top", [])[:10]:
+                        feature = item.get("feature", "")
+                        if len(feature) > 55:
+                            feature = feature[:52] + "..."
+                        feature_table_data.append([
+                            scanner,
+                            feature,
+                            str(item.get("count", 0)),
+                            f"0x{item.get('first_offset', 0):x}",
+                            f"0x{item.get('last_offset', 0):x}"
+                        ])
+
+                if len(feature_table_data) > 1:
+                    blocks.append(table(f"caracteristicas_{source}", feature_table_data, [0.8, 3.2, 0.8, 0.9, 0.9], font_size=7))
+                blocks.append(spacer(0.2))
+
+            feature_appendices = [appendix.letter for key, appendix in self.appendices.items() if key.startswith("features:")]
+            features_text = "Los histogramas completos se encuentran en la carpeta <b>Hallazgos/features</b>"
+            if feature_appendices:
+                features_text += f" y en los apéndices {feature_appendices[0]} a {feature_appendices[-1]}"
+            blocks.append(paragraph(features_text))
+        else:
+            blocks.append(paragraph("No se ejecutó la extracción de características"))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.7 CLASIFICACIÓN POR CONJUNTOS DE HASHES ===
+        blocks.append(heading("5.7 Clasificación por Conjuntos de Hashes", 2))
+        blocks.append(spacer(0.1))
+
+        known_files = self.report_data.get("analysis", {}).get("known_files", {})
+        if known_files:
+            hash_sets = ", ".join(
+                f"{item['name']} ({item['category']}, {sum(item.get('counts', {}).values())} hashes)" for item in known_files.get("hash_sets", [])
+            )
+            known_info = f"<b>Conjuntos utilizados:</b> {hash_sets}<br/>"
+            known_info += f"<b>Hashes verificados:</b> {known_files.get('checked', 0)}<br/>"
+            known_info += f"<b>Conocidos (known-good):</b> {known_files.get('known_good', 0)} - "
+            known_info += f"<b>Maliciosos (known-bad):</b> {known_files.get('known_bad', 0)}<br/>"
+            known_info += f"<b>Ubicación:</b> Hallazgos/known_files (classification.csv){self.appendix_reference('known_files')}<br/>"
+            blocks.append(paragraph(known_info))
+            blocks.append(spacer(0.1))
+
+            known_bad_items = known_files.get("known_bad_items", [])
+            if known_bad_items:
+                known_table_data = [["Origen", "Elemento", "Conjunto", "Hash"]]
+                for entry in known_bad_items[:20]:
+                    item = entry.get("item", "") or "-"
+                    if len(item) > 45:
+                        item = "..." + item[-42:]
+                    known_table_data.append([
+                        entry.get("source", ""),
+                        item,
+                        entry.get("hash_set", ""),
+                        entry.get("hash", "")[:32]
+                    ])
+                blocks.append(table("hashes_conocidos", known_table_data, [0.7, 2.7, 0.9, 2.3], font_size=7))
+        else:
+            blocks.append(paragraph("No se aplicaron conjuntos de hashes conocidos (ninguno importado)"))
+
+        blocks.append(spacer(0.3))
+
+        # === 5.8 MAPA DE ENTROPÍA ===
+        blocks.append(heading("5.8 Mapa de Entropía y Bloques en Cero", 2))
+        blocks.append(spacer(0.1))
+
+        entropy = self.report_data.get("analysis", {}).get("entropy", {})
+        if entropy:
+            for source, summary in entropy.items():
+                entropy_info = f"<b>Evidencia:</b> {source} ({summary.get('size_bytes', 0) / (1024**3):.2f} GB)<br/>"
+                entropy_info += f"<b>Entropía media:</b> {summary.get('mean_entropy', 0):.2f} bits/byte - "
+                entropy_info += f"<b>Bloques en cero:</b> {summary.get('zero_ratio', 0):.1%} - "
+                entropy_info += f"<b>Alta entropía:</b> {summary.get('high_entropy_ratio', 0):.1%} "
+                entropy_info += f"({summary.get('high_entropy_regions', 0)} regiones)<br/>"
+                largest = ", ".join(
+                    f"0x{region['start']:x}-0x{region['end']:x}" for region in summary.get("largest_high_entropy", [])[:5]
+                )
+                if largest:
+                    entropy_info += f"<b>Mayores regiones de alta entropía:</b> {largest}<br/>"
+                blocks.append(paragraph(entropy_info))
+                if self.inventory.exists(summary.get("map", "")):
+                    blocks.append(entropy_strip(summary["map"]))
+                blocks.append(spacer(0.15))
+
+            blocks.append(paragraph(
+                "Franja: azul = baja entropía, rojo = cifrado/comprimido, gris = bloques en cero. "
+                "Mapas y regiones en <b>Hallazgos/entropy</b>"))
+        else:
+            blocks.append(paragraph("No se generó el mapa de entropía"))
+
+        blocks.append(spacer(0.3))
+
+        return blocks
+
+    def build_timeline_section(self):
+        """Línea de tiempo multi-fuente"""
+        blocks = []
+
+        # === 5.9 LÍNEA DE TIEMPO ===
+        blocks.append(heading("5.9 Línea de Tiempo Multi-fuente", 2))
+        blocks.append(spacer(0.1))
+
+        timeline_summary = self.report_data.get("analysis", {}).get("timeline", {})
+        if timeline_summary.get("total_events"):
+            timeline_info = f"<b>Eventos:</b> {timeline_summary['total_events']}<br/>"
+            timeline_info += f"<b>Rango (UTC):</b> {timeline_summary.get('first_event', '')} - {timeline_summary.get('last_event', '')}<br/>"
+            timeline_info += "<b>Ubicación:</b> Hallazgos/timeline (timeline.csv / timeline.db)<br/>"
+            blocks.append(paragraph(timeline_info))
+            blocks.append(spacer(0.1))
+
+            timeline_table_data = [["Fuente", "Eventos"]]
+            for source, count in sorted(timeline_summary.get("sources", {}).items(), key=lambda item: -item[1]):
+                timeline_table_data.append([source, str(count)])
+            blocks.append(table("fuentes_linea_tiempo", timeline_table_data, [4.6, 2], font_size=8))
+        else:
+            blocks.append(paragraph("No se generaron eventos para la línea de tiempo"))
+
+        blocks.append(spacer(0.3))
+
+        return blocks
+
+    def build_closing_section(self):
+        """Recomendaciones, análisis con Autopsy e índice de apéndices"""
+        blocks = []
+
+        # === RECOMENDACIONES ===
+        blocks.append(heading("6. RECOMENDACIONES"))
+        blocks.append(spacer(0.2))
+
+        recommendations_text = """
+        1. Realizar análisis profundo con Autopsy para examinar archivos y artefactos adicionales<br/>
+        2. Revisar manualmente las conexiones de red sospechosas identificadas<br/>
+        3. Analizar los procesos maliciosos detectados en detalle<br/>
+        4. Verificar la integridad de los archivos del sistema<br/>
+        5. Documentar todos los hallazgos adicionales durante el análisis manual<br/>
+        """
+        blocks.append(paragraph(recommendations_text))
+
+        blocks.append(spacer(0.3))
+
+        # === NOTA SOBRE AUTOPSY ===
+        blocks.append(heading("7. ANÁLISIS POSTERIOR CON AUTOPSY"))
+        blocks.append(spacer(0.2))
+
+        autopsy_text = """
+        La evidencia recolectada ha sido preparada y está disponible para análisis 
+        manual detallado utilizando Autopsy. Esta herramienta permitirá realizar:
+        <br/><br/>
+        • Análisis de línea de tiempo<br/>
+        • Recuperación de archivos eliminados<br/>
+        • Análisis de registros del sistema<br/>
+        • Búsqueda de palabras clave<br/>
+        • Visualización de artefactos web<br/>
+        • Y muchas otras capacidades de análisis forense<br/>
+        """
+        blocks.append(paragraph(autopsy_text))
+
+        # === ÍNDICE DE APÉNDICES ===
+        appendices = list(self.appendices.values())
+        if appendices:
+            blocks.append(spacer(0.3))
+            blocks.append(heading("8. APÉNDICES"))
+            blocks.append(spacer(0.2))
+            appendix_index = "".join(f"• <b>{appendix.label}:</b> {appendix.title}<br/>" for appendix in appendices)
+            blocks.append(paragraph(appendix_index))
+
+        return blocks
+
+    def appendix_reference(self, key):
+        """Referencia al apéndice con el listado completo, si existe"""
+        if key not in self.appendices:
+            return ""
+        return f" - listado completo en el {self.appendices[key].label}"
@@ -0,0 +1,302 @@
+"""
+Adquisición tolerante a sectores dañados (estilo ddrescue)
+Primera pasada rápida que salta las zonas con errores, pasadas posteriores cada vez más finas
+y un mapa de rangos leídos/dañados/pendientes compatible con el formato de ddrescue
+"""
+
+import os
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+from utils.evidence_reader import get_evidence_size
+from utils.job_control import Cancelled, get_job_control
+
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_SECTOR_SIZE = 512
+
+# Salto tras un error en la primera pasada: crece al repetirse los errores
+MIN_SKIP_SIZE = 64 * 1024
+MAX_SKIP_SIZE = 1024 * 1024 * 1024
+
+DEFAULT_RETRY_PASSES = 2
+
+# Cada cuánto se guarda el mapa y se informa el avance (segundos)
+SAVE_INTERVAL = 30
+
+# Estados de ddrescue
+NON_TRIED = "?"
+NON_TRIMMED = "*"
+BAD_SECTOR = "-"
+FINISHED = "+"
+
+STATUS_NAMES = {
+    NON_TRIED: "sin leer",
+    NON_TRIMMED: "bloques con error",
+    BAD_SECTOR: "sectores dañados",
+    FINISHED: "leídos",
+}
+
+
+class RescueMap:
+    """Rangos contiguos del dispositivo con su estado
+
+    Se guarda como límites ordenados: el rango k va de starts[k] a starts[k+1] (o al final).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.starts = [0]
+        self.statuses = [NON_TRIED]
+        self.current_pos = 0
+        self.current_pass = 1
+
+    def set(self, start, length, status):
+        """Marcar [start, start + length) con un estado, fusionando rangos vecinos iguales"""
+        end = min(start + length, self.size)
+        if end <= start:
+            return
+        i = bisect_right(self.starts, start) - 1
+        k = bisect_right(self.starts, end) - 1
+
+        replacement_starts = []
+        replacement_statuses = []
+        if self.starts[i] < start:
+            replacement_starts.append(self.starts[i])
+            replacement_statuses.append(self.statuses[i])
+            previous = self.statuses[i]
+        else:
+            previous = self.statuses[i - 1] if i > 0 else None
+        if previous != status:
+            replacement_starts.append(start)
+            replacement_statuses.append(status)
+        if end < self.size and self.statuses[k] != status:
+            replacement_starts.append(end)
+            replacement_statuses.append(self.statuses[k])
+
+        self.starts[i:k + 1] = replacement_starts
+        self.statuses[i:k + 1] = replacement_statuses
+
+        # El rango siguiente puede haber quedado con el mismo estado
+        after = i + len(replacement_starts)
+        if after < len(self.starts) and after > 0 and self.statuses[after] == self.statuses[after - 1]:
+            del self.starts[after]
+            del self.statuses[after]
+
+    def ranges(self, status=None):
+        """Iterar (inicio, longitud, estado), opcionalmente solo de un estado"""
+        for index, start in enumerate(self.starts):
+            end = self.starts[index + 1] if index + 1 < len(self.starts) else self.size
+            if status is None or self.statuses[index] == status:
+                yield start, end - start, self.statuses[index]
+
+    def totals(self):
+        """Bytes por estado"""
+        totals = {status: 0 for status in STATUS_NAMES}
+        for _, length, status in self.ranges():
+            totals[status] += length
+        return totals
+
+    def save(self, path):
+        """Guardar en formato mapfile de ddrescue (reemplazo atómico)"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='ascii') as f:
+            f.write(f"# Mapfile. Created by ForensicFlow - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("# current_pos  current_status  current_pass\n")
+            f.write(f"0x{self.current_pos:08X}     ?               {self.current_pass}\n")
+            f.write("#      pos        size  status\n")
+            for start, length, status in self.ranges():
+                f.write(f"0x{start:08X}  0x{length:08X}  {status}\n")
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, size):
+        """Cargar un mapfile existente para reanudar una adquisición"""
+        rescue_map = cls(size)
+        header_read = False
+        with open(path, 'r', encoding='ascii') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split()
+                if not header_read:
+                    rescue_map.current_pos = int(parts[0], 16)
+                    if len(parts) > 2:
+                        rescue_map.current_pass = int(parts[2])
+                    header_read = True
+                    continue
+                status = parts[2] if parts[2] in STATUS_NAMES else NON_TRIMMED
+                rescue_map.set(int(parts[0], 16), int(parts[1], 16), status)
+        return rescue_map
+
+
+class RescueImager:
+    def __init__(self, app, block_size=DEFAULT_BLOCK_SIZE, sector_size=DEFAULT_SECTOR_SIZE,
+                 retry_passes=DEFAULT_RETRY_PASSES, governor=None):
+        self.app = app
+        self.governor = governor
+        self.jobs = get_job_control(app)
+        self.block_size = block_size
+        self.sector_size = sector_size
+        self.retry_passes = retry_passes
+        self.map_path = None
+        self.rescue_map = None
+        self.last_save = 0
+
+    def image(self, source, destination, map_path):
+        """Copiar el origen a la imagen destino registrando el estado de cada rango en el mapa
+
+        Las zonas ilegibles quedan en cero en la imagen. Si el mapa existe se reanuda desde él;
+        al detener el análisis el mapa se guarda antes de salir, listo para reanudar.
+        """
+        size = get_evidence_size(source)
+        self.map_path = map_path
+        if os.path.exists(map_path):
+            self.rescue_map = RescueMap.load(map_path, size)
+            self.app.add_log("Mapa de errores existente: se reanuda la adquisición", "INFO")
+        else:
+            self.rescue_map = RescueMap(size)
+
+        started = self.last_save = time.monotonic()
+        mode = 'r+b' if os.path.exists(destination) else 'w+b'
+        with open(source, 'rb', buffering=0) as src, open(destination, mode) as dst:
+            dst.truncate(size)
+            try:
+                self._run_passes(src, dst)
+            except Cancelled:
+                # Lo escrito en la imagen ya figura en el mapa: la próxima ejecución sigue desde aquí
+                dst.flush()
+                self._save()
+                self.app.add_log(f"Adquisición detenida: mapa de errores guardado en {map_path}", "WARNING")
+                raise
+
+        totals = self.rescue_map.totals()
+        bad_ranges = [(start, length) for start, length, _ in self.rescue_map.ranges(BAD_SECTOR)]
+        return {
+            "size": size,
+            "good_bytes": totals[FINISHED],
+            "bad_bytes": totals[BAD_SECTOR] + totals[NON_TRIMMED],
+            "untried_bytes": totals[NON_TRIED],
+            "bad_ranges": len(bad_ranges),
+            "bad_range_list": bad_ranges[:100],
+            "elapsed": round(time.monotonic() - started, 1),
+            "map": map_path,
+        }
+
+    def _run_passes(self, src, dst):
+        passes = [
+            (1, "Pasada 1: copia rápida (salta zonas con errores)", self._copy_pass),
+            (2, "Pasada 2: zonas saltadas, en sentido inverso", self._reverse_pass),
+            (3, "Pasada 3: bloques con error, sector por sector", self._scrape_pass),
+        ]
+        for number, label, run in passes:
+            if number < self.rescue_map.current_pass:
+                continue
+            self.rescue_map.current_pass = number
+            self.app.add_log(label, "INFO")
+            run(src, dst)
+            self._save()
+
+        for retry in range(self.retry_passes):
+            if not self.rescue_map.totals()[BAD_SECTOR]:
+                break
+            self.rescue_map.current_pass = 4 + retry
+            self.app.add_log(f"Reintento {retry + 1}/{self.retry_passes} de sectores dañados", "INFO")
+            self._retry_pass(src, dst, reverse=retry % 2 == 0)
+            self._save()
+
+    def _read(self, src, offset, length):
+        """Leer una zona; devuelve los bytes leídos (posiblemente menos) o None si hay error"""
+        self.jobs.check()
+        try:
+            src.seek(offset)
+            data = src.read(length)
+        except OSError:
+            return None
+        if self.governor and data:
+            self.governor.throttle(len(data))
+        return data
+
+    def _store(self, dst, offset, data, status=FINISHED):
+        """Escribir los datos leídos y marcarlos en el mapa"""
+        dst.seek(offset)
+        dst.write(data)
+        self.rescue_map.set(offset, len(data), status)
+        self.rescue_map.current_pos = offset + len(data)
+        self._checkpoint()
+
+    def _checkpoint(self):
+        """Guardar el mapa y registrar el avance periódicamente"""
+        now = time.monotonic()
+        if now - self.last_save < SAVE_INTERVAL:
+            return
+        self._save()
+        totals = self.rescue_map.totals()
+        self.app.add_log(
+            f"  Leído: {totals[FINISHED] / (1024**3):.2f} GB de {self.rescue_map.size / (1024**3):.2f} GB, "
+            f"con errores: {(totals[NON_TRIMMED] + totals[BAD_SECTOR]) / (1024**2):.2f} MB",
+            "INFO"
+        )
+
+    def _save(self):
+        self.rescue_map.save(self.map_path)
+        self.last_save = time.monotonic()
+
+    def _copy_pass(self, src, dst):
+        """Leer las zonas sin intentar por bloques; tras un error saltar cada vez más lejos"""
+        skip = MIN_SKIP_SIZE
+        max_skip = max(MIN_SKIP_SIZE, min(MAX_SKIP_SIZE, self.rescue_map.size // 100))
+        for start, length, _ in list(self.rescue_map.ranges(NON_TRIED)):
+            offset = start
+            end = start + length
+            while offset < end:
+                chunk = min(self.block_size, end - offset)
+                data = self._read(src, offset, chunk)
+                if data:
+                    self._store(dst, offset, data)
+                    offset += len(data)
+                    skip = MIN_SKIP_SIZE
+                    continue
+                self.rescue_map.set(offset, chunk, NON_TRIMMED)
+                # La zona saltada queda sin intentar para la pasada inversa
+                offset += chunk + skip
+                skip = min(skip * 2, max_skip)
+
+    def _reverse_pass(self, src, dst):
+        """Leer las zonas saltadas desde el final; los bloques que fallan quedan para el raspado"""
+        for start, length, _ in reversed(list(self.rescue_map.ranges(NON_TRIED))):
+            end = start + length
+            while end > start:
+                # Mantener los bloques alineados al sector para lecturas de dispositivo
+                chunk_start = end - self.block_size
+                chunk_start = max(start, chunk_start - chunk_start % self.sector_size)
+                data = self._read(src, chunk_start, end - chunk_start)
+                if data and len(data) == end - chunk_start:
+                    self._store(dst, chunk_start, data)
+                else:
+                    self.rescue_map.set(chunk_start, end - chunk_start, NON_TRIMMED)
+                end = chunk_start
+
+    def _scrape_pass(self, src, dst):
+        """Leer sector por sector los bloques que fallaron"""
+        for start, length, _ in list(self.rescue_map.ranges(NON_TRIMMED)):
+            for offset in range(start, start + length, self.sector_size):
+                sector = min(self.sector_size, start + length - offset)
+                data = self._read(src, offset, sector)
+                if data and len(data) == sector:
+                    self._store(dst, offset, data)
+                else:
+                    self.rescue_map.set(offset, sector, BAD_SECTOR)
+
+    def _retry_pass(self, src, dst, reverse):
+        """Reintentar los sectores dañados (alternando el sentido entre pasadas)"""
+        bad = list(self.rescue_map.ranges(BAD_SECTOR))
+        for start, length, _ in (reversed(bad) if reverse else bad):
+            offsets = range(start, start + length, self.sector_size)
+            for offset in (reversed(offsets) if reverse else offsets):
+                sector = min(self.sector_size, start + length - offset)
+                data = self._read(src, offset, sector)
+                if data and len(data) == sector:
+                    self._store(dst, offset, data)
@@ -0,0 +1,177 @@
+"""
+Ejecución de tareas por dependencias
+Cada tarea declara los artefactos que necesita y los que produce; se lanza en cuanto sus entradas
+están listas y hay recursos libres (núcleos, lecturas del disco de evidencia, etc.), sin esperar
+a que termine el resto de su fase
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.tracing import get_tracer
+from utils.job_control import Cancelled, get_job_control
+
+
+# Hilos del ejecutor; la concurrencia real la limitan los recursos de cada tarea
+DEFAULT_WORKERS = 8
+
+
+class TaskGraphError(Exception):
+    """Falló una tarea crítica: no se lanzan más tareas"""
+
+
+class Task:
+    """Unidad de trabajo: `func` sin argumentos que devuelve True si terminó bien
+
+    `resources` indica cuánto consume de cada límite del grafo (por ejemplo {"cpu": 1}).
+    Con `error`, la tarea es crítica: si falla se detiene el grafo con ese mensaje. Una tarea
+    no crítica que falla se registra como advertencia y sus dependientes se ejecutan igual.
+
+    `status`: pending, running, completed, failed, cancelled (interrumpida al detener el análisis)
+    o skipped (no llegó a lanzarse).
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), resources=None, group=None, error=None):
+        self.name = name
+        self.func = func
+        self.inputs = set(inputs)
+        self.outputs = set(outputs)
+        self.resources = dict(resources or {})
+        self.group = group
+        self.error = error
+        self.status = "pending"
+
+
+class TaskGraph:
+    def __init__(self, app, limits=None, max_workers=DEFAULT_WORKERS):
+        self.app = app
+        self.limits = dict(limits or {})
+        self.max_workers = max_workers
+        self.tasks = []
+        self.ready = set()
+        self.in_use = {}
+
+    def add(self, name, func, inputs=(), outputs=(), resources=None, group=None, error=None):
+        task = Task(name, func, inputs, outputs, resources, group, error)
+        self.tasks.append(task)
+        return task
+
+    def validate(self):
+        """Cada entrada debe tener un productor y el grafo no debe tener ciclos"""
+        producers = {}
+        for task in self.tasks:
+            for output in task.outputs:
+                if output in producers:
+                    raise TaskGraphError(f"'{output}' lo producen {producers[output].name} y {task.name}")
+                producers[output] = task
+        for task in self.tasks:
+            missing = task.inputs - set(producers)
+            if missing:
+                raise TaskGraphError(f"{task.name} necesita {', '.join(sorted(missing))}, que ninguna tarea produce")
+            for resource, amount in task.resources.items():
+                if amount > self.limits.get(resource, amount):
+                    raise TaskGraphError(f"{task.name} pide {amount} de '{resource}' (límite {self.limits[resource]})")
+
+        available = set()
+        pending = list(self.tasks)
+        while pending:
+            runnable = [task for task in pending if task.inputs <= available]
+            if not runnable:
+                raise TaskGraphError("Dependencias circulares entre: " + ", ".join(task.name for task in pending))
+            for task in runnable:
+                available |= task.outputs
+                pending.remove(task)
+
+    def can_start(self, task):
+        if not task.inputs <= self.ready:
+            return False
+        return all(
+            self.in_use.get(resource, 0) + amount <= self.limits.get(resource, amount)
+            for resource, amount in task.resources.items()
+        )
+
+    def run(self, on_group=None):
+        """Ejecutar todas las tareas; `on_group(group, status)` informa "running", "completed" o "error"
+
+        Devuelve {nombre de tarea: resultado}. Si falla una tarea crítica, espera a las que están
+        en curso y lanza TaskGraphError. Si se detiene el análisis no se lanzan más tareas y,
+        cuando terminan las que estaban en curso, se lanza Cancelled.
+        """
+        self.validate()
+        groups = {}
+        for task in self.tasks:
+            groups.setdefault(task.group, []).append(task)
+
+        def notify(group, status):
+            if on_group and group is not None:
+                on_group(group, status)
+
+        tracer = get_tracer(self.app)
+        jobs = get_job_control(self.app)
+        results = {}
+        failure = None
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tarea") as executor:
+            while True:
+                # Lanzar en el orden declarado todo lo que tenga entradas y recursos
+                if failure is None and not jobs.cancelled:
+                    for task in self.tasks:
+                        if task.status != "pending" or len(running) >= self.max_workers or not self.can_start(task):
+                            continue
+                        if all(other.status == "pending" for other in groups[task.group]):
+                            notify(task.group, "running")
+                        task.status = "running"
+                        for resource, amount in task.resources.items():
+                            self.in_use[resource] = self.in_use.get(resource, 0) + amount
+                        running[executor.submit(self._run_task, tracer, task)] = task
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    for resource, amount in task.resources.items():
+                        self.in_use[resource] -= amount
+                    try:
+                        results[task.name] = future.result()
+                    except Cancelled:
+                        results[task.name] = False
+                    except Exception as e:
+                        if not jobs.cancelled:
+                            self.app.add_log(f"Error en {task.name}: {str(e)}", "ERROR")
+                        results[task.name] = False
+
+                    if not results[task.name] and jobs.cancelled:
+                        # Las herramientas terminadas al detener el análisis fallan: no es un error de la tarea
+                        task.status = "cancelled"
+                        continue
+                    task.status = "completed" if results[task.name] else "failed"
+                    if not results[task.name]:
+                        if task.error:
+                            failure = failure or task
+                        else:
+                            self.app.add_log(f"Advertencia: problemas en {task.name}, continuando...", "WARNING")
+                    self.ready |= task.outputs
+
+                    siblings = groups[task.group]
+                    if all(other.status in ("completed", "failed") for other in siblings):
+                        critical = any(other.status == "failed" and other.error for other in siblings)
+                        notify(task.group, "error" if critical else "completed")
+
+        if failure is not None or jobs.cancelled:
+            for task in self.tasks:
+                if task.status == "pending":
+                    task.status = "skipped"
+            # Grupos que quedaron a medias
+            for group, tasks in groups.items():
+                statuses = {task.status for task in tasks}
+                if statuses - {"completed", "failed"} and statuses != {"skipped"}:
+                    notify(group, "error")
+            if jobs.cancelled:
+                raise Cancelled("Análisis detenido por el usuario")
+            raise TaskGraphError(failure.error)
+        return results
+
+    def _run_task(self, tracer, task):
+        with tracer.span(task.name, "tarea", inputs=sorted(task.inputs)):
+            return task.func()
@@ -0,0 +1,228 @@
+"""
+Modo de bajo impacto para equipos en producción
+Límite de ancho de banda (token bucket) en las lecturas de imagen y hash, prioridad baja de CPU
+y disco para las herramientas externas y pausa mientras la carga del equipo supera un umbral
+"""
+
+import os
+import time
+import threading
+import subprocess
+
+from utils.job_control import get_job_control
+
+
+DEFAULT_BANDWIDTH_MB_S = 50
+DEFAULT_LOAD_THRESHOLD = 70
+
+# Se reanuda cuando la carga baja de este porcentaje del umbral (evita pausar y reanudar en ráfaga)
+RESUME_RATIO = 0.8
+
+# Cada cuántos segundos se mide la carga del equipo
+LOAD_CHECK_INTERVAL = 2
+
+# Ráfaga máxima del token bucket, en segundos de ancho de banda
+BURST_SECONDS = 0.5
+
+# Clase de prioridad de Windows para las herramientas externas
+IDLE_PRIORITY_CLASS = 0x00000040
+
+
+class TokenBucket:
+    """Limitar los bytes por segundo compartidos por todos los hilos lectores"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate * BURST_SECONDS))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, count):
+        """Descontar `count` bytes; espera lo necesario si el balde no alcanza"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Se permite saldo negativo: lecturas mayores que la ráfaga esperan su parte
+            self.tokens -= count
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class HostLoad:
+    """Carga de CPU del equipo descontando la de ForensicFlow y sus procesos hijos"""
+
+    def __init__(self):
+        try:
+            import psutil
+            self.psutil = psutil
+            self.process = psutil.Process()
+            self.cpu_count = psutil.cpu_count() or 1
+            # La primera medición de cpu_percent solo fija el punto de partida
+            psutil.cpu_percent(interval=None)
+            self.process.cpu_percent(interval=None)
+        except ImportError:
+            self.psutil = None
+            self.cpu_count = os.cpu_count() or 1
+        self.children = {}
+
+    @property
+    def available(self):
+        return self.psutil is not None or hasattr(os, "getloadavg")
+
+    def percent(self):
+        """Porcentaje de CPU usado por el resto del equipo"""
+        if self.psutil is None:
+            if not hasattr(os, "getloadavg"):
+                return 0.0
+            return min(100.0, os.getloadavg()[0] * 100 / self.cpu_count)
+
+        total = self.psutil.cpu_percent(interval=None)
+        own = self.process.cpu_percent(interval=None)
+        try:
+            for child in self.process.children(recursive=True):
+                if child.pid not in self.children:
+                    self.children[child.pid] = child
+                    child.cpu_percent(interval=None)
+                    continue
+                own += self.children[child.pid].cpu_percent(interval=None)
+        except self.psutil.Error:
+            pass
+        return max(0.0, total - own / self.cpu_count)
+
+
+class ResourceGovernor:
+    """Política de bajo impacto compartida por los lectores y las herramientas externas"""
+
+    def __init__(self, app, bandwidth_mb_s=DEFAULT_BANDWIDTH_MB_S, load_threshold=DEFAULT_LOAD_THRESHOLD):
+        self.app = app
+        self.bandwidth_mb_s = bandwidth_mb_s
+        self.load_threshold = load_threshold
+        self.bucket = TokenBucket(bandwidth_mb_s * 1024 * 1024) if bandwidth_mb_s else None
+        self.load = HostLoad() if load_threshold else None
+        self.last_check = 0
+        self.check_lock = threading.Lock()
+        self.paused_seconds = 0.0
+
+        if self.load and not self.load.available:
+            self.app.add_log("Medición de carga no disponible (instale psutil); no se pausará por carga", "WARNING")
+            self.load = None
+
+    def describe(self):
+        limits = []
+        if self.bucket:
+            limits.append(f"{self.bandwidth_mb_s:g} MB/s")
+        if self.load:
+            limits.append(f"pausa con carga > {self.load_threshold:g}%")
+        return ", ".join(limits) or "sin límites"
+
+    def throttle(self, count):
+        """Llamar tras leer `count` bytes: respeta el ancho de banda y espera si el equipo está cargado"""
+        get_job_control(self.app).check()
+        if self.bucket:
+            self.bucket.consume(count)
+        if self.load:
+            self.wait_for_load()
+
+    def wait_for_load(self):
+        """Bloquear mientras la carga del resto del equipo supere el umbral"""
+        now = time.monotonic()
+        if now - self.last_check < LOAD_CHECK_INTERVAL:
+            return
+        # Un solo hilo mide; los demás siguen hasta la próxima medición
+        if not self.check_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_check = now
+            load = self.load.percent()
+            if load <= self.load_threshold:
+                return
+            self.app.add_log(f"Carga del equipo {load:.0f}% > {self.load_threshold:g}%: adquisición en pausa", "WARNING")
+            paused = time.monotonic()
+            while load > self.load_threshold * RESUME_RATIO:
+                get_job_control(self.app).wait(LOAD_CHECK_INTERVAL)
+                load = self.load.percent()
+            waited = time.monotonic() - paused
+            self.paused_seconds += waited
+            self.last_check = time.monotonic()
+            self.app.add_log(f"Carga del equipo {load:.0f}%: adquisición reanudada tras {waited:.0f} s", "INFO")
+        finally:
+            self.check_lock.release()
+
+    def popen_kwargs(self):
+        """Argumentos de subprocess para lanzar una herramienta con prioridad baja"""
+        if os.name == "nt":
+            return {"creationflags": IDLE_PRIORITY_CLASS}
+        return {"preexec_fn": lambda: os.nice(19)}
+
+    def run(self, cmd, timeout):
+        """Ejecutar una herramienta externa con prioridad baja, suspendiéndola si el equipo se carga
+
+        Devuelve un subprocess.CompletedProcess como subprocess.run.
+        """
+        jobs = get_job_control(self.app)
+        process = jobs.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                             **self.popen_kwargs())
+        self._lower_io_priority(process.pid)
+        stop = threading.Event()
+        watcher = None
+        if self.load:
+            watcher = threading.Thread(target=self._watch, args=(process.pid, stop), daemon=True)
+            watcher.start()
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            stop.set()
+            if watcher:
+                watcher.join()
+            jobs.release(process)
+        jobs.check()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _lower_io_priority(self, pid):
+        try:
+            import psutil
+        except ImportError:
+            return
+        try:
+            child = psutil.Process(pid)
+            if os.name == "nt":
+                child.ionice(psutil.IOPRIO_VERYLOW)
+            elif hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+                child.ionice(psutil.IOPRIO_CLASS_IDLE)
+        except (psutil.Error, OSError, AttributeError):
+            pass
+
+    def _watch(self, pid, stop):
+        """Suspender y reanudar la herramienta según la carga del equipo"""
+        try:
+            import psutil
+        except ImportError:
+            return
+        suspended = False
+        try:
+            child = psutil.Process(pid)
+            while not stop.wait(LOAD_CHECK_INTERVAL):
+                load = self.load.percent()
+                if not suspended and load > self.load_threshold:
+                    child.suspend()
+                    suspended = True
+                    self.app.add_log(f"Carga del equipo {load:.0f}%: herramienta en pausa", "WARNING")
+                elif suspended and load <= self.load_threshold * RESUME_RATIO:
+                    child.resume()
+                    suspended = False
+                    self.app.add_log(f"Carga del equipo {load:.0f}%: herramienta reanudada", "INFO")
+        except psutil.Error:
+            pass
+        finally:
+            if suspended:
+                try:
+                    child.resume()
+                except psutil.Error:
+                    pass
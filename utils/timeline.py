@@ -0,0 +1,332 @@
+"""
+Súper línea de tiempo multi-fuente
+Ordena eventos de TSK, Volatility y la recolección en vivo con ordenamiento externo (merge sort)
+"""
+
+import os
+import csv
+import time
+import heapq
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from datetime import datetime, timezone
+
+from utils.job_control import get_job_control
+
+
+# Eventos en memoria antes de volcar una corrida ordenada a disco
+DEFAULT_RUN_SIZE = 250000
+
+# Corridas que se mezclan a la vez (limita archivos abiertos)
+MAX_MERGE_FANIN = 64
+
+INSERT_BATCH = 50000
+
+TIMELINE_FIELDS = ["datetime_utc", "timestamp", "source", "type", "description", "artifact"]
+
+_MAC_FLAGS = (("m", 8), ("a", 7), ("c", 9), ("b", 10))
+
+
+def _write_run(path, events):
+    """Guardar una corrida de eventos ordenados"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter='\t')
+        for event in events:
+            writer.writerow(event)
+
+
+def _read_run(path):
+    """Leer una corrida en streaming"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            yield (float(row[0]), row[1], row[2], row[3], row[4])
+
+
+class ExternalSorter:
+    """Ordenamiento externo: corridas ordenadas en disco y mezcla k-way con memoria acotada
+
+    Los eventos son tuplas (timestamp, fuente, tipo, descripción, artefacto).
+    """
+
+    def __init__(self, temp_folder, run_size=DEFAULT_RUN_SIZE):
+        self.temp_folder = temp_folder
+        self.run_size = run_size
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+        self._files = 0
+
+    def add(self, event):
+        """Agregar un evento; vuelca una corrida al llenar el búfer"""
+        self.buffer.append(event)
+        self.count += 1
+        if len(self.buffer) >= self.run_size:
+            self._flush()
+
+    def _flush(self):
+        """Ordenar el búfer y escribirlo como corrida temporal"""
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        path = self._temp_path()
+        _write_run(path, self.buffer)
+        self.runs.append(path)
+        self.buffer = []
+
+    def _temp_path(self):
+        """Nombre único para una corrida temporal"""
+        self._files += 1
+        return os.path.join(self.temp_folder, f"run_{id(self):x}_{self._files:06d}.tsv")
+
+    def sorted_events(self):
+        """Iterar todos los eventos en orden cronológico"""
+        if not self.runs:
+            # Todo cupo en memoria: no hace falta tocar disco
+            self.buffer.sort()
+            events, self.buffer = self.buffer, []
+            yield from events
+            return
+
+        self._flush()
+        runs = self.runs
+        # Mezclas intermedias si hay más corridas que el máximo de archivos abiertos
+        while len(runs) > MAX_MERGE_FANIN:
+            merged_runs = []
+            for start in range(0, len(runs), MAX_MERGE_FANIN):
+                group = runs[start:start + MAX_MERGE_FANIN]
+                path = self._temp_path()
+                _write_run(path, heapq.merge(*[_read_run(run) for run in group]))
+                for run in group:
+                    os.remove(run)
+                merged_runs.append(path)
+            runs = merged_runs
+
+        try:
+            yield from heapq.merge(*[_read_run(run) for run in runs])
+        finally:
+            for run in runs:
+                if os.path.exists(run):
+                    os.remove(run)
+            self.runs = []
+
+
+def _parse_volatility_time(value):
+    """Convertir '2023-05-14 10:22:31.000000 UTC' a epoch; None si no aplica"""
+    value = value.strip()
+    if not value or value in ("N/A", "-", "Disabled"):
+        return None
+    value = value.replace(" UTC", "").replace("+00:00", "")
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_local_time(value, formats):
+    """Convertir una fecha en hora local del equipo a epoch"""
+    value = value.strip()
+    for fmt in formats:
+        try:
+            return time.mktime(datetime.strptime(value, fmt).timetuple())
+        except ValueError:
+            continue
+    return None
+
+
+def _read_volatility_table(path, required_column):
+    """Leer la salida tabular (separada por tabs) de un plugin de Volatility 3"""
+    header = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if line.startswith("ERRORS:"):
+                break
+            columns = line.rstrip("\r\n").split("\t")
+            if header is None:
+                if required_column in columns:
+                    header = columns
+                continue
+            if len(columns) >= len(header) - 1:
+                yield dict(zip(header, columns))
+
+
+def bodyfile_events(bodyfile, image):
+    """Eventos MACB de un bodyfile de fls (un evento por marca de tiempo distinta)"""
+    with open(bodyfile, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.rstrip("\r\n").split("|")
+            if len(parts) < 11:
+                continue
+            path = "|".join(parts[1:-9])
+            if path.startswith("//"):
+                path = path[1:]
+            tail = parts[-9:]
+            try:
+                times = {}
+                for flag, index in _MAC_FLAGS:
+                    value = int(tail[index - 2])
+                    if value > 0:
+                        times.setdefault(value, []).append(flag)
+            except ValueError:
+                continue
+
+            source = "FN" if path.endswith(" ($FILE_NAME)") else "TSK"
+            for timestamp, flags in times.items():
+                macb = "".join(flag if flag in flags else "." for flag, _ in _MAC_FLAGS)
+                yield (float(timestamp), source, macb, f"{path} (inodo {tail[0]}, {tail[4]} bytes)", image)
+
+
+def pslist_events(path):
+    """Creación y finalización de procesos desde pslist de Volatility"""
+    for row in _read_volatility_table(path, "CreateTime"):
+        name = row.get("ImageFileName", "?")
+        pid = row.get("PID", "?")
+        ppid = row.get("PPID", "?")
+        created = _parse_volatility_time(row.get("CreateTime", ""))
+        if created:
+            yield (created, "Volatility", "Proceso creado", f"{name} (PID {pid}, PPID {ppid})", "pslist")
+        exited = _parse_volatility_time(row.get("ExitTime", ""))
+        if exited:
+            yield (exited, "Volatility", "Proceso finalizado", f"{name} (PID {pid})", "pslist")
+
+
+def netscan_events(path):
+    """Conexiones con marca de tiempo desde netscan de Volatility"""
+    for row in _read_volatility_table(path, "Created"):
+        created = _parse_volatility_time(row.get("Created", ""))
+        if not created:
+            continue
+        description = (
+            f"{row.get('Proto', '')} {row.get('LocalAddr', '')}:{row.get('LocalPort', '')} -> "
+            f"{row.get('ForeignAddr', '')}:{row.get('ForeignPort', '')} {row.get('State', '')} "
+            f"({row.get('Owner', '?')}, PID {row.get('PID', '?')})"
+        )
+        yield (created, "Volatility", "Conexión de red", description.strip(), "netscan")
+
+
+def system_info_events(path):
+    """Fechas relevantes de systeminfo (arranque e instalación del sistema)"""
+    labels = {
+        "System Boot Time:": "Arranque del sistema",
+        "Tiempo de arranque del sistema:": "Arranque del sistema",
+        "Original Install Date:": "Instalación del sistema",
+        "Fecha de instalación original:": "Instalación del sistema",
+    }
+    formats = [
+        "%m/%d/%Y, %I:%M:%S %p",
+        "%d/%m/%Y, %H:%M:%S",
+        "%m/%d/%Y, %H:%M:%S",
+        "%d/%m/%Y, %I:%M:%S %p",
+    ]
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            for label, event_type in labels.items():
+                if line.strip().startswith(label):
+                    timestamp = _parse_local_time(line.split(":", 1)[1], formats)
+                    if timestamp:
+                        yield (timestamp, "Triage", event_type, line.strip(), "system_info.txt")
+
+
+def log_events(entries):
+    """Acciones de la adquisición registradas por ForensicFlow"""
+    for entry in entries:
+        if entry.get("level") not in ("PHASE", "SUCCESS", "WARNING", "ERROR"):
+            continue
+        timestamp = _parse_local_time(entry["timestamp"], ["%Y-%m-%d %H:%M:%S"])
+        if timestamp:
+            yield (timestamp, "ForensicFlow", entry["level"], entry["message"], "log")
+
+
+class TimelineBuilder:
+    def __init__(self, app, output_folder, run_size=DEFAULT_RUN_SIZE):
+        self.app = app
+        self.output_folder = output_folder
+        self.run_size = run_size
+        self.sources = []
+        self.jobs = get_job_control(app)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+    def add_source(self, name, events):
+        """Registrar una fuente de eventos (iterable, se consume en streaming)"""
+        self.sources.append((name, events))
+
+    def build(self):
+        """Ordenar todas las fuentes juntas y escribir timeline.csv y timeline.db
+
+        Un único ordenador externo recibe los eventos de todas las fuentes, así que en memoria
+        hay como máximo un búfer de `run_size` eventos y la mezcla final abre a lo sumo
+        MAX_MERGE_FANIN corridas, sin importar la cantidad de fuentes.
+        """
+        csv_path = os.path.join(self.output_folder, "timeline.csv")
+        db_path = os.path.join(self.output_folder, "timeline.db")
+        temp_folder = tempfile.mkdtemp(prefix="timeline_", dir=self.output_folder)
+        counts = {}
+
+        try:
+            sorter = ExternalSorter(temp_folder, self.run_size)
+            for name, events in self.sources:
+                count_before = sorter.count
+                try:
+                    for event in events:
+                        self.jobs.check()
+                        sorter.add(event)
+                except (OSError, ValueError) as e:
+                    self.app.add_log(f"  Fuente {name} incompleta: {str(e)}", "WARNING")
+                added = sorter.count - count_before
+                counts[name] = counts.get(name, 0) + added
+                self.app.add_log(f"  {name}: {added} eventos", "INFO")
+            self.app.add_log(f"  {sorter.count} eventos en total ({len(sorter.runs)} corridas en disco)", "INFO")
+
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            with closing(sqlite3.connect(db_path)) as connection:
+                total, first, last = self._write_outputs(sorter, csv_path, connection)
+        finally:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
+        return {
+            "total_events": total,
+            "sources": counts,
+            "first_event": first,
+            "last_event": last,
+            "csv": csv_path,
+            "database": db_path,
+        }
+
+    def _write_outputs(self, sorter, csv_path, connection):
+        """Volcar los eventos ordenados al CSV y a la base; devuelve (total, primero, último)"""
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute(
+            "CREATE TABLE events (timestamp REAL, datetime_utc TEXT, source TEXT, type TEXT, description TEXT, artifact TEXT)"
+        )
+
+        total = 0
+        first = last = None
+        batch = []
+        insert = "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)"
+
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(TIMELINE_FIELDS)
+
+            for timestamp, source, event_type, description, artifact in sorter.sorted_events():
+                stamp = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                writer.writerow([stamp, f"{timestamp:.6f}", source, event_type, description, artifact])
+                batch.append((timestamp, stamp, source, event_type, description, artifact))
+                if len(batch) >= INSERT_BATCH:
+                    self.jobs.check()
+                    connection.executemany(insert, batch)
+                    batch = []
+                if first is None:
+                    first = stamp
+                last = stamp
+                total += 1
+
+        if batch:
+            connection.executemany(insert, batch)
+        connection.execute("CREATE INDEX idx_events_timestamp ON events(timestamp)")
+        connection.execute("CREATE INDEX idx_events_source ON events(source, timestamp)")
+        connection.commit()
+        return total, first, last
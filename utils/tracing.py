@@ -0,0 +1,244 @@
+"""
+Trazas de rendimiento del análisis
+Cada etapa (fase, herramienta externa, hash, análisis de un archivo) se mide con un span: tiempo real,
+CPU del hilo, pico de memoria, bytes leídos y escritos y recursos de los procesos hijos. Los spans se
+exportan en formato Chrome trace (chrome://tracing o ui.perfetto.dev) y alimentan el apéndice
+de rendimiento del reporte
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows: sin getrusage, los recursos de los hijos solo se miden con psutil
+    resource = None
+
+
+# Dentro de Hallazgos
+TRACE_FILE = "performance/trace.json"
+
+MB = 1024 * 1024
+
+
+def _process():
+    """psutil.Process del proceso actual, o None sin psutil"""
+    try:
+        import psutil
+        return psutil.Process()
+    except ImportError:
+        return None
+
+
+def _peak_rss(process):
+    """Pico de memoria residente del proceso, en bytes"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB; macOS, bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    if process is not None:
+        info = process.memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def _io_bytes(process):
+    """Bytes leídos y escritos por el proceso (todos sus hilos), si el sistema lo informa"""
+    if process is None or not hasattr(process, "io_counters"):
+        return None
+    try:
+        counters = process.io_counters()
+        return counters.read_bytes, counters.write_bytes
+    except Exception:
+        return None
+
+
+def _children_usage():
+    """CPU (s) y pico de memoria (bytes) de los procesos hijos ya finalizados"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return usage.ru_utime + usage.ru_stime, peak
+
+
+class Span:
+    """Etapa en curso; `args` se exporta con el evento y admite contadores propios
+
+    `bytes` es la cantidad de datos que procesó la etapa (por ejemplo, bytes hasheados).
+    """
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.child = {}
+
+    def add(self, **counters):
+        """Acumular contadores numéricos en los argumentos del span"""
+        for key, value in counters.items():
+            self.args[key] = self.args.get(key, 0) + value
+
+    def sample(self, pid):
+        """Medir un proceso hijo en ejecución (requiere psutil); llamar periódicamente mientras corre"""
+        try:
+            import psutil
+            child = psutil.Process(pid)
+            with child.oneshot():
+                cpu = child.cpu_times()
+                rss = child.memory_info().rss
+                io = child.io_counters() if hasattr(child, "io_counters") else None
+        except Exception:
+            return
+        self.child["cpu"] = cpu.user + cpu.system
+        self.child["rss"] = max(self.child.get("rss", 0), rss)
+        if io is not None:
+            self.child["read"] = io.read_bytes
+            self.child["written"] = io.write_bytes
+
+
+class Tracer:
+    """Spans de toda la ejecución, seguros entre hilos"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.process = _process() if enabled else None
+
+    @contextmanager
+    def span(self, name, category="etapa", **args):
+        """Medir el bloque como un span; las excepciones se propagan y el span queda registrado"""
+        span = Span(name, category, args)
+        if not self.enabled:
+            yield span
+            return
+
+        io_start = _io_bytes(self.process)
+        children_start = _children_usage()
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end = time.perf_counter()
+            resources = {"cpu_s": round(time.thread_time() - cpu_start, 4)}
+
+            peak = _peak_rss(self.process)
+            if peak is not None:
+                resources["peak_rss_mb"] = round(peak / MB, 1)
+
+            io_end = _io_bytes(self.process)
+            if io_start and io_end:
+                resources["read_mb"] = round((io_end[0] - io_start[0]) / MB, 2)
+                resources["written_mb"] = round((io_end[1] - io_start[1]) / MB, 2)
+
+            if span.child:
+                # Hijo medido con psutil mientras corría
+                resources["child_cpu_s"] = round(span.child["cpu"], 4)
+                resources["child_peak_rss_mb"] = round(span.child["rss"] / MB, 1)
+                if "read" in span.child:
+                    resources["child_read_mb"] = round(span.child["read"] / MB, 2)
+                    resources["child_written_mb"] = round(span.child["written"] / MB, 2)
+            elif children_start:
+                # Hijos ya finalizados; con herramientas en paralelo incluye las de otros hilos
+                children_end = _children_usage()
+                child_cpu = children_end[0] - children_start[0]
+                if child_cpu > 0:
+                    resources["child_cpu_s"] = round(child_cpu, 4)
+                    resources["child_peak_rss_mb"] = round(children_end[1] / MB, 1)
+
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+                "args": {**span.args, **resources},
+            }
+            with self.lock:
+                self.events.append(event)
+                self.threads[event["tid"]] = threading.current_thread().name
+
+    def trace(self):
+        """Eventos en formato Chrome trace, con el nombre de cada hilo"""
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.threads.items()
+            ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        """Guardar la traza (los spans terminados hasta ahora)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f, ensure_ascii=False)
+        return path
+
+
+# Para componentes usados sin aplicación que mida (por ejemplo desde la línea de comandos)
+NULL_TRACER = Tracer(enabled=False)
+
+
+def get_tracer(app):
+    """Tracer de la aplicación, o uno desactivado"""
+    return getattr(app, 'tracer', None) or NULL_TRACER
+
+
+def traced(name, category="etapa"):
+    """Medir un método de una fase o componente (con atributo `app`) como un span"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with get_tracer(self.app).span(name, category):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_rows(path):
+    """Spans de una traza guardada, en orden de inicio, con la etapa sangrada según el anidamiento"""
+    with open(path, 'r', encoding='utf-8') as f:
+        events = [event for event in json.load(f)["traceEvents"] if event.get("ph") == "X"]
+    events.sort(key=lambda event: (event["tid"], event["ts"], -event["dur"]))
+
+    depths = {}
+    open_spans = {}
+    for event in events:
+        stack = open_spans.setdefault(event["tid"], [])
+        while stack and stack[-1] <= event["ts"]:
+            stack.pop()
+        depths[id(event)] = len(stack)
+        stack.append(event["ts"] + event["dur"])
+
+    events.sort(key=lambda event: event["ts"])
+    for event in events:
+        args = event["args"]
+        yield [
+            "  " * depths[id(event)] + event["name"],
+            event["cat"],
+            f"{event['ts'] / 1e6:.2f}",
+            f"{event['dur'] / 1e6:.2f}",
+            f"{args.get('cpu_s', 0):.2f}",
+            f"{args['child_cpu_s']:.2f}" if "child_cpu_s" in args else "",
+            f"{args['peak_rss_mb']:.0f}" if "peak_rss_mb" in args else "",
+            f"{args['bytes'] / MB:.1f}" if "bytes" in args else "",
+            f"{args['read_mb']:.1f}" if "read_mb" in args else "",
+            f"{args['written_mb']:.1f}" if "written_mb" in args else "",
+        ]
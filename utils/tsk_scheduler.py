@@ -0,0 +1,295 @@
+"""
+Planificador de trabajos de The Sleuth Kit (TSK)
+Ejecuta mmls y reparte fsstat/fls/istat por partición en un pool de trabajadores
+"""
+
+import os
+import re
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.evidence_reader import get_evidence_size
+from utils.tracing import get_tracer
+from utils.job_control import get_job_control
+
+
+GB = 1024 ** 3
+
+# Tiempo base y segundos adicionales por GB de volumen para cada herramienta
+TIMEOUT_POLICY = {
+    "mmls": (120, 0),
+    "fsstat": (300, 10),
+    "fls": (600, 120),
+    "istat": (120, 0),
+}
+
+# fls escribe de forma continua: si deja de producir salida se considera bloqueado
+FLS_IDLE_TIMEOUT = 1800
+
+# Sistema de archivos -> inodo del directorio raíz en TSK
+ROOT_INODES = {
+    "NTFS": 5,
+}
+DEFAULT_ROOT_INODE = 2
+
+_PARTITION_LINE = re.compile(
+    r"^\s*(\d+):\s+(\d+:\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(.*)$"
+)
+_SECTOR_SIZE = re.compile(r"Units are in (\d+)-byte sectors")
+
+
+class TSKJob:
+    def __init__(self, tool, cmd, output_file, timeout, image, partition=None, idle_timeout=None):
+        self.tool = tool
+        self.cmd = cmd
+        self.output_file = output_file
+        self.timeout = timeout
+        self.image = image
+        self.partition = partition
+        self.idle_timeout = idle_timeout
+
+
+def parse_mmls_output(text):
+    """Extraer particiones (slot, inicio, longitud, descripción) de la salida de mmls"""
+    match = _SECTOR_SIZE.search(text)
+    sector_size = int(match.group(1)) if match else 512
+
+    partitions = []
+    for line in text.splitlines():
+        match = _PARTITION_LINE.match(line)
+        if not match:
+            continue
+        partitions.append({
+            "slot": match.group(2),
+            "start": int(match.group(3)),
+            "length": int(match.group(5)),
+            "description": match.group(6).strip(),
+            "sector_size": sector_size,
+        })
+    return partitions
+
+
+def parse_fsstat_output(text):
+    """Obtener tipo de sistema de archivos e inodo raíz de la salida de fsstat"""
+    fs_type = ""
+    root_inode = None
+    for line in text.splitlines():
+        if line.startswith("File System Type:"):
+            fs_type = line.split(":", 1)[1].strip()
+        elif line.startswith("Root Directory:"):
+            value = line.split(":", 1)[1].strip()
+            if value.isdigit():
+                root_inode = int(value)
+    if root_inode is None:
+        root_inode = ROOT_INODES.get(fs_type.upper(), DEFAULT_ROOT_INODE)
+    return fs_type, root_inode
+
+
+def adaptive_timeout(tool, size_bytes):
+    """Timeout proporcional al tamaño del volumen analizado"""
+    base, per_gb = TIMEOUT_POLICY[tool]
+    return base + int(per_gb * size_bytes / GB)
+
+
+class TSKScheduler:
+    def __init__(self, app, tsk_bin_dir, output_folder, max_workers=None):
+        self.app = app
+        self.tsk_bin_dir = tsk_bin_dir
+        self.output_folder = output_folder
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+        self.jobs = get_job_control(app)
+
+    def tool_path(self, tool):
+        """Ruta del ejecutable de una herramienta TSK"""
+        return os.path.join(self.tsk_bin_dir, f"{tool}.exe")
+
+    def run(self, images):
+        """Procesar imágenes en paralelo
+
+        images: lista de (ruta, analizar_particiones). Devuelve un resumen por imagen.
+        """
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            for image_path, analyze_partitions in images:
+                name = os.path.basename(image_path)
+                results[name] = {"image": image_path, "partitions": [], "jobs": []}
+                job = TSKJob(
+                    "mmls",
+                    [self.tool_path("mmls"), image_path],
+                    os.path.join(self.output_folder, f"mmls_{name}.txt"),
+                    adaptive_timeout("mmls", 0),
+                    image_path,
+                )
+                pending[pool.submit(self.execute_job, job)] = (job, analyze_partitions)
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job, analyze_partitions = pending.pop(future)
+                    status = future.result()
+                    results[os.path.basename(job.image)]["jobs"].append(status)
+
+                    for next_job in self.follow_up_jobs(job, status, analyze_partitions, results):
+                        pending[pool.submit(self.execute_job, next_job)] = (next_job, analyze_partitions)
+
+        return results
+
+    def follow_up_jobs(self, job, status, analyze_partitions, results):
+        """Generar los trabajos que dependen de un trabajo terminado"""
+        name = os.path.basename(job.image)
+        jobs = []
+
+        if job.tool == "mmls":
+            partitions = []
+            if status["status"] == "ok":
+                with open(job.output_file, 'r', encoding='utf-8', errors='ignore') as f:
+                    partitions = parse_mmls_output(f.read())
+            if not partitions:
+                # Sin tabla de particiones: la imagen es un volumen
+                partitions = [{
+                    "slot": "vol",
+                    "start": 0,
+                    "length": get_evidence_size(job.image) // 512,
+                    "description": "Volumen sin tabla de particiones",
+                    "sector_size": 512,
+                }]
+            results[name]["partitions"] = partitions
+
+            if not analyze_partitions:
+                return jobs
+
+            for partition in partitions:
+                jobs.append(self._partition_job("fsstat", job.image, partition))
+                jobs.append(self._partition_job("fls", job.image, partition))
+
+        elif job.tool == "fsstat" and status["status"] == "ok":
+            with open(job.output_file, 'r', encoding='utf-8', errors='ignore') as f:
+                fs_type, root_inode = parse_fsstat_output(f.read())
+            job.partition["file_system"] = fs_type
+            job.partition["root_inode"] = root_inode
+            jobs.append(self._partition_job("istat", job.image, job.partition, [str(root_inode)]))
+
+        return jobs
+
+    def _partition_job(self, tool, image_path, partition, extra_args=None):
+        """Crear un trabajo TSK sobre una partición usando su offset (-o)"""
+        name = os.path.basename(image_path)
+        size_bytes = partition["length"] * partition["sector_size"]
+        suffix = f"_o{partition['start']}"
+
+        cmd = [self.tool_path(tool), "-o", str(partition["start"])]
+        extension = "txt"
+        if tool == "fls":
+            # Formato bodyfile: rutas completas, tamaños y tiempos MAC para el catálogo
+            cmd += ["-r", "-m", "/"]
+            extension = "body"
+        cmd.append(image_path)
+        cmd += extra_args or []
+
+        return TSKJob(
+            tool,
+            cmd,
+            os.path.join(self.output_folder, f"{tool}_{name}{suffix}.{extension}"),
+            adaptive_timeout(tool, size_bytes),
+            image_path,
+            partition,
+            idle_timeout=FLS_IDLE_TIMEOUT if tool == "fls" else None,
+        )
+
+    def execute_job(self, job):
+        """Ejecutar un trabajo enviando la salida directamente a disco"""
+        label = f"{job.tool} {os.path.basename(job.image)}"
+        if job.partition:
+            label += f" (offset {job.partition['start']})"
+        self.app.add_log(f"Ejecutando TSK: {label}", "INFO")
+
+        error_file = job.output_file + ".err"
+        started = time.monotonic()
+        status = "ok"
+        returncode = None
+
+        with get_tracer(self.app).span(label, "herramienta", cmd=" ".join(job.cmd)) as span:
+            try:
+                with open(job.output_file, 'wb') as out, open(error_file, 'wb') as err:
+                    process = self.jobs.popen(job.cmd, stdout=out, stderr=err)
+                    last_size = 0
+                    last_growth = started
+
+                    try:
+                        while True:
+                            try:
+                                returncode = process.wait(timeout=1)
+                                break
+                            except subprocess.TimeoutExpired:
+                                pass
+
+                            span.sample(process.pid)
+                            now = time.monotonic()
+                            size = os.path.getsize(job.output_file)
+                            if size != last_size:
+                                last_size = size
+                                last_growth = now
+
+                            if now - started > job.timeout:
+                                status = "timeout"
+                            elif job.idle_timeout and now - last_growth > job.idle_timeout:
+                                status = "stalled"
+                            if status != "ok":
+                                process.kill()
+                                process.wait()
+                                break
+                    finally:
+                        self.jobs.release(process)
+                # Terminado al detener el análisis: no es un error de la herramienta
+                self.jobs.check()
+
+                if returncode not in (None, 0) and status == "ok":
+                    status = "error"
+
+                # Mismo formato que las salidas anteriores: errores al final del archivo
+                if os.path.getsize(error_file):
+                    with open(job.output_file, 'ab') as out, open(error_file, 'rb') as err:
+                        out.write(b"\n\nERRORS:\n")
+                        out.write(err.read())
+                os.remove(error_file)
+
+            except Exception as e:
+                status = "error"
+                self.app.add_log(f"  Error al ejecutar {label}: {str(e)}", "WARNING")
+            span.args["status"] = status
+
+        elapsed = time.monotonic() - started
+        lines = self._count_lines(job.output_file)
+
+        if status == "ok":
+            self.app.add_log(f"✓ {label} completado ({lines} líneas, {elapsed:.1f} s)", "SUCCESS")
+        elif status in ("timeout", "stalled"):
+            self.app.add_log(f"  {label} detenido ({status}) tras {elapsed:.0f} s; salida parcial conservada", "WARNING")
+        else:
+            self.app.add_log(f"  {label} terminó con errores (código {returncode})", "WARNING")
+
+        return {
+            "tool": job.tool,
+            "output": os.path.basename(job.output_file),
+            "offset": job.partition["start"] if job.partition else None,
+            "status": status,
+            "returncode": returncode,
+            "elapsed": round(elapsed, 2),
+            "timeout": job.timeout,
+            "lines": lines,
+        }
+
+    def _count_lines(self, path):
+        """Contar líneas de un archivo sin cargarlo completo"""
+        count = 0
+        try:
+            with open(path, 'rb') as f:
+                while chunk := f.read(1024 * 1024):
+                    count += chunk.count(b"\n")
+        except OSError:
+            pass
+        return count